@@ -3,6 +3,7 @@ from typing import Dict, Any, Optional
 from .common.config import settings
 from .common.queue_manager import queue_manager
 from .common.storage import storage
+from .common.cancellation import CancellationToken
 from .sandbox.base import Sandbox
 from .sandbox.daytona import DaytonaSandbox
 
@@ -15,6 +16,12 @@ ACTIVE_AI_CONFIGS: Dict[str, Any] = {}
 # Registry for active worker tokens (Used by Worker process only)
 ACTIVE_WORKER_TOKENS: Dict[str, str] = {}
 
+# Registry for active cancellation tokens (Used by Worker process only)
+ACTIVE_CANCEL_TOKENS: Dict[str, CancellationToken] = {}
+
+# Registry for session traces: a TraceWriter while recording, a TraceReader while replaying
+ACTIVE_SESSION_TRACES: Dict[str, Any] = {}
+
 class AgentManager:
     """Singleton to manage task submission (API side) and execution (Worker side)"""
     _instance = None
@@ -107,6 +114,21 @@ class AgentManager:
             storage.save_state(session_id, state)
             return True
 
+    def cancel_session(self, session_id: str) -> bool:
+        """API Side: Request cancellation (POST /agent/sessions/{id}/cancel). A running worker notices within a few seconds."""
+        status = storage.get_session_status(session_id)
+        if not status or status in ["UNKNOWN", "COMPLETED", "FAILED", "CANCELLED"]:
+            return False
+        storage.set_session_status(session_id, "CANCELLED")
+        storage.append_log(session_id, "Cancellation requested.")
+
+        # A paused session has no worker to notice, so it must not be resumable either
+        state = storage.get_state(session_id)
+        if state and state.get("status") == "WAITING_FOR_USER":
+            state["status"] = "CANCELLED"
+            storage.save_state(session_id, state)
+        return True
+
     def get_session_status(self, session_id: str) -> Dict[str, Any]:
         """API Side: Read status"""
         return {
@@ -154,3 +176,29 @@ class AgentManager:
         """Worker Side: Cleanup worker token"""
         if session_id in ACTIVE_WORKER_TOKENS:
             del ACTIVE_WORKER_TOKENS[session_id]
+
+    def get_cancel_token(self, session_id: str) -> Optional[CancellationToken]:
+        """Worker Side: Retrieve active cancellation token"""
+        return ACTIVE_CANCEL_TOKENS.get(session_id)
+
+    def register_cancel_token(self, session_id: str, token: CancellationToken):
+        """Worker Side: Register cancellation token"""
+        ACTIVE_CANCEL_TOKENS[session_id] = token
+
+    def unregister_cancel_token(self, session_id: str):
+        """Worker Side: Cleanup cancellation token"""
+        if session_id in ACTIVE_CANCEL_TOKENS:
+            del ACTIVE_CANCEL_TOKENS[session_id]
+
+    def get_session_trace(self, session_id: str) -> Optional[Any]:
+        """Worker Side: Retrieve the session's trace writer or replay reader"""
+        return ACTIVE_SESSION_TRACES.get(session_id)
+
+    def register_session_trace(self, session_id: str, trace: Any):
+        """Worker Side: Register session trace"""
+        ACTIVE_SESSION_TRACES[session_id] = trace
+
+    def unregister_session_trace(self, session_id: str):
+        """Worker Side: Cleanup session trace"""
+        if session_id in ACTIVE_SESSION_TRACES:
+            del ACTIVE_SESSION_TRACES[session_id]
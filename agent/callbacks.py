@@ -1,6 +1,13 @@
+import time
 from typing import Dict, Any, List, Optional
+from uuid import UUID
 from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
 from .common.storage import storage
+from .common.tracing import tracer
+from .common.cancellation import SessionCancelled
+from .common.usage import extract_usage, record_usage
+from .common.session_trace import TraceWriter, dump_generations, message_key
 
 class SessionCallbackHandler(BaseCallbackHandler):
     def __init__(self, session_id: str):
@@ -20,3 +27,171 @@ class SessionCallbackHandler(BaseCallbackHandler):
 
     def on_tool_error(self, error: BaseException, **kwargs: Any) -> Any:
         storage.append_log(self.session_id, f"Tool error: {str(error)}")
+
+class SessionOutputStream:
+    """
+    Forwards streamed command output to the session log in batches, so users see
+    progress live without one storage write per chunk. Call flush() when done.
+    """
+
+    def __init__(self, session_id: str, flush_interval: float = 2.0, max_chars: int = 20000):
+        self.session_id = session_id
+        self.flush_interval = flush_interval
+        self.max_chars = max_chars
+        self._pending: List[str] = []
+        self._logged_chars = 0
+        self._last_flush = time.monotonic()
+        self._capped = False
+
+    def __call__(self, text: str):
+        if self._capped:
+            return
+        self._pending.append(text)
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        text = "".join(self._pending).rstrip("\n")
+        self._pending = []
+        if not text or self._capped:
+            return
+        room = self.max_chars - self._logged_chars
+        if len(text) > room:
+            text = f"{text[:room]}\n... (live output capped, full result follows when the command ends)"
+            self._capped = True
+        self._logged_chars += len(text)
+        storage.append_log(self.session_id, f"Output: {text}")
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Opens a span for every LLM and tool call, keyed by LangChain run_id."""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.spans: Dict[UUID, Any] = {}
+
+    def _start(self, run_id: UUID, name: str, **attributes: Any):
+        self.spans[run_id] = tracer.start_span(name, {"session_id": self.session_id, **attributes})
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None, **attributes: Any):
+        span = self.spans.pop(run_id, None)
+        if span is None:
+            return
+        if attributes:
+            span.set_attributes(attributes)
+        if error is not None:
+            span.record_error(error)
+        tracer.end_span(span)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID, **kwargs: Any) -> Any:
+        model = (kwargs.get("invocation_params") or {}).get("model") or (kwargs.get("invocation_params") or {}).get("model_name")
+        role = (kwargs.get("metadata") or {}).get("model_role")
+        self._start(run_id, "llm.call", model=model or serialized.get("name", "llm"), message_count=sum(len(m) for m in messages), **({"model_role": role} if role else {}))
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> Any:
+        self._start(run_id, "llm.call", model=serialized.get("name", "llm"), prompt_count=len(prompts))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> Any:
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        attributes = {k: v for k, v in usage.items() if isinstance(v, (int, float))}
+        attributes["cached_tokens"] = extract_usage(response)["cached_tokens"]
+        self._end(run_id, **attributes)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> Any:
+        self._end(run_id, error=error)
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> Any:
+        self._start(run_id, "tool.call", tool=serialized.get("name", "tool"), input_chars=len(input_str))
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> Any:
+        self._end(run_id, output_chars=len(str(output)))
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> Any:
+        self._end(run_id, error=error)
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """
+    Adds every LLM call's token usage, including prompt cache hits, to the session totals,
+    and per model role (from the model's metadata, see get_llm) with the call's latency.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.calls: Dict[UUID, Any] = {}
+
+    def _start(self, run_id: Optional[UUID], metadata: Optional[Dict[str, Any]]):
+        if run_id is not None and metadata and metadata.get("model_role"):
+            self.calls[run_id] = (metadata["model_role"], metadata.get("model_name"), time.perf_counter())
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID = None, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Any:
+        self._start(run_id, metadata)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID = None, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Any:
+        self._start(run_id, metadata)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID = None, **kwargs: Any) -> Any:
+        call = self.calls.pop(run_id, None)
+        if call is None:
+            record_usage(self.session_id, extract_usage(response))
+            return
+        role, model, started = call
+        record_usage(self.session_id, extract_usage(response), role=role, model=model, latency_ms=(time.perf_counter() - started) * 1000)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID = None, **kwargs: Any) -> Any:
+        self.calls.pop(run_id, None)
+
+class LLMRecordingCallbackHandler(BaseCallbackHandler):
+    """Writes every chat request's key and response to the session trace for later replay."""
+
+    def __init__(self, writer: TraceWriter):
+        self.writer = writer
+        self.requests: Dict[UUID, str] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID, **kwargs: Any) -> Any:
+        self.requests[run_id] = message_key(messages[0])
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> Any:
+        key = self.requests.pop(run_id, None)
+        if key is None or not response.generations:
+            return
+        self.writer.write({"kind": "llm", "key": key, "generations": dump_generations(response.generations[0]), "llm_output": response.llm_output})
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> Any:
+        self.requests.pop(run_id, None)
+
+class CancellationCallbackHandler(BaseCallbackHandler):
+    """Stops an agent run at the next LLM or tool call once the session is cancelled."""
+
+    raise_error = True
+
+    def __init__(self, session_id: str, token):
+        self.session_id = session_id
+        self.token = token
+
+    def _check(self):
+        if self.token.cancelled:
+            raise SessionCancelled(self.token.reason or "Session cancelled")
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], **kwargs: Any) -> Any:
+        self._check()
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> Any:
+        self._check()
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs: Any) -> Any:
+        self._check()
+
+def get_session_callbacks(session_id: str) -> List[BaseCallbackHandler]:
+    """Callbacks every node attaches to its LLM chains and agent executors."""
+    from .agent import AgentManager
+
+    callbacks: List[BaseCallbackHandler] = [SessionCallbackHandler(session_id), UsageCallbackHandler(session_id)]
+    if tracer.enabled:
+        callbacks.append(TracingCallbackHandler(session_id))
+    trace = AgentManager().get_session_trace(session_id)
+    if isinstance(trace, TraceWriter):
+        callbacks.append(LLMRecordingCallbackHandler(trace))
+    token = AgentManager().get_cancel_token(session_id)
+    if token is not None:
+        callbacks.append(CancellationCallbackHandler(session_id, token))
+    return callbacks
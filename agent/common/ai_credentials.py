@@ -8,7 +8,7 @@ The server looks up the session's user and their AI preferences to return approp
 import logging
 import requests
 from dataclasses import dataclass
-from typing import Optional
+from typing import Dict, Optional
 
 from .config import settings
 
@@ -17,11 +17,18 @@ logger = logging.getLogger(__name__)
 
 @dataclass
 class AICredentials:
-    """AI credentials for LLM operations."""
+    """
+    AI credentials for LLM operations.
+
+    models maps role names (e.g. "small", "large") to models of the same provider.
+    node_models maps graph nodes to a role or a model name and overrides LLM_NODE_ROLES.
+    """
     provider: str
     model: str
     api_key: str
     base_url: Optional[str] = None
+    models: Optional[Dict[str, str]] = None
+    node_models: Optional[Dict[str, str]] = None
 
 
 def fetch_ai_credentials(session_id: str, worker_token: str) -> Optional[AICredentials]:
@@ -62,7 +69,9 @@ def fetch_ai_credentials(session_id: str, worker_token: str) -> Optional[AICrede
             provider=data["provider"],
             model=data["model"],
             api_key=data["api_key"],
-            base_url=data.get("base_url")
+            base_url=data.get("base_url"),
+            models=data.get("models"),
+            node_models=data.get("node_models")
         )
 
     except requests.Timeout:
@@ -0,0 +1,64 @@
+"""
+Cancellation Module
+
+A session-wide cancellation token shared by the worker, the workflow manager, the
+sandbox and the agent tools, so a stuck or cancelled session frees its worker slot
+promptly instead of waiting for every remaining command to finish.
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+
+
+class SessionCancelled(Exception):
+    """Raised when work is attempted on a cancelled session."""
+
+
+class CancellationToken:
+    """
+    Cancelled explicitly via cancel(), when the optional deadline passes, or when the
+    optional external check (e.g. a storage flag set by the API) returns True. The
+    external check is rate-limited to once per poll_interval seconds.
+    """
+
+    def __init__(self, deadline: Optional[float] = None, check: Optional[Callable[[], bool]] = None, poll_interval: float = 5.0):
+        self.deadline = deadline
+        self._check = check
+        self._poll_interval = poll_interval
+        self._last_poll = 0.0
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+
+    def cancel(self, reason: str = "Session cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        now = time.time()
+        if self.deadline is not None and now >= self.deadline:
+            self.cancel("Session time limit reached")
+            return True
+        if self._check is not None and now - self._last_poll >= self._poll_interval:
+            self._last_poll = now
+            try:
+                if self._check():
+                    self.cancel("Cancelled by user")
+            except Exception:
+                # A failing check must never cancel a healthy session
+                pass
+        return self._event.is_set()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, or None when there is no deadline."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.time())
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise SessionCancelled(self.reason or "Session cancelled")
@@ -16,8 +16,70 @@ class Config:
     DAYTONA_SNAPSHOT_NAME = os.getenv("DAYTONA_SNAPSHOT_NAME", "")
     DAYTONA_TARGET_REPO = os.getenv("DAYTONA_TARGET_REPO", "")
 
+    # Sandbox resources (Daytona Resources); SANDBOX_CPU also sets the test shard count
+    SANDBOX_CPU = int(os.getenv("SANDBOX_CPU", "2"))
+    SANDBOX_MEMORY_GB = int(os.getenv("SANDBOX_MEMORY_GB", "4"))
+    SANDBOX_DISK_GB = int(os.getenv("SANDBOX_DISK_GB", "10"))
+    # Parallel test shards (0 follows SANDBOX_CPU, 1 runs tests serially)
+    TEST_SHARDS = int(os.getenv("TEST_SHARDS", "0"))
+
+    # Sandbox command output cap (characters kept per command, head + tail)
+    COMMAND_OUTPUT_MAX_CHARS = int(os.getenv("COMMAND_OUTPUT_MAX_CHARS", "200000"))
+
+    # Default token budget for a single tool result in the agent scratchpad (0 disables)
+    TOOL_OUTPUT_TOKEN_BUDGET = int(os.getenv("TOOL_OUTPUT_TOKEN_BUDGET", "4000"))
+
+    # Programmer scratchpad: tool results kept verbatim, and the token ceiling for all of them (0 disables)
+    SCRATCHPAD_KEEP_STEPS = int(os.getenv("SCRATCHPAD_KEEP_STEPS", "4"))
+    SCRATCHPAD_TOKEN_CEILING = int(os.getenv("SCRATCHPAD_TOKEN_CEILING", "30000"))
+
+    # Repeated read-only tool calls within one agent run are answered from memory
+    TOOL_RESULT_CACHE_ENABLED = os.getenv("TOOL_RESULT_CACHE_ENABLED", "true").lower() == "true"
+
+    # Read-only tool calls from one model turn that may run at the same time (1 runs them serially)
+    TOOL_CALL_CONCURRENCY = int(os.getenv("TOOL_CALL_CONCURRENCY", "4"))
+
+    # Independent graph nodes (env setup and planning, plan critic and branch naming) run concurrently
+    PARALLEL_NODES_ENABLED = os.getenv("PARALLEL_NODES_ENABLED", "true").lower() == "true"
+
+    # Fast path for small goals: classifier ("heuristic", "llm" or "off") and the largest change it may submit
+    FAST_PATH_CLASSIFIER = os.getenv("FAST_PATH_CLASSIFIER", "heuristic").lower()
+    FAST_PATH_MAX_CHANGED_LINES = int(os.getenv("FAST_PATH_MAX_CHANGED_LINES", "40"))
+
+    # Timeouts (seconds, 0 disables): per sandbox command and per worker session
+    COMMAND_TIMEOUT_SEC = int(os.getenv("COMMAND_TIMEOUT_SEC", "900"))
+    SESSION_TIMEOUT_SEC = int(os.getenv("SESSION_TIMEOUT_SEC", "7200"))
+
     # Redis configuration
     REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     STORAGE_TYPE = os.getenv("STORAGE_TYPE", "file") # file or redis
 
+    # Shared per-commit repository context cache (file or redis, following STORAGE_TYPE)
+    REPO_CACHE_ENABLED = os.getenv("REPO_CACHE_ENABLED", "true").lower() == "true"
+    REPO_CACHE_TTL_SEC = int(os.getenv("REPO_CACHE_TTL_SEC", str(86400 * 30)))
+
+    # Deterministic LLM response cache (sqlite or redis, following STORAGE_TYPE), per graph node
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() == "true"
+    LLM_CACHE_NODES = os.getenv("LLM_CACHE_NODES", "planner,plan_critic,branch_naming,submit")
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+
+    # Model role per graph node ("node=role,..."). A role is used when the AI config names a model for it
+    LLM_NODE_ROLES = os.getenv("LLM_NODE_ROLES", "branch_naming=small,submit=small,plan_critic=small,classifier=small,programmer=large")
+    # Models per role ("role=model,...") for AI configs that do not name their own
+    LLM_ROLE_MODELS = os.getenv("LLM_ROLE_MODELS", "")
+    # USD per million prompt/completion tokens, for the usage report ("model=input/output,...")
+    LLM_PRICES = os.getenv("LLM_PRICES", "")
+
+    # Snapshot the sandbox after env setup and reuse it while lockfiles are unchanged
+    ENV_SNAPSHOTS_ENABLED = os.getenv("ENV_SNAPSHOTS_ENABLED", "true").lower() == "true"
+    ENV_SNAPSHOT_TIMEOUT_SEC = int(os.getenv("ENV_SNAPSHOT_TIMEOUT_SEC", "600"))
+
+    # Record every LLM and sandbox call of a session to <dir>/<session_id>-<timestamp>.jsonl for replay ("" disables)
+    SESSION_RECORD_DIR = os.getenv("SESSION_RECORD_DIR", "")
+
+    # Tracing configuration
+    TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+    TRACE_FILE = os.getenv("TRACE_FILE", os.path.join(WORKSPACE_DIR, "traces", "spans.jsonl"))
+    OTEL_EXPORTER_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "")
+
 settings = Config()
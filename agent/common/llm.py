@@ -1,13 +1,41 @@
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from langchain_openai import ChatOpenAI, AzureChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_community.chat_models import ChatOllama
 from ..agent import AgentManager
+from .config import settings
+from .llm_cache import cache_enabled_for, get_llm_cache
+from .replay_llm import ReplayChatModel
+from .scripted_llm import ScriptedChatModel
 
-def get_llm(session_id: str):
+def parse_mapping(value: str) -> Dict[str, str]:
+    """"key=value,key=value" as a dict."""
+    pairs = (item.split("=", 1) for item in value.split(",") if "=" in item)
+    return {key.strip(): val.strip() for key, val in pairs if key.strip() and val.strip()}
+
+def resolve_model(ai_config, node: Optional[str]) -> Tuple[str, str]:
+    """
+    (model, role) for a node. The AI config's node_models override comes first, then the
+    node's LLM_NODE_ROLES role; either is looked up in the config's role models (or
+    LLM_ROLE_MODELS when it has none). Nodes without a match use the config's model under
+    the role "default". An override naming a model directly is reported under that name.
+    """
+    models = getattr(ai_config, "models", None) or parse_mapping(settings.LLM_ROLE_MODELS)
+    overrides = getattr(ai_config, "node_models", None) or {}
+    if node in overrides:
+        target = overrides[node]
+        return models.get(target, target), target
+    role = parse_mapping(settings.LLM_NODE_ROLES).get(node)
+    if role in models:
+        return models[role], role
+    return ai_config.model, "default"
+
+def get_llm(session_id: str, node: Optional[str] = None):
     """
     Retrieve the LLM instance based on the session's active AI configuration.
-    Strictly requires a session_id and a registered AI config.
+    Strictly requires a session_id and a registered AI config. `node` is the calling
+    graph node, which decides the model (see resolve_model) and whether responses come
+    from the response cache.
     """
     if not session_id:
         raise ValueError("session_id is required to retrieve LLM configuration.")
@@ -19,20 +47,21 @@ def get_llm(session_id: str):
         raise ValueError(f"No active AI configuration found for session {session_id}. Worker must fetch credentials first.")
 
     provider = ai_config.provider
-    model_name = ai_config.model
+    model_name, role = resolve_model(ai_config, node)
     api_key = ai_config.api_key
     base_url = ai_config.base_url
     deployment = None
+    cached = cache_enabled_for(node)
 
     # Provider-specific adjustments
     if provider == "azure":
-        deployment = ai_config.model # Use model name as deployment name for Azure
+        deployment = model_name # Use model name as deployment name for Azure
 
     if provider == "google":
         if not api_key:
              raise ValueError(f"Google API Key is missing for session {session_id}.")
 
-        return ChatGoogleGenerativeAI(
+        llm = ChatGoogleGenerativeAI(
             model=model_name,
             google_api_key=api_key,
             temperature=0
@@ -40,7 +69,7 @@ def get_llm(session_id: str):
     elif provider == "azure":
         if not api_key:
              raise ValueError(f"Azure API Key is missing for session {session_id}.")
-        return AzureChatOpenAI(
+        llm = AzureChatOpenAI(
             deployment_name=deployment,
             openai_api_version="2023-05-15",
             azure_endpoint=base_url,
@@ -49,17 +78,35 @@ def get_llm(session_id: str):
         )
     elif provider == "ollama":
         final_base_url = base_url or "http://localhost:11434"
-        return ChatOllama(
+        llm = ChatOllama(
             model=model_name,
             base_url=final_base_url,
             temperature=0
         )
     elif provider == "openai":
-        return ChatOpenAI(
+        # Routes a session's calls to the same cache shard so the shared prompt prefix
+        # (see prompt_layout) hits. OpenAI-compatible servers may reject the parameter.
+        # Left out for cached nodes: it is part of the response cache key and would tie
+        # entries to one session.
+        model_kwargs = {} if base_url or cached else {"prompt_cache_key": session_id}
+        llm = ChatOpenAI(
             model=model_name,
             api_key=api_key,
             base_url=base_url if base_url else None,
-            temperature=0
+            temperature=0,
+            model_kwargs=model_kwargs
         )
+    elif provider == "replay":
+        # Offline replay of a recorded session (see agent/replay.py)
+        llm = ReplayChatModel(trace=manager.get_session_trace(session_id), model=model_name or "replay")
+    elif provider == "scripted":
+        # Canned replies for benchmarks (see benchmarks/orchestration.py)
+        llm = ScriptedChatModel(model=model_name or "scripted", latency_sec=getattr(ai_config, "latency_sec", 0.0))
     else:
         raise ValueError(f"Unsupported LLM provider: {provider}")
+
+    if cached:
+        llm.cache = get_llm_cache()
+    # Passed to callbacks, which report usage, latency and cost per role
+    llm.metadata = {**(llm.metadata or {}), "node": node, "model_role": role, "model_name": model_name}
+    return llm
@@ -0,0 +1,152 @@
+"""
+LLM Response Cache
+
+Deterministic (temperature 0) responses reused across retries, resumes and replays.
+Entries are keyed by a hash of the model parameters, bound tools and the serialized
+messages, which LangChain hands to the cache as (prompt, llm_string). Backed by SQLite
+or Redis following STORAGE_TYPE, bounded by entry count with least-recently-used
+eviction. Opt-in per node through LLM_CACHE_NODES.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from typing import Any, Optional
+
+import redis
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.load import dumps, loads
+
+from .config import settings
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    return hashlib.sha256(f"{llm_string}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+def _serialize(return_val: RETURN_VAL_TYPE) -> str:
+    return dumps(list(return_val))
+
+
+def _deserialize(data) -> Optional[RETURN_VAL_TYPE]:
+    try:
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message=".*`loads` is in beta")
+            return loads(data.decode("utf-8") if isinstance(data, bytes) else data)
+    except Exception:
+        # Written by an incompatible LangChain version: treat as a miss
+        return None
+
+
+class SQLiteLLMCache(BaseCache):
+    def __init__(self, path: str = None, max_entries: int = None):
+        self.path = path or os.path.join(settings.WORKSPACE_DIR, "cache", "llm.sqlite")
+        self.max_entries = max_entries or settings.LLM_CACHE_MAX_ENTRIES
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        # One connection shared by the worker's threads, serialized by the lock
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, accessed REAL NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed)")
+        self.conn.commit()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE llm_cache SET accessed = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+        return _deserialize(row[0])
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, accessed) VALUES (?, ?, ?)",
+                (key, _serialize(return_val), time.time())
+            )
+            self.conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self.conn.commit()
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM llm_cache")
+            self.conn.commit()
+
+    # Not __len__: LangChain tests the cache object for truthiness, and an empty cache would read as absent
+    def size(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+class RedisLLMCache(BaseCache):
+    """Values under llm:cache:<key>; a sorted set of last-access times drives eviction."""
+
+    INDEX = "llm:cache:lru"
+
+    def __init__(self, client=None, max_entries: int = None):
+        self.redis = client or redis.from_url(settings.REDIS_URL)
+        self.max_entries = max_entries or settings.LLM_CACHE_MAX_ENTRIES
+
+    def _key(self, key: str) -> str:
+        return f"llm:cache:{key}"
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = cache_key(prompt, llm_string)
+        data = self.redis.get(self._key(key))
+        if data is None:
+            return None
+        self.redis.zadd(self.INDEX, {key: time.time()})
+        return _deserialize(data)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = cache_key(prompt, llm_string)
+        pipe = self.redis.pipeline()
+        pipe.set(self._key(key), _serialize(return_val))
+        pipe.zadd(self.INDEX, {key: time.time()})
+        pipe.execute()
+        overflow = self.redis.zcard(self.INDEX) - self.max_entries
+        if overflow > 0:
+            evicted = self.redis.zrange(self.INDEX, 0, overflow - 1)
+            if evicted:
+                keys = [k.decode("utf-8") if isinstance(k, bytes) else k for k in evicted]
+                self.redis.delete(*[self._key(k) for k in keys])
+                self.redis.zrem(self.INDEX, *keys)
+
+    def clear(self, **kwargs: Any) -> None:
+        keys = [k.decode("utf-8") if isinstance(k, bytes) else k for k in self.redis.zrange(self.INDEX, 0, -1)]
+        if keys:
+            self.redis.delete(*[self._key(k) for k in keys])
+        self.redis.delete(self.INDEX)
+
+
+_cache: Optional[BaseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> BaseCache:
+    """The process-wide response cache, created on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            if settings.STORAGE_TYPE == "redis":
+                _cache = RedisLLMCache()
+            else:
+                _cache = SQLiteLLMCache()
+        return _cache
+
+
+def cache_enabled_for(node: Optional[str]) -> bool:
+    if not settings.LLM_CACHE_ENABLED or not node:
+        return False
+    nodes = {n.strip() for n in settings.LLM_CACHE_NODES.split(",") if n.strip()}
+    return "*" in nodes or node in nodes
@@ -0,0 +1,74 @@
+"""
+Prompt Layout
+
+Assembles node prompts from blocks ordered from most to least stable, so consecutive
+LLM calls share the longest possible prefix and provider prompt caching can reuse it:
+
+1. repo       - AGENTS.md and the codebase tree; identical for every node in a session
+2. instructions - the node's role and rules; identical for every call of that node
+3. session    - goal and plan; change only on replanning
+4. volatile   - feedback, user input and the per-call request
+
+The first three go into the system message and the volatile blocks into the human
+message, so an agent's growing scratchpad only ever appends after the cached prefix.
+The configured providers (OpenAI, Azure, Gemini, Ollama) cache prefixes automatically
+and take no explicit breakpoints; a stable prefix is what earns the cache hits.
+"""
+from typing import List, Optional, Tuple
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
+
+TIERS = ("repo", "instructions", "session", "volatile")
+
+
+class PromptLayout:
+    def __init__(self):
+        self.blocks = {tier: [] for tier in TIERS}
+
+    def add(self, tier: str, text: Optional[str], title: Optional[str] = None) -> "PromptLayout":
+        if tier not in self.blocks:
+            raise ValueError(f"Unknown prompt tier: {tier}")
+        if text:
+            self.blocks[tier].append(f"### {title}\n{text.strip()}" if title else text.strip())
+        return self
+
+    def repo(self, state, tree: Optional[str] = None) -> "PromptLayout":
+        """The shared repository block: AGENTS.md, then the codebase tree."""
+        agents_md = state.get("agents_md_content")
+        if agents_md:
+            self.add("repo", f"You MUST obey the following instructions found in AGENTS.md:\n{agents_md}", "REPOSITORY SPECIFIC INSTRUCTIONS (AGENTS.MD)")
+        self.add("repo", tree or state.get("codebase_tree"), "CODEBASE TREE")
+        return self
+
+    def instructions(self, text: str) -> "PromptLayout":
+        return self.add("instructions", text)
+
+    def session(self, text: Optional[str], title: Optional[str] = None) -> "PromptLayout":
+        return self.add("session", text, title)
+
+    def task(self, state, plan: bool = True) -> "PromptLayout":
+        """Goal and (optionally) plan as one session block."""
+        text = f"Goal: {state['goal']}"
+        if plan and state.get("plan"):
+            text += f"\nPlan:\n{state['plan']}"
+        return self.session(text, "TASK")
+
+    def volatile(self, text: Optional[str], title: Optional[str] = None) -> "PromptLayout":
+        return self.add("volatile", text, title)
+
+    def sections(self) -> Tuple[str, str]:
+        """(system, human) text. Blocks keep their insertion order within a tier."""
+        system = "\n\n".join(self.blocks["repo"] + self.blocks["instructions"] + self.blocks["session"])
+        return system, "\n\n".join(self.blocks["volatile"])
+
+    def to_prompt(self, scratchpad: bool = False) -> ChatPromptTemplate:
+        """
+        A ready prompt with no template variables. Block text is never parsed as a
+        template, so braces in code or trees need no escaping.
+        """
+        system, human = self.sections()
+        messages: List = [SystemMessage(content=system), HumanMessage(content=human)]
+        if scratchpad:
+            messages.append(("placeholder", "{agent_scratchpad}"))
+        return ChatPromptTemplate.from_messages(messages)
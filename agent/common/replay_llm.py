@@ -0,0 +1,35 @@
+"""
+Replay Chat Model
+
+A chat model that answers from a recorded session trace instead of a provider, for
+running recorded sessions offline. Recorded token usage is reported again, so usage
+and cache-hit metrics of a replay match the original run.
+"""
+from typing import Any, List, Optional, Sequence
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from .session_trace import TraceReader, load_generations, message_key
+
+
+class ReplayChatModel(BaseChatModel):
+    trace: Any
+    model: str = "replay"
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        trace: TraceReader = self.trace
+        event = trace.take("llm", message_key(messages))
+        if event is None:
+            raise ValueError("Replay trace has no recorded LLM response left for this request.")
+        return ChatResult(generations=load_generations(event["generations"]), llm_output=event.get("llm_output"))
@@ -0,0 +1,96 @@
+"""
+Repository Context Cache
+
+Per-revision repository facts shared across sessions: codebase tree, file count,
+monorepo detection, AGENTS.md, language stats, package manager and the symbol index.
+Entries are keyed by (repo_url, commit SHA), so they never go stale: a new commit is
+simply a new key. Other revision keys work the same way (e.g. a lockfile hash for
+environment snapshots). Backed by disk or Redis, following STORAGE_TYPE.
+"""
+
+import hashlib
+import json
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+import redis
+
+from .config import settings
+
+
+def normalize_repo_url(repo_url: str) -> str:
+    """Drops credentials, scheme differences and a trailing .git so equivalent URLs share a key."""
+    url = re.sub(r"^[a-z+]+://", "", repo_url.strip().lower())
+    url = re.sub(r"^[^@/]+@", "", url)
+    url = url.replace(":", "/", 1) if re.match(r"^[^/]+:[^/\d]", url) else url
+    return re.sub(r"(\.git)?/*$", "", url)
+
+
+def repo_key(repo_url: str) -> str:
+    return hashlib.sha256(normalize_repo_url(repo_url).encode("utf-8")).hexdigest()[:32]
+
+
+class BaseRepoCache(ABC):
+    @abstractmethod
+    def get(self, repo_url: str, sha: str, name: str = "context") -> Optional[Dict[str, Any]]: pass
+    @abstractmethod
+    def set(self, repo_url: str, sha: str, data: Dict[str, Any], name: str = "context"): pass
+
+
+class FileRepoCache(BaseRepoCache):
+    def __init__(self, cache_dir: str = None):
+        self.cache_dir = cache_dir or os.path.join(settings.WORKSPACE_DIR, "cache", "repos")
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, repo_url: str, sha: str, name: str) -> str:
+        return os.path.join(self.cache_dir, repo_key(repo_url), sha, f"{name}.json")
+
+    def get(self, repo_url: str, sha: str, name: str = "context") -> Optional[Dict[str, Any]]:
+        path = self._path(repo_url, sha, name)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            return None
+
+    def set(self, repo_url: str, sha: str, data: Dict[str, Any], name: str = "context"):
+        path = self._path(repo_url, sha, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so concurrent workers never read a partial entry
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+
+class RedisRepoCache(BaseRepoCache):
+    def __init__(self):
+        self.redis = redis.from_url(settings.REDIS_URL)
+        self.ttl = settings.REPO_CACHE_TTL_SEC
+
+    def _key(self, repo_url: str, sha: str, name: str) -> str:
+        return f"repo:{repo_key(repo_url)}:{sha}:{name}"
+
+    def get(self, repo_url: str, sha: str, name: str = "context") -> Optional[Dict[str, Any]]:
+        data = self.redis.get(self._key(repo_url, sha, name))
+        if not data:
+            return None
+        # Sliding expiry: repos that keep getting sessions stay cached
+        self.redis.expire(self._key(repo_url, sha, name), self.ttl)
+        return json.loads(data)
+
+    def set(self, repo_url: str, sha: str, data: Dict[str, Any], name: str = "context"):
+        self.redis.set(self._key(repo_url, sha, name), json.dumps(data), ex=self.ttl)
+
+
+# Factory
+def get_repo_cache():
+    if hasattr(settings, "STORAGE_TYPE") and settings.STORAGE_TYPE == "redis":
+        return RedisRepoCache()
+    return FileRepoCache()
+
+repo_cache = get_repo_cache()
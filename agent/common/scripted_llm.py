@@ -0,0 +1,69 @@
+"""
+Scripted Chat Model
+
+A chat model that answers every node of the workflow with a canned reply picked from
+the node's system prompt, for benchmarks and offline runs of the real graph. The
+programmer writes one file through its tools before reporting completion, so the
+tool-calling path is exercised as well. latency_sec simulates provider response time.
+"""
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# Matched against the first message (the system prompt), first marker wins
+DEFAULT_SCRIPT: Dict[str, str] = {
+    "Technical Planner": "1. Add a greeting to README.md\n2. Run the tests",
+    "Plan Critic": "APPROVED",
+    "Branch Name": "feature/add-greeting",
+    "Software Engineer": "CHANGES_COMPLETE",
+    "QA Automation": "TESTS_PASSED",
+    "Code Reviewer": "APPROVED",
+    "Commit Message": "docs(readme): add a greeting\n\n- Greets readers at the top of the README.",
+    "DevOps": "SETUP_COMPLETE",
+    "Task Triage": "FAST",
+}
+
+# Tool calls made before the scripted reply, keyed like DEFAULT_SCRIPT
+DEFAULT_TOOL_CALLS: Dict[str, List[Dict[str, Any]]] = {
+    "Software Engineer": [{"name": "write_file", "args": {"filepath": "README.md", "content": "# Hello\n"}}],
+}
+
+
+class ScriptedChatModel(BaseChatModel):
+    script: Dict[str, str] = DEFAULT_SCRIPT
+    tool_calls: Dict[str, List[Dict[str, Any]]] = DEFAULT_TOOL_CALLS
+    latency_sec: float = 0.0
+    model: str = "scripted"
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _marker(self, messages: List[BaseMessage]) -> Optional[str]:
+        system = str(messages[0].content) if messages else ""
+        return next((marker for marker in self.script if marker in system), None)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        if self.latency_sec:
+            time.sleep(self.latency_sec)
+        marker = self._marker(messages)
+        if marker is None:
+            raise ValueError("No scripted reply for this prompt.")
+
+        calls = self.tool_calls.get(marker, [])
+        made = sum(1 for message in messages if isinstance(message, ToolMessage))
+        if made < len(calls):
+            call = calls[made]
+            message = AIMessage(content="", tool_calls=[{"name": call["name"], "args": call["args"], "id": f"call_{uuid.uuid4().hex[:12]}"}])
+        else:
+            message = AIMessage(content=self.script[marker])
+        return ChatResult(generations=[ChatGeneration(message=message)])
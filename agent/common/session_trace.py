@@ -0,0 +1,154 @@
+"""
+Session Trace
+
+Records a session's LLM and sandbox interactions to a JSONL file and serves them back
+for offline replay. Each line is one event:
+
+- {"kind": "session", "state": {...}}                         the state the workflow started from
+- {"kind": "llm", "key": ..., "generations": ..., "llm_output": ...}
+- {"kind": "sandbox", "method": ..., "key": ..., "result": ... | "error": ...}
+
+Replay matches a request to an event by key (a hash of the request) and falls back to
+the next unused event of the same group, so small nondeterminism in prompts (timestamps,
+ids) does not derail a replay. Every fallback is counted as a miss.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import warnings
+from collections import deque
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+
+from langchain_core.load import dumps, loads
+
+from ..sandbox.base import CommandResult
+
+
+def request_key(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:32]
+
+
+def message_key(messages: List[Any]) -> str:
+    """
+    Hash of the messages of a chat request, without message ids. Bound tools are left out:
+    they are fixed per node and their format differs between providers.
+    """
+    normalized = []
+    for message in messages:
+        tool_calls = [(c.get("name"), c.get("args")) for c in getattr(message, "tool_calls", None) or []]
+        normalized.append((message.type, message.content, tool_calls, getattr(message, "tool_call_id", None)))
+    return request_key(normalized)
+
+
+def dump_generations(generations: List[Any]) -> str:
+    return dumps(list(generations))
+
+
+def load_generations(data: str) -> List[Any]:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message=".*`loads` is in beta")
+        return loads(data)
+
+
+def encode_result(value: Any) -> Any:
+    if isinstance(value, CommandResult):
+        return {"__type__": "CommandResult", **asdict(value)}
+    if isinstance(value, (list, tuple)):
+        return [encode_result(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool, dict)):
+        return value
+    return str(value)
+
+
+def decode_result(value: Any) -> Any:
+    if isinstance(value, dict) and value.get("__type__") == "CommandResult":
+        return CommandResult(**{k: v for k, v in value.items() if k != "__type__"})
+    if isinstance(value, list):
+        return [decode_result(v) for v in value]
+    return value
+
+
+class TraceWriter:
+    """Appends events to a trace file. Safe to share between a session's threads."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, event: Dict[str, Any]):
+        line = json.dumps(event, default=str)
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line + "\n")
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class TraceReader:
+    """Serves recorded events in request order, matched by key where possible."""
+
+    def __init__(self, events: List[Dict[str, Any]]):
+        self.events = events
+        self._lock = threading.Lock()
+        self._used = [False] * len(events)
+        self._by_key: Dict[tuple, deque] = {}
+        self._by_group: Dict[str, deque] = {}
+        for i, event in enumerate(events):
+            group = self.group(event)
+            if group is None:
+                continue
+            self._by_key.setdefault((group, event.get("key")), deque()).append(i)
+            self._by_group.setdefault(group, deque()).append(i)
+        self.misses = 0
+        self.served = 0
+
+    @classmethod
+    def load(cls, path: str) -> "TraceReader":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls([json.loads(line) for line in f if line.strip()])
+
+    @staticmethod
+    def group(event: Dict[str, Any]) -> Optional[str]:
+        if event.get("kind") == "llm":
+            return "llm"
+        if event.get("kind") == "sandbox":
+            return f"sandbox.{event.get('method')}"
+        return None
+
+    def session_state(self) -> Optional[Dict[str, Any]]:
+        return next((dict(e["state"]) for e in self.events if e.get("kind") == "session"), None)
+
+    def _pop(self, queue: Optional[deque]) -> Optional[int]:
+        while queue:
+            i = queue.popleft()
+            if not self._used[i]:
+                return i
+        return None
+
+    def take(self, group: str, key: str) -> Optional[Dict[str, Any]]:
+        """The recorded event for a request, or None when the trace has nothing left for it."""
+        with self._lock:
+            i = self._pop(self._by_key.get((group, key)))
+            if i is None:
+                self.misses += 1
+                i = self._pop(self._by_group.get(group))
+                if i is None:
+                    return None
+            self._used[i] = True
+            self.served += 1
+            return self.events[i]
+
+    def has_group(self, group: str) -> bool:
+        return group in self._by_group
+
+    def remaining(self) -> int:
+        with self._lock:
+            return sum(1 for i, used in enumerate(self._used) if not used and self.group(self.events[i]))
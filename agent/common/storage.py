@@ -1,5 +1,6 @@
 import os
 import json
+import threading
 import redis
 from typing import Dict, Any, List, Optional
 from abc import ABC, abstractmethod
@@ -22,12 +23,18 @@ class BaseStorage(ABC):
     def save_state(self, session_id: str, state: Dict[str, Any]): pass
     @abstractmethod
     def get_state(self, session_id: str) -> Optional[Dict[str, Any]]: pass
+    @abstractmethod
+    def save_artifact(self, session_id: str, name: str, data: Dict[str, Any]): pass
+    @abstractmethod
+    def get_artifact(self, session_id: str, name: str) -> Optional[Dict[str, Any]]: pass
 
 class FileStorage(BaseStorage):
     def __init__(self, data_dir: str = None):
         self.data_dir = data_dir or os.path.join(settings.WORKSPACE_DIR, "data")
         os.makedirs(self.data_dir, exist_ok=True)
         self.sessions_file = os.path.join(self.data_dir, "sessions.json")
+        # Tool callbacks of one session can log from several threads at once
+        self._lock = threading.RLock()
         self._load()
 
     def _load(self):
@@ -47,46 +54,76 @@ class FileStorage(BaseStorage):
             json.dump(self.data, f, indent=2)
 
     def set_session_status(self, session_id: str, status: str):
-        self._load() # Reload to reduce race conditions (still poor for concurrency)
-        self.data["sessions"][session_id] = status
-        self._save()
+        with self._lock:
+            self._load() # Reload to reduce race conditions (still poor for concurrency)
+            self.data["sessions"][session_id] = status
+            self._save()
 
     def get_session_status(self, session_id: str) -> str:
-        self._load()
-        return self.data["sessions"].get(session_id, "UNKNOWN")
+        with self._lock:
+            self._load()
+            return self.data["sessions"].get(session_id, "UNKNOWN")
 
     def append_log(self, session_id: str, message: str):
-        self._load()
-        if session_id not in self.data["logs"]:
-            self.data["logs"][session_id] = []
-        self.data["logs"][session_id].append(message)
-        self._save()
+        with self._lock:
+            self._load()
+            if session_id not in self.data["logs"]:
+                self.data["logs"][session_id] = []
+            self.data["logs"][session_id].append(message)
+            self._save()
 
     def get_logs(self, session_id: str) -> List[str]:
-        self._load()
-        return self.data["logs"].get(session_id, [])
+        with self._lock:
+            self._load()
+            return self.data["logs"].get(session_id, [])
 
     def set_result(self, session_id: str, result: str):
-        self._load()
-        self.data["results"][session_id] = result
-        self._save()
+        with self._lock:
+            self._load()
+            self.data["results"][session_id] = result
+            self._save()
 
     def get_result(self, session_id: str) -> Optional[str]:
-        self._load()
-        return self.data["results"].get(session_id)
+        with self._lock:
+            self._load()
+            return self.data["results"].get(session_id)
 
     def save_state(self, session_id: str, state: Dict[str, Any]):
-        self._load()
-        self.data["states"][session_id] = state
-        self._save()
+        with self._lock:
+            self._load()
+            self.data["states"][session_id] = state
+            self._save()
 
     def get_state(self, session_id: str) -> Optional[Dict[str, Any]]:
-        self._load()
-        return self.data["states"].get(session_id)
+        with self._lock:
+            self._load()
+            return self.data["states"].get(session_id)
+
+    # Artifacts (e.g. the symbol index) can be large, so they live in their own files
+    def _artifact_path(self, session_id: str, name: str) -> str:
+        return os.path.join(self.data_dir, "artifacts", session_id, f"{name}.json")
+
+    def save_artifact(self, session_id: str, name: str, data: Dict[str, Any]):
+        path = self._artifact_path(session_id, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def get_artifact(self, session_id: str, name: str) -> Optional[Dict[str, Any]]:
+        path = self._artifact_path(session_id, name)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            return None
 
 class RedisStorage(BaseStorage):
-    def __init__(self):
-        self.redis = redis.from_url(settings.REDIS_URL)
+    def __init__(self, url: str = None):
+        self.redis = redis.from_url(url or settings.REDIS_URL)
         self.ttl = 86400 * 7 # 7 days
 
     def set_session_status(self, session_id: str, status: str):
@@ -118,10 +155,62 @@ class RedisStorage(BaseStorage):
         state = self.redis.get(f"session:{session_id}:state")
         return json.loads(state) if state else None
 
+    def save_artifact(self, session_id: str, name: str, data: Dict[str, Any]):
+        self.redis.set(f"session:{session_id}:artifact:{name}", json.dumps(data), ex=self.ttl)
+
+    def get_artifact(self, session_id: str, name: str) -> Optional[Dict[str, Any]]:
+        data = self.redis.get(f"session:{session_id}:artifact:{name}")
+        return json.loads(data) if data else None
+
+class SessionStorage(BaseStorage):
+    """Sends each call to `backend`, or to the storage registered for its session (e.g. an offline replay's)."""
+    def __init__(self, backend: BaseStorage):
+        self.backend = backend
+        self._sessions: Dict[str, BaseStorage] = {}
+
+    def register(self, session_id: str, backend: BaseStorage):
+        self._sessions[session_id] = backend
+
+    def unregister(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+    def _for(self, session_id: str) -> BaseStorage:
+        return self._sessions.get(session_id, self.backend)
+
+    def set_session_status(self, session_id: str, status: str):
+        self._for(session_id).set_session_status(session_id, status)
+
+    def get_session_status(self, session_id: str) -> str:
+        return self._for(session_id).get_session_status(session_id)
+
+    def append_log(self, session_id: str, message: str):
+        self._for(session_id).append_log(session_id, message)
+
+    def get_logs(self, session_id: str) -> List[str]:
+        return self._for(session_id).get_logs(session_id)
+
+    def set_result(self, session_id: str, result: str):
+        self._for(session_id).set_result(session_id, result)
+
+    def get_result(self, session_id: str) -> Optional[str]:
+        return self._for(session_id).get_result(session_id)
+
+    def save_state(self, session_id: str, state: Dict[str, Any]):
+        self._for(session_id).save_state(session_id, state)
+
+    def get_state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self._for(session_id).get_state(session_id)
+
+    def save_artifact(self, session_id: str, name: str, data: Dict[str, Any]):
+        self._for(session_id).save_artifact(session_id, name, data)
+
+    def get_artifact(self, session_id: str, name: str) -> Optional[Dict[str, Any]]:
+        return self._for(session_id).get_artifact(session_id, name)
+
 # Factory
 def get_storage():
     if hasattr(settings, "STORAGE_TYPE") and settings.STORAGE_TYPE == "redis":
         return RedisStorage()
     return FileStorage()
 
-storage = get_storage()
+storage = SessionStorage(get_storage())
@@ -0,0 +1,241 @@
+"""
+Tracing Module
+
+Lightweight nested spans for critical-path analysis of a single session:
+session -> node -> LLM call / tool call -> sandbox operation.
+
+Finished spans are exported to a local JSONL file, or to an OTLP collector when
+OTEL_EXPORTER_OTLP_ENDPOINT is configured. When tracing is disabled every call
+returns a shared no-op span, so instrumented code pays a single attribute check.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("swe_current_span", default=None)
+
+
+class _NoopSpan:
+    """Stand-in returned when tracing is disabled. Every operation is a no-op."""
+
+    trace_id = None
+    span_id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        pass
+
+    def record_error(self, error: BaseException):
+        pass
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """A timed unit of work. Use as a context manager or call end() explicitly."""
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"], attributes: Optional[Dict[str, Any]] = None):
+        self.tracer = tracer
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes: Dict[str, Any] = dict(attributes) if attributes else {}
+        self.status = "OK"
+        self.error: Optional[str] = None
+        self.start_time = time.time()
+        self.end_time: Optional[float] = None
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_time if self.end_time is not None else time.time()
+        return round((end - self.start_time) * 1000, 3)
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        self.attributes.update(attributes)
+
+    def record_error(self, error: BaseException):
+        self.status = "ERROR"
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self):
+        self.tracer.end_span(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.record_error(exc)
+        self.end()
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter:
+    """Receives span lifecycle events. Subclasses override what they need."""
+
+    def on_start(self, span: Span):
+        pass
+
+    def on_end(self, span: Span):
+        pass
+
+
+class JsonlSpanExporter(SpanExporter):
+    """Appends each finished span as one JSON line to a local file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def on_end(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+
+
+class OtlpSpanExporter(SpanExporter):
+    """Mirrors spans into OpenTelemetry and ships them to an OTLP/HTTP collector."""
+
+    def __init__(self, endpoint: str, service_name: str = "swe-agent-worker"):
+        from opentelemetry import trace as otel_trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=f"{endpoint.rstrip('/')}/v1/traces")))
+        self._otel_trace = otel_trace
+        self._tracer = provider.get_tracer("swe-agent")
+        self._live: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span):
+        context = None
+        with self._lock:
+            parent = self._live.get(span.parent_id) if span.parent_id else None
+        if parent is not None:
+            context = self._otel_trace.set_span_in_context(parent)
+        otel_span = self._tracer.start_span(span.name, context=context, start_time=int(span.start_time * 1e9))
+        with self._lock:
+            self._live[span.span_id] = otel_span
+
+    def on_end(self, span: Span):
+        with self._lock:
+            otel_span = self._live.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            if isinstance(value, (str, bool, int, float)):
+                otel_span.set_attribute(key, value)
+            else:
+                otel_span.set_attribute(key, str(value))
+        if span.error:
+            otel_span.set_status(self._otel_trace.Status(self._otel_trace.StatusCode.ERROR, span.error))
+        otel_span.end(end_time=int(span.end_time * 1e9))
+
+
+class Tracer:
+    """Creates nested spans. The current span is tracked per execution context."""
+
+    def __init__(self, exporter: Optional[SpanExporter] = None):
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None, parent: Optional[Span] = None):
+        """Starts a span and makes it current. Pair with end_span (or use span())."""
+        if self.exporter is None:
+            return NOOP_SPAN
+        span = Span(self, name, parent or _current_span.get(), attributes)
+        _current_span.set(span)
+        try:
+            self.exporter.on_start(span)
+        except Exception as e:
+            logger.warning(f"Span export (start) failed: {e}")
+        return span
+
+    def end_span(self, span):
+        if span is NOOP_SPAN or span.end_time is not None:
+            return
+        span.end_time = time.time()
+        # Restore the parent rather than resetting a token, so spans started and
+        # ended from different callbacks (LLM / tool events) still unwind cleanly.
+        if _current_span.get() is span:
+            _current_span.set(span.parent)
+        try:
+            self.exporter.on_end(span)
+        except Exception as e:
+            logger.warning(f"Span export (end) failed: {e}")
+
+    def span(self, name: str, **attributes: Any):
+        """Context manager form: `with tracer.span("node.planner", session_id=...) as span:`"""
+        if self.exporter is None:
+            return NOOP_SPAN
+        return self.start_span(name, attributes)
+
+
+def get_tracer() -> Tracer:
+    if not settings.TRACING_ENABLED:
+        return Tracer()
+
+    if settings.OTEL_EXPORTER_OTLP_ENDPOINT:
+        try:
+            return Tracer(OtlpSpanExporter(settings.OTEL_EXPORTER_OTLP_ENDPOINT))
+        except ImportError:
+            logger.warning("OTLP endpoint configured but opentelemetry-sdk is not installed. Falling back to JSONL traces.")
+
+    return Tracer(JsonlSpanExporter(settings.TRACE_FILE))
+
+
+tracer = get_tracer()
@@ -0,0 +1,111 @@
+"""
+LLM Usage
+
+Per-session token totals read from provider usage metadata, including prompt tokens
+served from the provider's prompt cache. Calls made with a model role (see
+llm.resolve_model) are also totalled per role, with latency and, for models listed in
+LLM_PRICES, cost.
+"""
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.outputs import LLMResult
+
+from .config import settings
+
+# Active sessions only; cleared when the worker finishes the session
+SESSION_USAGE: Dict[str, Dict[str, int]] = {}
+_lock = threading.Lock()
+
+
+def _first(mapping: Dict[str, Any], *keys: str) -> int:
+    for key in keys:
+        value = mapping.get(key)
+        if isinstance(value, (int, float)):
+            return int(value)
+    return 0
+
+
+def extract_usage(response: LLMResult) -> Dict[str, int]:
+    """Prompt, completion and cached prompt tokens, whichever naming the provider uses."""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if not usage:
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "response_metadata", None) or generation.generation_info or {}
+                usage = metadata.get("token_usage") or metadata.get("usage_metadata") or metadata.get("usage") or {}
+                if usage:
+                    break
+            if usage:
+                break
+
+    details = usage.get("prompt_tokens_details") or usage.get("input_token_details") or {}
+    return {
+        "prompt_tokens": _first(usage, "prompt_tokens", "prompt_token_count", "input_tokens", "prompt_eval_count"),
+        "completion_tokens": _first(usage, "completion_tokens", "candidates_token_count", "output_tokens", "eval_count"),
+        "cached_tokens": _first(details, "cached_tokens", "cache_read") or _first(usage, "cached_content_token_count", "cache_read_input_tokens"),
+    }
+
+
+def model_prices() -> Dict[str, Tuple[float, float]]:
+    """LLM_PRICES as {model: (USD per million prompt tokens, USD per million completion tokens)}."""
+    prices = {}
+    for item in settings.LLM_PRICES.split(","):
+        model, _, rates = item.partition("=")
+        prompt, _, completion = rates.partition("/")
+        try:
+            prices[model.strip()] = (float(prompt), float(completion or 0))
+        except ValueError:
+            continue
+    return prices
+
+
+def usage_cost(model: Optional[str], usage: Dict[str, int]) -> Optional[float]:
+    price = model_prices().get(model) if model else None
+    if price is None:
+        return None
+    return (usage.get("prompt_tokens", 0) * price[0] + usage.get("completion_tokens", 0) * price[1]) / 1_000_000
+
+
+def record_usage(session_id: str, usage: Dict[str, int], role: Optional[str] = None, model: Optional[str] = None, latency_ms: Optional[float] = None):
+    with _lock:
+        totals = SESSION_USAGE.setdefault(session_id, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0})
+        totals["calls"] += 1
+        for key in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+            totals[key] += usage.get(key, 0)
+        if role is None:
+            return
+        stats = totals.setdefault("roles", {}).setdefault(role, {"model": model, "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0, "latency_ms": 0.0})
+        stats["calls"] += 1
+        for key in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+            stats[key] += usage.get(key, 0)
+        stats["latency_ms"] += latency_ms or 0.0
+        cost = usage_cost(model, usage)
+        if cost is not None:
+            stats["cost_usd"] = stats.get("cost_usd", 0.0) + cost
+
+
+def get_usage(session_id: str) -> Dict[str, Any]:
+    with _lock:
+        usage = dict(SESSION_USAGE.get(session_id, {}))
+        if "roles" in usage:
+            usage["roles"] = {role: dict(stats) for role, stats in usage["roles"].items()}
+        return usage
+
+
+def clear_usage(session_id: str):
+    with _lock:
+        SESSION_USAGE.pop(session_id, None)
+
+
+def format_usage(usage: Dict[str, int]) -> str:
+    prompt = usage.get("prompt_tokens", 0)
+    cached = usage.get("cached_tokens", 0)
+    rate = f" ({cached * 100 // prompt}% from prompt cache)" if prompt else ""
+    text = (f"LLM usage: {usage.get('calls', 0)} calls, {prompt} prompt tokens, {cached} cached{rate}, "
+            f"{usage.get('completion_tokens', 0)} completion tokens.")
+    for role, stats in sorted((usage.get("roles") or {}).items()):
+        cost = f", ${stats['cost_usd']:.4f}" if "cost_usd" in stats else ""
+        text += (f"\n  {role} ({stats['model']}): {stats['calls']} calls, {stats['prompt_tokens']} prompt and "
+                 f"{stats['completion_tokens']} completion tokens, {stats['latency_ms'] / stats['calls']:.0f} ms per call{cost}")
+    return text
@@ -0,0 +1,69 @@
+"""
+Replays a recorded session offline.
+
+    python -m agent.replay workspace/traces/sessions/<session_id>-<timestamp>.jsonl
+
+Runs the whole workflow from the recorded starting state with the LLM and the sandbox
+served from the trace (see SESSION_RECORD_DIR), so no provider, sandbox or network is
+needed. The run gets its own throwaway storage, so the recorded session's saved state and
+logs are left alone. Prints the final status, the wall time (orchestration overhead only) and how
+well the run matched the recording.
+"""
+import argparse
+import json
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Any, Dict
+
+from .agent import AgentManager
+from .common.session_trace import TraceReader
+from .common.storage import FileStorage, storage
+from .sandbox.recording import ReplaySandbox
+
+
+def replay_session(trace_path: str) -> Dict[str, Any]:
+    from .workflow_pkg import WorkflowManager
+
+    trace = TraceReader.load(trace_path)
+    state = trace.session_state()
+    if state is None:
+        raise ValueError(f"{trace_path} has no recorded session state.")
+    session_id = state["session_id"]
+
+    manager = AgentManager()
+    manager.register_session_trace(session_id, trace)
+    manager.register_ai_config(session_id, SimpleNamespace(provider="replay", model="replay", api_key=None, base_url=None))
+    manager.register_sandbox(session_id, ReplaySandbox(trace, session_id))
+    data_dir = tempfile.TemporaryDirectory(prefix="replay-")
+    storage.register(session_id, FileStorage(data_dir=data_dir.name))
+    try:
+        start = time.perf_counter()
+        final_state = WorkflowManager().run_workflow_sync(state)
+        elapsed = time.perf_counter() - start
+    finally:
+        storage.unregister(session_id)
+        data_dir.cleanup()
+        manager.unregister_sandbox(session_id)
+        manager.unregister_ai_config(session_id)
+        manager.unregister_session_trace(session_id)
+
+    return {
+        "session_id": session_id,
+        "status": final_state["status"],
+        "elapsed_sec": round(elapsed, 3),
+        "served": trace.served,
+        "misses": trace.misses,
+        "unused": trace.remaining(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session offline.")
+    parser.add_argument("trace", help="Session trace written with SESSION_RECORD_DIR set")
+    args = parser.parse_args()
+    print(json.dumps(replay_session(args.trace), indent=2))
+
+
+if __name__ == "__main__":
+    main()
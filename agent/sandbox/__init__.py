@@ -1,4 +1,4 @@
-from .base import Sandbox
+from .base import Sandbox, CommandResult
 from .daytona import DaytonaSandbox
 
-__all__ = ["Sandbox", "DaytonaSandbox"]
+__all__ = ["Sandbox", "CommandResult", "DaytonaSandbox"]
@@ -1,5 +1,68 @@
+import shlex
+import time
 from abc import ABC, abstractmethod
-from typing import List
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from ..common.config import settings
+
+if TYPE_CHECKING:
+    from ..common.cancellation import CancellationToken
+
+# Exit codes of GNU `timeout`: 124 after SIGTERM, 137 when the SIGKILL follow-up was needed
+TIMEOUT_EXIT_CODES = (124, 137)
+TIMEOUT_KILL_GRACE_SEC = 10
+
+@dataclass
+class CommandResult:
+    """Outcome of a single command executed in the sandbox."""
+    command: str
+    stdout: str
+    exit_code: int
+    stderr: str = ""
+    duration_ms: float = 0.0
+    truncated: bool = False
+    timed_out: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.exit_code == 0
+
+    @property
+    def output(self) -> str:
+        """Combined stdout and stderr, as a shell user would see it."""
+        if self.stdout and self.stderr:
+            return f"{self.stdout}\n{self.stderr}"
+        return self.stdout or self.stderr
+
+def truncate_output(text: str, max_chars: Optional[int]) -> Tuple[str, bool]:
+    """Keeps the head and tail of oversized output. max_chars of 0/None disables the cap."""
+    if not max_chars or len(text) <= max_chars:
+        return text, False
+    half = max_chars // 2
+    omitted = len(text) - 2 * half
+    return f"{text[:half]}\n... ({omitted} characters truncated) ...\n{text[-half:]}", True
+
+def with_timeout(command: str, timeout: Optional[int]) -> str:
+    """
+    Wraps a command with GNU timeout. timeout signals the whole process group it
+    creates, so background children of a hung test runner are killed as well.
+    """
+    if not timeout:
+        return command
+    return f"timeout -k {TIMEOUT_KILL_GRACE_SEC} {int(timeout)} sh -c {shlex.quote(command)}"
+
+def mark_timeout(result: CommandResult, timeout: Optional[int]) -> CommandResult:
+    """Flags a result produced by a with_timeout() command that hit its limit. Output is kept."""
+    if not timeout or result.exit_code not in TIMEOUT_EXIT_CODES:
+        return result
+    if result.exit_code == 137 and result.duration_ms < timeout * 1000:
+        # Killed for another reason (e.g. OOM), not by the timeout
+        return result
+    result.timed_out = True
+    notice = f"[Command timed out after {int(timeout)}s and was terminated. Output above is partial.]"
+    result.stderr = f"{result.stderr}\n{notice}" if result.stderr else notice
+    return result
 
 class Sandbox(ABC):
     @abstractmethod
@@ -17,6 +80,141 @@ class Sandbox(ABC):
         """Runs a shell command in the sandbox."""
         pass
 
+    def execute(self, command: str, cwd: str = None, env: Dict[str, str] = None, max_output_chars: Optional[int] = None, timeout: Optional[int] = None) -> CommandResult:
+        """
+        Runs a shell command and returns a structured result with its exit code.
+        Output beyond max_output_chars (default COMMAND_OUTPUT_MAX_CHARS, 0 to disable)
+        is cut down to head and tail and flagged as truncated. The command is killed
+        after timeout seconds (default COMMAND_TIMEOUT_SEC, 0 to disable).
+
+        This default implementation recovers the exit code through a marker script;
+        sandboxes with a native exec API should override it.
+        """
+        from .batch import build_batch_script, parse_batch_output, wrap_script
+
+        cancelled = self.cancelled_result(command)
+        if cancelled:
+            return cancelled
+        timeout = self.resolve_timeout(timeout)
+
+        command_line = with_timeout(command, timeout)
+        if env:
+            exports = " ".join(f"{k}={shlex.quote(str(v))}" for k, v in env.items())
+            command_line = f"export {exports}\n{command_line}"
+
+        start = time.monotonic()
+        script, marker = build_batch_script([command_line])
+        result = parse_batch_output(self.run_command(wrap_script(script), cwd=cwd), [command_line], marker)[0]
+        result.command = command
+        if not result.duration_ms:
+            result.duration_ms = round((time.monotonic() - start) * 1000, 3)
+        limit = settings.COMMAND_OUTPUT_MAX_CHARS if max_output_chars is None else max_output_chars
+        result.stdout, result.truncated = truncate_output(result.stdout, limit)
+        return mark_timeout(result, timeout)
+
+    def execute_stream(self, command: str, cwd: str = None, env: Dict[str, str] = None, on_output: Optional[Callable[[str], None]] = None, line_filter: Optional[Callable[[str], bool]] = None, max_output_chars: Optional[int] = None, timeout: Optional[int] = None) -> CommandResult:
+        """
+        Runs a command, passing output chunks to on_output as they arrive, and keeps
+        only a bounded head and tail of it (default COMMAND_OUTPUT_MAX_CHARS). Lines
+        rejected by line_filter are neither kept nor forwarded.
+
+        This default implementation has no live output: it runs execute() and replays
+        the result through the same buffer. Sandboxes that can stream should override it.
+        """
+        from .streaming import replay_output
+
+        result = self.execute(command, cwd=cwd, env=env, max_output_chars=0, timeout=timeout)
+        return replay_output(result, on_output, line_filter, max_output_chars)
+
+    def run_commands(self, commands: List[str], cwd: str = None, stop_on_failure: bool = True, timeout: Optional[int] = None) -> List[CommandResult]:
+        """
+        Runs several commands in a single remote exec and returns per-command results.
+        With stop_on_failure, commands after the first non-zero exit are not run and
+        are absent from the returned list. timeout applies to the batch as a whole.
+        """
+        from .batch import build_batch_script, parse_batch_output, wrap_script
+
+        if not commands:
+            return []
+        script, marker = build_batch_script(commands, stop_on_failure=stop_on_failure)
+        # Fetch the combined output uncapped so no marker is lost, then cap per command
+        batch = self.execute(wrap_script(script), cwd=cwd, max_output_chars=0, timeout=timeout)
+        results = parse_batch_output(batch.output, commands, marker)
+        for result in results:
+            result.stdout, result.truncated = truncate_output(result.stdout, settings.COMMAND_OUTPUT_MAX_CHARS)
+        if batch.timed_out and results:
+            # The command that was running when the batch was killed has no END marker
+            results[-1].timed_out = True
+        return results
+
+    def run_parallel(self, commands: List[str], cwd: str = None, timeout: Optional[int] = None) -> List[CommandResult]:
+        """
+        Runs several commands concurrently in a single remote exec and returns one result
+        per command, in command order. Commands that had not finished when the batch
+        timed out or was killed come back failed (timed_out when the batch timed out),
+        with whatever output they had written so far.
+        """
+        from .batch import build_parallel_script, parallel_dir, parse_batch_sections, wrap_script
+
+        if not commands:
+            return []
+        script, marker = build_parallel_script(commands)
+        batch = self.execute(wrap_script(script), cwd=cwd, max_output_chars=0, timeout=timeout)
+        sections = parse_batch_sections(batch.output, marker)
+
+        missing = [i for i in range(len(commands)) if i not in sections]
+        if missing:
+            # One more exec for the partial output of unfinished commands, then clean up
+            directory = shlex.quote(parallel_dir(marker))
+            reads = [f"cat {directory}/{i}.log 2>/dev/null" for i in missing]
+            partial = {r.command: r.stdout for r in self.run_commands(reads + [f"rm -rf {directory}"], stop_on_failure=False)}
+            reason = f"Command did not finish before the batch timed out after {timeout}s." if batch.timed_out else f"Command did not report a result: {batch.output.strip()[-500:]}"
+            for i, read in zip(missing, reads):
+                sections[i] = CommandResult(
+                    command=commands[i],
+                    stdout=partial.get(read, ""),
+                    stderr=reason,
+                    exit_code=124 if batch.timed_out else -1,
+                    duration_ms=batch.duration_ms,
+                    timed_out=batch.timed_out,
+                )
+
+        results = []
+        for i, command in enumerate(commands):
+            result = sections[i]
+            result.command = command
+            result.stdout, result.truncated = truncate_output(result.stdout, settings.COMMAND_OUTPUT_MAX_CHARS)
+            results.append(result)
+        return results
+
+    def create_snapshot(self, name: str) -> bool:
+        """Saves the sandbox as a reusable snapshot. Returns False when unsupported or failed."""
+        return False
+
+    def set_cancel_token(self, token: Optional["CancellationToken"]):
+        """Attaches the session's cancellation token. Commands are refused once it fires."""
+        self._cancel_token = token
+
+    def get_cancel_token(self) -> Optional["CancellationToken"]:
+        return getattr(self, "_cancel_token", None)
+
+    def resolve_timeout(self, timeout: Optional[int]) -> Optional[int]:
+        """Applies the default command timeout and clamps it to the session deadline."""
+        if timeout is None:
+            timeout = settings.COMMAND_TIMEOUT_SEC
+        token = self.get_cancel_token()
+        remaining = token.remaining() if token else None
+        if remaining is not None:
+            timeout = min(timeout, int(remaining) + 1) if timeout else int(remaining) + 1
+        return timeout or None
+
+    def cancelled_result(self, command: str) -> Optional[CommandResult]:
+        """Returns a failed result instead of running anything when the session is cancelled."""
+        token = self.get_cancel_token()
+        if token and token.cancelled:
+            return CommandResult(command=command, stdout="", stderr=f"Error: {token.reason}. Command not run.", exit_code=-1)
+        return None
+
     @abstractmethod
     def read_file(self, filepath: str) -> str:
         """Reads content from a file in the sandbox."""
@@ -0,0 +1,112 @@
+"""
+Scripted command batches.
+
+Builds a single POSIX shell script that runs many commands in one remote exec and
+brackets each command's output with markers carrying its exit code and duration,
+so per-command results can be recovered from the combined output.
+"""
+import re
+import shlex
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from .base import CommandResult
+
+
+def build_batch_script(commands: List[str], stop_on_failure: bool = True, marker: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Returns (script, marker). Each command runs in its own subshell with stderr
+    merged into stdout, so `cd`/`exit` inside one command do not affect the next.
+    """
+    marker = marker or f"__SWE_BATCH_{uuid.uuid4().hex[:12]}"
+    lines = ["set +e"]
+    for i, command in enumerate(commands):
+        lines.append(f"printf '\\n%s\\n' '{marker}_BEGIN_{i}'")
+        lines.append("__swe_t0=$(date +%s%3N)")
+        # Command on its own line so heredocs and trailing comments stay valid
+        lines.append("(")
+        lines.append(command)
+        lines.append(") 2>&1")
+        lines.append("__swe_rc=$?")
+        lines.append("__swe_t1=$(date +%s%3N)")
+        lines.append(f"printf '\\n%s_END_{i}_%s_%s\\n' '{marker}' \"$__swe_rc\" \"$((__swe_t1 - __swe_t0))\"")
+        if stop_on_failure:
+            lines.append('[ "$__swe_rc" -eq 0 ] || exit 0')
+    return "\n".join(lines) + "\n", marker
+
+
+def parallel_dir(marker: str) -> str:
+    """Where a parallel batch keeps each command's output while it runs."""
+    return f"/tmp/{marker}"
+
+
+def build_parallel_script(commands: List[str], marker: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Like build_batch_script, but every command runs at the same time in the background.
+    Each command's output goes to its own file under parallel_dir(marker) and is printed
+    with the usual markers as soon as that command finishes, so results of finished
+    commands survive even if the batch is killed. Reports come in completion order.
+    """
+    marker = marker or f"__SWE_BATCH_{uuid.uuid4().hex[:12]}"
+    lines = ["set +e", f"__swe_dir={shlex.quote(parallel_dir(marker))}", 'mkdir -p "$__swe_dir"']
+    for i, command in enumerate(commands):
+        lines.append("(")
+        lines.append("__swe_t0=$(date +%s%3N)")
+        lines.append("(")
+        lines.append(command)
+        lines.append(f') > "$__swe_dir/{i}.log" 2>&1')
+        lines.append("__swe_rc=$?")
+        lines.append("__swe_t1=$(date +%s%3N)")
+        # mkdir is atomic: one report at a time, so reports never interleave
+        lines.append('until mkdir "$__swe_dir/lock" 2>/dev/null; do sleep 0.05; done')
+        lines.append(f"printf '\\n%s\\n' '{marker}_BEGIN_{i}'")
+        lines.append(f'cat "$__swe_dir/{i}.log"')
+        lines.append(f"printf '\\n%s_END_{i}_%s_%s\\n' '{marker}' \"$__swe_rc\" \"$((__swe_t1 - __swe_t0))\"")
+        lines.append('rmdir "$__swe_dir/lock"')
+        lines.append(") &")
+    lines.append("wait")
+    lines.append('rm -rf "$__swe_dir"')
+    return "\n".join(lines) + "\n", marker
+
+
+def parse_batch_sections(output: str, marker: str) -> Dict[int, CommandResult]:
+    """Complete (BEGIN to END) command sections in batch output, by command index."""
+    sections: Dict[int, CommandResult] = {}
+    pattern = re.compile(
+        rf"^{re.escape(marker)}_BEGIN_(\d+)\n(.*?)\n{re.escape(marker)}_END_\1_(-?\d+)_(-?\d+)$",
+        re.DOTALL | re.MULTILINE,
+    )
+    for match in pattern.finditer(output):
+        body = match.group(2)
+        # Drop the separator newline the END marker printf adds
+        if body.endswith("\n"):
+            body = body[:-1]
+        sections[int(match.group(1))] = CommandResult(
+            command="",
+            stdout=body,
+            exit_code=int(match.group(3)),
+            duration_ms=float(match.group(4)),
+        )
+    return sections
+
+
+def parse_batch_output(output: str, commands: List[str], marker: str) -> List[CommandResult]:
+    """
+    Splits combined batch output back into per-command results. Commands that never
+    started (stop-on-failure) are omitted, so the result may be shorter than `commands`.
+    """
+    results: List[CommandResult] = []
+    for index, result in sorted(parse_batch_sections(output, marker).items()):
+        result.command = commands[index]
+        results.append(result)
+
+    if not results and commands:
+        # The remote exec itself failed before any marker was printed
+        results.append(CommandResult(command=commands[0], stdout=output, exit_code=-1))
+
+    return results
+
+
+def wrap_script(script: str) -> str:
+    """Runs the script through sh regardless of the sandbox's login shell."""
+    return f"sh -c {shlex.quote(script)}"
@@ -1,17 +1,25 @@
 import logging
+import shlex
 import time
-from typing import List, Optional, TYPE_CHECKING
-from daytona import Daytona, DaytonaConfig, CreateSandboxFromImageParams, CreateSandboxFromSnapshotParams, Resources, DaytonaError, DaytonaNotFoundError
+import uuid
+from typing import Callable, List, Optional, TYPE_CHECKING
+from daytona import Daytona, DaytonaConfig, CreateSandboxFromImageParams, CreateSandboxFromSnapshotParams, Resources, DaytonaError, DaytonaNotFoundError, SessionExecuteRequest
 
-from .base import Sandbox
+from .base import Sandbox, CommandResult, truncate_output, with_timeout, mark_timeout, TIMEOUT_KILL_GRACE_SEC
+from .streaming import OutputBuffer, run_coroutine
 from ..common.config import settings
+from ..common.tracing import tracer
 
 if TYPE_CHECKING:
     from ..common.credentials import GitCredentials
 
 class DaytonaSandbox(Sandbox):
-    def __init__(self, session_id: str, repo_url: str = None, base_branch: str = None, git_credentials: "GitCredentials" = None):
+    def __init__(self, session_id: str, repo_url: str = None, base_branch: str = None, git_credentials: "GitCredentials" = None, snapshot: str = None):
         self.session_id = session_id
+        # Environment snapshot to create the sandbox from (overrides DAYTONA_SNAPSHOT_NAME)
+        self.snapshot = snapshot
+        # True when setup() found the session's sandbox from an earlier run instead of creating one
+        self.reused = False
         self.repo_url = repo_url
         self.base_branch = base_branch
         self.git_credentials = git_credentials
@@ -59,6 +67,7 @@ class DaytonaSandbox(Sandbox):
                 try:
                     self.sandbox = self.daytona.find_one(labels=labels)
                     logging.info(f"Found existing sandbox for session {self.session_id}: {self.sandbox.id}")
+                    self.reused = True
                     
                     # Check state and start if needed
                     state = self.sandbox.state
@@ -76,12 +85,13 @@ class DaytonaSandbox(Sandbox):
                     if isinstance(e, DaytonaNotFoundError) or "No sandbox found" in str(e):
                         logging.info(f"Creating new sandbox for session {self.session_id} (attempt {attempt + 1})")
                         
-                        resources = Resources(cpu=2, memory=4, disk=10)
+                        resources = Resources(cpu=settings.SANDBOX_CPU, memory=settings.SANDBOX_MEMORY_GB, disk=settings.SANDBOX_DISK_GB)
                         
-                        if settings.DAYTONA_SNAPSHOT_NAME:
-                            logging.info(f"Using snapshot: {settings.DAYTONA_SNAPSHOT_NAME}")
+                        snapshot = self.snapshot or settings.DAYTONA_SNAPSHOT_NAME
+                        if snapshot:
+                            logging.info(f"Using snapshot: {snapshot}")
                             params = CreateSandboxFromSnapshotParams(
-                                snapshot=settings.DAYTONA_SNAPSHOT_NAME,
+                                snapshot=snapshot,
                                 labels=labels,
                                 resources=resources,
                                 auto_stop_interval=30
@@ -103,6 +113,10 @@ class DaytonaSandbox(Sandbox):
                             raise e
             except Exception as e:
                 logging.error(f"Failed to setup Daytona sandbox (attempt {attempt + 1}): {e}")
+                if self.snapshot:
+                    # The environment snapshot may have been deleted; retry from the base image
+                    logging.warning(f"Dropping environment snapshot {self.snapshot} for the next attempt")
+                    self.snapshot = None
                 if attempt == max_attempts - 1:
                     raise e
                 time.sleep(2) # Wait before retry
@@ -123,12 +137,9 @@ class DaytonaSandbox(Sandbox):
                 logging.warning(f"Error deleting sandbox: {e}")
 
     def run_command(self, command: str, cwd: str = None, env: dict = None) -> str:
-        if not self.sandbox:
-            return "Error: Sandbox not initialized."
-
-        if cwd is None:
-            cwd = self.get_cwd()
+        return self.execute(command, cwd=cwd, env=env).output
 
+    def _command_env(self, env: dict = None) -> dict:
         # Default environment variables
         default_env = {
             "COREPACK_ENABLE_DOWNLOAD_PROMPT": "0"
@@ -138,17 +149,152 @@ class DaytonaSandbox(Sandbox):
                 default_env["GIT_CO_AUTHOR_NAME"] = self.git_credentials.co_author_name
             if self.git_credentials.co_author_email:
                 default_env["GIT_CO_AUTHOR_EMAIL"] = self.git_credentials.co_author_email
-            
+
         if env:
             default_env.update(env)
+        return default_env
 
-        try:
-            # Using latest process exec pattern
-            resp = self.sandbox.process.exec(command, cwd=cwd, env=default_env)
-            return resp.result
-        except Exception as e:
-            logging.error(f"Command execution error: {e}")
-            return f"Error running command: {str(e)}"
+    def execute(self, command: str, cwd: str = None, env: dict = None, max_output_chars: Optional[int] = None, timeout: Optional[int] = None) -> CommandResult:
+        if not self.sandbox:
+            return CommandResult(command=command, stdout="", stderr="Error: Sandbox not initialized.", exit_code=-1)
+
+        cancelled = self.cancelled_result(command)
+        if cancelled:
+            return cancelled
+        timeout = self.resolve_timeout(timeout)
+
+        if cwd is None:
+            cwd = self.get_cwd()
+
+        default_env = self._command_env(env)
+        limit = settings.COMMAND_OUTPUT_MAX_CHARS if max_output_chars is None else max_output_chars
+        start = time.monotonic()
+        with tracer.span("sandbox.run_command", command=command[:200], cwd=cwd, timeout=timeout or 0) as span:
+            try:
+                # The in-sandbox timeout kills the process tree; the exec timeout is
+                # only a backstop in case the sandbox itself stops responding.
+                resp = self.sandbox.process.exec(
+                    with_timeout(command, timeout),
+                    cwd=cwd,
+                    env=default_env,
+                    timeout=timeout + TIMEOUT_KILL_GRACE_SEC + 30 if timeout else None
+                )
+            except Exception as e:
+                span.record_error(e)
+                logging.error(f"Command execution error: {e}")
+                return CommandResult(
+                    command=command,
+                    stdout="",
+                    stderr=f"Error running command: {str(e)}",
+                    exit_code=-1,
+                    duration_ms=round((time.monotonic() - start) * 1000, 3)
+                )
+
+            # Daytona's exec API returns stdout and stderr combined in `result`
+            stdout, truncated = truncate_output(resp.result or "", limit)
+            result = CommandResult(
+                command=command,
+                stdout=stdout,
+                exit_code=resp.exit_code if resp.exit_code is not None else 0,
+                duration_ms=round((time.monotonic() - start) * 1000, 3),
+                truncated=truncated
+            )
+            mark_timeout(result, timeout)
+            span.set_attributes({"exit_code": result.exit_code, "output_chars": len(resp.result or ""), "truncated": truncated, "timed_out": result.timed_out})
+            return result
+
+    def execute_stream(self, command: str, cwd: str = None, env: dict = None, on_output: Optional[Callable[[str], None]] = None, line_filter: Optional[Callable[[str], bool]] = None, max_output_chars: Optional[int] = None, timeout: Optional[int] = None) -> CommandResult:
+        """Runs the command in a throwaway process session and follows its logs live."""
+        if not self.sandbox:
+            return CommandResult(command=command, stdout="", stderr="Error: Sandbox not initialized.", exit_code=-1)
+
+        cancelled = self.cancelled_result(command)
+        if cancelled:
+            return cancelled
+        timeout = self.resolve_timeout(timeout)
+
+        if cwd is None:
+            cwd = self.get_cwd()
+
+        # Session commands take neither cwd nor env, so both go into the script
+        exports = "".join(f"export {k}={shlex.quote(str(v))}\n" for k, v in self._command_env(env).items())
+        script = f"{exports}cd {shlex.quote(cwd)} && {with_timeout(command, timeout)}"
+
+        buffer = OutputBuffer(settings.COMMAND_OUTPUT_MAX_CHARS if max_output_chars is None else max_output_chars, line_filter)
+
+        def handle_chunk(chunk: str):
+            # Runs on the shared streaming loop: keep it cheap and never raise
+            accepted = buffer.feed(chunk)
+            if on_output and accepted:
+                try:
+                    on_output(accepted)
+                except Exception as e:
+                    logging.warning(f"Output callback failed: {e}")
+
+        process = self.sandbox.process
+        stream_session = f"swe-stream-{uuid.uuid4().hex[:12]}"
+        start = time.monotonic()
+        exit_code = -1
+        error = ""
+        with tracer.span("sandbox.stream_command", command=command[:200], cwd=cwd, timeout=timeout or 0) as span:
+            try:
+                process.create_session(stream_session)
+                resp = process.execute_session_command(
+                    stream_session,
+                    SessionExecuteRequest(command=f"sh -c {shlex.quote(script)}", run_async=True)
+                )
+                follow = process.get_session_command_logs_async(stream_session, resp.cmd_id, handle_chunk, handle_chunk)
+                backstop = timeout + TIMEOUT_KILL_GRACE_SEC + 30 if timeout else None
+                run_coroutine(follow, backstop)
+                exit_code = self._session_exit_code(stream_session, resp.cmd_id)
+            except Exception as e:
+                span.record_error(e)
+                logging.error(f"Streamed command error: {e}")
+                error = f"Error running command: {str(e)}"
+            finally:
+                try:
+                    process.delete_session(stream_session)
+                except Exception:
+                    pass
+
+            tail = buffer.close()
+            if on_output and tail:
+                on_output(tail)
+            stdout, truncated = buffer.getvalue()
+            result = CommandResult(
+                command=command,
+                stdout=stdout,
+                stderr=error,
+                exit_code=exit_code,
+                duration_ms=round((time.monotonic() - start) * 1000, 3),
+                truncated=truncated
+            )
+            mark_timeout(result, timeout)
+            span.set_attributes({"exit_code": result.exit_code, "output_chars": buffer.total_chars, "truncated": truncated, "timed_out": result.timed_out})
+            return result
+
+    def _session_exit_code(self, session_id: str, cmd_id: str, attempts: int = 10) -> int:
+        """The exit code can lag slightly behind the end of the log stream."""
+        for _ in range(attempts):
+            exit_code = self.sandbox.process.get_session_command(session_id, cmd_id).exit_code
+            if exit_code is not None:
+                return exit_code
+            time.sleep(0.5)
+        return -1
+
+    def create_snapshot(self, name: str) -> bool:
+        if not self.sandbox:
+            return False
+
+        with tracer.span("sandbox.create_snapshot", snapshot=name) as span:
+            try:
+                self.sandbox.create_snapshot(name, timeout=settings.ENV_SNAPSHOT_TIMEOUT_SEC)
+                logging.info(f"Created snapshot {name} from sandbox {self.sandbox.id}")
+                return True
+            except Exception as e:
+                span.record_error(e)
+                logging.warning(f"Snapshot creation failed: {e}")
+                return False
 
     def _resolve_path(self, path: str) -> str:
         """Resolves a path against the current working directory if it's relative."""
@@ -162,27 +308,32 @@ class DaytonaSandbox(Sandbox):
         if not self.sandbox:
             return "Error: Sandbox not initialized."
 
-        try:
-            full_path = self._resolve_path(filepath)
-            # Using latest fs download pattern
-            content_bytes = self.sandbox.fs.download_file(full_path)
-            return content_bytes.decode('utf-8')
-        except Exception as e:
-            logging.error(f"File read error: {e}")
-            return f"Error reading file: {str(e)}"
+        with tracer.span("sandbox.read_file", path=filepath) as span:
+            try:
+                full_path = self._resolve_path(filepath)
+                # Using latest fs download pattern
+                content_bytes = self.sandbox.fs.download_file(full_path)
+                span.set_attribute("bytes", len(content_bytes))
+                return content_bytes.decode('utf-8')
+            except Exception as e:
+                span.record_error(e)
+                logging.error(f"File read error: {e}")
+                return f"Error reading file: {str(e)}"
 
     def write_file(self, filepath: str, content: str) -> str:
         if not self.sandbox:
             return "Error: Sandbox not initialized."
 
-        try:
-            full_path = self._resolve_path(filepath)
-            # Using latest fs upload pattern
-            self.sandbox.fs.upload_file(content.encode('utf-8'), full_path)
-            return f"Successfully wrote to {filepath}"
-        except Exception as e:
-            logging.error(f"File write error: {e}")
-            return f"Error writing file: {str(e)}"
+        with tracer.span("sandbox.write_file", path=filepath, bytes=len(content)) as span:
+            try:
+                full_path = self._resolve_path(filepath)
+                # Using latest fs upload pattern
+                self.sandbox.fs.upload_file(content.encode('utf-8'), full_path)
+                return f"Successfully wrote to {filepath}"
+            except Exception as e:
+                span.record_error(e)
+                logging.error(f"File write error: {e}")
+                return f"Error writing file: {str(e)}"
 
     def list_files(self, path: str) -> str:
         if not self.sandbox:
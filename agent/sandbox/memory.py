@@ -0,0 +1,117 @@
+"""
+In-memory sandbox.
+
+Holds the workspace as a dict of files and never starts a process, for benchmarks and
+offline runs of the real workflow. Commands are not executed: `cat`, `ls`, `test -f/-d`
+and `git ls-files` are answered from the files, responses registered with respond()
+are returned for matching commands, and every other command succeeds with no output.
+"""
+import posixpath
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from ..common.config import settings
+from .base import CommandResult, Sandbox, truncate_output
+
+
+class InMemorySandbox(Sandbox):
+    def __init__(self, files: Optional[Dict[str, str]] = None, root: str = "/workspace"):
+        self.files: Dict[str, str] = dict(files or {})
+        self.root = root
+        self.commands: List[str] = []
+        self._responses: List[Tuple[re.Pattern, str, int]] = []
+        self._lock = threading.Lock()
+
+    def respond(self, pattern: str, stdout: str = "", exit_code: int = 0):
+        """Answers commands matching the regex pattern with a fixed result. Earlier patterns win."""
+        self._responses.append((re.compile(pattern), stdout, exit_code))
+
+    def _relative(self, path: str) -> str:
+        path = posixpath.normpath(posixpath.join(self.get_cwd(), path))
+        return posixpath.relpath(path, self.root)
+
+    def _builtin(self, command: str) -> Optional[Tuple[str, int]]:
+        parts = command.split()
+        if parts[:2] == ["git", "ls-files"]:
+            listing = "\n".join(sorted(self.files))
+            if command.endswith("| wc -l"):
+                return str(len(self.files)), 0
+            return (listing, 0) if len(parts) == 2 else None
+        if len(parts) == 2 and parts[0] == "cat":
+            content = self.files.get(self._relative(parts[1]))
+            if content is None:
+                return f"cat: {parts[1]}: No such file or directory", 1
+            return content, 0
+        if parts and parts[0] == "ls" and len(parts) <= 3:
+            target = next((p for p in parts[1:] if not p.startswith("-")), ".")
+            return self.list_files(target), 0
+        if len(parts) == 3 and parts[0] == "test" and parts[1] in ("-f", "-e", "-d"):
+            path = self._relative(parts[2])
+            is_dir = any(name.startswith(path.rstrip("/") + "/") for name in self.files)
+            found = {"-f": path in self.files, "-d": is_dir, "-e": path in self.files or is_dir}[parts[1]]
+            return "", 0 if found else 1
+        return None
+
+    def setup(self):
+        pass
+
+    def teardown(self):
+        pass
+
+    def run_command(self, command: str, cwd: str = None) -> str:
+        return self.execute(command, cwd=cwd).output
+
+    def execute(self, command: str, cwd: str = None, env: Dict[str, str] = None, max_output_chars: Optional[int] = None, timeout: Optional[int] = None) -> CommandResult:
+        cancelled = self.cancelled_result(command)
+        if cancelled:
+            return cancelled
+        with self._lock:
+            self.commands.append(command)
+        stdout, exit_code = next(((out, code) for pattern, out, code in self._responses if pattern.search(command)), (None, 0))
+        if stdout is None:
+            stdout, exit_code = self._builtin(command.strip()) or ("", 0)
+        limit = settings.COMMAND_OUTPUT_MAX_CHARS if max_output_chars is None else max_output_chars
+        stdout, truncated = truncate_output(stdout, limit)
+        if exit_code:
+            return CommandResult(command=command, stdout="", stderr=stdout, exit_code=exit_code, truncated=truncated)
+        return CommandResult(command=command, stdout=stdout, exit_code=exit_code, truncated=truncated)
+
+    def run_commands(self, commands: List[str], cwd: str = None, stop_on_failure: bool = True, timeout: Optional[int] = None) -> List[CommandResult]:
+        results = []
+        for command in commands:
+            results.append(self.execute(command, cwd=cwd))
+            if stop_on_failure and not results[-1].ok:
+                break
+        return results
+
+    def run_parallel(self, commands: List[str], cwd: str = None, timeout: Optional[int] = None) -> List[CommandResult]:
+        return [self.execute(command, cwd=cwd) for command in commands]
+
+    def read_file(self, filepath: str) -> str:
+        content = self.files.get(self._relative(filepath))
+        if content is None:
+            return f"Error reading file: {filepath} not found"
+        return content
+
+    def write_file(self, filepath: str, content: str) -> str:
+        with self._lock:
+            self.files[self._relative(filepath)] = content
+        return f"Successfully wrote to {filepath}"
+
+    def list_files(self, path: str) -> str:
+        prefix = self._relative(path or ".")
+        prefix = "" if prefix == "." else prefix.rstrip("/") + "/"
+        entries = set()
+        for name in self.files:
+            if name.startswith(prefix):
+                head, _, rest = name[len(prefix):].partition("/")
+                entries.add(f"{head}/" if rest else head)
+        return "\n".join(sorted(entries))
+
+    def get_root_path(self) -> str:
+        return self.root
+
+    def generate_codebase_tree(self, depth: int = 3) -> str:
+        paths = {"/".join(name.split("/")[:depth]) for name in self.files}
+        return "\n".join(sorted(paths))
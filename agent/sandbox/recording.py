@@ -0,0 +1,163 @@
+"""
+Recording and replay sandboxes.
+
+RecordingSandbox wraps a live sandbox and writes every call (method, arguments, result)
+to a session trace. ReplaySandbox answers the same calls from a trace without any
+remote sandbox, so a recorded session can run offline.
+"""
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+from ..common.session_trace import TraceReader, TraceWriter, decode_result, encode_result, request_key
+from .base import CommandResult, Sandbox
+
+# Arguments that only steer live output; they are not part of the recorded request
+CALLBACK_ARGS = ("on_output", "line_filter")
+
+
+def _request(method: str, args: tuple, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    kwargs = {k: v for k, v in kwargs.items() if k not in CALLBACK_ARGS and not callable(v)}
+    request = {"args": list(args), "kwargs": kwargs}
+    # Round-trip so recorded and replayed keys see the same JSON types (tuples become lists)
+    request = json.loads(json.dumps(request, default=str))
+    return {"method": method, "key": request_key(method, request), **request}
+
+
+class RecordingSandbox(Sandbox):
+    def __init__(self, inner: Sandbox, writer: TraceWriter):
+        self.inner = inner
+        self.writer = writer
+
+    def _record(self, method: str, *args, **kwargs):
+        event = {"kind": "sandbox", **_request(method, args, kwargs)}
+        try:
+            result = getattr(self.inner, method)(*args, **kwargs)
+        except Exception as e:
+            self.writer.write({**event, "error": str(e)})
+            raise
+        self.writer.write({**event, "result": encode_result(result)})
+        return result
+
+    def __getattr__(self, name: str):
+        # Sandbox-specific extras (generate_codebase_tree, clone_repo, ...) are recorded too
+        if name == "inner":
+            raise AttributeError(name)
+        value = getattr(self.inner, name)
+        if callable(value):
+            return lambda *args, **kwargs: self._record(name, *args, **kwargs)
+        return value
+
+    def setup(self):
+        return self._record("setup")
+
+    def teardown(self):
+        return self._record("teardown")
+
+    def run_command(self, command: str, cwd: str = None) -> str:
+        return self._record("run_command", command, cwd=cwd)
+
+    def execute(self, command: str, cwd: str = None, env: Dict[str, str] = None, max_output_chars: Optional[int] = None, timeout: Optional[int] = None) -> CommandResult:
+        return self._record("execute", command, cwd=cwd, env=env, max_output_chars=max_output_chars, timeout=timeout)
+
+    def execute_stream(self, command: str, cwd: str = None, env: Dict[str, str] = None, on_output: Optional[Callable[[str], None]] = None, line_filter: Optional[Callable[[str], bool]] = None, max_output_chars: Optional[int] = None, timeout: Optional[int] = None) -> CommandResult:
+        return self._record("execute_stream", command, cwd=cwd, env=env, on_output=on_output, line_filter=line_filter, max_output_chars=max_output_chars, timeout=timeout)
+
+    def run_commands(self, commands: List[str], cwd: str = None, stop_on_failure: bool = True, timeout: Optional[int] = None) -> List[CommandResult]:
+        return self._record("run_commands", commands, cwd=cwd, stop_on_failure=stop_on_failure, timeout=timeout)
+
+    def run_parallel(self, commands: List[str], cwd: str = None, timeout: Optional[int] = None) -> List[CommandResult]:
+        return self._record("run_parallel", commands, cwd=cwd, timeout=timeout)
+
+    def create_snapshot(self, name: str) -> bool:
+        return self._record("create_snapshot", name)
+
+    def read_file(self, filepath: str) -> str:
+        return self._record("read_file", filepath)
+
+    def write_file(self, filepath: str, content: str) -> str:
+        return self._record("write_file", filepath, content)
+
+    def list_files(self, path: str) -> str:
+        return self._record("list_files", path)
+
+    def get_root_path(self) -> str:
+        return self._record("get_root_path")
+
+    # Local state stays with the wrapped sandbox
+    def set_cancel_token(self, token):
+        self.inner.set_cancel_token(token)
+
+    def get_cancel_token(self):
+        return self.inner.get_cancel_token()
+
+    def set_cwd(self, path: str):
+        self.inner.set_cwd(path)
+
+    def get_cwd(self) -> str:
+        return self._record("get_cwd")
+
+
+class ReplaySandbox(Sandbox):
+    def __init__(self, trace: TraceReader, session_id: str = None):
+        self.trace = trace
+        self.session_id = session_id
+
+    def _replay(self, method: str, *args, **kwargs):
+        request = _request(method, args, kwargs)
+        event = self.trace.take(f"sandbox.{method}", request["key"])
+        if event is None:
+            if method in ("execute", "execute_stream"):
+                return CommandResult(command=args[0] if args else "", stdout="", stderr="Error: Command not found in the replay trace.", exit_code=127)
+            if method in ("run_commands", "run_parallel"):
+                return []
+            return "Error: Call not found in the replay trace."
+        if "error" in event:
+            raise Exception(event["error"])
+        return decode_result(event.get("result"))
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or not self.trace.has_group(f"sandbox.{name}"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._replay(name, *args, **kwargs)
+
+    def setup(self):
+        pass
+
+    def teardown(self):
+        pass
+
+    def run_command(self, command: str, cwd: str = None) -> str:
+        return self._replay("run_command", command, cwd=cwd)
+
+    def execute(self, command: str, cwd: str = None, env: Dict[str, str] = None, max_output_chars: Optional[int] = None, timeout: Optional[int] = None) -> CommandResult:
+        return self._replay("execute", command, cwd=cwd, env=env, max_output_chars=max_output_chars, timeout=timeout)
+
+    def execute_stream(self, command: str, cwd: str = None, env: Dict[str, str] = None, on_output: Optional[Callable[[str], None]] = None, line_filter: Optional[Callable[[str], bool]] = None, max_output_chars: Optional[int] = None, timeout: Optional[int] = None) -> CommandResult:
+        result = self._replay("execute_stream", command, cwd=cwd, env=env, max_output_chars=max_output_chars, timeout=timeout)
+        if on_output and result.stdout:
+            on_output(result.stdout)
+        return result
+
+    def run_commands(self, commands: List[str], cwd: str = None, stop_on_failure: bool = True, timeout: Optional[int] = None) -> List[CommandResult]:
+        return self._replay("run_commands", commands, cwd=cwd, stop_on_failure=stop_on_failure, timeout=timeout)
+
+    def run_parallel(self, commands: List[str], cwd: str = None, timeout: Optional[int] = None) -> List[CommandResult]:
+        return self._replay("run_parallel", commands, cwd=cwd, timeout=timeout)
+
+    def create_snapshot(self, name: str) -> bool:
+        return False
+
+    def read_file(self, filepath: str) -> str:
+        return self._replay("read_file", filepath)
+
+    def write_file(self, filepath: str, content: str) -> str:
+        return self._replay("write_file", filepath, content)
+
+    def list_files(self, path: str) -> str:
+        return self._replay("list_files", path)
+
+    def get_root_path(self) -> str:
+        return self._replay("get_root_path")
+
+    def get_cwd(self) -> str:
+        return self._replay("get_cwd")
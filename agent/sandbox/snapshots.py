@@ -0,0 +1,66 @@
+"""
+Environment snapshots.
+
+After a successful env setup the sandbox is saved as a snapshot, keyed by the repo
+and a hash of its lockfiles. New sessions on the repo start from the latest snapshot
+and skip dependency installation when the lockfiles still hash the same.
+"""
+import hashlib
+import logging
+import shlex
+import time
+from typing import Any, Dict, Optional
+
+from ..common.repo_cache import repo_cache, repo_key
+from .base import Sandbox
+
+LOCKFILES = [
+    "package-lock.json", "npm-shrinkwrap.json", "pnpm-lock.yaml", "yarn.lock", "bun.lockb", "bun.lock",
+    "poetry.lock", "uv.lock", "Pipfile.lock", "pdm.lock", "requirements*.txt",
+    "go.sum", "Cargo.lock", "Gemfile.lock", "composer.lock", "mix.lock", "pubspec.lock",
+]
+
+REGISTRY_NAME = "env_snapshot"
+LATEST_KEY = "latest"
+CREDENTIALS_FILE = "~/.git-credentials"
+
+
+def lockfile_hash(sandbox: Sandbox) -> Optional[str]:
+    """Hashes every tracked lockfile in the repo (any depth) in one exec. None if there are none."""
+    pathspecs = " ".join(shlex.quote(f":(glob)**/{name}") for name in LOCKFILES)
+    result = sandbox.execute(f"git ls-files -z -- {pathspecs} | xargs -0 -r sha256sum | sort -k2")
+    listing = result.stdout.strip()
+    if not result.ok or not listing:
+        return None
+    return hashlib.sha256(listing.encode("utf-8")).hexdigest()
+
+
+def env_snapshot_name(repo_url: str, lock_hash: str) -> str:
+    return f"swe-env-{repo_key(repo_url)[:12]}-{lock_hash[:16]}"
+
+
+def find_env_snapshot(repo_url: str, lock_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Snapshot for the given lockfile hash, or the repo's most recent one when no hash is given."""
+    return repo_cache.get(repo_url, f"deps-{lock_hash}" if lock_hash else LATEST_KEY, name=REGISTRY_NAME)
+
+
+def snapshot_environment(sandbox: Sandbox, repo_url: str, lock_hash: str) -> Optional[str]:
+    """
+    Snapshots the sandbox and registers it for the repo. Git credentials are moved
+    out of the way while the snapshot is taken so no token is baked into it.
+    Returns the snapshot name, or None if the sandbox could not be snapshotted.
+    """
+    name = env_snapshot_name(repo_url, lock_hash)
+    sandbox.execute(f"mv {CREDENTIALS_FILE} {CREDENTIALS_FILE}.swe-bak 2>/dev/null; true")
+    try:
+        created = sandbox.create_snapshot(name)
+    finally:
+        sandbox.execute(f"mv {CREDENTIALS_FILE}.swe-bak {CREDENTIALS_FILE} 2>/dev/null; true")
+    if not created:
+        return None
+
+    entry = {"name": name, "lock_hash": lock_hash, "created_at": time.time()}
+    repo_cache.set(repo_url, f"deps-{lock_hash}", entry, name=REGISTRY_NAME)
+    repo_cache.set(repo_url, LATEST_KEY, entry, name=REGISTRY_NAME)
+    logging.info(f"Registered environment snapshot {name} for {repo_url}")
+    return name
@@ -0,0 +1,126 @@
+"""
+Streamed command output.
+
+Captures a command's output incrementally in bounded memory: the first and last
+part of the (optionally line-filtered) output are kept and everything in between is
+only counted. Chunks accepted by the filter are handed to an optional callback as
+they arrive so they can be shown live.
+
+Sandboxes that follow output over an async API run it on one shared background event
+loop (run_coroutine), so streaming works from sync code whether or not the calling
+thread already runs a loop.
+"""
+import asyncio
+import threading
+from typing import Awaitable, Callable, Optional, Tuple, TypeVar
+
+LineFilter = Callable[[str], bool]
+OutputCallback = Callable[[str], None]
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="sandbox-stream-loop", daemon=True).start()
+        return _loop
+
+
+def run_coroutine(coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """Runs coro on the shared background loop and waits for it. Raises TimeoutError after timeout seconds."""
+    return asyncio.run_coroutine_threadsafe(asyncio.wait_for(coro, timeout), _background_loop()).result()
+
+
+def replay_output(result, on_output: Optional[OutputCallback] = None, line_filter: Optional[LineFilter] = None, max_output_chars: Optional[int] = None):
+    """
+    Passes a finished command's full output through an OutputBuffer, as if it had been
+    streamed: one on_output call with the accepted text, then the result's stdout is
+    replaced by the bounded, filtered capture.
+    """
+    from ..common.config import settings
+
+    buffer = OutputBuffer(settings.COMMAND_OUTPUT_MAX_CHARS if max_output_chars is None else max_output_chars, line_filter)
+    accepted = buffer.feed(result.stdout) + buffer.close()
+    if on_output and accepted:
+        on_output(accepted)
+    result.stdout, result.truncated = buffer.getvalue()
+    return result
+
+
+class OutputBuffer:
+    """Head/tail capture of streamed output. max_chars of 0/None keeps everything."""
+
+    def __init__(self, max_chars: Optional[int] = None, line_filter: Optional[LineFilter] = None):
+        self.max_chars = max_chars or 0
+        self.line_filter = line_filter
+        self._head_limit = self.max_chars // 2
+        self._tail_limit = self.max_chars - self._head_limit
+        self._head = []
+        self._head_len = 0
+        self._tail = ""
+        self._partial = ""
+        self.total_chars = 0
+        self.filtered_lines = 0
+
+    def feed(self, chunk: str) -> str:
+        """Adds a chunk and returns the part of it that passed the line filter."""
+        if not chunk:
+            return ""
+        if self.line_filter is None:
+            self._keep(chunk)
+            return chunk
+
+        # Filter whole lines only; hold back an unterminated last line
+        lines = (self._partial + chunk).split("\n")
+        self._partial = lines.pop()
+        accepted = "".join(f"{line}\n" for line in lines if self._accept(line))
+        self._keep(accepted)
+        return accepted
+
+    def close(self) -> str:
+        """Flushes a trailing line without newline. Returns the accepted text, if any."""
+        line, self._partial = self._partial, ""
+        if not line or not self._accept(line):
+            return ""
+        self._keep(line)
+        return line
+
+    def getvalue(self) -> Tuple[str, bool]:
+        """Returns (text, truncated) in the same format as truncate_output()."""
+        head = "".join(self._head)
+        omitted = self.total_chars - len(head) - len(self._tail)
+        if omitted > 0:
+            text = f"{head}\n... ({omitted} characters truncated) ...\n{self._tail}"
+        else:
+            text = head + self._tail
+        if text.endswith("\n"):
+            text = text[:-1]
+        if self.filtered_lines:
+            text = f"{text}\n[{self.filtered_lines} lines not matching the filter omitted]" if text else f"[{self.filtered_lines} lines not matching the filter omitted]"
+        return text, omitted > 0
+
+    def _accept(self, line: str) -> bool:
+        if self.line_filter(line):
+            return True
+        self.filtered_lines += 1
+        return False
+
+    def _keep(self, text: str):
+        if not text:
+            return
+        self.total_chars += len(text)
+        if not self.max_chars:
+            self._head.append(text)
+            return
+        room = self._head_limit - self._head_len
+        if room > 0:
+            self._head.append(text[:room])
+            self._head_len += min(room, len(text))
+            text = text[room:]
+        if text:
+            self._tail = (self._tail + text)[-self._tail_limit:]
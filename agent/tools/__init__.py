@@ -23,6 +23,10 @@ from .human_help_tool import (
 )
 from .git_tools import create_git_tools
 from .navigation_tool import create_navigation_tools
+from .symbol_index import create_symbol_tools
+from .compaction import compact_tools, create_fetch_elided_output_tool
+from .tool_cache import ToolResultCache, memoize_tools
+from .testing.commands import create_record_test_command_tool
 
 __all__ = [
     # Base tools
@@ -52,4 +56,14 @@ __all__ = [
     "create_git_tools",
     # Navigation
     "create_navigation_tools",
+    # Symbols
+    "create_symbol_tools",
+    # Output compaction
+    "compact_tools",
+    "create_fetch_elided_output_tool",
+    # Read-only tool memoization
+    "ToolResultCache",
+    "memoize_tools",
+    # Testing
+    "create_record_test_command_tool",
 ]
@@ -1,6 +1,70 @@
+import os
+import re
+import shlex
 from langchain_core.tools import StructuredTool
-from typing import List, Optional, Tuple
-from ..sandbox.base import Sandbox
+from typing import Callable, List, Optional, Tuple
+from ..sandbox.base import Sandbox, CommandResult
+from ..sandbox.streaming import replay_output
+from ..callbacks import SessionOutputStream
+
+
+# Installs, builds and test runs: worth the extra round trips of a streamed command.
+# Decided by the command word (after any `cd ... &&`, env assignments and wrappers), and
+# for package managers its subcommand, so `cat test.py` or `ls build/` don't count.
+LONG_RUNNING_TOOLS = {"pytest", "tox", "nox", "jest", "vitest", "mocha", "rspec", "phpunit", "make", "mvn", "gradle", "gradlew", "docker", "tsc", "webpack", "vite"}
+LONG_RUNNING_SUBCOMMANDS = {"npm": {"install", "i", "ci", "test", "t", "run", "run-script", "exec"}, "yarn": {"", "install", "add", "test", "run", "build"},
+                            "pnpm": {"install", "i", "add", "test", "run", "build", "exec"}, "bun": {"install", "i", "add", "test", "run", "build"},
+                            "pip": {"install"}, "pip3": {"install"}, "poetry": {"install", "run", "update"}, "pipenv": {"install", "sync", "run"},
+                            "uv": {"sync", "pip", "run"}, "bundle": {"install", "exec"}, "composer": {"install", "update"},
+                            "cargo": {"build", "test", "fetch", "run"}, "go": {"build", "test", "mod", "run"}, "apt-get": {"install"}}
+# Run the command word that follows them
+WRAPPERS = {"env", "sudo", "time", "nice", "npx", "exec"}
+SEGMENT_SEPARATOR_RE = re.compile(r"&&|\|\||;")
+ENV_ASSIGNMENT_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*=")
+
+
+def command_words(command: str) -> List[str]:
+    """The words of the first segment that isn't a `cd`, from the command word on."""
+    for segment in SEGMENT_SEPARATOR_RE.split(command):
+        try:
+            words = shlex.split(segment)
+        except ValueError:
+            words = segment.split()
+        while words and (words[0] in WRAPPERS or ENV_ASSIGNMENT_RE.match(words[0])):
+            words = words[1:]
+        if len(words) > 2 and os.path.basename(words[0]).startswith("python") and words[1] == "-m":
+            words = words[2:]
+        if words and words[0] != "cd":
+            return [os.path.basename(words[0])] + words[1:]
+    return []
+
+
+def is_long_running(command: str) -> bool:
+    words = command_words(command)
+    if not words:
+        return False
+    if words[0] in LONG_RUNNING_TOOLS:
+        return True
+    subcommand = next((w for w in words[1:] if not w.startswith("-")), "")
+    return subcommand in LONG_RUNNING_SUBCOMMANDS.get(words[0], ())
+
+
+def run_streamed(sandbox: Sandbox, command: str, timeout: Optional[int] = None, line_filter: Optional[Callable[[str], bool]] = None, stream: Optional[bool] = None) -> CommandResult:
+    """
+    Runs a command. Long-running commands (stream=None: decided by is_long_running) are
+    streamed live to the session log; the rest run as one exec and aren't logged here.
+    """
+    if stream is None:
+        stream = is_long_running(command)
+    if not stream:
+        return replay_output(sandbox.execute(command, max_output_chars=0, timeout=timeout), line_filter=line_filter)
+    session_id = getattr(sandbox, "session_id", None)
+    on_output = SessionOutputStream(session_id) if session_id else None
+    try:
+        return sandbox.execute_stream(command, on_output=on_output, line_filter=line_filter, timeout=timeout)
+    finally:
+        if on_output:
+            on_output.flush()
 
 
 def create_filesystem_tools(sandbox: Sandbox) -> List[StructuredTool]:
@@ -20,7 +84,7 @@ def create_filesystem_tools(sandbox: Sandbox) -> List[StructuredTool]:
 
     def run_command(command: str) -> str:
         """Runs a shell command and returns the output."""
-        return sandbox.run_command(command)
+        return run_streamed(sandbox, command).output
 
     def edit_file(filepath: str, old_str: str, new_str: str) -> str:
         """Replaces old_str with new_str in the file. Returns success message or error."""
@@ -266,17 +330,18 @@ def create_text_editor_tool(sandbox: Sandbox) -> StructuredTool:
     )
 
 
-def create_shell_tool(sandbox: Sandbox, timeout: int = 60) -> StructuredTool:
+def create_shell_tool(sandbox: Sandbox, timeout: int = 300) -> StructuredTool:
     """Creates an enhanced shell tool with timeout support."""
     
-    def shell(command: str, workdir: Optional[str] = None, timeout_sec: int = 60) -> str:
+    def shell(command: str, workdir: Optional[str] = None, timeout_sec: Optional[int] = None, filter_regex: Optional[str] = None) -> str:
         """
         Run a shell command with timeout support.
         
         Args:
             command: The shell command to execute
             workdir: Optional working directory for the command
-            timeout_sec: Maximum time to wait (default 60 seconds)
+            timeout_sec: Maximum time to wait before the command is killed (default 300 seconds)
+            filter_regex: Optional regex; only output lines matching it are returned (e.g. "FAIL|Error")
         
         Returns:
             Command output or error message
@@ -285,10 +350,12 @@ def create_shell_tool(sandbox: Sandbox, timeout: int = 60) -> StructuredTool:
             full_cmd = command
             if workdir:
                 full_cmd = f"cd {workdir} && {command}"
+
+            line_filter = re.compile(filter_regex).search if filter_regex else None
+            return run_streamed(sandbox, full_cmd, timeout=timeout_sec or timeout, line_filter=line_filter).output
             
-            result = sandbox.run_command(full_cmd)
-            return result
-            
+        except re.error as e:
+            return f"Error: invalid filter_regex: {str(e)}"
         except Exception as e:
             return f"Error executing command: {str(e)}"
     
@@ -298,7 +365,9 @@ def create_shell_tool(sandbox: Sandbox, timeout: int = 60) -> StructuredTool:
         description=(
             "Execute a shell command and return its output. "
             "Use for running tests, builds, git commands, or any shell operation. "
-            "Optionally specify a working directory."
+            "Optionally specify a working directory and a timeout in seconds; "
+            "commands that exceed it are killed and their partial output is returned. "
+            "Use filter_regex to keep only matching lines of long output (e.g. test failures)."
         )
     )
 
@@ -0,0 +1,203 @@
+"""
+Tool Output Compaction - Keeps tool results inside a per-tool token budget.
+
+Every tool result is cleaned (ANSI codes, progress bars and runs of identical lines
+removed) and, when still over budget, cut down to its head and tail. The full
+cleaned text is kept per session so the agent can page through the elided part
+with the fetch_elided_output tool. When cleaning dropped lines, the uncleaned
+output is kept too, so nothing the tool printed is lost for good.
+"""
+import functools
+import itertools
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.tools import StructuredTool
+
+from ..common.config import settings
+
+# CSI / OSC escape sequences and stray control characters (tabs and newlines excepted)
+ANSI_RE = re.compile(r"\x1b\[[0-?]*[ -/]*[@-~]|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)|\x1b[@-Z\\-_]|[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]")
+# Bars such as "[=====>    ] 45%", "######## 80%" or "━━━━━━ 12.3 MB"
+PROGRESS_RE = re.compile(r"^\s*\S{0,40}?\s*[\[|(]?[=#>\-━─█▓▒░*.·\s]{10,}[\]|)]?\s*(\d+(\.\d+)?\s*%|[\d./]+\s*[kMG]?i?B\b).*$")
+
+# File contents and diffs must stay byte-exact for later edits: budget only, no cleaning
+RAW_CONTENT_TOOLS = {"read_file", "view_file", "text_editor", "git_diff"}
+
+# Per-tool budgets in tokens; everything else uses TOOL_OUTPUT_TOKEN_BUDGET
+TOOL_TOKEN_BUDGETS = {
+    "read_file": 12000,
+    "view_file": 12000,
+    "text_editor": 12000,
+    "git_diff": 8000,
+}
+
+FETCH_TOOL_NAME = "fetch_elided_output"
+MAX_STORED_OUTPUTS = 50
+
+# Elided tool outputs per session (Used by Worker process only)
+ELIDED_OUTPUTS: Dict[str, "OrderedDict[str, str]"] = {}
+_output_ids = itertools.count(1)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (4 characters per token), good enough for budgeting."""
+    return (len(text) + 3) // 4
+
+
+def strip_ansi(text: str) -> str:
+    return ANSI_RE.sub("", text)
+
+
+def strip_progress(text: str) -> str:
+    """Resolves carriage-return redraws to their final state and drops progress bar lines."""
+    lines = []
+    for line in text.split("\n"):
+        if "\r" in line:
+            # A terminal shows only what was drawn after the last carriage return
+            segments = [s for s in line.split("\r") if s.strip()]
+            line = segments[-1] if segments else ""
+        if PROGRESS_RE.match(line):
+            continue
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def collapse_repeats(text: str, min_run: int = 3) -> str:
+    """
+    Collapses runs of identical lines (repeated warnings, retry messages) to the line
+    and a count. Lines that differ in anything, even only a number, are all kept.
+    """
+    lines = text.split("\n")
+    out: List[str] = []
+    i = 0
+    while i < len(lines):
+        j = i + 1
+        while j < len(lines) and lines[j] == lines[i]:
+            j += 1
+        run = j - i
+        if run >= min_run and lines[i].strip():
+            out.append(lines[i])
+            out.append(f"... [line repeated {run - 1} more times] ...")
+        else:
+            out.extend(lines[i:j])
+        i = j
+    return "\n".join(out)
+
+
+def clean_output(text: str) -> str:
+    return collapse_repeats(strip_progress(strip_ansi(text)))
+
+
+def store_elided_output(session_id: str, text: str) -> str:
+    """Keeps the full text for later paging and returns its reference id."""
+    outputs = ELIDED_OUTPUTS.setdefault(session_id, OrderedDict())
+    ref = f"out-{next(_output_ids)}"
+    outputs[ref] = text
+    while len(outputs) > MAX_STORED_OUTPUTS:
+        outputs.popitem(last=False)
+    return ref
+
+
+def clear_elided_outputs(session_id: str):
+    ELIDED_OUTPUTS.pop(session_id, None)
+
+
+def compact_output(text: str, budget_tokens: int, session_id: Optional[str] = None, clean: bool = True) -> Tuple[str, Optional[str]]:
+    """
+    Returns (compacted_text, ref). ref is None when the text fit the budget; otherwise
+    the full (cleaned) text was stored under ref for fetch_elided_output. When cleaning
+    dropped lines, the uncleaned text is stored as well and a note points to it.
+    """
+    raw_note = ""
+    if clean:
+        cleaned = clean_output(text)
+        if session_id and cleaned.count("\n") < text.count("\n"):
+            raw_ref = store_elided_output(session_id, strip_ansi(text))
+            raw_note = f"\n[repeated lines and progress bars were removed; call {FETCH_TOOL_NAME}(ref=\"{raw_ref}\") for the uncleaned output]"
+        text = cleaned
+    if not budget_tokens or estimate_tokens(text) <= budget_tokens:
+        return text + raw_note, None
+
+    max_chars = budget_tokens * 4
+    # Errors and summaries tend to be at the end, so the tail gets the larger share
+    head_end = text.rfind("\n", 0, int(max_chars * 0.4)) + 1
+    tail_start = text.find("\n", len(text) - int(max_chars * 0.6))
+    tail_start = len(text) - int(max_chars * 0.6) if tail_start == -1 else tail_start + 1
+    ref = store_elided_output(session_id, text) if session_id else None
+
+    elided = text[head_end:tail_start]
+    note = f"... [{elided.count(chr(10)) + 1} lines / {len(elided)} characters elided"
+    if ref:
+        note += f"; call {FETCH_TOOL_NAME}(ref=\"{ref}\", offset={head_end}) to read them"
+    note += "] ..."
+    return f"{text[:head_end]}{note}\n{text[tail_start:]}{raw_note}", ref
+
+
+def _compacting(func, tool_name: str, session_id: str, budget: int):
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        result = func(*args, **kwargs)
+        if not isinstance(result, str):
+            return result
+        compacted, _ = compact_output(result, budget, session_id, clean=tool_name not in RAW_CONTENT_TOOLS)
+        return compacted
+    return run
+
+
+def create_fetch_elided_output_tool(session_id: str) -> StructuredTool:
+    """Creates the tool that pages through output elided by the compactor."""
+
+    def fetch_elided_output(ref: str, offset: int = 0, limit_chars: int = 16000) -> str:
+        """
+        Read part of a tool output that was shortened to save context.
+
+        Args:
+            ref: The reference from the elision note, e.g. "out-3"
+            offset: Character offset to start reading from (given in the note)
+            limit_chars: Maximum characters to return (default 16000)
+        """
+        text = ELIDED_OUTPUTS.get(session_id, {}).get(ref)
+        if text is None:
+            return f"Error: No stored output named '{ref}'. It may have expired."
+        offset = max(0, offset)
+        chunk = text[offset:offset + limit_chars]
+        end = offset + len(chunk)
+        if end < len(text):
+            chunk += f"\n... [{len(text) - end} more characters; continue with offset={end}]"
+        return chunk
+
+    return StructuredTool.from_function(
+        func=fetch_elided_output,
+        name=FETCH_TOOL_NAME,
+        description=(
+            "Read the part of a long tool output that was elided to save context. "
+            "Use the ref and offset given in the '... elided ...' note."
+        )
+    )
+
+
+def compact_tools(tools: List[StructuredTool], session_id: str, budgets: Optional[Dict[str, int]] = None) -> List[StructuredTool]:
+    """
+    Wraps every tool so its output is compacted to its token budget, and adds the
+    fetch_elided_output tool. Tool names, schemas and descriptions are unchanged.
+    """
+    budgets = {**TOOL_TOKEN_BUDGETS, **(budgets or {})}
+    wrapped = []
+    for tool in tools:
+        if tool.name == FETCH_TOOL_NAME or not getattr(tool, "func", None):
+            wrapped.append(tool)
+            continue
+        budget = budgets.get(tool.name, settings.TOOL_OUTPUT_TOKEN_BUDGET)
+        wrapped.append(StructuredTool(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            func=_compacting(tool.func, tool.name, session_id, budget),
+            return_direct=tool.return_direct,
+            handle_tool_error=tool.handle_tool_error,
+        ))
+    if not any(t.name == FETCH_TOOL_NAME for t in wrapped):
+        wrapped.append(create_fetch_elided_output_tool(session_id))
+    return wrapped
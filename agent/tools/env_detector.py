@@ -0,0 +1,222 @@
+"""
+Install Plan Detector - Deterministic dependency install plan from manifests and lockfiles.
+
+Scans the repository in a single sandbox exec (manifest paths, root package.json,
+pnpm workspace config and available package managers) and maps it to install
+commands, including monorepo workspaces. When the layout is ambiguous the plan is
+marked unsure and env setup falls back to the LLM agent.
+"""
+import json
+import os
+import re
+import shlex
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from ..sandbox.base import Sandbox
+from .install_tool import install_dependencies
+
+MANIFESTS = [
+    "package.json", "pnpm-lock.yaml", "yarn.lock", "package-lock.json", "bun.lockb", "bun.lock",
+    "pyproject.toml", "poetry.lock", "uv.lock", "Pipfile", "Pipfile.lock", "requirements.txt", "requirements-dev.txt",
+    "go.mod", "Cargo.toml", "Gemfile", "composer.json", "pom.xml", "build.gradle", "build.gradle.kts",
+]
+
+TOOLS = ["pnpm", "yarn", "npm", "bun", "corepack", "poetry", "uv", "pipenv", "pip", "go", "cargo", "bundle", "composer"]
+
+MAX_DEPTH = 3
+MAX_INSTALL_DIRS = 8
+SKIP_DIRS = ("node_modules/", "vendor/", "third_party/", "examples/", "fixtures/", "test/fixtures/")
+# AGENTS.md setup instructions: a setup section, or an install command in a code span or block
+SETUP_HEADING_RE = re.compile(
+    r"^#{1,6}[^\n]*\b(set ?up|install|installation|installing|bootstrap\w*|getting started|development environment)\b",
+    re.IGNORECASE | re.MULTILINE,
+)
+SETUP_COMMAND_RE = re.compile(
+    r"\b(npm|pnpm|yarn|bun)\s+(install|i|ci)\b|\b(pip3?|pipx|poetry|pipenv|bundle|composer)\s+install\b|\buv\s+(sync|pip\s+install)\b"
+    r"|\bmake\s+(setup|install|bootstrap|deps)\b|\b(apt-get|apt|brew|apk)\s+(install|add)\b|\S*(setup|bootstrap)\S*\.sh\b"
+    r"|\bgo\s+mod\s+download\b|\bcargo\s+fetch\b",
+    re.IGNORECASE,
+)
+CODE_RE = re.compile(r"```[^\n]*\n(.*?)```|`([^`\n]+)`", re.DOTALL)
+
+
+@dataclass
+class InstallStep:
+    command: List[str]
+    workdir: str = "."
+
+    def __str__(self) -> str:
+        prefix = "" if self.workdir == "." else f"(in {self.workdir}) "
+        return prefix + " ".join(self.command)
+
+
+@dataclass
+class InstallPlan:
+    steps: List[InstallStep] = field(default_factory=list)
+    confident: bool = True
+    reason: str = ""
+
+
+def _node_step(directory: str, files: set, package_json: Dict) -> Tuple[InstallStep, str]:
+    def own(name: str) -> bool:
+        return (name if directory == "." else f"{directory}/{name}") in files
+
+    # A package without its own lockfile follows the root one
+    def has(name: str) -> bool:
+        return name in files or own(name)
+
+    declared = str(package_json.get("packageManager", "")).split("@")[0]
+    if has("pnpm-lock.yaml") or declared == "pnpm":
+        return InstallStep(["pnpm", "install"], directory), "pnpm"
+    if has("yarn.lock") or declared == "yarn":
+        return InstallStep(["yarn", "install"], directory), "yarn"
+    if has("bun.lockb") or has("bun.lock") or declared == "bun":
+        return InstallStep(["bun", "install"], directory), "bun"
+    # npm ci fails without a lockfile next to package.json
+    if own("package-lock.json"):
+        return InstallStep(["npm", "ci"], directory), "npm"
+    return InstallStep(["npm", "install"], directory), "npm"
+
+
+def _python_step(directory: str, names: set) -> Tuple[Optional[InstallStep], Optional[str]]:
+    if "uv.lock" in names:
+        return InstallStep(["uv", "sync"], directory), "uv"
+    if "poetry.lock" in names:
+        return InstallStep(["poetry", "install", "--no-interaction"], directory), "poetry"
+    if "Pipfile.lock" in names or "Pipfile" in names:
+        return InstallStep(["pipenv", "install", "--dev"], directory), "pipenv"
+    if "requirements.txt" in names:
+        command = ["pip", "install", "-r", "requirements.txt"]
+        if "requirements-dev.txt" in names:
+            command += ["-r", "requirements-dev.txt"]
+        return InstallStep(command, directory), "pip"
+    if "pyproject.toml" in names:
+        return InstallStep(["pip", "install", "-e", "."], directory), "pip"
+    return None, None
+
+
+# Manifest -> (install command, package manager)
+OTHER_ECOSYSTEMS = {
+    "go.mod": (["go", "mod", "download"], "go"),
+    "Cargo.toml": (["cargo", "fetch"], "cargo"),
+    "Gemfile": (["bundle", "install"], "bundle"),
+    "composer.json": (["composer", "install", "--no-interaction"], "composer"),
+}
+
+# Missing tool -> (bootstrap command, tool it needs)
+BOOTSTRAP = {
+    "pnpm": (["corepack", "enable"], "corepack"),
+    "yarn": (["corepack", "enable"], "corepack"),
+    "poetry": (["pip", "install", "poetry"], "pip"),
+    "uv": (["pip", "install", "uv"], "pip"),
+    "pipenv": (["pip", "install", "pipenv"], "pip"),
+}
+
+
+def has_setup_instructions(agents_md: str) -> bool:
+    """A setup/installation section, or an install command in code. Passing mentions of "install" do not count."""
+    if SETUP_HEADING_RE.search(agents_md):
+        return True
+    return any(SETUP_COMMAND_RE.search(block or span) for block, span in CODE_RE.findall(agents_md))
+
+
+def build_install_plan(paths: List[str], root_package_json: Optional[Dict], has_pnpm_workspace: bool, tools: set, agents_md: Optional[str] = None) -> InstallPlan:
+    """Pure planning step, separated from the sandbox scan for testability."""
+    if agents_md and has_setup_instructions(agents_md):
+        return InstallPlan(confident=False, reason="AGENTS.md has setup instructions")
+
+    files = {p for p in paths if p.count("/") < MAX_DEPTH and not any(p.startswith(d) or f"/{d}" in p for d in SKIP_DIRS)}
+    by_dir: Dict[str, set] = {}
+    for path in files:
+        directory, name = os.path.split(path)
+        by_dir.setdefault(directory or ".", set()).add(name)
+
+    if any(names & {"pom.xml", "build.gradle", "build.gradle.kts"} for names in by_dir.values()):
+        return InstallPlan(confident=False, reason="JVM build detected")
+
+    steps: List[InstallStep] = []
+    managers: List[str] = []
+
+    # Node: a root workspace config covers every package below it
+    node_dirs = sorted(d for d, names in by_dir.items() if "package.json" in names)
+    root_workspaces = bool(root_package_json and root_package_json.get("workspaces")) or has_pnpm_workspace
+    if root_workspaces:
+        node_dirs = ["."]
+    for directory in node_dirs:
+        package_json = (root_package_json or {}) if directory == "." else {}
+        step, manager = _node_step(directory, files, package_json)
+        steps.append(step)
+        managers.append(manager)
+
+    for directory in sorted(by_dir):
+        names = by_dir[directory]
+        step, manager = _python_step(directory, names)
+        if step is not None:
+            steps.append(step)
+            managers.append(manager)
+        for manifest, (command, manager) in OTHER_ECOSYSTEMS.items():
+            if manifest in names:
+                steps.append(InstallStep(command, directory))
+                managers.append(manager)
+
+    if len(steps) > MAX_INSTALL_DIRS:
+        return InstallPlan(confident=False, reason=f"{len(steps)} separate projects found")
+
+    bootstrap: List[InstallStep] = []
+    for manager in dict.fromkeys(managers):
+        if manager in tools:
+            continue
+        if manager in BOOTSTRAP and BOOTSTRAP[manager][1] in tools:
+            step = InstallStep(BOOTSTRAP[manager][0])
+            if not any(s.command == step.command for s in bootstrap):
+                bootstrap.append(step)
+            continue
+        return InstallPlan(confident=False, reason=f"'{manager}' is not installed in the sandbox")
+
+    return InstallPlan(steps=bootstrap + steps, reason="no dependency manifests found" if not steps else "")
+
+
+def detect_install_plan(sandbox: Sandbox, agents_md: Optional[str] = None) -> InstallPlan:
+    """Scans the repo in one sandbox exec and builds the install plan."""
+    pathspecs = " ".join(shlex.quote(f":(glob)**/{name}") for name in MANIFESTS)
+    probe = " ".join(TOOLS)
+    results = sandbox.run_commands(
+        [
+            f"git ls-files -- {pathspecs} | head -n 2000",
+            "cat package.json",
+            "test -f pnpm-workspace.yaml",
+            f"for t in {probe}; do command -v $t >/dev/null 2>&1 && echo $t; done; true",
+        ],
+        stop_on_failure=False
+    )
+    if len(results) != 4 or not results[0].ok:
+        return InstallPlan(confident=False, reason="repository scan failed")
+    paths_res, package_res, workspace_res, tools_res = results
+
+    root_package_json = None
+    if package_res.ok:
+        try:
+            root_package_json = json.loads(package_res.stdout)
+        except json.JSONDecodeError:
+            return InstallPlan(confident=False, reason="package.json could not be parsed")
+
+    return build_install_plan(
+        paths_res.stdout.split(),
+        root_package_json,
+        workspace_res.ok,
+        set(tools_res.stdout.split()),
+        agents_md
+    )
+
+
+def run_install_plan(sandbox: Sandbox, plan: InstallPlan) -> Tuple[bool, str]:
+    """Runs the plan's steps in order, stopping at the first failure. Returns (ok, report)."""
+    reports = []
+    for step in plan.steps:
+        output = install_dependencies(sandbox, step.command, None if step.workdir == "." else step.workdir)
+        if not output.startswith("Successfully ran"):
+            reports.append(f"$ {step}\n{output}")
+            return False, "\n\n".join(reports)
+        reports.append(f"$ {step}: ok")
+    return True, "\n".join(reports)
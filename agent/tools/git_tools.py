@@ -1,7 +1,8 @@
 import re
+import shlex
 from urllib.parse import urlparse, urlunparse
 from langchain_core.tools import StructuredTool
-from ..sandbox.base import Sandbox
+from ..sandbox.base import Sandbox, CommandResult
 from typing import Optional, List, TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -10,32 +11,32 @@ if TYPE_CHECKING:
 def configure_git_global(sandbox: Sandbox, credentials: Optional["GitCredentials"] = None, repo_url: Optional[str] = None):
     """
     Sets global git/user config and credential helper.
+    All settings are applied in a single batched sandbox exec.
     """
+    commands = []
+
     # 1. Global User Config
     if credentials:
-        sandbox.run_command(f"git config --global user.name '{credentials.author_name}'")
-        sandbox.run_command(f"git config --global user.email '{credentials.author_email}'")
+        commands.append(f"git config --global user.name '{credentials.author_name}'")
+        commands.append(f"git config --global user.email '{credentials.author_email}'")
     else:
-        sandbox.run_command("git config --global user.name 'swe-agent'")
-        sandbox.run_command("git config --global user.email 'swe-agent@example.com'")
+        commands.append("git config --global user.name 'swe-agent'")
+        commands.append("git config --global user.email 'swe-agent@example.com'")
 
     # 2. Credential Helper
-    sandbox.run_command("git config --global credential.helper store")
+    commands.append("git config --global credential.helper store")
     
     # 3. Disable SSL Verify (Fix for internal/self-hosted git servers)
-    sandbox.run_command("git config --global http.sslVerify false")
+    commands.append("git config --global http.sslVerify false")
 
     if credentials and credentials.token and repo_url:
-        # 3. Write credentials to store using the known repo_url
-        setup_git_auth(sandbox, repo_url, credentials)
+        # 4. Write credentials to store using the known repo_url
+        commands.append(_git_auth_command(repo_url, credentials))
 
-def setup_git_auth(sandbox: Sandbox, repo_url: str, credentials: Optional["GitCredentials"] = None):
-    """
-    Configures git auth for a specific repository host by writing to ~/.git-credentials.
-    """
-    if not credentials or not credentials.token:
-        return
+    return sandbox.run_commands(commands, stop_on_failure=False)
 
+def _git_auth_command(repo_url: str, credentials: "GitCredentials") -> str:
+    """Builds the shell command that appends the host credentials to ~/.git-credentials."""
     parsed = urlparse(repo_url)
     username = credentials.username or "oauth2"
     
@@ -45,7 +46,16 @@ def setup_git_auth(sandbox: Sandbox, repo_url: str, credentials: Optional["GitCr
     
     # Append to ~/.git-credentials
     # echo "url" >> ~/.git-credentials
-    sandbox.run_command(f"echo '{auth_url_str}' >> ~/.git-credentials")
+    return f"echo '{auth_url_str}' >> ~/.git-credentials"
+
+def setup_git_auth(sandbox: Sandbox, repo_url: str, credentials: Optional["GitCredentials"] = None):
+    """
+    Configures git auth for a specific repository host by writing to ~/.git-credentials.
+    """
+    if not credentials or not credentials.token:
+        return
+
+    sandbox.run_command(_git_auth_command(repo_url, credentials))
 
 def _add_auth_to_url(repo_url: str, credentials: "GitCredentials" = None) -> str:
     """
@@ -74,24 +84,26 @@ def clone_repo(sandbox: Sandbox, repo_url: str) -> str:
     target_dir = f"{workspace_root}/{repo_name}"
 
     # Check for .git directory in the subfolder
-    check = sandbox.run_command(f"test -d {repo_name}/.git && echo EXISTS", workspace_root)
-    if "EXISTS" in check:
+    check = sandbox.execute(f"test -d {repo_name}/.git", workspace_root)
+    if check.ok:
          sandbox.set_cwd(target_dir)
          return f"Repository already exists at {target_dir}"
 
     # Setup auth credentials
+    safe_content = "No credentials configured"
     if credentials:
-        setup_git_auth(sandbox, repo_url, credentials)
-        
-        # DEBUG: Verify credentials file
+        # Write and verify the credentials file in one round trip
+        auth_commands = ["cat ~/.git-credentials"]
+        if credentials.token:
+            auth_commands.insert(0, _git_auth_command(repo_url, credentials))
         try:
-            creds_content = sandbox.run_command("cat ~/.git-credentials")
+            creds_content = sandbox.run_commands(auth_commands, stop_on_failure=False)[-1].output
             # Redact token for logs
             if cr := credentials.token:
                  safe_content = creds_content.replace(cr, "***")
             else:
                  safe_content = creds_content
-        except:
+        except Exception:
              safe_content = "Could not read ~/.git-credentials"
 
     # Clone into the specific subfolder
@@ -99,36 +111,37 @@ def clone_repo(sandbox: Sandbox, repo_url: str) -> str:
     
     # Attempt 1: Standard Clone
     cmd = f"git clone {repo_url} {repo_name}"
-    res = sandbox.run_command(cmd, workspace_root)
+    res = sandbox.execute(cmd, workspace_root)
 
-    if "already exists" in res and "not an empty directory" in res:
+    if not res.ok and "already exists" in res.output and "not an empty directory" in res.output:
          # Fallback: if somehow the subfolder exists but is not a git repo
-         return f"Failed to clone: {res}"
+         return f"Failed to clone: {res.output}"
 
     # Attempt 2: Retry with TLS 1.2 & other compat fixes if failed
-    if "Error" in res or "fatal" in res or "Failed" in res:
+    if not res.ok:
          # Try enforcing TLS 1.2 via multiple mechanisms (env vars + config)
          # Also try to fallback to HTTP/1.1 if possible via config (though git doesn't expose it easily)
          cmd_retry = f"GIT_SSL_VERSION=tlsv1.2 CURL_SSLVERSION=TLSv1_2 git -c http.sslVersion=tlsv1.2 clone {repo_url} {repo_name}"
-         res = sandbox.run_command(cmd_retry, workspace_root)
+         res = sandbox.execute(cmd_retry, workspace_root)
     
     # If still failed, run verbose debug
-    if "Error" in res or "fatal" in res or "Failed" in res:
-         # RETRY with VERBOSE LOGGING using the aggressive fix
-         verbose_res = sandbox.run_command(f"GIT_CURL_VERBOSE=1 GIT_TRACE=1 GIT_SSL_VERSION=tlsv1.2 CURL_SSLVERSION=TLSv1_2 git -c http.sslVersion=tlsv1.2 clone {repo_url} {repo_name}", workspace_root)
-         
-         # Capture config and version state
-         config_dump = sandbox.run_command("git config --global --list")
-         version_info = sandbox.run_command("git --version && curl --version")
+    if not res.ok:
+         # RETRY with VERBOSE LOGGING using the aggressive fix,
+         # capturing config and version state in the same exec
+         debug_results = sandbox.run_commands([
+             f"GIT_CURL_VERBOSE=1 GIT_TRACE=1 GIT_SSL_VERSION=tlsv1.2 CURL_SSLVERSION=TLSv1_2 git -c http.sslVersion=tlsv1.2 clone {repo_url} {repo_name}",
+             "git config --global --list",
+             "git --version && curl --version",
+         ], cwd=workspace_root, stop_on_failure=False)
+         debug_outputs = [r.output for r in debug_results] + [""] * 3
+         verbose_res, config_dump, version_info = debug_outputs[:3]
          
          debug_info = f"\n\n--- DEBUG INFO ---\nCredentials File (~/.git-credentials):\n{safe_content}\n\nGlobal Config:\n{config_dump}\n\nVersions:\n{version_info}\n\nVerbose Log:\n{verbose_res}"
-         return f"Failed to clone: {res}{debug_info}"
+         return f"Failed to clone: {res.output}{debug_info}"
 
-    if "Error" not in res and "fatal" not in res:
-        # Set sandbox CWD to the cloned repo path
-        sandbox.set_cwd(target_dir)
-        return f"Successfully cloned to {target_dir}"
-    return res
+    # Set sandbox CWD to the cloned repo path
+    sandbox.set_cwd(target_dir)
+    return f"Successfully cloned to {target_dir}"
 
 def get_repo_path(sandbox: Sandbox, provided_path: Optional[str] = None) -> str:
     """Returns the effective repository path (prioritizes sandbox CWD)."""
@@ -139,27 +152,32 @@ def get_repo_path(sandbox: Sandbox, provided_path: Optional[str] = None) -> str:
     # Use the current working directory of the sandbox
     return sandbox.get_cwd()
 
-def create_branch(sandbox: Sandbox, branch_name: str, repo_path: Optional[str] = None) -> str:
-    """Creates and switches to a new branch."""
-    is_valid, error_msg = validate_branch_name(branch_name)
-    if not is_valid:
-        return error_msg
+def switch_branch(sandbox: Sandbox, branch_name: str, create: bool = False, repo_path: Optional[str] = None) -> CommandResult:
+    """Checks out a branch (creating it when requested) and returns the structured result."""
+    command = f"git checkout -b {branch_name}" if create else f"git checkout {branch_name}"
+    if create:
+        is_valid, error_msg = validate_branch_name(branch_name)
+        if not is_valid:
+            return CommandResult(command=command, stdout=error_msg, exit_code=1)
 
     target = get_repo_path(sandbox, repo_path)
-    return sandbox.run_command(f"git checkout -b {branch_name}", target)
+    return sandbox.execute(command, target)
+
+def create_branch(sandbox: Sandbox, branch_name: str, repo_path: Optional[str] = None) -> str:
+    """Creates and switches to a new branch."""
+    return switch_branch(sandbox, branch_name, create=True, repo_path=repo_path).output
 
 def checkout_branch(sandbox: Sandbox, branch_name: str, repo_path: Optional[str] = None) -> str:
     """Switches to an existing branch."""
-    target = get_repo_path(sandbox, repo_path)
-    return sandbox.run_command(f"git checkout {branch_name}", target)
+    return switch_branch(sandbox, branch_name, repo_path=repo_path).output
 
 def commit_changes(sandbox: Sandbox, message: str, repo_path: Optional[str] = None) -> str:
     """Stages all changes and commits them with co-author attribution."""
     target = get_repo_path(sandbox, repo_path)
 
-    add_res = sandbox.run_command("git add .", target)
-    if "Error" in add_res:
-        return f"Failed to add files: {add_res}"
+    add_res = sandbox.execute("git add .", target)
+    if not add_res.ok:
+        return f"Failed to add files: {add_res.output}"
 
     # Build commit message with co-author trailer if available
     credentials = getattr(sandbox, 'git_credentials', None)
@@ -220,31 +238,67 @@ def git_blame(sandbox: Sandbox, filepath: str, repo_path: Optional[str] = None)
     target = get_repo_path(sandbox, repo_path)
     return sandbox.run_command(f"git blame {filepath}", target)
 
-def init_workspace(sandbox: Sandbox, repo_url: str, base_branch: Optional[str] = None) -> str:
+def sync_to_remote(sandbox: Sandbox, repo_path: str, branch: Optional[str] = None) -> CommandResult:
+    """
+    Fetches and points the local branch (default: the remote's default branch) at its
+    remote tip, discarding local commits and changes. Runs in one exec.
+    """
+    if branch:
+        checkout = f"git checkout -f -B {shlex.quote(branch)} {shlex.quote(f'origin/{branch}')}"
+    else:
+        checkout = 'b=$(git rev-parse --abbrev-ref origin/HEAD) && git checkout -f -B "${b#origin/}" "$b"'
+    results = sandbox.run_commands([
+        "git fetch --prune origin",
+        "git remote set-head origin --auto",
+        checkout,
+        "git log -1 --format='%h %s'",
+    ], cwd=repo_path)
+    return results[-1]
+
+def init_workspace(sandbox: Sandbox, repo_url: str, base_branch: Optional[str] = None, sync: bool = False) -> str:
     """
     Sets up the workspace by cloning the repository and checking out the base branch.
+    Raises if the repository cannot be cloned; a missing base branch is only a warning.
+
+    With sync, an existing clone (e.g. one baked into an environment snapshot) is moved
+    to the remote tip of the base branch, so the session never works on stale code.
     """
-    # 1. Clone
+    # 1. Clone (clone_repo reports failures with a "Failed to clone" prefix)
     clone_res = clone_repo(sandbox, repo_url)
-    if ("Error" in clone_res or "fatal" in clone_res or "Failed" in clone_res) and "Repository already exists" not in clone_res:
-        return clone_res
+    if clone_res.startswith("Failed to clone"):
+        raise Exception(f"Repository initialization failed: {clone_res}")
 
     output = [clone_res]
-
-    # 2. Checkout Base Branch
+    repo_path = get_repo_path(sandbox)
+
+    if sync and "Repository already exists" in clone_res:
+        # 2a. Fast-forward a stale clone to the remote
+        synced = sync_to_remote(sandbox, repo_path, base_branch)
+        if base_branch:
+            if synced.ok:
+                output.append(f"Checked out base branch '{base_branch}'.")
+            else:
+                output.append(f"Warning: Base branch '{base_branch}' not found or could not be checked out. Keeping default branch.")
+                synced = sync_to_remote(sandbox, repo_path)
+        if not synced.ok:
+            raise Exception(f"Repository initialization failed: could not update the existing clone: {synced.output}")
+        output.append(f"Updated existing clone to the remote tip: {synced.output}")
+        return "\n".join(output)
+
+    # 2b. Checkout Base Branch
     if base_branch:
          # Ensure we are in the repo
-         repo_path = get_repo_path(sandbox)
          if "No repository" in repo_path:
              return f"{clone_res}\nError: Could not find repository path."
 
-         # Fetch to ensure remote branches are visible
+         # Fetch to ensure remote branches are visible (same exec as the checkout)
+         commands = [f"git checkout {base_branch}"]
          if "Repository already exists" in clone_res:
-             sandbox.run_command("git fetch --all", repo_path)
+             commands.insert(0, "git fetch --all")
 
-         checkout_res = sandbox.run_command(f"git checkout {base_branch}", repo_path)
+         checkout_res = sandbox.run_commands(commands, cwd=repo_path, stop_on_failure=False)[-1]
 
-         if "error" in checkout_res.lower() or "fatal" in checkout_res.lower() or "did not match any file" in checkout_res.lower():
+         if not checkout_res.ok:
               output.append(f"Warning: Base branch '{base_branch}' not found or could not be checked out. Keeping default branch.")
          else:
               output.append(f"Checked out base branch '{base_branch}'.")
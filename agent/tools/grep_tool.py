@@ -94,23 +94,24 @@ def grep_search(
         )
         
         command = " ".join(command_parts)
-        result = sandbox.run_command(command)
+        result = sandbox.execute(command)
         
-        # Handle exit codes
-        # rg returns 1 when no matches found, which is not an error
-        if not result or result.strip() == "":
-            return "No matches found."
-        
-        if "command not found" in result.lower() or "not found" in result.lower():
+        # Handle exit codes: rg returns 1 when no matches found, which is not an error,
+        # and the shell returns 127 when ripgrep is not installed
+        if result.exit_code == 127:
             # Fallback to grep if ripgrep not available
             fallback_cmd = f"grep -rn {_escape_shell_arg(query)} ."
             if include_files:
                 fallback_cmd = f"grep -rn --include={_escape_shell_arg(include_files)} {_escape_shell_arg(query)} ."
-            result = sandbox.run_command(fallback_cmd)
-            if not result or result.strip() == "":
-                return "No matches found."
+            result = sandbox.execute(fallback_cmd)
+        
+        if result.exit_code == 1 or (result.ok and not result.output.strip()):
+            return "No matches found."
+        
+        if not result.ok:
+            return f"Error running grep search (exit code {result.exit_code}): {result.output}"
         
-        return result
+        return result.output
         
     except Exception as e:
         return f"Error running grep search: {str(e)}"
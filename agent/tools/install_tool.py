@@ -6,6 +6,7 @@ Inspired by open-swe install-dependencies implementation.
 from langchain_core.tools import StructuredTool
 from typing import List, Optional
 from ..sandbox.base import Sandbox
+from .base import run_streamed
 
 
 # Environment variables to prevent interactive prompts
@@ -20,7 +21,7 @@ def install_dependencies(
     sandbox: Sandbox,
     command: List[str],
     workdir: Optional[str] = None,
-    timeout: int = 150  # 2.5 minutes default
+    timeout: int = 600  # 10 minutes default
 ) -> str:
     """
     Install dependencies using the specified package manager command.
@@ -37,26 +38,14 @@ def install_dependencies(
         if workdir:
             full_cmd = f"cd {workdir} && {full_cmd}"
         
-        result = sandbox.run_command(full_cmd)
+        result = run_streamed(sandbox, full_cmd, timeout=timeout, stream=True)
         
-        # Check for common error patterns
-        error_patterns = [
-            "ERR!",
-            "error:",
-            "Error:",
-            "ENOENT",
-            "EACCES",
-            "EPERM",
-            "failed",
-            "not found",
-        ]
+        if result.timed_out:
+            return f"Dependency installation timed out after {timeout}s and was terminated. Partial output:\n{result.output}"
+        if not result.ok:
+            return f"Dependency installation failed (exit code {result.exit_code}):\n{result.output}"
         
-        is_error = any(pattern.lower() in result.lower() for pattern in error_patterns)
-        
-        if is_error and "error" in result.lower():
-            return f"Dependency installation may have failed:\n{result}"
-        
-        return f"Successfully ran: {cmd_str}\n\nOutput:\n{result}"
+        return f"Successfully ran: {cmd_str}\n\nOutput:\n{result.output}"
         
     except Exception as e:
         return f"Error installing dependencies: {str(e)}"
@@ -67,7 +56,8 @@ def create_install_dependencies_tool(sandbox: Sandbox) -> StructuredTool:
     
     def tool_install_deps(
         command: List[str],
-        workdir: Optional[str] = None
+        workdir: Optional[str] = None,
+        timeout: int = 600
     ) -> str:
         """
         Install dependencies for the project using a package manager.
@@ -75,11 +65,12 @@ def create_install_dependencies_tool(sandbox: Sandbox) -> StructuredTool:
         Args:
             command: The install command as a list, e.g., ["npm", "install"] or ["pip", "install", "-r", "requirements.txt"]
             workdir: Optional working directory to run the command in.
+            timeout: Maximum seconds before the install is killed (default 600).
         
         Returns:
             Installation output or error message.
         """
-        return install_dependencies(sandbox, command, workdir)
+        return install_dependencies(sandbox, command, workdir, timeout)
     
     return StructuredTool.from_function(
         func=tool_install_deps,
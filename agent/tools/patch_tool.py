@@ -20,28 +20,28 @@ def _apply_patch_with_git(sandbox: Sandbox, workdir: str, diff_content: str, fil
     try:
         # Create the patch file
         # Use a heredoc to handle special characters in diff
-        create_result = sandbox.run_command(
+        create_result = sandbox.execute(
             f"cat > \"{temp_patch_file}\" << 'ENDOFPATCH'\n{diff_content}\nENDOFPATCH"
         )
         
-        if "Error" in create_result:
+        if not create_result.ok:
             return {
                 "success": False,
-                "output": f"Failed to create patch file: {create_result}"
+                "output": f"Failed to create patch file: {create_result.output}"
             }
         
         # Execute git apply with --verbose
-        result = sandbox.run_command(f"cd {workdir} && git apply --verbose \"{temp_patch_file}\"", workdir)
+        result = sandbox.execute(f"cd {workdir} && git apply --verbose \"{temp_patch_file}\"", workdir)
         
-        if "error" in result.lower() or "fatal" in result.lower():
+        if not result.ok:
             return {
                 "success": False,
-                "output": f"Git apply failed: {result}"
+                "output": f"Git apply failed: {result.output}"
             }
         
         return {
             "success": True,
-            "output": result if result else "Patch applied successfully"
+            "output": result.output if result.output else "Patch applied successfully"
         }
         
     finally:
@@ -0,0 +1,339 @@
+"""
+Symbol Index - Definitions and imports of the repository, built once per revision.
+
+The index is built with a single `git grep` over tracked files and classified with
+per-language regexes (functions, classes, types, exports and imports for Python,
+JS/TS, Go, Rust, JVM languages, C#, Ruby and PHP). It is stored with the session
+and refreshed incrementally: only files changed since the indexed commit, or edited
+in the working tree since the last refresh, are re-read.
+"""
+import re
+import shlex
+from typing import Any, Dict, List, Optional
+
+from langchain_core.tools import StructuredTool
+
+from ..common.storage import storage
+from ..sandbox.base import Sandbox
+
+ARTIFACT_NAME = "symbol_index"
+MAX_LINE_CHARS = 300
+MAX_RESULTS = 50
+
+LANGUAGES = {
+    ".py": "python",
+    ".js": "js", ".jsx": "js", ".mjs": "js", ".cjs": "js", ".ts": "js", ".tsx": "js",
+    ".go": "go",
+    ".rs": "rust",
+    ".java": "jvm", ".kt": "jvm", ".kts": "jvm", ".scala": "jvm", ".cs": "jvm",
+    ".rb": "ruby",
+    ".php": "php",
+}
+
+# Coarse POSIX ERE prefilter run remotely; the Python rules below do the real work
+REMOTE_PATTERNS = [
+    r"^[[:space:]]*(async[[:space:]]+)?def[[:space:]]",
+    r"^[[:space:]]*(export[[:space:]]+)?(default[[:space:]]+)?(declare[[:space:]]+)?(abstract[[:space:]]+)?(async[[:space:]]+)?(function|class|interface|type|enum)[[:space:]*]",
+    r"^[[:space:]]*(export[[:space:]]+)?(const|let|var)[[:space:]]+[A-Za-z_$][A-Za-z0-9_$]*[[:space:]]*=[[:space:]]*(async[[:space:]]*)?(\(|function|[A-Za-z_$][A-Za-z0-9_$]*[[:space:]]*=>)",
+    r"^(func|type)[[:space:]]",
+    r"^[[:space:]]*(pub(\([a-z]+\))?[[:space:]]+)?(async[[:space:]]+)?(fn|struct|enum|trait|mod)[[:space:]]",
+    r"^[[:space:]]*((public|private|protected|internal|static|final|abstract|sealed|data|open|partial)[[:space:]]+)*(class|interface|enum|record|object|fun|module|trait)[[:space:]]",
+    r"^[[:space:]]*(from[[:space:]]+[A-Za-z0-9_.]+[[:space:]]+)?import[[:space:](\"'{*]",
+    r"require(_once)?[[:space:]]*\(",
+    r"^[[:space:]]*use[[:space:]]",
+]
+
+# (kind, regex) per language; the symbol name is the named group "name"
+RULES = {
+    "python": [
+        ("function", re.compile(r"^(?P<indent>\s*)(?:async\s+)?def\s+(?P<name>\w+)")),
+        ("class", re.compile(r"^\s*class\s+(?P<name>\w+)")),
+    ],
+    "js": [
+        ("function", re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*(?P<name>[\w$]+)")),
+        ("class", re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:declare\s+)?(?:abstract\s+)?class\s+(?P<name>[\w$]+)")),
+        ("interface", re.compile(r"^\s*(?:export\s+)?(?:declare\s+)?interface\s+(?P<name>[\w$]+)")),
+        ("type", re.compile(r"^\s*(?:export\s+)?(?:declare\s+)?type\s+(?P<name>[\w$]+)\s*[=<]")),
+        ("enum", re.compile(r"^\s*(?:export\s+)?(?:declare\s+)?(?:const\s+)?enum\s+(?P<name>[\w$]+)")),
+        ("function", re.compile(r"^\s*(?:export\s+)?(?:const|let|var)\s+(?P<name>[\w$]+)\s*=\s*(?:async\s*)?(?:\(|function|[\w$]+\s*=>)")),
+    ],
+    "go": [
+        ("method", re.compile(r"^func\s+\([^)]*\)\s*(?P<name>\w+)")),
+        ("function", re.compile(r"^func\s+(?P<name>\w+)")),
+        ("type", re.compile(r"^type\s+(?P<name>\w+)")),
+    ],
+    "rust": [
+        ("function", re.compile(r"^\s*(?:pub(?:\([a-z]+\))?\s+)?(?:async\s+)?fn\s+(?P<name>\w+)")),
+        ("type", re.compile(r"^\s*(?:pub(?:\([a-z]+\))?\s+)?(?:struct|enum|trait)\s+(?P<name>\w+)")),
+        ("module", re.compile(r"^\s*(?:pub(?:\([a-z]+\))?\s+)?mod\s+(?P<name>\w+)")),
+    ],
+    "jvm": [
+        ("class", re.compile(r"^\s*(?:(?:public|private|protected|internal|static|final|abstract|sealed|data|open|partial)\s+)*(?:class|interface|enum|record|object|trait)\s+(?P<name>\w+)")),
+        ("function", re.compile(r"^\s*(?:(?:public|private|protected|internal|override|suspend|open)\s+)*fun\s+(?:<[^>]*>\s*)?(?:[\w.]+\.)?(?P<name>\w+)")),
+    ],
+    "ruby": [
+        ("function", re.compile(r"^\s*def\s+(?:self\.)?(?P<name>\w+[?!=]?)")),
+        ("class", re.compile(r"^\s*(?:class|module)\s+(?P<name>[\w:]+)")),
+    ],
+    "php": [
+        ("function", re.compile(r"^\s*(?:(?:public|private|protected|static|final|abstract)\s+)*function\s+(?P<name>\w+)")),
+        ("class", re.compile(r"^\s*(?:(?:final|abstract)\s+)*(?:class|interface|trait|enum)\s+(?P<name>\w+)")),
+    ],
+}
+
+IMPORT_RE = re.compile(r"^\s*(?:(?:from\s+[\w.]+\s+)?import[\s(\"'{*]|use\s)|require(?:_once)?\s*\(")
+GREP_LINE_RE = re.compile(r"^(?P<path>[^:\n]+):(?P<line>\d+):(?P<text>.*)$")
+WORD_RE = re.compile(r"[\w$]+")
+
+
+def _language(path: str) -> Optional[str]:
+    dot = path.rfind(".")
+    return LANGUAGES.get(path[dot:].lower()) if dot != -1 else None
+
+
+def _is_exported(language: str, name: str, text: str, indent: bool) -> bool:
+    if language == "python":
+        return not name.startswith("_") and not indent
+    if language == "js":
+        return text.lstrip().startswith("export")
+    if language == "go":
+        return name[:1].isupper()
+    if language == "rust":
+        return text.lstrip().startswith("pub")
+    return "private" not in text.split(name)[0]
+
+
+def parse_grep_output(output: str) -> Dict[str, Dict[str, List]]:
+    """Turns `path:line:text` grep output into per-file symbols and imports."""
+    files: Dict[str, List[List[Any]]] = {}
+    imports: Dict[str, List[str]] = {}
+    for raw in output.splitlines():
+        match = GREP_LINE_RE.match(raw)
+        if not match:
+            continue
+        path, line_no, text = match.group("path"), int(match.group("line")), match.group("text")
+        language = _language(path)
+        if language is None:
+            continue
+        files.setdefault(path, [])
+        if IMPORT_RE.search(text):
+            imports.setdefault(path, []).append(text.strip()[:MAX_LINE_CHARS])
+            continue
+        for kind, rule in RULES[language]:
+            found = rule.match(text)
+            if not found:
+                continue
+            name = found.group("name")
+            indented = bool(found.groupdict().get("indent"))
+            if language == "python" and kind == "function" and indented:
+                kind = "method"
+            files[path].append([name, kind, line_no, _is_exported(language, name, text, indented)])
+            break
+    return {"files": files, "imports": imports}
+
+
+def _grep_command(paths: Optional[List[str]] = None) -> str:
+    pattern = shlex.quote("|".join(REMOTE_PATTERNS))
+    if paths is None:
+        pathspecs = " ".join(shlex.quote(f"*{ext}") for ext in LANGUAGES)
+        return f"git grep -nIE -e {pattern} -- {pathspecs} | cut -c1-{MAX_LINE_CHARS}"
+    # Plain grep also covers untracked files; -H keeps the path for a single file
+    quoted = " ".join(shlex.quote(p) for p in paths)
+    return f"grep -nIHE -e {pattern} -- {quoted} 2>/dev/null | cut -c1-{MAX_LINE_CHARS}"
+
+
+class SymbolIndex:
+    """Definitions and imports per file, tagged with the commit they were read from."""
+
+    def __init__(self, revision: str = "", files: Dict[str, List[List[Any]]] = None, imports: Dict[str, List[str]] = None, hashes: Dict[str, str] = None):
+        self.revision = revision
+        self.files = files or {}
+        self.imports = imports or {}
+        # Blob hashes of working-tree files indexed on top of `revision`
+        self.hashes = hashes or {}
+        self._by_name: Optional[Dict[str, List[Dict[str, Any]]]] = None
+
+    @property
+    def symbol_count(self) -> int:
+        return sum(len(symbols) for symbols in self.files.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"revision": self.revision, "files": self.files, "imports": self.imports, "hashes": self.hashes}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SymbolIndex":
+        return cls(data.get("revision", ""), data.get("files"), data.get("imports"), data.get("hashes"))
+
+    @classmethod
+    def build(cls, sandbox: Sandbox) -> "SymbolIndex":
+        """Indexes all tracked files at HEAD with one sandbox exec."""
+        # One exec, uncapped: the revision on the first line, then the grep listing
+        result = sandbox.execute(f"git rev-parse HEAD && {_grep_command()}", max_output_chars=0)
+        revision, _, listing = result.stdout.partition("\n")
+        if not result.ok or not re.fullmatch(r"[0-9a-f]{7,64}", revision.strip()):
+            raise Exception(f"Could not build symbol index: {result.output[:500]}")
+        parsed = parse_grep_output(listing)
+        return cls(revision.strip(), parsed["files"], parsed["imports"])
+
+    def refresh(self, sandbox: Sandbox) -> bool:
+        """
+        Re-indexes files changed since the indexed revision or edited since the last
+        refresh. Costs one exec when nothing changed. Returns True if the index changed.
+        """
+        since = shlex.quote(self.revision) if self.revision else "HEAD"
+        listing = (
+            f"{{ git diff --name-only {since} HEAD 2>/dev/null; git status --porcelain --untracked-files=all --no-renames | cut -c4-; }} "
+            "| sort -u | while IFS= read -r f; do "
+            "if [ -f \"$f\" ]; then echo \"$(git hash-object -- \"$f\") $f\"; else echo \"- $f\"; fi; done"
+        )
+        results = sandbox.run_commands(["git rev-parse HEAD", listing], stop_on_failure=True)
+        if len(results) != 2:
+            return False
+        head = results[0].output.strip()
+
+        current: Dict[str, str] = {}
+        for line in results[1].stdout.splitlines():
+            blob, _, path = line.partition(" ")
+            if path and _language(path):
+                current[path] = blob
+
+        changed = [p for p, blob in current.items() if self.hashes.get(p) != blob]
+        # Files that were dirty last time but are clean now went back to HEAD content
+        reverted = [p for p in self.hashes if p not in current]
+        if not changed and not reverted and head == self.revision:
+            return False
+
+        to_read = [p for p in changed + reverted if current.get(p, "") != "-"]
+        for path in changed + reverted:
+            self.files.pop(path, None)
+            self.imports.pop(path, None)
+        if to_read:
+            grep_res = sandbox.execute(_grep_command(to_read))
+            parsed = parse_grep_output(grep_res.stdout)
+            self.files.update(parsed["files"])
+            self.imports.update(parsed["imports"])
+            for path in to_read:
+                self.files.setdefault(path, [])
+
+        self.revision = head
+        self.hashes = current
+        self._by_name = None
+        return True
+
+    def _name_map(self) -> Dict[str, List[Dict[str, Any]]]:
+        if self._by_name is None:
+            self._by_name = {}
+            for path, symbols in self.files.items():
+                for name, kind, line, exported in symbols:
+                    self._by_name.setdefault(name, []).append({"name": name, "kind": kind, "path": path, "line": line, "exported": exported})
+        return self._by_name
+
+    def find(self, name: str, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Exact-name matches, or case-insensitive partial matches when there are none."""
+        by_name = self._name_map()
+        matches = list(by_name.get(name, []))
+        if not matches:
+            needle = name.lower()
+            for candidate, entries in by_name.items():
+                if needle in candidate.lower():
+                    matches.extend(entries)
+        if kind:
+            matches = [m for m in matches if m["kind"] == kind]
+        return sorted(matches, key=lambda m: (m["name"] != name, not m["exported"], m["path"], m["line"]))
+
+    def importers(self, name: str) -> List[str]:
+        """Files whose import statements mention the name."""
+        return sorted(path for path, lines in self.imports.items() if any(name in WORD_RE.findall(line) for line in lines))
+
+
+def build_symbol_index(sandbox: Sandbox, session_id: str) -> SymbolIndex:
+    """Builds the index for the checked-out revision and stores it with the session."""
+    index = SymbolIndex.build(sandbox)
+    storage.save_artifact(session_id, ARTIFACT_NAME, index.to_dict())
+    return index
+
+
+def load_symbol_index(session_id: str) -> Optional[SymbolIndex]:
+    data = storage.get_artifact(session_id, ARTIFACT_NAME)
+    return SymbolIndex.from_dict(data) if data else None
+
+
+def create_symbol_tools(sandbox: Sandbox, session_id: str) -> List[StructuredTool]:
+    """Creates find_symbol and find_references backed by the session's symbol index."""
+    cache: Dict[str, SymbolIndex] = {}
+
+    def current_index() -> SymbolIndex:
+        index = cache.get("index") or load_symbol_index(session_id)
+        if index is None:
+            index = build_symbol_index(sandbox, session_id)
+        elif index.refresh(sandbox):
+            storage.save_artifact(session_id, ARTIFACT_NAME, index.to_dict())
+        cache["index"] = index
+        return index
+
+    def find_symbol(name: str, kind: Optional[str] = None) -> str:
+        """
+        Find where a function, class, method or type is defined.
+
+        Args:
+            name: Symbol name (exact match preferred; partial matches are returned if none)
+            kind: Optional filter: function, method, class, interface, type, enum or module
+        """
+        try:
+            matches = current_index().find(name, kind)
+        except Exception as e:
+            return f"Error searching symbol index: {str(e)}"
+        if not matches:
+            return f"No definition found for '{name}'."
+        lines = [f"{m['path']}:{m['line']}  {m['kind']} {m['name']}{'' if m['exported'] else ' (private)'}" for m in matches[:MAX_RESULTS]]
+        if len(matches) > MAX_RESULTS:
+            lines.append(f"... {len(matches) - MAX_RESULTS} more matches. Refine the name or kind.")
+        return "\n".join(lines)
+
+    def find_references(name: str, max_results: int = MAX_RESULTS) -> str:
+        """
+        Find where a symbol is defined, imported and used.
+
+        Args:
+            name: Exact symbol name
+            max_results: Maximum number of usage lines to return (default 50)
+        """
+        try:
+            index = current_index()
+        except Exception as e:
+            return f"Error searching symbol index: {str(e)}"
+
+        sections = []
+        definitions = index.find(name)
+        definitions = [d for d in definitions if d["name"] == name]
+        if definitions:
+            sections.append("Definitions:\n" + "\n".join(f"{d['path']}:{d['line']}  {d['kind']}" for d in definitions))
+        importers = index.importers(name)
+        if importers:
+            sections.append("Imported by:\n" + "\n".join(importers[:MAX_RESULTS]))
+
+        # Usages need the file text; a fixed-string word match through git's index is cheap
+        usage = sandbox.execute(f"git grep -nwF --untracked -e {shlex.quote(name)} | head -n {int(max_results)}")
+        defined_at = {(d["path"], d["line"]) for d in definitions}
+        usages = []
+        for line in usage.stdout.splitlines():
+            match = GREP_LINE_RE.match(line)
+            if match and (match.group("path"), int(match.group("line"))) not in defined_at:
+                usages.append(f"{match.group('path')}:{match.group('line')}: {match.group('text').strip()[:200]}")
+        if usages:
+            sections.append("Usages:\n" + "\n".join(usages))
+
+        return "\n\n".join(sections) if sections else f"No references found for '{name}'."
+
+    return [
+        StructuredTool.from_function(
+            func=find_symbol,
+            name="find_symbol",
+            description="Find where a function, class, method or type is defined, using the repository symbol index. Faster than grep_search for definitions."
+        ),
+        StructuredTool.from_function(
+            func=find_references,
+            name="find_references",
+            description="Find a symbol's definitions, the files that import it, and the lines that use it."
+        ),
+    ]
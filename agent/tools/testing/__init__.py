@@ -0,0 +1,4 @@
+"""
+Test running support for the tester node: recorded test commands (commands), impacted
+test selection (impact), structured report parsing (results) and sharding (sharding).
+"""
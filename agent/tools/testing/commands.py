@@ -0,0 +1,156 @@
+"""
+Test Commands - Remember how a repository runs its tests.
+
+The tester agent records the commands it found with record_test_command. They are kept
+in the workflow state and the per-repo cache, so later tester passes (and later sessions
+on the same repo) run them directly instead of rediscovering them.
+"""
+import shlex
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.tools import StructuredTool
+
+from ...common.config import settings
+from ...common.repo_cache import repo_cache
+from ...sandbox.base import CommandResult, Sandbox
+from ..base import run_streamed
+from .results import TestSummary, collect_summaries, prepare_reports, with_reporter
+from .impact import detect_runner
+from .sharding import read_pytest_config, shard_command, shard_count
+
+CACHE_NAME = "test_commands"
+CACHE_KEY = "latest"
+# Exit codes meaning the command itself is gone (missing binary or directory), not a test failure
+STALE_EXIT_CODES = (126, 127)
+
+
+def create_record_test_command_tool(state: Dict[str, Any]) -> StructuredTool:
+    """
+    Creates a tool that records a working test command in the workflow state.
+
+    Args:
+        state: The AgentState dictionary (will be mutated to store the commands)
+    """
+
+    def record_test_command(command: str, cwd: str = ".", env: Optional[Dict[str, str]] = None) -> str:
+        """
+        Record the command that runs this repository's tests, once you have seen it work.
+
+        Args:
+            command: The test command, e.g. 'npm test' or 'pytest -q'.
+            cwd: Directory to run it in, relative to the repository root.
+            env: Extra environment variables the command needs.
+
+        Returns:
+            Confirmation message.
+        """
+        spec = {"command": command, "cwd": cwd or ".", "env": env or {}}
+        commands = state.get("test_commands") or []
+        if spec not in commands:
+            commands.append(spec)
+        state["test_commands"] = commands
+        return f"Recorded test command: {command} (in {spec['cwd']}). Later test runs will reuse it."
+
+    return StructuredTool.from_function(
+        func=record_test_command,
+        name="record_test_command",
+        description=(
+            "Record a test command that you have run successfully for this repository, with its working "
+            "directory and any extra environment variables. Call it once per command for multi-project repos."
+        )
+    )
+
+
+def load_test_commands(state: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """Commands from the state, else from the repo cache."""
+    if state.get("test_commands"):
+        return state["test_commands"]
+    if state.get("repo_url") and settings.REPO_CACHE_ENABLED:
+        cached = repo_cache.get(state["repo_url"], CACHE_KEY, name=CACHE_NAME)
+        if cached and cached.get("commands"):
+            return cached["commands"]
+    return None
+
+
+def save_test_commands(state: Dict[str, Any], commands: List[Dict[str, Any]]):
+    state["test_commands"] = commands
+    if state.get("repo_url") and settings.REPO_CACHE_ENABLED:
+        repo_cache.set(state["repo_url"], CACHE_KEY, {"commands": commands}, name=CACHE_NAME)
+
+
+def forget_test_commands(state: Dict[str, Any]):
+    state["test_commands"] = None
+    if state.get("repo_url") and settings.REPO_CACHE_ENABLED:
+        repo_cache.set(state["repo_url"], CACHE_KEY, {"commands": []}, name=CACHE_NAME)
+
+
+def format_test_command(spec: Dict[str, Any]) -> str:
+    """Shell line for a recorded spec. A missing cwd exits 127 so it reads as stale."""
+    exports = "".join(f"export {k}={shlex.quote(str(v))}; " for k, v in (spec.get("env") or {}).items())
+    cwd = shlex.quote(spec.get("cwd") or ".")
+    return f"cd {cwd} 2>/dev/null || exit 127; {exports}{spec['command']}"
+
+
+def merge_shard_results(command: str, results: List[CommandResult], shards: int) -> CommandResult:
+    """
+    One result for a sharded command: outputs in shard order, the first failing exit code.
+    Fails when a shard is missing, so a lost shard never reads as a pass.
+    """
+    if len(results) != shards:
+        output = "\n\n".join(r.output for r in results)
+        return CommandResult(command=command, stdout=output, stderr=f"Error: {shards} test shards ran but {len(results)} reported a result.", exit_code=-1)
+    if len(results) == 1:
+        return results[0]
+    failing = [r for r in results if r.exit_code in STALE_EXIT_CODES] or [r for r in results if not r.ok]
+    return CommandResult(
+        command=command,
+        stdout="\n\n".join(f"[shard {i + 1}/{len(results)}]\n{r.output}" for i, r in enumerate(results)),
+        exit_code=failing[0].exit_code if failing else 0,
+        duration_ms=max(r.duration_ms for r in results),
+        truncated=any(r.truncated for r in results),
+        timed_out=any(r.timed_out for r in results),
+    )
+
+
+def run_test_commands(sandbox: Sandbox, commands: List[Dict[str, Any]], test_files: Optional[List[str]] = None, durations: Optional[Dict[str, float]] = None, shards: Optional[int] = None) -> List[Tuple[Dict[str, Any], CommandResult, Optional[TestSummary]]]:
+    """
+    Runs every command, in order, even after a failure so all failures get reported.
+    Known runners get a structured reporter; their parsed summary comes back alongside
+    the raw result (None when the runner is unknown or the report is unusable).
+    Commands are sharded across the sandbox's cores where possible (see testing.sharding).
+    """
+    groups = []
+    report_id = 0
+    configs: Dict[str, Optional[str]] = {}
+    for spec in commands:
+        config = ""
+        if detect_runner(spec["command"]) == "pytest" and (shards or shard_count()) > 1:
+            cwd = spec.get("cwd") or "."
+            if cwd not in configs:
+                configs[cwd] = read_pytest_config(sandbox, cwd)
+            config = configs[cwd]
+        group = []
+        for shard in shard_command(spec, test_files or [], durations or {}, shards, config):
+            group.append(with_reporter(shard, report_id))
+            report_id += 1
+        groups.append(group)
+    if any(report for group in groups for _, report in group):
+        prepare_reports(sandbox)
+
+    results = []
+    for spec, group in zip(commands, groups):
+        lines = [f"sh -c {shlex.quote(format_test_command(shard))}" for shard, _ in group]
+        shard_results = [run_streamed(sandbox, lines[0], stream=True)] if len(lines) == 1 else sandbox.run_parallel(lines)
+        results.append(merge_shard_results(spec["command"], shard_results, len(lines)))
+
+    summaries = iter(collect_summaries(sandbox, [report for group in groups for _, report in group]))
+    merged = []
+    for group in groups:
+        parts = [next(summaries) for _ in group]
+        summary = None
+        if all(part is not None for part in parts):
+            summary = TestSummary()
+            for part in parts:
+                summary.merge(part)
+        merged.append(summary)
+    return list(zip(commands, results, merged))
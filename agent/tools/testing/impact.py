@@ -0,0 +1,205 @@
+"""
+Test Impact Selection - Run only the tests a change can affect.
+
+Changed files (git diff against the session's base revision plus untracked files) are
+mapped to test files by naming conventions (pytest, jest/vitest, go test) and through
+the symbol index's import graph. Recorded test commands are then narrowed to that
+subset. The full suite still runs once before submission.
+"""
+import os
+import re
+import shlex
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from ...sandbox.base import Sandbox
+from ..symbol_index import SymbolIndex
+
+PY_TEST_RE = re.compile(r"(^|/)(test_[^/]*|[^/]*_test)\.py$")
+JS_TEST_RE = re.compile(r"(^|/)([^/]*\.(test|spec)\.[cm]?[jt]sx?$|__tests__/[^/]*\.[cm]?[jt]sx?$)")
+GO_TEST_RE = re.compile(r"_test\.go$")
+TEST_FILES_ERE = r"(^|/)(test_[^/]*\.py|[^/]*_test\.(py|go)|[^/]*\.(test|spec)\.[cm]?[jt]sx?|__tests__/[^/]*\.[cm]?[jt]sx?)$"
+
+RUNNER_RES = {
+    "pytest": re.compile(r"\bpytest\b"),
+    "jest": re.compile(r"\b(jest|vitest)\b"),
+    "npm": re.compile(r"\b(npm|yarn|pnpm|bun)( run)? test\b"),
+    "go": re.compile(r"\bgo test\b"),
+}
+# Positional args that look like test paths; dropped so only the selection runs
+PATH_ARG_RE = re.compile(r"^(\./)?[\w.\-/]*(/|\.py|\.[cm]?[jt]sx?)$|^tests?$")
+# Options that take the next word as their value (`--cov src/`), which is never a test path
+OPTIONS_WITH_VALUES = {
+    "pytest": {"-k", "-m", "-c", "-p", "-o", "-W", "-r", "-n", "--cov", "--cov-report", "--cov-config", "--rootdir", "--ignore",
+               "--ignore-glob", "--deselect", "--confcutdir", "--basetemp", "--junitxml", "--junit-xml", "--log-file", "--log-level",
+               "--tb", "--maxfail", "--durations", "--timeout", "--import-mode", "--capture", "--override-ini", "--numprocesses",
+               "--dist", "--reruns", "--html"},
+    "jest": {"-c", "--config", "-t", "--testNamePattern", "--testPathPattern", "--testPathIgnorePatterns", "--rootDir", "--roots",
+             "--root", "-r", "--dir", "--coverageDirectory", "--outputFile", "--reporter", "--reporters", "-w", "--maxWorkers",
+             "--project", "--selectProjects", "--setupFiles", "--environment", "--env", "--shard", "--testTimeout"},
+}
+
+SHELL_OPERATOR_RE = re.compile(r"[;&|<>`$]")
+
+IMPORT_DEPTH = 2
+MAX_SELECTED_FILES = 200
+
+
+def is_test_file(path: str) -> bool:
+    return bool(PY_TEST_RE.search(path) or JS_TEST_RE.search(path) or GO_TEST_RE.search(path))
+
+
+def detect_runner(command: str) -> Optional[str]:
+    for runner, regex in RUNNER_RES.items():
+        if regex.search(command):
+            return runner
+    return None
+
+
+def _stem(path: str) -> str:
+    name = os.path.basename(path)
+    return name.split(".", 1)[0]
+
+
+def _module_names(path: str) -> Set[str]:
+    """Names an import statement may use for the file: its stem, or its directory for index/__init__ files."""
+    stem = _stem(path)
+    if stem in ("__init__", "index", "mod") and os.path.dirname(path):
+        return {os.path.basename(os.path.dirname(path))}
+    return {stem}
+
+
+def _test_stem(path: str) -> str:
+    stem = _stem(path)
+    if stem.startswith("test_"):
+        return stem[len("test_"):]
+    if stem.endswith("_test"):
+        return stem[:-len("_test")]
+    return stem
+
+
+def select_tests(changed: Iterable[str], test_files: Iterable[str], index: Optional[SymbolIndex] = None) -> Set[str]:
+    """Test files affected by the changed files: edited tests, same-named tests and importers of the change."""
+    tests_by_stem: Dict[str, List[str]] = {}
+    tests_by_dir: Dict[str, List[str]] = {}
+    for path in test_files:
+        tests_by_stem.setdefault(_test_stem(path), []).append(path)
+        tests_by_dir.setdefault(os.path.dirname(path), []).append(path)
+
+    selected: Set[str] = set()
+    frontier = set()
+    for path in changed:
+        if is_test_file(path):
+            selected.add(path)
+            continue
+        frontier.add(path)
+        selected.update(tests_by_stem.get(_stem(path), []))
+        # Go tests live in the package directory and run per package
+        if path.endswith(".go"):
+            selected.update(p for p in tests_by_dir.get(os.path.dirname(path), []) if p.endswith("_test.go"))
+
+    # Walk the import graph outwards from the changed modules
+    seen = set(frontier)
+    for _ in range(IMPORT_DEPTH if index else 0):
+        next_frontier = set()
+        for path in frontier:
+            for name in _module_names(path):
+                for importer in index.importers(name):
+                    if is_test_file(importer):
+                        selected.add(importer)
+                    elif importer not in seen:
+                        next_frontier.add(importer)
+        seen |= next_frontier
+        frontier = next_frontier
+    return selected
+
+
+def changed_and_test_files(sandbox: Sandbox, base: Optional[str] = None) -> Optional[Dict[str, List[str]]]:
+    """Changed files since base (plus untracked) and all test files, in one exec. None if git failed."""
+    since = shlex.quote(base) if base else "HEAD"
+    results = sandbox.run_commands(
+        [
+            f"git diff --name-only {since}",
+            "git ls-files --others --exclude-standard",
+            f"git ls-files --cached --others --exclude-standard | grep -E {shlex.quote(TEST_FILES_ERE)}; true",
+        ],
+        stop_on_failure=True
+    )
+    if len(results) != 3 or not all(result.ok for result in results):
+        return None
+    return {
+        "changed": sorted(set(results[0].stdout.split()) | set(results[1].stdout.split())),
+        "tests": results[2].stdout.split(),
+    }
+
+
+def narrow_command(spec: Dict[str, Any], tests: Set[str]) -> Optional[Dict[str, Any]]:
+    """
+    The spec restricted to the selected tests. Returns the spec unchanged when its runner
+    is unknown, and None when none of the selected tests belong to it.
+    """
+    runner = detect_runner(spec["command"])
+    # Compound shell lines can't be rewritten safely
+    if runner is None or SHELL_OPERATOR_RE.search(spec["command"]):
+        return spec
+
+    cwd = (spec.get("cwd") or ".").strip("/")
+    prefix = "" if cwd in ("", ".") else cwd + "/"
+    local = sorted(t[len(prefix):] for t in tests if t.startswith(prefix))
+    if runner == "go":
+        targets = sorted({"./" + os.path.dirname(t) if os.path.dirname(t) else "." for t in local if t.endswith("_test.go")})
+    elif runner == "pytest":
+        targets = [t for t in local if t.endswith(".py")]
+    else:
+        targets = [t for t in local if not t.endswith((".py", ".go"))]
+    if not targets:
+        return None
+
+    return with_targets(spec, runner, targets)
+
+
+def with_targets(spec: Dict[str, Any], runner: str, targets: List[str]) -> Dict[str, Any]:
+    """The spec with its test path arguments replaced by targets (files, or packages for go)."""
+    quoted = " ".join(shlex.quote(t) for t in targets)
+    command = spec["command"]
+    if runner == "go":
+        command = command.replace("./...", quoted) if "./..." in command else f"{command} {quoted}"
+    elif runner == "npm":
+        command = f"{command} -- {quoted}"
+    else:
+        words = shlex.split(command)
+        dropped = {i for i in positional_indices(words, runner) if PATH_ARG_RE.match(words[i])}
+        kept = [w for i, w in enumerate(words) if i not in dropped]
+        command = " ".join(shlex.quote(w) for w in kept) + " " + quoted
+    return {**spec, "command": command}
+
+
+def runner_index(words: List[str], runner: str) -> int:
+    return next(i for i, w in enumerate(words) if RUNNER_RES[runner].search(w))
+
+
+def positional_indices(words: List[str], runner: str) -> List[int]:
+    """Indices of the positional arguments after the runner word, skipping option values."""
+    options = OPTIONS_WITH_VALUES.get(runner, set())
+    indices = []
+    takes_value = False
+    for i in range(runner_index(words, runner) + 1, len(words)):
+        if takes_value:
+            takes_value = False
+        elif words[i].startswith("-"):
+            takes_value = words[i] in options
+        else:
+            indices.append(i)
+    return indices
+
+
+def path_args(command: str, runner: str) -> List[str]:
+    """Test path arguments already on a pytest/jest command line."""
+    words = shlex.split(command)
+    return [words[i] for i in positional_indices(words, runner) if PATH_ARG_RE.match(words[i])]
+
+
+def select_test_commands(commands: List[Dict[str, Any]], tests: Set[str]) -> Optional[List[Dict[str, Any]]]:
+    """Narrowed commands for the selection, or None when it should fall back to the full suite."""
+    if len(tests) > MAX_SELECTED_FILES:
+        return None
+    return [narrowed for narrowed in (narrow_command(spec, tests) for spec in commands) if narrowed is not None]
@@ -0,0 +1,218 @@
+"""
+Test Results - Machine-readable test reports parsed into a compact summary.
+
+Known test commands are run with a structured reporter (JUnit XML for pytest and
+vitest, --json for jest, -json for go test). The reports are parsed into counts,
+failing test IDs and trimmed tracebacks, which is what the tester and programmer see
+instead of the raw log.
+"""
+import json
+import re
+import shlex
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from ...sandbox.base import Sandbox
+from .impact import SHELL_OPERATOR_RE, detect_runner
+
+REPORT_DIR = "/tmp/swe-test-reports"
+MAX_FAILURES = 20
+MAX_TRACE_LINES = 15
+ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
+
+
+@dataclass
+class TestFailure:
+    test_id: str
+    message: str = ""
+    trace: str = ""
+
+
+@dataclass
+class TestSummary:
+    total: int = 0
+    passed: int = 0
+    failed: int = 0
+    errors: int = 0
+    skipped: int = 0
+    failures: List[TestFailure] = field(default_factory=list)
+    # Seconds per test group: JUnit classname, jest suite path or go package
+    durations: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.failed == 0 and self.errors == 0
+
+    def merge(self, other: "TestSummary"):
+        self.total += other.total
+        self.passed += other.passed
+        self.failed += other.failed
+        self.errors += other.errors
+        self.skipped += other.skipped
+        self.failures.extend(other.failures)
+        for group, seconds in other.durations.items():
+            self.durations[group] = self.durations.get(group, 0.0) + seconds
+
+    def format(self) -> str:
+        lines = [f"{self.total} tests: {self.passed} passed, {self.failed} failed, {self.errors} errors, {self.skipped} skipped."]
+        for failure in self.failures[:MAX_FAILURES]:
+            lines.append(f"\nFAILED {failure.test_id}" + (f": {failure.message}" if failure.message else ""))
+            if failure.trace:
+                lines.append(failure.trace)
+        if len(self.failures) > MAX_FAILURES:
+            lines.append(f"\n... and {len(self.failures) - MAX_FAILURES} more failing tests.")
+        return "\n".join(lines)
+
+
+def trim_trace(text: str, max_lines: int = MAX_TRACE_LINES) -> str:
+    """Keeps the end of a traceback, where the assertion and the failing line are."""
+    lines = [line for line in ANSI_RE.sub("", text or "").rstrip().splitlines() if line.strip()]
+    if len(lines) <= max_lines:
+        return "\n".join(lines)
+    return "\n".join([f"... ({len(lines) - max_lines} lines omitted)"] + lines[-max_lines:])
+
+
+def _first_line(text: str) -> str:
+    text = ANSI_RE.sub("", text or "").strip()
+    return text.splitlines()[0][:300] if text else ""
+
+
+def parse_junit_xml(text: str) -> TestSummary:
+    root = ET.fromstring(text)
+    summary = TestSummary()
+    for case in root.iter("testcase"):
+        summary.total += 1
+        name = case.get("name", "")
+        classname = case.get("classname", "") or case.get("file", "")
+        test_id = f"{classname}::{name}" if classname else name
+        try:
+            summary.durations[classname] = summary.durations.get(classname, 0.0) + float(case.get("time") or 0)
+        except ValueError:
+            pass
+        problem = case.find("failure")
+        if problem is None:
+            problem = case.find("error")
+        if problem is not None:
+            if problem.tag == "failure":
+                summary.failed += 1
+            else:
+                summary.errors += 1
+            summary.failures.append(TestFailure(test_id, _first_line(problem.get("message") or problem.text), trim_trace(problem.text)))
+        elif case.find("skipped") is not None:
+            summary.skipped += 1
+        else:
+            summary.passed += 1
+    return summary
+
+
+def parse_jest_json(text: str) -> TestSummary:
+    data = json.loads(text)
+    summary = TestSummary(
+        total=data.get("numTotalTests", 0),
+        passed=data.get("numPassedTests", 0),
+        failed=data.get("numFailedTests", 0),
+        skipped=data.get("numPendingTests", 0) + data.get("numTodoTests", 0),
+    )
+    for suite in data.get("testResults", []):
+        path = suite.get("name", "")
+        stats = suite.get("perfStats") or {}
+        if stats.get("end") and stats.get("start"):
+            summary.durations[path] = (stats["end"] - stats["start"]) / 1000
+        elif suite.get("endTime") and suite.get("startTime"):
+            summary.durations[path] = (suite["endTime"] - suite["startTime"]) / 1000
+        assertions = suite.get("assertionResults", [])
+        for assertion in assertions:
+            if assertion.get("status") == "failed":
+                messages = "\n".join(assertion.get("failureMessages") or [])
+                test_id = f"{path}::{assertion.get('fullName') or assertion.get('title', '')}"
+                summary.failures.append(TestFailure(test_id, _first_line(messages), trim_trace(messages)))
+        # A suite that fails to load (syntax error, missing module) has no assertions
+        if suite.get("status") == "failed" and not assertions:
+            summary.errors += 1
+            summary.failures.append(TestFailure(path, _first_line(suite.get("message")), trim_trace(suite.get("message"))))
+    return summary
+
+
+def parse_go_test_json(text: str) -> TestSummary:
+    summary = TestSummary()
+    output: Dict[Tuple[str, str], List[str]] = {}
+    for line in text.splitlines():
+        try:
+            event = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        key = (event.get("Package", ""), event.get("Test", ""))
+        action = event.get("Action")
+        if action == "output":
+            output.setdefault(key, []).append(event.get("Output", ""))
+        elif action in ("pass", "fail", "skip") and key[1]:
+            summary.total += 1
+            if action == "pass":
+                summary.passed += 1
+            elif action == "skip":
+                summary.skipped += 1
+            else:
+                summary.failed += 1
+                trace = trim_trace("".join(output.get(key, [])))
+                summary.failures.append(TestFailure(f"{key[0]}.{key[1]}", _first_line(trace.splitlines()[-1] if trace else ""), trace))
+        if action in ("pass", "fail") and not key[1] and event.get("Elapsed") is not None:
+            summary.durations[key[0]] = float(event["Elapsed"])
+        if action == "fail" and not key[1]:
+            # Package-level failure with no failing test: build error or panic in init
+            if not any(f.test_id.startswith(f"{key[0]}.") for f in summary.failures):
+                summary.errors += 1
+                summary.failures.append(TestFailure(key[0], "package failed", trim_trace("".join(output.get(key, [])))))
+    return summary
+
+
+PARSERS = {"junit": parse_junit_xml, "jest": parse_jest_json, "go": parse_go_test_json}
+
+
+def with_reporter(spec: Dict[str, Any], report_id: int) -> Tuple[Dict[str, Any], Optional[Dict[str, str]]]:
+    """
+    Adds a machine-readable reporter to a test command. Returns the new spec and the
+    report (path and format), or the spec unchanged and None when the runner is unknown.
+    """
+    command = spec["command"]
+    runner = detect_runner(command)
+    if SHELL_OPERATOR_RE.search(command):
+        return spec, None
+    path = f"{REPORT_DIR}/{report_id}"
+    if runner == "pytest":
+        report = {"path": f"{path}.xml", "format": "junit"}
+        command = f"{command} --junitxml={report['path']}"
+    elif runner == "jest" and re.search(r"\bvitest\b", command):
+        report = {"path": f"{path}.xml", "format": "junit"}
+        command = f"{command} --reporter=default --reporter=junit --outputFile.junit={report['path']}"
+    elif runner == "jest":
+        report = {"path": f"{path}.json", "format": "jest"}
+        command = f"{command} --json --outputFile={report['path']}"
+    elif runner == "go":
+        report = {"path": f"{path}.jsonl", "format": "go"}
+        # Flags after the package list would go to the test binary, so -json goes right after `go test`
+        command = re.sub(r"\bgo test\b", "go test -json", command, count=1) + f" > {report['path']}"
+    else:
+        return spec, None
+    return {**spec, "command": command}, report
+
+
+def prepare_reports(sandbox: Sandbox):
+    sandbox.execute(f"rm -rf {REPORT_DIR} && mkdir -p {REPORT_DIR}")
+
+
+def collect_summaries(sandbox: Sandbox, reports: List[Optional[Dict[str, str]]]) -> List[Optional[TestSummary]]:
+    """Reads and parses every report in one exec. None for a missing or unparsable report."""
+    wanted = [(i, report) for i, report in enumerate(reports) if report]
+    summaries: List[Optional[TestSummary]] = [None] * len(reports)
+    if not wanted:
+        return summaries
+    results = sandbox.run_commands([f"cat {shlex.quote(report['path'])}" for _, report in wanted], stop_on_failure=False)
+    for (i, report), result in zip(wanted, results):
+        if not result.ok or result.truncated or not result.stdout.strip():
+            continue
+        try:
+            summaries[i] = PARSERS[report["format"]](result.stdout)
+        except (ValueError, ET.ParseError):
+            continue
+    return summaries
@@ -0,0 +1,131 @@
+"""
+Test Sharding - Spread a test run across the sandbox's cores.
+
+pytest runs are split into file shards balanced by historical per-file durations and
+run side by side in one exec, unless the pytest config collects more than the default
+test file names; jest/vitest and go test get their native parallelism flags (--maxWorkers, -p). The shard count follows the sandbox CPU setting. Durations
+from each run are recorded per repo to balance the next one.
+"""
+import os
+import re
+import shlex
+from typing import Any, Dict, List, Optional
+
+from ...common.config import settings
+from ...common.repo_cache import repo_cache
+from ...sandbox.base import Sandbox
+from .impact import SHELL_OPERATOR_RE, detect_runner, path_args, with_targets
+from .results import TestSummary
+
+CACHE_NAME = "test_durations"
+CACHE_KEY = "latest"
+DEFAULT_DURATION = 1.0
+# Shards shorter than this aren't worth a separate process
+MIN_FILES_PER_SHARD = 2
+PYTEST_CONFIG_FILES = ("pytest.ini", "pyproject.toml", "tox.ini", "setup.cfg")
+# Collection beyond test_*.py / *_test.py, which file shards would silently leave out
+CUSTOM_COLLECTION_RE = re.compile(r"\bpython_files\b|--doctest-(modules|glob)")
+
+
+def shard_count() -> int:
+    return max(1, settings.TEST_SHARDS or settings.SANDBOX_CPU)
+
+
+def balance(files: List[str], durations: Dict[str, float], shards: int) -> List[List[str]]:
+    """Longest-first greedy assignment of files to the currently lightest shard."""
+    known = sorted(d for d in (durations.get(f) for f in files) if d is not None)
+    # Unmeasured files are assumed to be typical
+    fallback = known[len(known) // 2] if known else DEFAULT_DURATION
+    weighted = sorted(files, key=lambda f: (-durations.get(f, fallback), f))
+    buckets: List[List[str]] = [[] for _ in range(shards)]
+    loads = [0.0] * shards
+    for path in weighted:
+        lightest = loads.index(min(loads))
+        buckets[lightest].append(path)
+        loads[lightest] += durations.get(path, fallback)
+    return [sorted(bucket) for bucket in buckets if bucket]
+
+
+def read_pytest_config(sandbox: Sandbox, cwd: str = ".") -> Optional[str]:
+    """The pytest config files in cwd and at the repo root, concatenated. None when they can't be read."""
+    dirs = ["."] if cwd.strip("/") in ("", ".") else [cwd, "."]
+    files = " ".join(shlex.quote(os.path.join(d, name)) for d in dirs for name in PYTEST_CONFIG_FILES)
+    result = sandbox.execute(f"cat {files} 2>/dev/null; true")
+    return result.stdout if result.ok else None
+
+
+def shard_command(spec: Dict[str, Any], test_files: List[str], durations: Dict[str, float], shards: Optional[int] = None, pytest_config: Optional[str] = "") -> List[Dict[str, Any]]:
+    """
+    The spec split for parallel execution. Returns one spec (with native parallelism
+    flags where the runner has them) or one spec per pytest file shard. pytest is only
+    split into files when neither the command nor pytest_config (see read_pytest_config;
+    None if unknown) changes which files are collected.
+    """
+    shards = shards or shard_count()
+    command = spec["command"]
+    runner = detect_runner(command)
+    if shards <= 1 or runner is None or SHELL_OPERATOR_RE.search(command):
+        return [spec]
+    if runner == "go":
+        if re.search(r"\s-p[ =]\d", command):
+            return [spec]
+        return [{**spec, "command": re.sub(r"\bgo test\b", f"go test -p {shards}", command, count=1)}]
+    if runner == "jest":
+        if "--maxWorkers" in command or "--runInBand" in command or re.search(r"\s-i\b", command):
+            return [spec]
+        return [{**spec, "command": f"{command} --maxWorkers={shards}"}]
+    if runner != "pytest" or re.search(r"\s-n[ =]?\d", command):
+        return [spec]
+    if pytest_config is None or CUSTOM_COLLECTION_RE.search(command) or CUSTOM_COLLECTION_RE.search(pytest_config):
+        return [spec]
+
+    cwd = (spec.get("cwd") or ".").strip("/")
+    prefix = "" if cwd in ("", ".") else cwd + "/"
+    local = [t[len(prefix):] for t in test_files if t.startswith(prefix) and t.endswith(".py")]
+    args = path_args(command, runner)
+    if args:
+        # Keep the command's own scope: listed files, or test files under listed directories
+        dirs = [a.rstrip("/") + "/" for a in args if not a.endswith(".py")]
+        local = sorted({a for a in args if a.endswith(".py")} | {t for t in local if any(t.startswith(d) for d in dirs)})
+    shards = min(shards, len(local) // MIN_FILES_PER_SHARD)
+    if shards <= 1:
+        return [spec]
+    return [with_targets(spec, runner, bucket) for bucket in balance(local, durations, shards)]
+
+
+def file_durations(summary: TestSummary, test_files: List[str]) -> Dict[str, float]:
+    """Maps report groups (dotted JUnit classnames, absolute jest paths) onto repo test files."""
+    by_module: Dict[str, str] = {}
+    for path in test_files:
+        if path.endswith(".py"):
+            by_module[path[:-3].replace("/", ".")] = path
+    result: Dict[str, float] = {}
+    for group, seconds in summary.durations.items():
+        match = None
+        parts = group.split(".")
+        for k in range(len(parts), 0, -1):
+            module = ".".join(parts[:k])
+            match = by_module.get(module) or next((p for m, p in by_module.items() if m.endswith("." + module)), None)
+            if match:
+                break
+        if match is None:
+            match = next((p for p in test_files if group == p or group.endswith("/" + p)), None)
+        if match:
+            result[match] = result.get(match, 0.0) + seconds
+    return result
+
+
+def load_durations(repo_url: Optional[str]) -> Dict[str, float]:
+    if not repo_url or not settings.REPO_CACHE_ENABLED:
+        return {}
+    cached = repo_cache.get(repo_url, CACHE_KEY, name=CACHE_NAME)
+    return cached.get("files", {}) if cached else {}
+
+
+def record_durations(repo_url: Optional[str], measured: Dict[str, float]):
+    """Merges newly measured file durations into the repo's history."""
+    if not repo_url or not settings.REPO_CACHE_ENABLED or not measured:
+        return
+    files = load_durations(repo_url)
+    files.update({path: round(seconds, 3) for path, seconds in measured.items()})
+    repo_cache.set(repo_url, CACHE_KEY, {"files": files}, name=CACHE_NAME)
@@ -0,0 +1,129 @@
+"""
+Tool Result Cache - Memoizes read-only tools for the duration of one agent run.
+
+Agents often repeat a read (the same file, search or listing) within one executor run.
+A repeat with identical arguments is answered from the cache instead of another sandbox
+round trip. While the earlier result is still in the agent's context, the answer is a short
+"unchanged since step N" marker instead of the full output. Any tool that may modify the
+workspace (writes, edits, patches, shell and git commands) clears the cache.
+"""
+import functools
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.tools import StructuredTool
+
+from ..common.config import settings
+from .compaction import FETCH_TOOL_NAME
+
+# Results depend only on the workspace and the arguments
+READ_ONLY_TOOLS = {
+    "read_file", "view_file", "list_files", "list_directory", "find_file", "grep_search",
+    "find_symbol", "find_references", "git_status", "git_diff", "git_log", "git_blame",
+}
+
+# Neither read nor modify the workspace, so they leave the cache alone. Every other tool
+# (including ones added later) is assumed to modify it.
+NEUTRAL_TOOLS = {
+    FETCH_TOOL_NAME, "scratchpad", "record_test_command", "get_url_content",
+    "session_plan", "update_plan", "mark_task_completed", "request_human_help",
+}
+
+
+class ToolResultCache:
+    """
+    Results of read-only tool calls in one agent run, keyed by tool name and arguments.
+    Steps count tool calls made through the cache, starting at 1.
+
+    marker_window: number of latest tool results the agent still sees verbatim (see
+    ScratchpadWindow). A repeat within that window gets the marker; an older one gets the
+    cached output again. None means every earlier result is still visible.
+    """
+
+    def __init__(self, marker_window: Optional[int] = None):
+        self.marker_window = marker_window
+        self.step = 0
+        self.hits = 0
+        self._generation = 0
+        self._results: Dict[str, Tuple[int, str]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(tool_name: str, args: tuple, kwargs: dict) -> str:
+        return json.dumps([tool_name, list(args), kwargs], sort_keys=True, default=str)
+
+    def _invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._results.clear()
+
+    def wrap(self, tool_name: str, func):
+        if tool_name in NEUTRAL_TOOLS:
+            @functools.wraps(func)
+            def neutral(*args, **kwargs):
+                with self._lock:
+                    self.step += 1
+                return func(*args, **kwargs)
+            return neutral
+
+        if tool_name not in READ_ONLY_TOOLS:
+            @functools.wraps(func)
+            def mutating(*args, **kwargs):
+                with self._lock:
+                    self.step += 1
+                self._invalidate()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    # Reads that overlapped the change must not be cached either
+                    self._invalidate()
+            return mutating
+
+        @functools.wraps(func)
+        def read_only(*args, **kwargs):
+            key = self.key(tool_name, args, kwargs)
+            with self._lock:
+                self.step += 1
+                step = self.step
+                generation = self._generation
+                cached = self._results.get(key)
+                if cached:
+                    self.hits += 1
+            if cached:
+                seen, output = cached
+                if self.marker_window is None or step - seen < self.marker_window:
+                    return f"[Unchanged since step {seen}: {tool_name} returns the same result as it did then. Nothing in the workspace was modified in between.]"
+                return output
+
+            result = func(*args, **kwargs)
+            # Failures may be transient, so only successful reads are reused
+            if isinstance(result, str) and not result.startswith("Error"):
+                with self._lock:
+                    if generation == self._generation:
+                        self._results[key] = (step, result)
+            return result
+        return read_only
+
+
+def memoize_tools(tools: List[StructuredTool], cache: ToolResultCache) -> List[StructuredTool]:
+    """
+    Routes every tool through the cache. Tool names, schemas and descriptions are unchanged.
+    Use a new cache per agent run. A no-op when TOOL_RESULT_CACHE_ENABLED is off.
+    """
+    if not settings.TOOL_RESULT_CACHE_ENABLED:
+        return tools
+    wrapped = []
+    for tool in tools:
+        if not getattr(tool, "func", None):
+            wrapped.append(tool)
+            continue
+        wrapped.append(StructuredTool(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            func=cache.wrap(tool.name, tool.func),
+            return_direct=tool.return_direct,
+            handle_tool_error=tool.handle_tool_error,
+        ))
+    return wrapped
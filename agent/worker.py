@@ -1,3 +1,4 @@
+import os
 import time
 import logging
 from .common.queue_manager import queue_manager
@@ -7,8 +8,15 @@ from .workflow_pkg import WorkflowManager, AgentState
 from .common.storage import storage
 from .common.credentials import fetch_git_credentials
 from .common.ai_credentials import fetch_ai_credentials
+from .common.tracing import tracer
+from .common.cancellation import CancellationToken
 from .sandbox.daytona import DaytonaSandbox
+from .sandbox.snapshots import find_env_snapshot
+from .sandbox.recording import RecordingSandbox
+from .common.session_trace import TraceWriter
 from .tools.git_tools import init_workspace, configure_git_global
+from .tools.compaction import clear_elided_outputs
+from .common.usage import clear_usage, format_usage, get_usage
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,10 +27,21 @@ def log_message(session_id: str, message: str):
 
 def run_agent_session_sync(session_id: str, goal: str, repo_url: str = "", base_branch: str = None, mode: str = "auto", worker_token: str = ""):
     sandbox = None
+    trace_writer = None
     agent_manager = AgentManager()
     git_credentials = None
+    session_span = tracer.start_span("session", {"session_id": session_id, "repo_url": repo_url, "mode": mode})
+    cancel_token = CancellationToken(
+        deadline=time.time() + settings.SESSION_TIMEOUT_SEC if settings.SESSION_TIMEOUT_SEC else None,
+        check=lambda: storage.get_session_status(session_id) == "CANCELLED"
+    )
 
     try:
+        if storage.get_session_status(session_id) == "CANCELLED":
+            log_message(session_id, "Session was cancelled before it started.")
+            return
+
+        agent_manager.register_cancel_token(session_id, cancel_token)
         storage.set_session_status(session_id, "RUNNING")
         log_message(session_id, f"Worker picked up session: {goal} on repo {repo_url} (base branch: {base_branch}, mode: {mode})")
 
@@ -53,15 +72,30 @@ def run_agent_session_sync(session_id: str, goal: str, repo_url: str = "", base_
         else:
             log_message(session_id, "No worker token available, skipping credential fetch")
 
+        # Start from the repo's latest environment snapshot when there is one
+        env_snapshot = None
+        if repo_url and settings.ENV_SNAPSHOTS_ENABLED:
+            try:
+                env_snapshot = find_env_snapshot(repo_url)
+            except Exception as e:
+                log_message(session_id, f"Warning: Could not look up environment snapshot: {e}")
+
         # Initialize Sandbox with credentials
         sandbox = DaytonaSandbox(
             session_id,
             repo_url=repo_url,
             base_branch=base_branch,
-            git_credentials=git_credentials
+            git_credentials=git_credentials,
+            snapshot=env_snapshot["name"] if env_snapshot else None
         )
+        sandbox.set_cancel_token(cancel_token)
         log_message(session_id, "Setting up Daytona sandbox...")
-        sandbox.setup()
+        with tracer.span("sandbox.setup", session_id=session_id):
+            sandbox.setup()
+        # A fresh sandbox from an environment snapshot holds the clone as it was when the snapshot was taken
+        from_snapshot = bool(env_snapshot and sandbox.snapshot and not sandbox.reused)
+        if from_snapshot:
+            log_message(session_id, f"Sandbox created from environment snapshot {sandbox.snapshot}.")
         
         # Configure Global Git Settings
         configure_git_global(sandbox, git_credentials, repo_url)
@@ -69,16 +103,15 @@ def run_agent_session_sync(session_id: str, goal: str, repo_url: str = "", base_
         # Initialize repository (Clone/Checkout) BEFORE starting workflow
         if repo_url:
             log_message(session_id, f"Initializing repository: {repo_url}...")
-            init_output = init_workspace(sandbox, repo_url, base_branch)
+            with tracer.span("workspace.init", session_id=session_id):
+                init_output = init_workspace(sandbox, repo_url, base_branch, sync=from_snapshot)
             log_message(session_id, f"Repository initialization result: {init_output}")
 
-            if "fatal" in init_output or ("Error" in init_output and "Checking out base branch" not in init_output) or "Failed" in init_output:
-                if "Warning: Base branch" in init_output:
-                     pass 
-                elif "Repository already exists" in init_output and "Error" not in init_output:
-                     pass 
-                else:
-                    raise Exception(f"Repository initialization failed: {init_output}")
+        if settings.SESSION_RECORD_DIR:
+            trace_writer = TraceWriter(os.path.join(settings.SESSION_RECORD_DIR, f"{session_id}-{int(time.time())}.jsonl"))
+            agent_manager.register_session_trace(session_id, trace_writer)
+            sandbox = RecordingSandbox(sandbox, trace_writer)
+            log_message(session_id, f"Recording session trace to {trace_writer.path}")
 
         agent_manager.register_sandbox(session_id, sandbox)
         log_message(session_id, "Sandbox ready.")
@@ -105,14 +138,24 @@ def run_agent_session_sync(session_id: str, goal: str, repo_url: str = "", base_
                 "mode": mode,
                 "review_count": 0,
                 "git_co_author_name": git_credentials.co_author_name if git_credentials else "",
-                "git_co_author_email": git_credentials.co_author_email if git_credentials else ""
+                "git_co_author_email": git_credentials.co_author_email if git_credentials else "",
+                "env_snapshot_hash": env_snapshot["lock_hash"] if env_snapshot and sandbox.snapshot else None
             }
 
+        if trace_writer:
+            trace_writer.write({"kind": "session", "state": state})
+
         # Manager runs the loop synchronously
         manager = WorkflowManager()
         final_state = manager.run_workflow_sync(state)
+        session_span.set_attribute("final_status", final_state["status"])
 
-        if final_state["status"] == "COMPLETED":
+        if cancel_token.cancelled:
+            session_span.set_attribute("cancel_reason", cancel_token.reason)
+            storage.set_session_status(session_id, "CANCELLED" if cancel_token.reason == "Cancelled by user" else "FAILED")
+            storage.set_result(session_id, f"Workflow stopped: {cancel_token.reason}.")
+            storage.save_state(session_id, final_state)
+        elif final_state["status"] == "COMPLETED":
             storage.set_session_status(session_id, "COMPLETED")
             storage.set_result(session_id, "Workflow completed successfully.")
         elif final_state["status"] == "WAITING_FOR_USER":
@@ -123,7 +166,9 @@ def run_agent_session_sync(session_id: str, goal: str, repo_url: str = "", base_
             storage.set_result(session_id, "Workflow failed or timed out.")
 
     except Exception as e:
-        storage.set_session_status(session_id, "FAILED")
+        session_span.record_error(e)
+        user_cancelled = cancel_token.cancelled and cancel_token.reason == "Cancelled by user"
+        storage.set_session_status(session_id, "CANCELLED" if user_cancelled else "FAILED")
         log_message(session_id, f"Session failed: {str(e)}")
         import traceback
         traceback.print_exc()
@@ -134,6 +179,20 @@ def run_agent_session_sync(session_id: str, goal: str, repo_url: str = "", base_
             agent_manager.unregister_sandbox(session_id)
         agent_manager.unregister_ai_config(session_id)
         agent_manager.unregister_worker_token(session_id)
+        agent_manager.unregister_cancel_token(session_id)
+        if trace_writer:
+            agent_manager.unregister_session_trace(session_id)
+            trace_writer.close()
+        clear_elided_outputs(session_id)
+        usage = get_usage(session_id)
+        if usage.get("calls"):
+            log_message(session_id, format_usage(usage))
+            roles = usage.pop("roles", {})
+            session_span.set_attributes({f"llm.{key}": value for key, value in usage.items()})
+            for role, stats in roles.items():
+                session_span.set_attributes({f"llm.{role}.{key}": value for key, value in stats.items() if value is not None})
+        clear_usage(session_id)
+        tracer.end_span(session_span)
 
 def main():
     logger.info("Worker started. Polling for sessions...")
@@ -0,0 +1,185 @@
+"""
+Agent builders shared by the tool-calling nodes.
+
+create_bounded_tool_calling_agent is create_tool_calling_agent with a bounded scratchpad.
+The last SCRATCHPAD_KEEP_STEPS tool results are sent verbatim. Older results become a
+one-line reference to the full output, which the agent can read again with
+fetch_elided_output, and the arguments of their tool calls are shortened. The whole
+scratchpad is kept under SCRATCHPAD_TOKEN_CEILING by compacting the oldest verbatim
+results first.
+
+A step is compacted once and then sent identically on every later iteration, so the
+prompt prefix stays stable for provider prompt caching.
+
+ConcurrentAgentExecutor is AgentExecutor for models that return several tool calls in
+one turn. Read-only calls run concurrently (up to TOOL_CALL_CONCURRENCY at a time), the
+remaining calls run one by one after them, and the results come back in call order.
+"""
+import contextvars
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain.agents import AgentExecutor
+from langchain.agents.format_scratchpad.tools import format_to_tool_messages
+from langchain.agents.output_parsers.tools import ToolAgentAction, ToolsAgentOutputParser
+from langchain_core.agents import AgentAction, AgentStep
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.pydantic_v1 import PrivateAttr
+from langchain_core.runnables import RunnablePassthrough
+
+from ..common.config import settings
+from ..tools.compaction import FETCH_TOOL_NAME, estimate_tokens, store_elided_output
+from ..tools.tool_cache import READ_ONLY_TOOLS
+
+# Results this short cost less than their reference would
+MIN_COMPACT_CHARS = 400
+# Longer string arguments of compacted tool calls (e.g. write_file content) are cut to a preview
+ARG_PREVIEW_CHARS = 200
+
+
+def _preview(value: str, limit: int) -> str:
+    value = value.strip()
+    return value if len(value) <= limit else f"{value[:limit]}... [{len(value) - limit} more characters]"
+
+
+def _message_tokens(message: BaseMessage) -> int:
+    tokens = estimate_tokens(str(message.content))
+    for call in getattr(message, "tool_calls", None) or []:
+        tokens += estimate_tokens(json.dumps(call.get("args"), default=str))
+    return tokens
+
+
+class ScratchpadWindow:
+    """Formats intermediate steps into scratchpad messages within the step and token bounds."""
+
+    def __init__(self, session_id: Optional[str], keep_steps: Optional[int] = None, token_ceiling: Optional[int] = None):
+        self.session_id = session_id
+        self.keep_steps = settings.SCRATCHPAD_KEEP_STEPS if keep_steps is None else keep_steps
+        self.token_ceiling = settings.SCRATCHPAD_TOKEN_CEILING if token_ceiling is None else token_ceiling
+        # tool_call_id -> compacted message, so a step is compacted exactly once
+        self._compacted: Dict[str, ToolMessage] = {}
+
+    def _compact(self, message: ToolMessage, action: ToolAgentAction, step: int) -> ToolMessage:
+        if message.tool_call_id in self._compacted:
+            return self._compacted[message.tool_call_id]
+        content = str(message.content)
+        if len(content) < MIN_COMPACT_CHARS:
+            compacted = message
+        else:
+            args = _preview(json.dumps(action.tool_input, default=str), 120)
+            first_line = _preview(content.split("\n", 1)[0], 120)
+            note = f"[Result of step {step} compacted: {action.tool}({args}) returned {content.count(chr(10)) + 1} lines / {len(content)} characters. First line: {first_line}"
+            if self.session_id:
+                ref = store_elided_output(self.session_id, content)
+                note += f". Full output: {FETCH_TOOL_NAME}(ref=\"{ref}\")"
+            compacted = ToolMessage(content=note + "]", tool_call_id=message.tool_call_id, additional_kwargs=message.additional_kwargs)
+        self._compacted[message.tool_call_id] = compacted
+        return compacted
+
+    @staticmethod
+    def _shorten_calls(message: AIMessage) -> AIMessage:
+        calls = []
+        for call in message.tool_calls:
+            args = {k: _preview(v, ARG_PREVIEW_CHARS) if isinstance(v, str) else v for k, v in call["args"].items()}
+            calls.append({**call, "args": args})
+        # Provider-specific raw tool calls would carry the full arguments again
+        extra = {k: v for k, v in message.additional_kwargs.items() if k != "tool_calls"}
+        return AIMessage(content=message.content, tool_calls=calls, additional_kwargs=extra, id=message.id)
+
+    def format(self, intermediate_steps: Sequence[Tuple[AgentAction, Any]]) -> List[BaseMessage]:
+        messages = format_to_tool_messages(intermediate_steps)
+        actions = {action.tool_call_id: (i + 1, action) for i, (action, _) in enumerate(intermediate_steps) if isinstance(action, ToolAgentAction)}
+        results = [i for i, m in enumerate(messages) if isinstance(m, ToolMessage) and m.tool_call_id in actions]
+
+        def compact(i: int):
+            step, action = actions[messages[i].tool_call_id]
+            messages[i] = self._compact(messages[i], action, step)
+
+        recent = set(results[-self.keep_steps:]) if self.keep_steps > 0 else set()
+        for i in results:
+            if i not in recent or messages[i].tool_call_id in self._compacted:
+                compact(i)
+
+        if self.token_ceiling:
+            # The latest result is already within its tool budget and is what the agent acts on next
+            for i in results[:-1]:
+                if sum(_message_tokens(m) for m in messages) <= self.token_ceiling:
+                    break
+                compact(i)
+
+        for i, message in enumerate(messages):
+            if isinstance(message, AIMessage) and message.tool_calls and all(c.get("id") in self._compacted for c in message.tool_calls):
+                messages[i] = self._shorten_calls(message)
+        return messages
+
+
+def create_bounded_tool_calling_agent(llm, tools, prompt, session_id: Optional[str], keep_steps: Optional[int] = None, token_ceiling: Optional[int] = None):
+    """create_tool_calling_agent with the scratchpad bounded by a ScratchpadWindow."""
+    if "agent_scratchpad" not in prompt.input_variables + list(prompt.partial_variables):
+        raise ValueError("Prompt missing required variables: {'agent_scratchpad'}")
+    window = ScratchpadWindow(session_id, keep_steps, token_ceiling)
+    return (
+        RunnablePassthrough.assign(agent_scratchpad=lambda x: window.format(x["intermediate_steps"]))
+        | prompt
+        | llm.bind_tools(tools)
+        | ToolsAgentOutputParser()
+    )
+
+
+class ConcurrentAgentExecutor(AgentExecutor):
+    """
+    AgentExecutor that runs the independent tool calls of one model turn concurrently.
+
+    The base executor yields every action of a turn before it performs the first one. The
+    first perform call therefore sees the whole batch and runs it in call order, with each
+    run of consecutive read-only calls in a thread pool. Any other call is a barrier: it
+    runs alone, after everything before it, so a read placed after a write sees the write.
+    Later perform calls just return their results.
+    """
+
+    max_concurrency: int = settings.TOOL_CALL_CONCURRENCY
+    _batch: List[AgentAction] = PrivateAttr(default_factory=list)
+    _results: Dict[int, AgentStep] = PrivateAttr(default_factory=dict)
+
+    def _iter_next_step(self, name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager=None):
+        self._batch, self._results = [], {}
+        try:
+            for output in super()._iter_next_step(name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager):
+                if isinstance(output, AgentAction):
+                    self._batch.append(output)
+                yield output
+        finally:
+            self._batch, self._results = [], {}
+
+    def _perform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None) -> AgentStep:
+        if len(self._batch) < 2 or self.max_concurrency < 2 or not any(a is agent_action for a in self._batch):
+            return super()._perform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+        if not self._results:
+            self._results = self._perform_batch(name_to_tool_map, color_mapping, run_manager)
+        return self._results[id(agent_action)]
+
+    def _perform_batch(self, name_to_tool_map, color_mapping, run_manager) -> Dict[int, AgentStep]:
+        perform = super()._perform_agent_action
+        results: Dict[int, AgentStep] = {}
+        reads: List[AgentAction] = []
+
+        def flush_reads():
+            if len(reads) == 1:
+                results[id(reads[0])] = perform(name_to_tool_map, color_mapping, reads[0], run_manager)
+            elif reads:
+                with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(reads))) as pool:
+                    # Each call runs in a copy of this context, so its tool span nests under the node span
+                    futures = [(a, pool.submit(contextvars.copy_context().run, perform, name_to_tool_map, color_mapping, a, run_manager)) for a in reads]
+                    for action, future in futures:
+                        results[id(action)] = future.result()
+            reads.clear()
+
+        for action in self._batch:
+            if action.tool in READ_ONLY_TOOLS:
+                reads.append(action)
+                continue
+            flush_reads()
+            results[id(action)] = perform(name_to_tool_map, color_mapping, action, run_manager)
+        flush_reads()
+        return results
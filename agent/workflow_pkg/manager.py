@@ -1,6 +1,9 @@
 from langgraph.graph import StateGraph, END, START
 from langgraph.errors import GraphRecursionError
 from ..common.storage import storage
+from ..common.tracing import tracer
+from ..agent import AgentManager
+from .parallel import Branch, parallel_node
 from .state import AgentState, log_update
 
 # Import nodes
@@ -13,39 +16,85 @@ from .nodes.programmer import programmer_node
 from .nodes.tester import tester_node
 from .nodes.reviewer import reviewer_node
 from .nodes.submit import submit_node
+from .nodes.fast_path import classify_pipeline, fast_programmer_node, fast_verify_node
 
 def router_node(state: AgentState) -> AgentState:
     # Acts as an entry point to route based on existing status
     return state
 
+def entry_status(state: AgentState) -> str:
+    return "INITIALIZING" if state.get("status") == "PLANNING" and not state.get("codebase_tree") else state.get("status", "PLANNING")
+
+def traced_node(name: str, node):
+    """Wraps a node so each execution is recorded as a child span of the session."""
+    def run(state: AgentState) -> AgentState:
+        if not tracer.enabled:
+            return node(state)
+        with tracer.span(f"node.{name}", session_id=state.get("session_id"), status_in=state.get("status")) as span:
+            result = node(state)
+            span.set_attribute("status_out", result.get("status"))
+            return result
+    return run
+
+def plan_critic_then_branch(results) -> str:
+    """An approved plan continues with the branch naming result, when it ran; anything else is the critic's verdict."""
+    critic = results["plan_critic"]["status"]
+    if critic == "BRANCH_NAMING" and "branch_naming" in results:
+        return results["branch_naming"]["status"]
+    return critic
+
 class WorkflowManager:
     def __init__(self):
         pass
 
+    def _stop_if_cancelled(self, state: AgentState) -> bool:
+        """Marks the state FAILED when the session's cancellation token has fired."""
+        token = AgentManager().get_cancel_token(state["session_id"])
+        if token is None or not token.cancelled:
+            return False
+        state["status"] = "FAILED"
+        log_update(state, f"Workflow stopped: {token.reason}.")
+        return True
+
     def build_graph(self):
         workflow = StateGraph(AgentState)
 
+        # Env setup needs only the repository context, not the plan, so it runs alongside the
+        # first planning pass. Branch naming needs only the goal and plan, so in auto mode it
+        # runs alongside the critic (review mode names the branch after approval).
+        setup_and_plan = parallel_node((
+            Branch("env_setup", traced_node("env_setup", env_setup_node), writes=("env_snapshot_hash",)),
+            Branch("planner", traced_node("planner", planner_node), writes=("plan",)),
+        ), status=lambda results: results["planner"]["status"])
+        critic_and_branch = parallel_node((
+            Branch("plan_critic", traced_node("plan_critic", plan_critic_node), writes=("plan_critic_feedback", "next_status")),
+            # A name made for a rejected plan is dropped, so the next plan gets its own
+            Branch("branch_naming", traced_node("branch_naming", branch_naming_node), writes=("branch_name",),
+                   when=lambda state: state.get("mode") == "auto",
+                   keep=lambda results: results["plan_critic"]["status"] == "BRANCH_NAMING"),
+        ), status=plan_critic_then_branch)
+
         workflow.add_node("router", router_node)
-        workflow.add_node("initializer", initializer_node)
-        workflow.add_node("env_setup", env_setup_node)
-        workflow.add_node("planner", planner_node)
-        workflow.add_node("plan_critic", plan_critic_node)
-        workflow.add_node("branch_naming", branch_naming_node)
-        workflow.add_node("programmer", programmer_node)
-        workflow.add_node("tester", tester_node)
-        workflow.add_node("reviewer", reviewer_node)
-        workflow.add_node("submit", submit_node)
+        workflow.add_node("initializer", traced_node("initializer", initializer_node))
+        workflow.add_node("setup_and_plan", traced_node("setup_and_plan", setup_and_plan))
+        workflow.add_node("planner", traced_node("planner", planner_node))
+        workflow.add_node("critic_and_branch", traced_node("critic_and_branch", critic_and_branch))
+        workflow.add_node("branch_naming", traced_node("branch_naming", branch_naming_node))
+        workflow.add_node("programmer", traced_node("programmer", programmer_node))
+        workflow.add_node("tester", traced_node("tester", tester_node))
+        workflow.add_node("reviewer", traced_node("reviewer", reviewer_node))
+        workflow.add_node("submit", traced_node("submit", submit_node))
 
         workflow.add_edge(START, "router")
 
         workflow.add_conditional_edges(
             "router",
-            lambda state: "INITIALIZING" if state.get("status") == "PLANNING" and not state.get("codebase_tree") else state.get("status", "PLANNING"),
+            entry_status,
             {
                 "INITIALIZING": "initializer",
-                "ENV_SETUP": "env_setup",
+                "ENV_SETUP": "setup_and_plan",
                 "PLANNING": "planner",
-                "PLAN_CRITIC": "plan_critic",
+                "PLAN_CRITIC": "critic_and_branch",
                 "BRANCH_NAMING": "branch_naming",
                 "CODING": "programmer",
                 "TESTING": "tester",
@@ -57,19 +106,20 @@ class WorkflowManager:
             }
         )
 
-        workflow.add_edge("initializer", "env_setup")
-        workflow.add_edge("env_setup", "planner")
-        workflow.add_edge("planner", "plan_critic")
+        workflow.add_edge("initializer", "setup_and_plan")
+        workflow.add_edge("setup_and_plan", "critic_and_branch")
+        workflow.add_edge("planner", "critic_and_branch")
 
         workflow.add_conditional_edges(
-            "plan_critic",
+            "critic_and_branch",
             lambda state: "WAITING_FOR_USER" if state.get("status") == "WAITING_FOR_USER" else state.get("status", "PLANNING"),
             {
                 "WAITING_FOR_USER": END,
                 "BRANCH_NAMING": "branch_naming",
+                "CODING": "programmer",
                 "PLANNING": "planner",
                 "FAILED": END,
-                "PLAN_CRITIC": "plan_critic" # Fallback if status doesn't change?
+                "PLAN_CRITIC": "critic_and_branch" # Fallback if status doesn't change?
             }
         )
 
@@ -97,6 +147,7 @@ class WorkflowManager:
             {
                 "REVIEWING": "reviewer",
                 "CODING": "programmer",
+                "SUBMITTING": "submit",
                 "FAILED": END
             }
         )
@@ -106,6 +157,7 @@ class WorkflowManager:
             lambda state: state["status"],
             {
                 "SUBMITTING": "submit",
+                "TESTING": "tester",
                 "CODING": "programmer",
                 "FAILED": END
             }
@@ -115,6 +167,71 @@ class WorkflowManager:
 
         return workflow.compile()
 
+    def build_fast_graph(self):
+        """
+        Pipeline for goals classified as small: initializer -> fast_programmer -> fast_verify -> submit.
+        A session that turns out not to be small ends this graph with status ENV_SETUP and
+        continues in the full graph.
+        """
+        workflow = StateGraph(AgentState)
+
+        workflow.add_node("router", router_node)
+        workflow.add_node("initializer", traced_node("initializer", initializer_node))
+        workflow.add_node("fast_programmer", traced_node("fast_programmer", fast_programmer_node))
+        workflow.add_node("fast_verify", traced_node("fast_verify", fast_verify_node))
+        workflow.add_node("submit", traced_node("submit", submit_node))
+
+        workflow.add_edge(START, "router")
+
+        workflow.add_conditional_edges(
+            "router",
+            entry_status,
+            {
+                "INITIALIZING": "initializer",
+                "PLANNING": "fast_programmer",
+                "CODING": "fast_programmer",
+                "TESTING": "fast_verify",
+                "SUBMITTING": "submit",
+                "ENV_SETUP": END,
+                "WAITING_FOR_USER": END,
+                "COMPLETED": END,
+                "FAILED": END
+            }
+        )
+
+        workflow.add_conditional_edges(
+            "initializer",
+            lambda state: state["status"],
+            {
+                "PLANNING": "fast_programmer",
+                "FAILED": END
+            }
+        )
+
+        workflow.add_conditional_edges(
+            "fast_programmer",
+            lambda state: state["status"],
+            {
+                "TESTING": "fast_verify",
+                "ENV_SETUP": END,
+                "FAILED": END
+            }
+        )
+
+        workflow.add_conditional_edges(
+            "fast_verify",
+            lambda state: state["status"],
+            {
+                "SUBMITTING": "submit",
+                "ENV_SETUP": END,
+                "FAILED": END
+            }
+        )
+
+        workflow.add_edge("submit", END)
+
+        return workflow.compile()
+
     def run_workflow_sync(self, state: AgentState):
         """
         Runs the workflow synchronously. This should be called from a separate thread
@@ -129,13 +246,19 @@ class WorkflowManager:
         max_steps = 50
         steps = 0
 
-        # Construct graph
-        app = self.build_graph()
+        # Small goals take the fast graph; both graphs are compiled at most once per run
+        if state["status"] == "PLANNING":
+            state["pipeline"] = classify_pipeline(state)
+        builders = {"fast": self.build_fast_graph, "full": self.build_graph}
+        graphs = {}
 
         while state["status"] not in ["COMPLETED", "FAILED", "WAITING_FOR_USER"] and steps < max_steps:
             # We use a loop here primarily to handle interruptions (pending inputs) which might trigger replanning
             # and to check step limits globally.
 
+            if self._stop_if_cancelled(state):
+                break
+
             try:
                 # app.stream yields state updates. We consume them.
                 # We set recursion_limit to (max_steps - steps) + safety to avoid premature error
@@ -156,6 +279,7 @@ class WorkflowManager:
                         new_input_str = "\n\n[User Input]: " + "\n".join(inputs)
                         state["goal"] += new_input_str
                         state["status"] = "PLANNING"
+                        state["pipeline"] = "full"
 
                         # Clear inputs
                         latest_stored_state = storage.get_state(state["session_id"])
@@ -169,6 +293,11 @@ class WorkflowManager:
                         # Continue loop to restart graph with PLANNING
                         continue
 
+                pipeline = state.get("pipeline") or "full"
+                if pipeline not in graphs:
+                    graphs[pipeline] = builders[pipeline]()
+                app = graphs[pipeline]
+
                 # Run the graph. We iterate over the stream.
                 # If we want to check for inputs *during* execution (between nodes), we can do it inside the loop.
                 for output in app.stream(state, config={"recursion_limit": max_steps - steps + 2}):
@@ -180,6 +309,9 @@ class WorkflowManager:
                         # Save state after each node execution to keep UI in sync
                         storage.save_state(state["session_id"], state)
 
+                    if self._stop_if_cancelled(state):
+                        break
+
                     # Check for pending inputs between steps
                     stored_state = storage.get_state(state["session_id"])
                     if stored_state and stored_state.get("pending_inputs"):
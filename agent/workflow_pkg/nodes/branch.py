@@ -2,15 +2,15 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
 from ...common.llm import get_llm
-from ...tools.git_tools import create_branch, checkout_branch
-from ...callbacks import SessionCallbackHandler
+from ...tools.git_tools import switch_branch
+from ...callbacks import get_session_callbacks
 from ..state import AgentState, log_update
 from ..utils import get_active_sandbox
 
 def branch_naming_node(state: AgentState) -> AgentState:
     print(f"[{state['session_id']}] BRANCH_NAMING: Generating branch name...")
-    llm = get_llm(state["session_id"])
-    callbacks = [SessionCallbackHandler(state["session_id"])]
+    llm = get_llm(state["session_id"], "branch_naming")
+    callbacks = get_session_callbacks(state["session_id"])
 
     # Check if branch name already exists
     if state.get("branch_name"):
@@ -19,15 +19,15 @@ def branch_naming_node(state: AgentState) -> AgentState:
         sandbox = get_active_sandbox(state["session_id"])
 
         # Try to checkout first
-        res = checkout_branch(sandbox, state["branch_name"])
-        if "error" in res.lower() or "fatal" in res.lower() or "did not match any file" in res.lower():
+        res = switch_branch(sandbox, state["branch_name"])
+        if not res.ok:
              # If checkout fails (e.g. branch deleted or clean sandbox), try creating it
-             log_update(state, f"Branch checkout failed ({res}). Creating branch...")
-             res = create_branch(sandbox, state["branch_name"])
+             log_update(state, f"Branch checkout failed ({res.output}). Creating branch...")
+             res = switch_branch(sandbox, state["branch_name"], create=True)
 
-        log_update(state, f"Branch checkout/creation result: {res}")
+        log_update(state, f"Branch checkout/creation result: {res.output}")
 
-        if "error" in res.lower() or "fatal" in res.lower():
+        if not res.ok:
              state["status"] = "FAILED"
              return state
 
@@ -69,13 +69,13 @@ Rules:
     log_update(state, f"Generated branch name: {branch_name}")
 
     sandbox = get_active_sandbox(state["session_id"])
-    res = create_branch(sandbox, branch_name)
-    log_update(state, f"Branch creation result: {res}")
+    res = switch_branch(sandbox, branch_name, create=True)
+    log_update(state, f"Branch creation result: {res.output}")
 
-    if "ERROR" in res: # Validation error
+    if not res.ok: # Validation error or git failure
         # Fallback or retry? For now, fail.
         state["status"] = "FAILED"
-        log_update(state, f"Branch creation failed: {res}")
+        log_update(state, f"Branch creation failed: {res.output}")
         return state
 
     state["status"] = "CODING"
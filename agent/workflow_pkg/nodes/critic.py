@@ -2,13 +2,13 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
 from ...common.llm import get_llm
-from ...callbacks import SessionCallbackHandler
+from ...callbacks import get_session_callbacks
 from ..state import AgentState, log_update
 
 def plan_critic_node(state: AgentState) -> AgentState:
     print(f"[{state['session_id']}] PLAN CRITIC: Reviewing plan...")
-    llm = get_llm(state["session_id"])
-    callbacks = [SessionCallbackHandler(state["session_id"])]
+    llm = get_llm(state["session_id"], "plan_critic")
+    callbacks = get_session_callbacks(state["session_id"])
 
     prompt = ChatPromptTemplate.from_messages([
         ("system", "You are a Technical Plan Critic. Review the proposed plan for safety, completeness, and feasibility. If the plan is good, respond with 'APPROVED'. If not, provide specific, constructive feedback on what steps are missing or dangerous."),
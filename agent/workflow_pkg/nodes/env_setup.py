@@ -1,22 +1,62 @@
 from langchain_core.prompts import ChatPromptTemplate
-from langchain.agents import AgentExecutor, create_tool_calling_agent
+from langchain.agents import create_tool_calling_agent
 
+from ...common.config import settings
 from ...common.llm import get_llm
-from ...tools import create_filesystem_tools
-from ...callbacks import SessionCallbackHandler
+from ...sandbox.snapshots import lockfile_hash, snapshot_environment
+from ...tools import create_filesystem_tools, compact_tools, memoize_tools, ToolResultCache
+from ...tools.env_detector import detect_install_plan, run_install_plan
+from ...callbacks import get_session_callbacks
+from ..agents import ConcurrentAgentExecutor
 from ..state import AgentState, log_update
 from ..utils import get_active_sandbox
 
+def save_env_snapshot(state: AgentState, sandbox, lock_hash):
+    if not lock_hash:
+        return
+    snapshot = snapshot_environment(sandbox, state["repo_url"], lock_hash)
+    if snapshot:
+        state["env_snapshot_hash"] = lock_hash
+        log_update(state, f"Saved environment snapshot {snapshot} for later sessions.")
+
 def env_setup_node(state: AgentState) -> AgentState:
     print(f"[{state['session_id']}] ENV_SETUP: Setting up environment...")
-    llm = get_llm(state["session_id"])
-    callbacks = [SessionCallbackHandler(state["session_id"])]
 
     try:
         sandbox = get_active_sandbox(state["session_id"])
+
+        lock_hash = lockfile_hash(sandbox) if settings.ENV_SNAPSHOTS_ENABLED and state.get("repo_url") else None
+        if lock_hash and state.get("env_snapshot_hash") == lock_hash:
+            log_update(state, "Lockfiles match the environment snapshot this sandbox was created from. Skipping dependency install.")
+            state["status"] = "PLANNING"
+            return state
+
+        # Fast path: install straight from the detected manifests, no LLM round trips
+        failure_report = ""
+        plan = detect_install_plan(sandbox, state.get("agents_md_content"))
+        if plan.confident:
+            if not plan.steps:
+                log_update(state, f"Env Setup: {plan.reason}. Nothing to install.")
+                state["status"] = "PLANNING"
+                return state
+            log_update(state, "Env Setup: installing dependencies with " + "; ".join(str(step) for step in plan.steps))
+            ok, report = run_install_plan(sandbox, plan)
+            if ok:
+                log_update(state, f"Env Setup Output: {report}")
+                save_env_snapshot(state, sandbox, lock_hash)
+                state["status"] = "PLANNING"
+                return state
+            failure_report = report
+            log_update(state, "Automatic install failed. Falling back to the setup agent.")
+        else:
+            log_update(state, f"Install plan unclear ({plan.reason}). Using the setup agent.")
+
+        llm = get_llm(state["session_id"], "env_setup")
+        callbacks = get_session_callbacks(state["session_id"])
         fs_tools = create_filesystem_tools(sandbox)
         # We need read_file to check for config files, and run_command to install
         tools = [t for t in fs_tools if t.name in ["read_file", "list_files", "run_command"]]
+        tools = memoize_tools(compact_tools(tools, state["session_id"]), ToolResultCache())
 
         system_prompt = (
             "You are a DevOps Engineer. Your goal is to prepare the development environment by installing dependencies. "
@@ -35,20 +75,29 @@ def env_setup_node(state: AgentState) -> AgentState:
 
         prompt = ChatPromptTemplate.from_messages([
             ("system", system_prompt),
-            ("human", "Repo Context: {codebase_tree}\n\nAGENTS.MD Instructions: {agents_md_content}\n\nPlease install dependencies."),
+            ("human", "Repo Context: {codebase_tree}\n\nAGENTS.MD Instructions: {agents_md_content}\n\n{failure_report}Please install dependencies."),
             ("placeholder", "{agent_scratchpad}"),
         ])
 
         agent = create_tool_calling_agent(llm, tools, prompt)
-        agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True, max_iterations=10)
+        agent_executor = ConcurrentAgentExecutor(agent=agent, tools=tools, verbose=True, max_iterations=10)
 
         # We pass codebase_tree to give it a hint of the file structure immediately
         context = state.get("codebase_tree", "")
         agents_md = state.get("agents_md_content", "None")
-        result = agent_executor.invoke({"codebase_tree": context, "agents_md_content": agents_md}, config={"callbacks": callbacks})
+        if failure_report:
+            failure_report = f"An automatic install was attempted and failed:\n{failure_report}\n\n"
+        result = agent_executor.invoke(
+            {"codebase_tree": context, "agents_md_content": agents_md, "failure_report": failure_report},
+            config={"callbacks": callbacks}
+        )
         output = result.get("output", "")
 
         log_update(state, f"Env Setup Output: {output}")
+
+        if "SETUP_COMPLETE" in output:
+            save_env_snapshot(state, sandbox, lock_hash)
+
         state["status"] = "PLANNING"
 
     except Exception as e:
@@ -0,0 +1,180 @@
+"""
+Fast path for small goals.
+
+classify_pipeline decides whether a session takes the fast graph: a short goal about docs,
+comments, typos or a similar one-spot edit, in auto mode. FAST_PATH_CLASSIFIER picks how:
+"heuristic" (keywords only), "llm" (heuristic candidates confirmed by one short LLM call)
+or "off".
+
+The fast graph skips env setup, the plan critic and the reviewer. fast_programmer_node
+plans and edits in one agent run, and fast_verify_node checks that the change is small and
+still parses. Anything else goes back to the full pipeline, starting at env setup.
+"""
+import re
+import shlex
+from typing import Optional
+
+from langchain_core.output_parsers import StrOutputParser
+
+from ...common.config import settings
+from ...common.llm import get_llm
+from ...common.prompt_layout import PromptLayout
+from ...tools import create_filesystem_tools, create_editor_tools, create_grep_tool, create_navigation_tools, compact_tools, memoize_tools, ToolResultCache
+from ...tools.git_tools import switch_branch
+from ...callbacks import get_session_callbacks
+from ..agents import ConcurrentAgentExecutor, create_bounded_tool_calling_agent
+from ..state import AgentState, log_update
+from ..utils import get_active_sandbox
+
+MAX_GOAL_CHARS = 200
+SMALL_GOAL_WORDS = re.compile(
+    r"\b(typos?|spelling|misspell\w*|grammar|wording|readme|docs?|documentation|docstrings?|comments?|changelog|licen[cs]e|copyright|links?)\b",
+    re.IGNORECASE,
+)
+LARGE_GOAL_WORDS = re.compile(
+    r"\b(refactor\w*|implement\w*|features?|migrat\w*|tests?|api|endpoints?|database|schema|security|performance|dependenc\w*|upgrade|architecture|redesign|bugs?|crash\w*)\b",
+    re.IGNORECASE,
+)
+
+CLASSIFIER_INSTRUCTIONS = (
+    "You are a Task Triage assistant for a coding agent. Decide whether the goal below is a trivial change: "
+    "a single small edit such as a typo, a wording change or a comment, that needs no planning, no new dependencies and no tests. "
+    "Answer with exactly one word: FAST if it is trivial, FULL otherwise."
+)
+
+FAST_PROGRAMMER_INSTRUCTIONS = (
+    "You are a Skilled Software Engineer making a small, self-contained change. "
+    "Find the exact spot with `find_file`, `grep_search` or `view_file`, make the edit with `replace_in_file` or `write_file`, "
+    "and read the file back to verify it. Do not commit changes and do not expand the scope. "
+    "When finished, reply with one line describing what you changed, followed by 'CHANGES_COMPLETE'."
+)
+
+FAST_PROGRAMMER_TOOLS = {"read_file", "write_file", "list_files", "view_file", "replace_in_file", "grep_search", "list_directory", "find_file"}
+FAST_PROGRAMMER_MAX_ITERATIONS = 8
+# Parses the files given as arguments. Unlike py_compile it writes no __pycache__, which submit would commit
+PYTHON_PARSE_CHECK = "python3 -c 'import ast, sys; [ast.parse(open(f).read(), f) for f in sys.argv[1:]]'"
+
+def looks_small(goal: str) -> bool:
+    goal = goal.strip()
+    if not goal or len(goal) > MAX_GOAL_CHARS or "\n" in goal:
+        return False
+    return bool(SMALL_GOAL_WORDS.search(goal)) and not LARGE_GOAL_WORDS.search(goal)
+
+def classify_pipeline(state: AgentState) -> str:
+    """'fast' or 'full'. Sessions being replanned or awaiting plan approval always take the full pipeline."""
+    mode = settings.FAST_PATH_CLASSIFIER
+    if mode == "off" or state.get("mode") != "auto" or state.get("plan") or state.get("pending_inputs"):
+        return "full"
+    if not looks_small(state["goal"]):
+        return "full"
+    if mode == "llm":
+        try:
+            prompt = PromptLayout().instructions(CLASSIFIER_INSTRUCTIONS).volatile(f"Goal: {state['goal']}").to_prompt()
+            chain = prompt | get_llm(state["session_id"], "classifier") | StrOutputParser()
+            answer = chain.invoke({}, config={"callbacks": get_session_callbacks(state["session_id"])})
+        except Exception as e:
+            log_update(state, f"Goal classification failed, using the full pipeline: {str(e)}")
+            return "full"
+        if "FAST" not in answer.upper():
+            return "full"
+    log_update(state, "Goal classified as a small change. Taking the fast path (no env setup, plan review or code review).")
+    return "fast"
+
+def fast_branch_name(goal: str, session_id: str) -> str:
+    """type/kebab-case from the goal's first words, without an LLM call."""
+    words = re.findall(r"[a-z0-9]+", goal.lower())[:6]
+    kind = "docs" if re.search(r"\b(readme|docs?|documentation|docstrings?|changelog)\b", goal, re.IGNORECASE) else "chore"
+    return f"{kind}/{'-'.join(words) or 'small-change'}-{session_id}"
+
+def escalate(state: AgentState, reason: str) -> AgentState:
+    """Hands the session to the full pipeline. Changes made so far stay in the workspace."""
+    log_update(state, f"Fast path: {reason}. Continuing with the full pipeline.")
+    state["pipeline"] = "full"
+    state["plan"] = None
+    state["status"] = "ENV_SETUP"
+    return state
+
+def fast_programmer_node(state: AgentState) -> AgentState:
+    print(f"[{state['session_id']}] FAST_PROGRAMMER: Planning and applying a small change...")
+    callbacks = get_session_callbacks(state["session_id"])
+
+    try:
+        sandbox = get_active_sandbox(state["session_id"])
+        if not state.get("branch_name"):
+            branch_name = fast_branch_name(state["goal"], state["session_id"])
+            res = switch_branch(sandbox, branch_name, create=True)
+            log_update(state, f"Branch creation result: {res.output}")
+            if not res.ok:
+                state["status"] = "FAILED"
+                return state
+            state["branch_name"] = branch_name
+
+        tools = create_filesystem_tools(sandbox) + create_editor_tools(sandbox) + [create_grep_tool(sandbox)] + create_navigation_tools(sandbox)
+        tools = [t for t in tools if t.name in FAST_PROGRAMMER_TOOLS]
+        tools = memoize_tools(compact_tools(tools, state["session_id"]), ToolResultCache(marker_window=settings.SCRATCHPAD_KEEP_STEPS))
+
+        prompt = PromptLayout().repo(state).instructions(FAST_PROGRAMMER_INSTRUCTIONS).task(state, plan=False) \
+            .volatile("Make the change now.").to_prompt(scratchpad=True)
+        agent = create_bounded_tool_calling_agent(get_llm(state["session_id"], "programmer"), tools, prompt, state["session_id"])
+        agent_executor = ConcurrentAgentExecutor(agent=agent, tools=tools, verbose=True, max_iterations=FAST_PROGRAMMER_MAX_ITERATIONS)
+
+        result = agent_executor.invoke({}, config={"callbacks": callbacks})
+        output = result.get("output", "")
+        log_update(state, f"Programmer output: {output}")
+        if "CHANGES_COMPLETE" not in output:
+            return escalate(state, "the change was not finished in one pass")
+        # The one-line summary doubles as the plan, e.g. for the PR and for later replanning
+        state["plan"] = output.replace("CHANGES_COMPLETE", "").strip() or state["goal"]
+        state["status"] = "TESTING"
+    except Exception as e:
+        log_update(state, f"Programmer error: {str(e)}")
+        state["status"] = "FAILED"
+
+    return state
+
+def changed_line_count(numstat: str) -> Optional[int]:
+    """Total added and deleted lines in `git diff --numstat` output. None when a binary file changed."""
+    total = 0
+    for line in numstat.splitlines():
+        match = re.match(r"^(\d+|-)\t(\d+|-)\t", line)
+        if not match:
+            continue
+        if "-" in match.groups():
+            return None
+        total += int(match.group(1)) + int(match.group(2))
+    return total
+
+def fast_verify_node(state: AgentState) -> AgentState:
+    """Lightweight verification: something changed, the change is small, and changed Python and JSON files parse."""
+    print(f"[{state['session_id']}] FAST_VERIFY: Checking the change...")
+
+    try:
+        sandbox = get_active_sandbox(state["session_id"])
+        staged = sandbox.execute("git add -A && git diff --cached --numstat")
+        names = sandbox.execute("git diff --cached --name-only --diff-filter=d")
+        if not staged.ok or not names.ok:
+            return escalate(state, f"could not inspect the change ({staged.output or names.output})")
+        files = [f for f in names.output.splitlines() if f.strip()]
+        lines = changed_line_count(staged.output)
+        if not files or lines == 0:
+            return escalate(state, "no changes were made")
+        if lines is None or lines > settings.FAST_PATH_MAX_CHANGED_LINES:
+            return escalate(state, f"the change is larger than {settings.FAST_PATH_MAX_CHANGED_LINES} lines")
+
+        checks = []
+        python_files = [shlex.quote(f) for f in files if f.endswith(".py")]
+        if python_files:
+            checks.append(f"{PYTHON_PARSE_CHECK} {' '.join(python_files)}")
+        checks += [f"python3 -m json.tool {shlex.quote(f)} > /dev/null" for f in files if f.endswith(".json")]
+        for result in sandbox.run_commands(checks, stop_on_failure=False) if checks else []:
+            # 127: no Python in the sandbox, nothing to check with
+            if not result.ok and result.exit_code != 127:
+                return escalate(state, f"`{result.command}` failed: {result.output.strip()[:500]}")
+
+        log_update(state, f"Fast path verification passed ({len(files)} files, {lines} lines changed). Proceeding to submission.")
+        state["status"] = "SUBMITTING"
+    except Exception as e:
+        log_update(state, f"Fast path verification error: {str(e)}")
+        state["status"] = "FAILED"
+
+    return state
@@ -1,59 +1,144 @@
+import re
+from typing import Any, Dict, List, Optional
+
+from ...common.config import settings
+from ...common.repo_cache import repo_cache
+from ...common.storage import storage
+from ...tools.symbol_index import ARTIFACT_NAME as SYMBOL_INDEX_ARTIFACT, build_symbol_index
 from ..state import AgentState, log_update
 from ..utils import get_active_sandbox
 
+MONOREPO_INDICATORS = ["apps/", "packages/", "services/", "modules/"]
+
+# Checked in order: lockfiles first, so e.g. pnpm wins over a bare package.json
+PACKAGE_MANAGER_FILES = [
+    ("pnpm-lock.yaml", "pnpm"),
+    ("yarn.lock", "yarn"),
+    ("bun.lockb", "bun"),
+    ("bun.lock", "bun"),
+    ("package-lock.json", "npm"),
+    ("uv.lock", "uv"),
+    ("poetry.lock", "poetry"),
+    ("Pipfile.lock", "pipenv"),
+    ("go.mod", "go"),
+    ("Cargo.toml", "cargo"),
+    ("Gemfile", "bundler"),
+    ("composer.json", "composer"),
+    ("pom.xml", "maven"),
+    ("build.gradle", "gradle"),
+    ("build.gradle.kts", "gradle"),
+    ("package.json", "npm"),
+    ("pyproject.toml", "pip"),
+    ("requirements.txt", "pip"),
+]
+
+def detect_package_manager(root_entries: List[str]) -> Optional[str]:
+    names = {entry.rstrip("/*@") for entry in root_entries}
+    for filename, manager in PACKAGE_MANAGER_FILES:
+        if filename in names:
+            return manager
+    return None
+
+def parse_language_stats(output: str) -> Dict[str, int]:
+    """Parses `uniq -c` output of file extensions into {extension: file_count}."""
+    stats = {}
+    for line in output.splitlines():
+        match = re.match(r"^\s*(\d+)\s+(\S+)$", line)
+        if match:
+            stats[match.group(2)] = int(match.group(1))
+    return stats
+
+def inspect_repository(sandbox, state: AgentState) -> Dict[str, Any]:
+    """Collects the repository context from the sandbox (the cache-miss path)."""
+    # Gather file count, root listing, AGENTS.md and extension counts in a single sandbox exec
+    results = sandbox.run_commands(
+        [
+            "git ls-files | wc -l",
+            "ls -F",
+            "cat AGENTS.md",
+            "git ls-files | sed -n 's/.*\\.\\([A-Za-z0-9]*\\)$/\\1/p' | sort | uniq -c | sort -rn | head -n 15",
+        ],
+        stop_on_failure=False
+    )
+    if len(results) != 4:
+        raise Exception(f"Could not inspect workspace: {results[0].output if results else 'no output'}")
+    count_res, root_res, agents_res, lang_res = results
+    root_list = root_res.output
+
+    count_str = count_res.output.strip()
+    file_count = int(count_str) if count_res.ok and count_str.isdigit() else 10000 # Fallback to high number if fails
+    is_monorepo = any(indicator in root_list for indicator in MONOREPO_INDICATORS)
+
+    # Generate Codebase Tree for context
+    if hasattr(sandbox, "generate_codebase_tree"):
+        # Adaptive logic based on file count
+        if file_count < 1000:
+            # Small/Medium repo: Full context
+            tree = sandbox.generate_codebase_tree(depth=20)
+            log_update(state, f"Generated full codebase tree ({file_count} files).")
+        elif is_monorepo:
+            # Shallower depth for monorepos to avoid context explosion
+            tree = sandbox.generate_codebase_tree(depth=2)
+            tree += "\n\n[Note]: This appears to be a Monorepo. The tree is truncated to depth 2. Use `list_files` to explore subdirectories."
+            log_update(state, "Detected Monorepo structure. Generated truncated codebase tree.")
+        else:
+            tree = sandbox.generate_codebase_tree(depth=3)
+            log_update(state, "Generated codebase tree for context.")
+    else:
+        # Fallback to simple ls -F for non-Daytona sandboxes to avoid massive output
+        tree = root_list
+
+    return {
+        "codebase_tree": tree,
+        "file_count": file_count,
+        "is_monorepo": is_monorepo,
+        # A missing AGENTS.md is not an error
+        "agents_md_content": agents_res.output if agents_res.ok and agents_res.output.strip() else None,
+        "language_stats": parse_language_stats(lang_res.output) if lang_res.ok else {},
+        "package_manager": detect_package_manager(root_list.split()),
+    }
+
 def initializer_node(state: AgentState) -> AgentState:
     print(f"[{state['session_id']}] INITIALIZER: Setting up workspace...")
     sandbox = get_active_sandbox(state["session_id"])
 
     try:
-        # Generate Codebase Tree for context
-        if hasattr(sandbox, "generate_codebase_tree"):
-            # Adaptive logic based on file count
-            try:
-                # count files
-                count_str = sandbox.run_command("git ls-files | wc -l").strip()
-                file_count = int(count_str) if count_str.isdigit() else 10000 # Fallback to high number if fails
-            except Exception:
-                file_count = 10000
-
-            if file_count < 1000:
-                # Small/Medium repo: Full context
-                tree = sandbox.generate_codebase_tree(depth=20)
-                log_update(state, f"Generated full codebase tree ({file_count} files).")
-            else:
-                # Large repo: Adaptive depth
-                root_list = sandbox.run_command("ls -F")
-
-                is_monorepo = False
-                monorepo_indicators = ["apps/", "packages/", "services/", "modules/"]
-                if any(indicator in root_list for indicator in monorepo_indicators):
-                    is_monorepo = True
-
-                if is_monorepo:
-                    # Shallower depth for monorepos to avoid context explosion
-                    tree = sandbox.generate_codebase_tree(depth=2)
-                    tree += "\n\n[Note]: This appears to be a Monorepo. The tree is truncated to depth 2. Use `list_files` to explore subdirectories."
-                    log_update(state, "Detected Monorepo structure. Generated truncated codebase tree.")
-                else:
-                    tree = sandbox.generate_codebase_tree(depth=3)
-                    log_update(state, "Generated codebase tree for context.")
-
-            state["codebase_tree"] = tree
+        repo_url = state.get("repo_url")
+        head = sandbox.execute("git rev-parse HEAD") if repo_url and settings.REPO_CACHE_ENABLED else None
+        sha = head.output.strip() if head is not None and head.ok else None
+
+        context = repo_cache.get(repo_url, sha) if sha else None
+        if context:
+            log_update(state, f"Loaded repository context from cache (commit {sha[:12]}).")
         else:
-            # Fallback to simple ls -F for non-Daytona sandboxes to avoid massive output
-            state["codebase_tree"] = sandbox.run_command("ls -F")
+            context = inspect_repository(sandbox, state)
+            if sha:
+                repo_cache.set(repo_url, sha, context)
+
+        state["codebase_tree"] = context["codebase_tree"]
+        state["agents_md_content"] = context["agents_md_content"]
+        state["language_stats"] = context.get("language_stats", {})
+        state["package_manager"] = context.get("package_manager")
+        if state["agents_md_content"]:
+            log_update(state, "Found AGENTS.md instructions.")
 
-        # Check for AGENTS.md
+        # Index definitions once per revision for find_symbol / find_references
+        index = None
         try:
-            agents_md = sandbox.read_file("AGENTS.md")
-            if agents_md and "Error:" not in agents_md:
-                state["agents_md_content"] = agents_md
-                log_update(state, "Found AGENTS.md instructions.")
+            cached_index = repo_cache.get(repo_url, sha, name=SYMBOL_INDEX_ARTIFACT) if sha else None
+            if cached_index:
+                storage.save_artifact(state["session_id"], SYMBOL_INDEX_ARTIFACT, cached_index)
+                log_update(state, f"Loaded symbol index from cache ({len(cached_index.get('files', {}))} files).")
             else:
-                state["agents_md_content"] = None
-        except Exception:
-            # Ignore errors reading AGENTS.md (e.g. doesn't exist)
-            state["agents_md_content"] = None
+                index = build_symbol_index(sandbox, state["session_id"])
+                if sha and index.revision == sha:
+                    repo_cache.set(repo_url, sha, index.to_dict(), name=SYMBOL_INDEX_ARTIFACT)
+                log_update(state, f"Indexed {index.symbol_count} symbols in {len(index.files)} files.")
+        except Exception as e:
+            log_update(state, f"Symbol index unavailable, falling back to search tools: {str(e)}")
+
+        # Test impact selection diffs against the revision the session started from
+        state["base_revision"] = sha or (index.revision if index else None)
 
         state["status"] = "PLANNING"
     except Exception as e:
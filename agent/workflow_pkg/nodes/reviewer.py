@@ -1,57 +1,66 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain.agents import AgentExecutor, create_tool_calling_agent
+from langchain.agents import create_tool_calling_agent
 
 from ...common.llm import get_llm
-from ...tools import create_filesystem_tools
-from ...callbacks import SessionCallbackHandler
+from ...common.prompt_layout import PromptLayout
+from ...tools import create_filesystem_tools, compact_tools, memoize_tools, ToolResultCache
+from ...callbacks import get_session_callbacks
+from ..agents import ConcurrentAgentExecutor
 from ..state import AgentState, log_update
 from ..utils import get_active_sandbox
 
+REVIEWER_INSTRUCTIONS = (
+    "You are a pragmatic Code Reviewer. Check the workspace to verify if the core goal has been met and the code is functionally correct. "
+    "Use 'read_file' or 'run_command' (e.g. tests) to verify.\n"
+    "- **Focus:** Core logic, correctness, security, and potential regressions.\n"
+    "- **Ignore:** Formatting, style preferences, or comments, unless they cause build failures.\n"
+    "If the core requirements are satisfied, respond with 'APPROVED'."
+)
+
+def require_full_test_run(state: AgentState):
+    """Sends an approved change through the full test suite when only impacted tests have run."""
+    if state.get("full_suite_passed") is False:
+        state["status"] = "TESTING"
+        state["test_scope"] = "full"
+        log_update(state, "Only impacted tests have run so far. Running the full suite before submission.")
+
 def reviewer_node(state: AgentState) -> AgentState:
     print(f"[{state['session_id']}] REVIEWER: Reviewing changes...")
-    llm = get_llm(state["session_id"])
-    callbacks = [SessionCallbackHandler(state["session_id"])]
+    llm = get_llm(state["session_id"], "reviewer")
+    callbacks = get_session_callbacks(state["session_id"])
 
     try:
         sandbox = get_active_sandbox(state["session_id"])
         fs_tools = create_filesystem_tools(sandbox)
         tools = [t for t in fs_tools if t.name in ["read_file", "list_files", "run_command"]]
+        tools = memoize_tools(compact_tools(tools, state["session_id"]), ToolResultCache())
 
         review_count = state.get("review_count", 0)
         
-        system_prompt = (
-            "You are a pragmatic Code Reviewer. Check the workspace to verify if the core goal has been met and the code is functionally correct. "
-            "Use 'read_file' or 'run_command' (e.g. tests) to verify.\n"
-            "- **Focus:** Core logic, correctness, security, and potential regressions.\n"
-            "- **Ignore:** Formatting, style preferences, or comments, unless they cause build failures.\n"
-            "If the core requirements are satisfied, respond with 'APPROVED'."
-        )
-        
+        layout = PromptLayout().repo(state).instructions(REVIEWER_INSTRUCTIONS).task(state)
+        # Leniency changes with the attempt count, so it stays out of the cached instructions
         if review_count >= 2:
-            system_prompt += " This is a subsequent review. Be even more lenient. Prioritize functional correctness over everything else. Do NOT request changes unless the code is broken."
-
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", "Goal: {goal}\nPlan: {plan}\n\nVerify the changes. If good, say APPROVED. Otherwise, list critical changes needed."),
-             ("placeholder", "{agent_scratchpad}"),
-        ])
+            layout.volatile("This is a subsequent review. Be even more lenient. Prioritize functional correctness over everything else. Do NOT request changes unless the code is broken.")
+        layout.volatile("Verify the changes. If good, say APPROVED. Otherwise, list critical changes needed.")
+        prompt = layout.to_prompt(scratchpad=True)
 
         agent = create_tool_calling_agent(llm, tools, prompt)
-        agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True, max_iterations=5)
+        agent_executor = ConcurrentAgentExecutor(agent=agent, tools=tools, verbose=True, max_iterations=5)
 
-        result = agent_executor.invoke({"goal": state["goal"], "plan": state["plan"]}, config={"callbacks": callbacks})
+        result = agent_executor.invoke({}, config={"callbacks": callbacks})
         output = result.get("output", "")
 
         if "APPROVED" in output:
             state["status"] = "SUBMITTING"
             state["review_feedback"] = None
             log_update(state, "Reviewer Approved. Proceeding to submission.")
+            require_full_test_run(state)
         else:
             state["review_count"] = review_count + 1
             if state["review_count"] >= 4:
                 log_update(state, f"Max review attempts reached. Forced approval of functional changes: {output}")
                 state["status"] = "SUBMITTING"
                 state["review_feedback"] = None
+                require_full_test_run(state)
             else:
                 state["status"] = "CODING"
                 state["review_feedback"] = output
@@ -6,7 +6,7 @@ from langchain_core.output_parsers import StrOutputParser
 from ...common.llm import get_llm
 from ...common.config import settings
 from ...tools.git_tools import commit_changes, push_changes
-from ...callbacks import SessionCallbackHandler
+from ...callbacks import get_session_callbacks
 from ...agent import AgentManager
 from ..state import AgentState, log_update
 from ..utils import get_active_sandbox
@@ -17,8 +17,8 @@ def submit_node(state: AgentState) -> AgentState:
     print(f"[{state['session_id']}] SUBMIT: Generating commit message and submitting...")
 
     # --- Commit Logic ---
-    llm = get_llm(state["session_id"])
-    callbacks = [SessionCallbackHandler(state["session_id"])]
+    llm = get_llm(state["session_id"], "submit")
+    callbacks = get_session_callbacks(state["session_id"])
     sandbox = get_active_sandbox(state["session_id"])
 
     # Stage all changes
@@ -1,54 +1,161 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain.agents import AgentExecutor, create_tool_calling_agent
+from langchain.agents import create_tool_calling_agent
 
+from ...common.config import settings
 from ...common.llm import get_llm
-from ...tools import create_filesystem_tools, create_navigation_tools
-from ...callbacks import SessionCallbackHandler
+from ...common.prompt_layout import PromptLayout
+from ...tools import create_filesystem_tools, create_navigation_tools, compact_tools, memoize_tools, ToolResultCache
+from ...common.storage import storage
+from ...tools.compaction import compact_output
+from ...tools.symbol_index import ARTIFACT_NAME as SYMBOL_INDEX_ARTIFACT, load_symbol_index
+from ...tools.testing.impact import changed_and_test_files, select_test_commands, select_tests
+from ...tools.testing.results import TestSummary
+from ...tools.testing.sharding import file_durations, load_durations, record_durations
+from ...tools.testing.commands import (
+    STALE_EXIT_CODES,
+    create_record_test_command_tool,
+    forget_test_commands,
+    load_test_commands,
+    run_test_commands,
+    save_test_commands,
+)
+from ...callbacks import get_session_callbacks
+from ..agents import ConcurrentAgentExecutor
 from ..state import AgentState, log_update
 from ..utils import get_active_sandbox
 
+TESTER_INSTRUCTIONS = (
+    "You are a QA Automation Engineer. Your goal is to ensure the codebase passes all tests and meets the plan requirements. "
+    "1. Identify the project type (e.g. Python, Node, Go) by looking at files (package.json, pyproject.toml, etc). "
+    "2. Determine the command to run tests (e.g. 'npm test', 'pytest', 'go test ./...'). "
+    "3. Run the tests using 'run_command'. Once a test command runs, call 'record_test_command' with it, its working directory and any env it needs, so later runs can reuse it. "
+    "4. Analyze the output. "
+    "   - If tests PASS: Respond with 'TESTS_PASSED'. "
+    "   - If tests FAIL: Read any error logs mentioned in the output. Respond with 'TESTS_FAILED' followed by a detailed summary of the errors.\n\n"
+    "### GOAL ADHERENCE & EXIT CRITERIA\n"
+    "Sometimes there are no formal tests, or the goal is just to create a file.\n"
+    "- **No Tests Found:** If no test suite exists, create a temporary script (e.g., `verify_change.py`) to verify the specific changes work as expected. Run it, then delete it.\n"
+    "- **Verification:** If the goal was to create a file/feature, and you verify it exists and functions correctly, treat that as a PASS.\n"
+    "- **Existing Files:** If the file already exists, this is usually a SUCCESS, not a failure. Do NOT ask the programmer to 'create it' again.\n"
+    "- If the plan is complete, respond 'TESTS_PASSED'."
+)
+
+def failure_report(state: AgentState, spec, result, summary) -> str:
+    """The parsed summary when the run produced a report, else the compacted raw output."""
+    if summary is not None:
+        output = summary.format()
+        if summary.ok:
+            output += f"\nAll tests passed but the command exited with code {result.exit_code}. Output:\n{compact_output(result.output, 500)[0]}"
+    else:
+        output, _ = compact_output(result.output, settings.TOOL_OUTPUT_TOKEN_BUDGET, state["session_id"])
+    return f"$ {spec['command']} (in {spec['cwd']}, exit code {result.exit_code})\n{output}"
+
+def interpret_failures(state: AgentState, reports) -> str:
+    """Asks the LLM to turn failing test reports into a summary the programmer can act on."""
+    layout = PromptLayout().repo(state).instructions(
+        "You are a QA Automation Engineer. The test commands below failed after a code change. "
+        "Summarize which tests fail and why, citing files, assertions and error messages, so the programmer can fix them. "
+        "Start your answer with 'TESTS_FAILED'."
+    ).task(state)
+    layout.volatile("\n\n".join(reports), "Failing test runs")
+    chain = layout.to_prompt() | get_llm(state["session_id"], "tester")
+    result = chain.invoke({}, config={"callbacks": get_session_callbacks(state["session_id"])})
+    return result.content
+
+def impacted_commands(state: AgentState, sandbox, commands, files):
+    """The known test commands narrowed to tests affected by the change, or all of them when unsure."""
+    if files is None:
+        return commands
+
+    index = load_symbol_index(state["session_id"])
+    if index is not None and index.refresh(sandbox):
+        storage.save_artifact(state["session_id"], SYMBOL_INDEX_ARTIFACT, index.to_dict())
+    tests = select_tests(files["changed"], files["tests"], index)
+    selected = select_test_commands(commands, tests)
+    if selected is None:
+        return commands
+    log_update(state, f"Tester: {len(files['changed'])} changed files affect {len(tests)} test files. Running that subset; the full suite runs before submission.")
+    return selected
+
+def run_known_tests(state: AgentState, sandbox, commands) -> bool:
+    """
+    Runs previously discovered test commands: the impacted subset while coding, the full
+    suite when the reviewer has approved. Returns False when they no longer work and
+    discovery has to start over.
+    """
+    full_run = state.get("test_scope") == "full"
+    files = changed_and_test_files(sandbox, state.get("base_revision"))
+    to_run = commands if full_run else impacted_commands(state, sandbox, commands, files)
+    log_update(state, "Tester: Running test commands: " + ("; ".join(spec["command"] for spec in to_run) or "none affected"))
+    test_files = files["tests"] if files else []
+    results = run_test_commands(sandbox, to_run, test_files, load_durations(state.get("repo_url")))
+    if any(result.exit_code in STALE_EXIT_CODES for _, result, _ in results):
+        log_update(state, "Tester: Known test commands no longer run here. Rediscovering.")
+        forget_test_commands(state)
+        return False
+
+    state["test_commands"] = commands
+    state["test_scope"] = None
+    failures = [(spec, result, summary) for spec, result, summary in results if not result.ok or (summary and not summary.ok)]
+    counts = TestSummary()
+    for _, _, summary in results:
+        if summary:
+            counts.merge(summary)
+    record_durations(state.get("repo_url"), file_durations(counts, test_files))
+    if not failures:
+        state["full_suite_passed"] = to_run is commands
+        passed = f" ({counts.passed} passed, {counts.skipped} skipped)" if counts.total else ""
+        if full_run:
+            log_update(state, f"Tester: Full test suite passed{passed}. Proceeding to submission.")
+            state["status"] = "SUBMITTING"
+        else:
+            log_update(state, f"Tester: Tests passed{passed}. Proceeding to review.")
+            state["status"] = "REVIEWING"
+        return True
+
+    reports = [failure_report(state, *failure) for failure in failures]
+    output = interpret_failures(state, reports)
+    log_update(state, f"Tester: Tests failed. Sending back to programmer. Output: {output}")
+    state["status"] = "CODING"
+    # The exact failing tests travel with the analysis
+    state["review_feedback"] = f"Test Failure: {output}\n\nTest results:\n" + "\n\n".join(reports)
+    return True
+
 def tester_node(state: AgentState) -> AgentState:
     print(f"[{state['session_id']}] TESTER: Running tests...")
-    llm = get_llm(state["session_id"])
-    callbacks = [SessionCallbackHandler(state["session_id"])]
 
     try:
         sandbox = get_active_sandbox(state["session_id"])
+
+        commands = load_test_commands(state)
+        if commands and run_known_tests(state, sandbox, commands):
+            return state
+
+        llm = get_llm(state["session_id"], "tester")
+        callbacks = get_session_callbacks(state["session_id"])
         # Tester needs filesystem tools to read config and run commands
         fs_tools = create_filesystem_tools(sandbox)
         nav_tools = create_navigation_tools(sandbox)
 
         # We explicitly need run_command and navigation tools
         tools = [t for t in fs_tools if t.name in ["read_file", "list_files", "run_command"]] + nav_tools
+        tools.append(create_record_test_command_tool(state))
+        tools = memoize_tools(compact_tools(tools, state["session_id"]), ToolResultCache())
 
-        system_prompt = (
-            "You are a QA Automation Engineer. Your goal is to ensure the codebase passes all tests and meets the plan requirements. "
-            "1. Identify the project type (e.g. Python, Node, Go) by looking at files (package.json, pyproject.toml, etc). "
-            "2. Determine the command to run tests (e.g. 'npm test', 'pytest', 'go test ./...'). "
-            "3. Run the tests using 'run_command'. "
-            "4. Analyze the output. "
-            "   - If tests PASS: Respond with 'TESTS_PASSED'. "
-            "   - If tests FAIL: Read any error logs mentioned in the output. Respond with 'TESTS_FAILED' followed by a detailed summary of the errors.\n\n"
-            "### GOAL ADHERENCE & EXIT CRITERIA\n"
-            "Sometimes there are no formal tests, or the goal is just to create a file.\n"
-            "- **No Tests Found:** If no test suite exists, create a temporary script (e.g., `verify_change.py`) to verify the specific changes work as expected. Run it, then delete it.\n"
-            "- **Verification:** If the goal was to create a file/feature, and you verify it exists and functions correctly, treat that as a PASS.\n"
-            "- **Existing Files:** If the file already exists, this is usually a SUCCESS, not a failure. Do NOT ask the programmer to 'create it' again.\n"
-            "- If the plan is complete, respond 'TESTS_PASSED'."
-        )
-
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", "Goal: {goal}\nPlan: {plan}\n\nRun the tests and report the result."),
-            ("placeholder", "{agent_scratchpad}"),
-        ])
+        prompt = PromptLayout().repo(state).instructions(TESTER_INSTRUCTIONS).task(state) \
+            .volatile("Run the tests and report the result.").to_prompt(scratchpad=True)
 
         agent = create_tool_calling_agent(llm, tools, prompt)
-        agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True, max_iterations=10)
+        agent_executor = ConcurrentAgentExecutor(agent=agent, tools=tools, verbose=True, max_iterations=10)
 
-        result = agent_executor.invoke({"goal": state["goal"], "plan": state["plan"]}, config={"callbacks": callbacks})
+        result = agent_executor.invoke({}, config={"callbacks": callbacks})
         output = result.get("output", "")
 
+        if state.get("test_commands"):
+            save_test_commands(state, state["test_commands"])
+        # The agent picks its own scope, so there is no subset to re-run in full
+        state["test_scope"] = None
+        state["full_suite_passed"] = None
+
         if "TESTS_PASSED" in output:
             log_update(state, "Tester: Tests passed. Proceeding to review.")
             state["status"] = "REVIEWING"
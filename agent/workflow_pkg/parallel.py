@@ -0,0 +1,86 @@
+"""
+Parallel fan-out for independent graph nodes.
+
+parallel_node combines nodes that read the same state and write disjoint fields into one
+graph node. Each branch runs on its own copy of the state, in its own thread, and the
+copies are merged when all branches are done:
+
+- a branch's declared `writes` are copied from its result; no two branches may declare
+  the same field, and writing an undeclared field is an error
+- log lines each branch appended are added in branch order
+- `status` decides the combined status from the branch results
+- a branch whose `keep` is false for the branch results has its writes dropped
+
+Branches don't save their copies of the state; only the merged state is saved. Branches
+whose `when` is false for the incoming state are skipped. With PARALLEL_NODES_ENABLED off
+the branches run one after another, with the same merge.
+"""
+import contextvars
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from ..common.config import settings
+from .state import AgentState, on_branch_copy, save_state
+
+# Every branch may set these; the merge handles them itself
+MERGED_FIELDS = ("status", "logs")
+
+
+@dataclass
+class Branch:
+    name: str
+    node: Callable[[AgentState], AgentState]
+    writes: Tuple[str, ...]
+    when: Optional[Callable[[AgentState], bool]] = None
+    keep: Optional[Callable[[Dict[str, AgentState]], bool]] = None
+
+
+def parallel_node(branches: Tuple[Branch, ...], status: Callable[[Dict[str, AgentState]], str]):
+    """A graph node running `branches` concurrently. `status` gets {branch name: result} of the branches that ran."""
+    declared = [field for branch in branches for field in branch.writes]
+    overlap = {field for field in declared if declared.count(field) > 1 or field in MERGED_FIELDS}
+    if overlap:
+        raise ValueError(f"Parallel branches may not declare the same or merged fields: {sorted(overlap)}")
+
+    def run(state: AgentState) -> AgentState:
+        active = [branch for branch in branches if branch.when is None or branch.when(state)]
+        snapshot = copy.deepcopy(state)
+
+        def run_branch(branch: Branch) -> AgentState:
+            token = on_branch_copy.set(True)
+            try:
+                return branch.node(copy.deepcopy(snapshot))
+            finally:
+                on_branch_copy.reset(token)
+
+        if settings.PARALLEL_NODES_ENABLED and len(active) > 1:
+            with ThreadPoolExecutor(max_workers=len(active)) as pool:
+                # Each branch runs in a copy of this context, so its node span nests under this one
+                futures = [pool.submit(contextvars.copy_context().run, run_branch, branch) for branch in active]
+                outputs = [future.result() for future in futures]
+        else:
+            outputs = [run_branch(branch) for branch in active]
+
+        results: Dict[str, AgentState] = {}
+        logs = list(state.get("logs", []))
+        for branch, result in zip(active, outputs):
+            undeclared = [key for key in result if key not in branch.writes and key not in MERGED_FIELDS and result[key] != snapshot.get(key)]
+            if undeclared:
+                raise ValueError(f"Parallel branch '{branch.name}' wrote undeclared fields: {sorted(undeclared)}")
+            logs.extend(result.get("logs", [])[len(snapshot.get("logs", [])):])
+            results[branch.name] = result
+
+        for branch in active:
+            if branch.keep is None or branch.keep(results):
+                for field in branch.writes:
+                    if field in results[branch.name]:
+                        state[field] = results[branch.name][field]
+
+        state["logs"] = logs
+        state["status"] = status(results)
+        save_state(state)
+        return state
+
+    return run
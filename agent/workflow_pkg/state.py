@@ -1,3 +1,4 @@
+import contextvars
 from typing import Dict, Any, List, TypedDict, Optional, TYPE_CHECKING
 from ..common.storage import storage
 
@@ -28,9 +29,25 @@ class AgentState(TypedDict):
     review_count: int
     pr_url: Optional[str]
     agents_md_content: Optional[str]
+    language_stats: Dict[str, int]
+    package_manager: Optional[str]
+    env_snapshot_hash: Optional[str]
+    test_commands: Optional[List[Dict[str, Any]]]
+    base_revision: Optional[str]
+    test_scope: Optional[str] # None (impacted tests) or "full"
+    full_suite_passed: Optional[bool]
+    pipeline: Optional[str] # "fast" or "full", decided when planning starts
+
+# Set while a node runs on a parallel branch's copy of the state. Branch copies diverge, so
+# only the merged state is saved (see parallel.py).
+on_branch_copy = contextvars.ContextVar("on_branch_copy", default=False)
+
+def save_state(state: AgentState):
+    if not on_branch_copy.get():
+        storage.save_state(state["session_id"], state)
 
 def log_update(state: AgentState, message: str):
     state["logs"].append(message)
     storage.append_log(state["session_id"], message)
     # Proactively save state to ensure UI is in sync
-    storage.save_state(state["session_id"], state)
+    save_state(state)
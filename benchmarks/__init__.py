@@ -0,0 +1,4 @@
+"""
+Benchmarks for the agent worker. Each module is runnable with `python -m benchmarks.<name>`
+and writes its results as JSON under benchmarks/results/ for comparison between commits.
+"""
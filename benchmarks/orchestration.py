@@ -0,0 +1,311 @@
+"""
+Orchestration benchmark.
+
+    python -m benchmarks.orchestration [--sessions 1 10 100] [--latency 0.0] [--pipeline full|fast] [--output FILE] [--compare BASELINE]
+
+Runs the real WorkflowManager and nodes end to end for N concurrent sessions, with the
+scripted chat model and an in-memory sandbox, so only the worker's own cost is measured:
+graph execution, prompt building, callbacks, tracing and storage. Every concurrency level
+runs in a fresh process with its own workspace directory, so storage size and peak memory
+belong to that level alone. STORAGE_TYPE/REDIS_URL from the environment choose the storage.
+--pipeline fast lets the (small) benchmark goal take the fast path instead of the full graph.
+
+Reported per level: wall time, time per node (from the node spans), storage operations and
+bytes written per session, and peak RSS. Results are written as JSON, by default to
+benchmarks/results/orchestration-<commit>.json; --compare prints the change against an
+earlier results file.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_SESSIONS = [1, 10, 100]
+
+# The workspace every session starts from
+REPO_FILES = {
+    "README.md": "# Greeter\n\nA tiny greeting library.\n",
+    "pyproject.toml": "[project]\nname = \"greeter\"\nversion = \"0.1.0\"\n",
+    "src/greeter/__init__.py": "from .greet import greet\n",
+    "src/greeter/greet.py": "def greet(name):\n    return f\"Hello, {name}!\"\n",
+    "tests/test_greet.py": "from greeter import greet\n\ndef test_greet():\n    assert greet(\"a\") == \"Hello, a!\"\n",
+}
+STAGED_NUMSTAT = "1\t1\tREADME.md\n"
+STAGED_DIFF = "diff --git a/README.md b/README.md\n--- a/README.md\n+++ b/README.md\n@@ -1 +1 @@\n-# Greeter\n+# Hello\n"
+TEST_COMMANDS = [{"command": "python -m pytest -q", "cwd": ".", "env": {}}]
+
+STORAGE_WRITES = ("set_session_status", "append_log", "set_result", "save_state", "save_artifact")
+STORAGE_READS = ("get_session_status", "get_logs", "get_result", "get_state", "get_artifact")
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "total_ms": round(sum(ordered), 3),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": round(ordered[len(ordered) // 2], 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        return None
+
+
+class StorageMeter:
+    """Counts calls, payload bytes and time of every storage operation, per session."""
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.calls: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.bytes_written: Dict[str, int] = defaultdict(int)
+        self.elapsed_ms: Dict[str, float] = defaultdict(float)
+        self.file_bytes_written = 0
+        self._lock = threading.Lock()
+
+    def install(self):
+        for name in STORAGE_WRITES + STORAGE_READS:
+            setattr(self.storage, name, self._wrap(name, getattr(self.storage, name)))
+        if hasattr(self.storage, "sessions_file"):
+            # FileStorage rewrites the whole file on every write
+            save = self.storage._save
+
+            def counted_save():
+                save()
+                size = os.path.getsize(self.storage.sessions_file)
+                with self._lock:
+                    self.file_bytes_written += size
+            self.storage._save = counted_save
+
+    def _wrap(self, name: str, method):
+        def call(session_id, *args):
+            start = time.perf_counter()
+            try:
+                return method(session_id, *args)
+            finally:
+                elapsed = (time.perf_counter() - start) * 1000
+                payload = args[-1] if name in STORAGE_WRITES and args else None
+                size = 0
+                if payload is not None:
+                    size = len(payload.encode("utf-8")) if isinstance(payload, str) else len(json.dumps(payload, default=str))
+                with self._lock:
+                    self.calls[session_id][name] += 1
+                    self.bytes_written[session_id] += size
+                    self.elapsed_ms[session_id] += elapsed
+        return call
+
+    def per_session(self, session_ids: List[str]) -> Dict[str, Any]:
+        n = len(session_ids)
+        ops = defaultdict(int)
+        for session_id in session_ids:
+            for name, count in self.calls[session_id].items():
+                ops[name] += count
+        result = {
+            "ops": {name: round(count / n, 1) for name, count in sorted(ops.items())},
+            "ops_total": round(sum(ops.values()) / n, 1),
+            "bytes_written": round(sum(self.bytes_written[s] for s in session_ids) / n),
+            "time_ms": round(sum(self.elapsed_ms[s] for s in session_ids) / n, 3),
+        }
+        if hasattr(self.storage, "sessions_file"):
+            result["file_bytes_written"] = round(self.file_bytes_written / n)
+        return result
+
+
+def run_level(sessions: int, latency_sec: float = 0.0) -> Dict[str, Any]:
+    """Runs `sessions` workflows concurrently in this process and returns the measurements."""
+    from types import SimpleNamespace
+
+    from agent.agent import AgentManager
+    from agent.common.storage import storage
+    from agent.common.tracing import SpanExporter, tracer
+    from agent.sandbox.memory import InMemorySandbox
+    from agent.workflow_pkg import WorkflowManager
+
+    class SpanTimings(SpanExporter):
+        def __init__(self):
+            self.durations: Dict[str, List[float]] = defaultdict(list)
+            self._lock = threading.Lock()
+
+        def on_end(self, span):
+            with self._lock:
+                self.durations[span.name].append(span.duration_ms)
+
+    meter = StorageMeter(storage)
+    meter.install()
+    timings = SpanTimings()
+    tracer.exporter = timings
+    manager = AgentManager()
+    rss_start = peak_rss_mb()
+
+    def run_session(i: int) -> Dict[str, Any]:
+        session_id = f"bench-{sessions}-{i}"
+        sandbox = InMemorySandbox(REPO_FILES)
+        sandbox.respond(r"git diff --cached --numstat", STAGED_NUMSTAT)
+        sandbox.respond(r"git diff --cached --name-only", "README.md\n")
+        sandbox.respond(r"^git diff --cached", STAGED_DIFF)
+        manager.register_sandbox(session_id, sandbox)
+        manager.register_ai_config(session_id, SimpleNamespace(provider="scripted", model="scripted", api_key=None, base_url=None, latency_sec=latency_sec))
+        state = {
+            "session_id": session_id,
+            "goal": "Greet readers at the top of the README",
+            "repo_url": "",
+            "base_branch": None,
+            "workspace_path": sandbox.get_root_path(),
+            "plan": None,
+            "current_step": 0,
+            "review_feedback": None,
+            "plan_critic_feedback": None,
+            "status": "PLANNING",
+            "logs": [],
+            "mode": "auto",
+            "review_count": 0,
+            "git_co_author_name": "",
+            "git_co_author_email": "",
+            "test_commands": [dict(spec) for spec in TEST_COMMANDS],
+        }
+        start = time.perf_counter()
+        try:
+            final_state = WorkflowManager().run_workflow_sync(state)
+        finally:
+            manager.unregister_sandbox(session_id)
+            manager.unregister_ai_config(session_id)
+        return {"session_id": session_id, "status": final_state["status"], "elapsed_ms": (time.perf_counter() - start) * 1000}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        results = list(pool.map(run_session, range(sessions)))
+    wall = time.perf_counter() - start
+    tracer.exporter = None
+
+    statuses = defaultdict(int)
+    for result in results:
+        statuses[result["status"]] += 1
+    return {
+        "sessions": sessions,
+        "statuses": dict(statuses),
+        "wall_sec": round(wall, 3),
+        "sessions_per_sec": round(sessions / wall, 2),
+        "session": summarize([r["elapsed_ms"] for r in results]),
+        "nodes": {name[len("node."):]: summarize(d) for name, d in sorted(timings.durations.items()) if name.startswith("node.")},
+        "spans": {name: summarize(d) for name, d in sorted(timings.durations.items()) if not name.startswith("node.")},
+        "storage_per_session": meter.per_session([r["session_id"] for r in results]),
+        "memory": {"rss_start_mb": rss_start, "peak_rss_mb": peak_rss_mb()},
+    }
+
+
+def run_level_isolated(sessions: int, latency_sec: float, pipeline: str = "full") -> Dict[str, Any]:
+    """Runs one level in a fresh interpreter with its own workspace directory."""
+    with tempfile.TemporaryDirectory(prefix="swe-bench-") as workspace:
+        result_file = os.path.join(workspace, "result.json")
+        env = {**os.environ, "WORKSPACE_DIR": workspace, "TRACING_ENABLED": "false",
+               "FAST_PATH_CLASSIFIER": "heuristic" if pipeline == "fast" else "off"}
+        command = [sys.executable, "-m", "benchmarks.orchestration", "--level", str(sessions),
+                   "--latency", str(latency_sec), "--result-file", result_file]
+        # Nodes and agent executors print progress; keep the benchmark output readable
+        subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL,
+                       cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        with open(result_file) as f:
+            return json.load(f)
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """One line per level and headline metric: baseline -> current (change)."""
+    def line(label, old, new):
+        if old is None or new is None:
+            return None
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        return f"  {label:<32} {old:>12} -> {new:<12} {change}"
+
+    lines = [f"Compared with {baseline.get('revision') or 'baseline'} ({baseline.get('timestamp')}):"]
+    old_levels = {level["sessions"]: level for level in baseline.get("levels", [])}
+    for level in current["levels"]:
+        old = old_levels.get(level["sessions"])
+        if old is None:
+            continue
+        lines.append(f"{level['sessions']} sessions")
+        metrics = [
+            ("wall_sec", old["wall_sec"], level["wall_sec"]),
+            ("session p50 ms", old["session"]["p50_ms"], level["session"]["p50_ms"]),
+            ("storage ops/session", old["storage_per_session"]["ops_total"], level["storage_per_session"]["ops_total"]),
+            ("storage bytes/session", old["storage_per_session"]["bytes_written"], level["storage_per_session"]["bytes_written"]),
+            ("peak_rss_mb", old["memory"]["peak_rss_mb"], level["memory"]["peak_rss_mb"]),
+        ]
+        for node, stats in level["nodes"].items():
+            metrics.append((f"node {node} mean ms", old["nodes"].get(node, {}).get("mean_ms"), stats["mean_ms"]))
+        lines.extend(l for l in (line(*m) for m in metrics) if l)
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the workflow end to end with a scripted LLM and an in-memory sandbox.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=DEFAULT_SESSIONS, help="Concurrency levels to run (default: 1 10 100)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per LLM call")
+    parser.add_argument("--pipeline", choices=("full", "fast"), default="full", help="Graph the sessions take (default: full)")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/orchestration-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--level", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.level:
+        # Child process of run_level_isolated
+        with open(args.result_file, "w") as f:
+            json.dump(run_level(args.level, args.latency), f)
+        return
+
+    revision = git_revision()
+    results = {
+        "benchmark": "orchestration",
+        "revision": revision,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "storage_type": os.getenv("STORAGE_TYPE", "file"),
+        "latency_sec": args.latency,
+        "pipeline": args.pipeline,
+        "levels": [],
+    }
+    for sessions in args.sessions:
+        level = run_level_isolated(sessions, args.latency, args.pipeline)
+        results["levels"].append(level)
+        storage_stats = level["storage_per_session"]
+        print(f"{sessions:>4} sessions: {level['wall_sec']}s wall, p50 {level['session']['p50_ms']} ms/session, "
+              f"{storage_stats['ops_total']} storage ops and {storage_stats['bytes_written']} bytes/session, "
+              f"peak RSS {level['memory']['peak_rss_mb']} MB, {level['statuses']}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"orchestration-{revision or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n".join(compare(results, json.load(f))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Local Redis stand-in.
+
+A minimal RESP server for the commands RedisStorage uses (SET, GET, RPUSH, LRANGE,
+EXPIRE, DEL, PING), so storage benchmarks exercise the real redis-py client and a real
+socket round trip on machines without a Redis server. Data lives in memory and TTLs are
+accepted but not enforced. Not a substitute for measuring a real Redis.
+"""
+import socketserver
+import threading
+from typing import Dict, List, Optional, Union
+
+Value = Union[bytes, List[bytes]]
+
+
+def _bulk(value: Optional[bytes], resp3: bool = False) -> bytes:
+    if value is None:
+        return b"_\r\n" if resp3 else b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _read_command(self) -> Optional[List[bytes]]:
+        header = self.rfile.readline()
+        if not header:
+            return None
+        if not header.startswith(b"*"):
+            return header.strip().split()
+        args = []
+        for _ in range(int(header[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        self.protocol = 2
+        while True:
+            command = self._read_command()
+            if command is None:
+                return
+            self.wfile.write(self.server.standin.dispatch(command, self))
+            self.wfile.flush()
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class RedisStandIn:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.data: Dict[bytes, Value] = {}
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _Handler)
+        self._server.standin = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def dispatch(self, command: List[bytes], connection) -> bytes:
+        name = command[0].upper()
+        args = command[1:]
+        with self._lock:
+            if name == b"PING":
+                return b"+PONG\r\n"
+            if name == b"HELLO":
+                # Newer clients open with HELLO 3; only nulls are encoded differently after that
+                proto = connection.protocol = int(args[0]) if args else 2
+                fields = _bulk(b"server") + _bulk(b"redis") + _bulk(b"proto") + b":%d\r\n" % proto
+                return (b"%2\r\n" if proto == 3 else b"*4\r\n") + fields
+            if name in (b"CLIENT", b"SELECT"):
+                return b"+OK\r\n"
+            if name == b"SET":
+                self.data[args[0]] = args[1]
+                return b"+OK\r\n"
+            if name == b"GET":
+                value = self.data.get(args[0])
+                if isinstance(value, list):
+                    return b"-WRONGTYPE Operation against a key holding the wrong kind of value\r\n"
+                return _bulk(value, connection.protocol == 3)
+            if name == b"RPUSH":
+                items = self.data.setdefault(args[0], [])
+                items.extend(args[1:])
+                return b":%d\r\n" % len(items)
+            if name == b"LRANGE":
+                items = self.data.get(args[0], [])
+                start, stop = int(args[1]), int(args[2])
+                selected = items[start:] if stop == -1 else items[start:stop + 1]
+                return b"*%d\r\n" % len(selected) + b"".join(_bulk(item) for item in selected)
+            if name == b"EXPIRE":
+                return b":1\r\n" if args[0] in self.data else b":0\r\n"
+            if name == b"DEL":
+                return b":%d\r\n" % sum(1 for key in args if self.data.pop(key, None) is not None)
+        return b"-ERR unknown command '%s'\r\n" % command[0]
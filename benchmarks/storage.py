@@ -0,0 +1,214 @@
+"""
+Storage benchmark and load generator.
+
+    python -m benchmarks.storage [--backend file redis] [--sessions 1 10 100] [--redis-url URL] [--output FILE] [--compare BASELINE]
+
+Replays the storage traffic of concurrent sessions against a backend:
+
+- status changes: RUNNING when the worker picks a session up, COMPLETED and the result at the end
+- log bursts: SessionCallbackHandler appends a line per tool start and end
+- full-state saves: log_update appends a log line and saves the whole state, which grows with its logs
+- polling: run_workflow_sync reads the state before each node and saves it after
+
+Every session runs in its own thread, like worker sessions do. Throughput and p50/p99
+latency are reported per operation. The redis backend uses --redis-url (or BENCHMARK_REDIS_URL)
+when given, and otherwise starts a local stand-in server (benchmarks/redis_standin.py),
+which measures client and round-trip cost but not a real Redis.
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from .orchestration import RESULTS_DIR, git_revision
+
+DEFAULT_SESSIONS = [1, 10, 100]
+BACKENDS = ("file", "redis")
+
+
+def latency_stats(values: List[float], wall: float) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "ops_per_sec": round(len(ordered) / wall, 1),
+        "p50_ms": round(ordered[len(ordered) // 2], 3),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def initial_state(session_id: str) -> Dict[str, Any]:
+    """A state shaped like the worker's after initialization: tree, AGENTS.md and plan filled in."""
+    tree = "\n".join(f"src/module_{i // 20}/file_{i}.py" for i in range(300))
+    return {
+        "session_id": session_id,
+        "goal": "Add retry with exponential backoff to the HTTP client and cover it with tests",
+        "repo_url": "https://github.com/example/service.git",
+        "base_branch": "main",
+        "workspace_path": "/workspace/service",
+        "plan": "\n".join(f"{i}. Step {i}: update the client and its tests accordingly." for i in range(1, 16)),
+        "current_step": 0,
+        "review_feedback": None,
+        "plan_critic_feedback": None,
+        "status": "PLANNING",
+        "logs": [],
+        "mode": "auto",
+        "review_count": 0,
+        "codebase_tree": tree,
+        "agents_md_content": "Run `make test` before submitting. Keep functions small.\n" * 10,
+        "language_stats": {"py": 300, "md": 4},
+        "test_commands": [{"command": "python -m pytest -q", "cwd": ".", "env": {}}],
+    }
+
+
+class Recorder:
+    """Times storage calls of one session. Errors are counted, not raised."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.state_bytes = 0
+
+    def __call__(self, name: str, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        except Exception:
+            self.errors[name] += 1
+            return None
+        finally:
+            self.latencies[name].append((time.perf_counter() - start) * 1000)
+
+
+def simulate_session(storage, session_id: str, nodes: int, log_burst: int, log_updates: int) -> Recorder:
+    record = Recorder()
+    state = initial_state(session_id)
+    record("set_session_status", storage.set_session_status, session_id, "RUNNING")
+    for node in range(nodes):
+        record("get_state", storage.get_state, session_id)
+        for i in range(log_burst):
+            record("append_log", storage.append_log, session_id, f"Executing tool 'read_file' with input: {{'filepath': 'src/module_{node}/file_{i}.py'}}")
+        for i in range(log_updates):
+            message = f"Node {node}: progress update {i} with a sentence or two of detail about what happened."
+            state["logs"].append(message)
+            record("append_log", storage.append_log, session_id, message)
+            record("save_state", storage.save_state, session_id, state)
+        state["current_step"] = node + 1
+        record("save_state", storage.save_state, session_id, state)
+    record("set_session_status", storage.set_session_status, session_id, "COMPLETED")
+    record("set_result", storage.set_result, session_id, "Workflow completed successfully.")
+    record.state_bytes = len(json.dumps(state))
+    return record
+
+
+def run_level(storage, backend: str, sessions: int, nodes: int, log_burst: int, log_updates: int) -> Dict[str, Any]:
+    run_id = f"{int(time.time() * 1000)}-{threading.get_ident()}"
+    session_ids = [f"bench-{run_id}-{i}" for i in range(sessions)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        recorders = list(pool.map(lambda sid: simulate_session(storage, sid, nodes, log_burst, log_updates), session_ids))
+    wall = time.perf_counter() - start
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    for recorder in recorders:
+        for name, values in recorder.latencies.items():
+            latencies[name].extend(values)
+        for name, count in recorder.errors.items():
+            errors[name] += count
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "backend": backend,
+        "sessions": sessions,
+        "wall_sec": round(wall, 3),
+        "ops_per_sec": round(total / wall, 1),
+        "operations": {name: latency_stats(values, wall) for name, values in sorted(latencies.items())},
+        "errors": dict(errors),
+        "final_state_bytes": max(recorder.state_bytes for recorder in recorders),
+    }
+
+
+def open_backend(backend: str, workdir: str, redis_url: str = None):
+    """The storage under test, and a cleanup callable."""
+    from agent.common.storage import FileStorage, RedisStorage
+
+    if backend == "file":
+        return FileStorage(data_dir=os.path.join(workdir, f"data-{time.monotonic_ns()}")), lambda: None
+    if redis_url:
+        return RedisStorage(redis_url), lambda: None
+    from .redis_standin import RedisStandIn
+    server = RedisStandIn()
+    return RedisStorage(server.start()), server.stop
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    lines = [f"Compared with {baseline.get('revision') or 'baseline'} ({baseline.get('timestamp')}):"]
+    old_levels = {(level["backend"], level["sessions"]): level for level in baseline.get("levels", [])}
+    for level in current["levels"]:
+        old = old_levels.get((level["backend"], level["sessions"]))
+        if old is None:
+            continue
+        lines.append(f"{level['backend']}, {level['sessions']} sessions: {old['ops_per_sec']} -> {level['ops_per_sec']} ops/s")
+        for name, stats in level["operations"].items():
+            before = old["operations"].get(name)
+            if before:
+                lines.append(f"  {name:<20} p50 {before['p50_ms']} -> {stats['p50_ms']} ms, p99 {before['p99_ms']} -> {stats['p99_ms']} ms")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark storage backends with simulated session traffic.")
+    parser.add_argument("--backend", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--sessions", type=int, nargs="+", default=DEFAULT_SESSIONS, help="Concurrent session counts (default: 1 10 100)")
+    parser.add_argument("--nodes", type=int, default=10, help="Graph nodes run per session")
+    parser.add_argument("--log-burst", type=int, default=4, help="Callback log lines per node")
+    parser.add_argument("--log-updates", type=int, default=2, help="log_update calls (log line + full-state save) per node")
+    parser.add_argument("--redis-url", default=os.getenv("BENCHMARK_REDIS_URL"), help="Real Redis to use instead of the local stand-in")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/storage-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    revision = git_revision()
+    results = {
+        "benchmark": "storage",
+        "revision": revision,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "redis": args.redis_url or "stand-in",
+        "profile": {"nodes": args.nodes, "log_burst": args.log_burst, "log_updates": args.log_updates},
+        "levels": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="swe-storage-bench-") as workdir:
+        for backend in args.backend:
+            for sessions in args.sessions:
+                storage, close = open_backend(backend, workdir, args.redis_url)
+                try:
+                    level = run_level(storage, backend, sessions, args.nodes, args.log_burst, args.log_updates)
+                finally:
+                    close()
+                results["levels"].append(level)
+                slowest = max(level["operations"].items(), key=lambda item: item[1]["p99_ms"])
+                print(f"{backend:>5}, {sessions:>4} sessions: {level['ops_per_sec']} ops/s, slowest p99 {slowest[0]} {slowest[1]['p99_ms']} ms"
+                      + (f", errors {level['errors']}" if level["errors"] else ""))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"storage-{revision or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n".join(compare(results, json.load(f))))
+
+
+if __name__ == "__main__":
+    main()
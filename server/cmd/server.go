@@ -104,6 +104,7 @@ func startServer() {
 			agentGroup.GET("/sessions/:session_id", handlers.GetSessionStatus)
 			agentGroup.POST("/sessions/:session_id/approve", handlers.ApproveSession)
 			agentGroup.POST("/sessions/:session_id/input", handlers.AddSessionInput)
+			agentGroup.POST("/sessions/:session_id/cancel", handlers.CancelSession)
 		}
 
 		// Admin routes for Git Providers
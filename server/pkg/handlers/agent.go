@@ -215,6 +215,37 @@ func AddSessionInput(c *gin.Context) {
 	c.JSON(http.StatusOK, gin.H{"status": "input_added"})
 }
 
+func CancelSession(c *gin.Context) {
+	sessionID := c.Param("session_id")
+	status, err := services.GetSessionStatus(sessionID)
+	if err != nil {
+		c.JSON(http.StatusNotFound, gin.H{"error": "Session not found"})
+		return
+	}
+
+	if status == "COMPLETED" || status == "FAILED" || status == "CANCELLED" {
+		c.JSON(http.StatusBadRequest, gin.H{"error": "Session has already finished"})
+		return
+	}
+
+	// The worker polls this status and stops the session within a few seconds
+	if err := services.SetSessionStatus(sessionID, "CANCELLED"); err != nil {
+		c.JSON(http.StatusInternalServerError, gin.H{"error": "Failed to set status"})
+		return
+	}
+	services.AppendLog(sessionID, "Cancellation requested.")
+
+	// A paused session has no worker to notice, so it must not be resumable either
+	if state, err := services.GetState(sessionID); err == nil {
+		if s, _ := state["status"].(string); s == "WAITING_FOR_USER" {
+			state["status"] = "CANCELLED"
+			services.SaveState(sessionID, state)
+		}
+	}
+
+	c.JSON(http.StatusOK, gin.H{"status": "cancelled"})
+}
+
 func GetSessionStatus(c *gin.Context) {
 	sessionID := c.Param("session_id")
 	status, err := services.GetSessionStatus(sessionID)
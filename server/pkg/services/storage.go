@@ -29,6 +29,14 @@ func GetLogs(sessionID string) ([]string, error) {
 	return model.Rdb.LRange(model.Ctx, fmt.Sprintf("session:%s:logs", sessionID), 0, -1).Result()
 }
 
+func AppendLog(sessionID, message string) error {
+	key := fmt.Sprintf("session:%s:logs", sessionID)
+	if err := model.Rdb.RPush(model.Ctx, key, message).Err(); err != nil {
+		return err
+	}
+	return model.Rdb.Expire(model.Ctx, key, SessionTTL).Err()
+}
+
 func GetResult(sessionID string) (string, error) {
 	val, err := model.Rdb.Get(model.Ctx, fmt.Sprintf("session:%s:result", sessionID)).Result()
 	if err != nil {
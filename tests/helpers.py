@@ -0,0 +1,13 @@
+import tempfile
+from unittest.mock import patch
+from agent.common.storage import FileStorage, storage
+
+def use_temp_storage(test):
+    """Back the process-wide storage with a FileStorage in a temp dir for the rest of the test."""
+    tmp = tempfile.TemporaryDirectory()
+    test.addCleanup(tmp.cleanup)
+    backend = FileStorage(data_dir=tmp.name)
+    patcher = patch.object(storage, "backend", backend)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    return backend
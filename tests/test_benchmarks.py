@@ -0,0 +1,96 @@
+import tempfile
+import unittest
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+from agent.common.scripted_llm import ScriptedChatModel
+from agent.sandbox.memory import InMemorySandbox
+from agent.common.storage import RedisStorage
+from benchmarks.orchestration import compare, run_level_isolated
+from benchmarks.redis_standin import RedisStandIn
+from benchmarks.storage import open_backend, run_level as run_storage_level
+
+class TestInMemorySandbox(unittest.TestCase):
+
+    def test_files_and_shell_idioms(self):
+        sandbox = InMemorySandbox({"README.md": "# Hi\n", "src/app.py": "x = 1\n"})
+        self.assertEqual(sandbox.list_files("."), "README.md\nsrc/")
+        self.assertEqual(sandbox.execute("cat src/app.py").output, "x = 1\n")
+        self.assertEqual(sandbox.execute("cat missing.txt").exit_code, 1)
+        self.assertEqual(sandbox.execute("git ls-files | wc -l").output, "2")
+        self.assertTrue(sandbox.execute("test -d src").ok)
+        sandbox.write_file("/workspace/src/new.py", "y = 2\n")
+        self.assertEqual(sandbox.read_file("src/new.py"), "y = 2\n")
+        results = sandbox.run_commands(["true", "test -f nope", "echo never"])
+        self.assertEqual([r.exit_code for r in results], [0, 1])
+
+    def test_scripted_responses(self):
+        sandbox = InMemorySandbox()
+        sandbox.respond(r"^git diff", "diff --git a/x b/x")
+        self.assertEqual(sandbox.run_command("git diff --cached"), "diff --git a/x b/x")
+        self.assertEqual(sandbox.execute("npm install").output, "")
+        self.assertEqual(sandbox.commands, ["git diff --cached", "npm install"])
+
+class TestScriptedChatModel(unittest.TestCase):
+
+    def test_programmer_calls_a_tool_then_finishes(self):
+        llm = ScriptedChatModel()
+        messages = [SystemMessage(content="You are a Skilled Software Engineer."), HumanMessage(content="Go")]
+        first = llm.invoke(messages)
+        self.assertEqual(first.tool_calls[0]["name"], "write_file")
+        done = llm.invoke(messages + [first, ToolMessage(content="ok", tool_call_id=first.tool_calls[0]["id"])])
+        self.assertEqual(done.content, "CHANGES_COMPLETE")
+        with self.assertRaises(ValueError):
+            llm.invoke([HumanMessage(content="Unknown role")])
+
+class TestOrchestrationBenchmark(unittest.TestCase):
+
+    def test_single_session_runs_the_real_workflow(self):
+        level = run_level_isolated(1, 0.0)
+        self.assertEqual(level["statuses"], {"COMPLETED": 1})
+        for node in ("initializer", "env_setup", "planner", "plan_critic", "branch_naming", "programmer", "tester", "reviewer", "submit"):
+            self.assertIn(node, level["nodes"])
+        self.assertGreater(level["storage_per_session"]["ops"]["save_state"], 0)
+        self.assertGreater(level["storage_per_session"]["bytes_written"], 0)
+        self.assertGreater(level["memory"]["peak_rss_mb"], 0)
+
+        results = {"revision": "abc", "timestamp": "t", "levels": [level]}
+        self.assertIn("1 sessions", compare(results, results))
+
+    def test_fast_pipeline_skips_planning_and_review(self):
+        level = run_level_isolated(1, 0.0, "fast")
+        self.assertEqual(level["statuses"], {"COMPLETED": 1})
+        self.assertEqual(set(level["nodes"]), {"initializer", "fast_programmer", "fast_verify", "submit"})
+
+class TestStorageBenchmark(unittest.TestCase):
+
+    def test_redis_storage_round_trips_through_the_stand_in(self):
+        server = RedisStandIn()
+        self.addCleanup(server.stop)
+        storage = RedisStorage(server.start())
+        storage.save_state("s1", {"status": "CODING", "logs": ["a"]})
+        storage.append_log("s1", "one")
+        storage.append_log("s1", "two")
+        self.assertEqual(storage.get_state("s1"), {"status": "CODING", "logs": ["a"]})
+        self.assertEqual(storage.get_logs("s1"), ["one", "two"])
+        self.assertIsNone(storage.get_result("s1"))
+        self.assertEqual(storage.get_session_status("s1"), "UNKNOWN")
+
+    def test_simulated_traffic_per_operation(self):
+        for backend in ("file", "redis"):
+            with tempfile.TemporaryDirectory() as workdir:
+                storage, close = open_backend(backend, workdir)
+                try:
+                    level = run_storage_level(storage, backend, 2, nodes=3, log_burst=2, log_updates=1)
+                finally:
+                    close()
+            operations = level["operations"]
+            self.assertEqual(operations["get_state"]["count"], 6)
+            self.assertEqual(operations["save_state"]["count"], 12)
+            self.assertEqual(operations["append_log"]["count"], 18)
+            self.assertEqual(operations["set_session_status"]["count"], 4)
+            self.assertLessEqual(operations["save_state"]["p50_ms"], operations["save_state"]["p99_ms"])
+            if backend == "redis":
+                # FileStorage is not safe for concurrent writers, which the report shows as errors
+                self.assertEqual(level["errors"], {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from agent.agent import AgentManager
+from agent.callbacks import CancellationCallbackHandler, get_session_callbacks
+from agent.common.cancellation import CancellationToken, SessionCancelled
+from agent.common.storage import FileStorage
+from agent.sandbox.base import CommandResult, with_timeout
+from agent.sandbox.daytona import DaytonaSandbox
+from agent.tools.install_tool import install_dependencies
+from tests.test_sandbox_batch import LocalShellSandbox
+
+class TestCancellation(unittest.TestCase):
+
+    def test_token_deadline(self):
+        token = CancellationToken(deadline=time.time() - 1)
+        self.assertTrue(token.cancelled)
+        self.assertEqual(token.reason, "Session time limit reached")
+        self.assertRaises(SessionCancelled, token.raise_if_cancelled)
+
+    def test_token_external_check_is_rate_limited(self):
+        check = MagicMock(return_value=False)
+        token = CancellationToken(check=check, poll_interval=60)
+        self.assertFalse(token.cancelled)
+        self.assertFalse(token.cancelled)
+        self.assertEqual(check.call_count, 1)
+
+    def test_token_failing_check_is_ignored(self):
+        token = CancellationToken(check=MagicMock(side_effect=ConnectionError("redis down")), poll_interval=0)
+        self.assertFalse(token.cancelled)
+
+    def test_local_command_timeout_keeps_partial_output(self):
+        sandbox = LocalShellSandbox()
+        start = time.monotonic()
+        result = sandbox.execute("echo started; sleep 30; echo finished", timeout=1)
+        self.assertLess(time.monotonic() - start, 15)
+        self.assertTrue(result.timed_out)
+        self.assertFalse(result.ok)
+        self.assertIn("started", result.output)
+        self.assertNotIn("finished", result.output)
+        self.assertIn("timed out after 1s", result.output)
+
+    def test_fast_command_not_marked(self):
+        result = LocalShellSandbox().execute("echo ok", timeout=5)
+        self.assertTrue(result.ok)
+        self.assertFalse(result.timed_out)
+        self.assertEqual(result.output, "ok")
+
+    def test_daytona_wraps_command_with_timeout(self):
+        sandbox = DaytonaSandbox("test-timeout")
+        sandbox.sandbox = MagicMock()
+        resp = MagicMock()
+        resp.result = "partial"
+        resp.exit_code = 124
+        sandbox.sandbox.process.exec.return_value = resp
+
+        result = sandbox.execute("npm test", timeout=30)
+        args, kwargs = sandbox.sandbox.process.exec.call_args
+        self.assertEqual(args[0], with_timeout("npm test", 30))
+        self.assertGreater(kwargs["timeout"], 30)
+        self.assertTrue(result.timed_out)
+        self.assertIn("partial", result.output)
+
+    def test_cancelled_sandbox_refuses_commands(self):
+        sandbox = DaytonaSandbox("test-cancel")
+        sandbox.sandbox = MagicMock()
+        token = CancellationToken()
+        token.cancel("Cancelled by user")
+        sandbox.set_cancel_token(token)
+        result = sandbox.execute("ls")
+        self.assertEqual(result.exit_code, -1)
+        self.assertIn("Cancelled by user", result.output)
+        sandbox.sandbox.process.exec.assert_not_called()
+
+    def test_timeout_clamped_to_session_deadline(self):
+        sandbox = LocalShellSandbox()
+        sandbox.set_cancel_token(CancellationToken(deadline=time.time() + 10))
+        self.assertLessEqual(sandbox.resolve_timeout(900), 11)
+        self.assertIsNotNone(sandbox.resolve_timeout(0))
+
+    def test_install_reports_timeout(self):
+        sandbox = MagicMock()
+        sandbox.execute_stream.return_value = CommandResult(command="npm install", stdout="added 12", exit_code=124, timed_out=True)
+        output = install_dependencies(sandbox, ["npm", "install"], timeout=5)
+        self.assertIn("timed out after 5s", output)
+        self.assertEqual(sandbox.execute_stream.call_args.kwargs["timeout"], 5)
+
+    def test_callback_raises_once_cancelled(self):
+        manager = AgentManager()
+        token = CancellationToken()
+        manager.register_cancel_token("cb-session", token)
+        try:
+            handler = [c for c in get_session_callbacks("cb-session") if isinstance(c, CancellationCallbackHandler)][0]
+            handler.on_tool_start({"name": "shell"}, "ls")
+            token.cancel()
+            self.assertRaises(SessionCancelled, handler.on_tool_start, {"name": "shell"}, "ls")
+        finally:
+            manager.unregister_cancel_token("cb-session")
+
+    def test_cancel_session(self):
+        storage = FileStorage(data_dir=tempfile.mkdtemp())
+        with patch("agent.agent.storage", storage):
+            storage.set_session_status("running", "RUNNING")
+            self.assertTrue(AgentManager().cancel_session("running"))
+            self.assertEqual(storage.get_session_status("running"), "CANCELLED")
+            self.assertEqual(storage.get_logs("running"), ["Cancellation requested."])
+            # The worker's token sees the flag on its next poll
+            token = CancellationToken(check=lambda: storage.get_session_status("running") == "CANCELLED", poll_interval=0)
+            self.assertEqual((token.cancelled, token.reason), (True, "Cancelled by user"))
+
+            # A paused session can no longer be approved
+            storage.set_session_status("paused", "WAITING_FOR_USER")
+            storage.save_state("paused", {"status": "WAITING_FOR_USER", "next_status": "CODING"})
+            self.assertTrue(AgentManager().cancel_session("paused"))
+            self.assertFalse(AgentManager().resume_session("paused"))
+
+            self.assertFalse(AgentManager().cancel_session("running"))
+            self.assertFalse(AgentManager().cancel_session("missing"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from agent.sandbox.base import CommandResult, truncate_output
+from agent.sandbox.daytona import DaytonaSandbox
+from agent.tools.grep_tool import grep_search
+from agent.tools.install_tool import install_dependencies
+from agent.tools.git_tools import switch_branch
+
+def make_result(stdout="", exit_code=0):
+    return CommandResult(command="cmd", stdout=stdout, exit_code=exit_code)
+
+class TestCommandResult(unittest.TestCase):
+
+    def test_daytona_execute_returns_exit_code(self):
+        sandbox = DaytonaSandbox("test-exec")
+        sandbox.sandbox = MagicMock()
+        resp = MagicMock()
+        resp.result = "fatal: not a git repository"
+        resp.exit_code = 128
+        sandbox.sandbox.process.exec.return_value = resp
+
+        result = sandbox.execute("git status", cwd="/workspace")
+        self.assertEqual(result.exit_code, 128)
+        self.assertFalse(result.ok)
+        self.assertEqual(result.stdout, "fatal: not a git repository")
+        self.assertGreaterEqual(result.duration_ms, 0)
+        # run_command keeps returning the plain output string
+        self.assertEqual(sandbox.run_command("git status"), "fatal: not a git repository")
+
+    def test_daytona_execute_truncates_output(self):
+        sandbox = DaytonaSandbox("test-trunc")
+        sandbox.sandbox = MagicMock()
+        resp = MagicMock()
+        resp.result = "x" * 1000
+        resp.exit_code = 0
+        sandbox.sandbox.process.exec.return_value = resp
+
+        result = sandbox.execute("cat big", max_output_chars=100)
+        self.assertTrue(result.truncated)
+        self.assertIn("truncated", result.stdout)
+        self.assertLess(len(result.stdout), 200)
+
+    def test_daytona_execute_exception(self):
+        sandbox = DaytonaSandbox("test-err")
+        sandbox.sandbox = MagicMock()
+        sandbox.sandbox.process.exec.side_effect = RuntimeError("connection reset")
+        result = sandbox.execute("ls", cwd="/workspace")
+        self.assertEqual(result.exit_code, -1)
+        self.assertIn("connection reset", result.output)
+
+    def test_truncate_output_passthrough(self):
+        self.assertEqual(truncate_output("short", 100), ("short", False))
+        self.assertEqual(truncate_output("short", 0), ("short", False))
+
+    def test_grep_no_matches_is_not_an_error(self):
+        sandbox = MagicMock()
+        sandbox.execute.return_value = make_result("", 1)
+        self.assertEqual(grep_search(sandbox, "needle"), "No matches found.")
+
+    def test_grep_matches_mentioning_not_found(self):
+        sandbox = MagicMock()
+        sandbox.execute.return_value = make_result("app.py\n3: raise NotFound('not found')", 0)
+        result = grep_search(sandbox, "not found")
+        self.assertIn("app.py", result)
+        self.assertEqual(sandbox.execute.call_count, 1)
+
+    def test_grep_falls_back_when_rg_missing(self):
+        sandbox = MagicMock()
+        sandbox.execute.side_effect = [make_result("sh: rg: command not found", 127), make_result("./a.py:1:needle", 0)]
+        result = grep_search(sandbox, "needle")
+        self.assertEqual(result, "./a.py:1:needle")
+        self.assertTrue(sandbox.execute.call_args.args[0].startswith("grep -rn"))
+
+    def test_install_success_with_error_words_in_log(self):
+        sandbox = MagicMock()
+        sandbox.execute_stream.return_value = make_result("added 10 packages, 0 errors found", 0)
+        result = install_dependencies(sandbox, ["npm", "install"])
+        self.assertTrue(result.startswith("Successfully ran"))
+
+    def test_install_failure_uses_exit_code(self):
+        sandbox = MagicMock()
+        sandbox.execute_stream.return_value = make_result("npm ERR! code E404", 1)
+        result = install_dependencies(sandbox, ["npm", "install"])
+        self.assertIn("exit code 1", result)
+
+    def test_switch_branch_validation(self):
+        sandbox = MagicMock()
+        result = switch_branch(sandbox, "Bad Branch", create=True)
+        self.assertFalse(result.ok)
+        sandbox.execute.assert_not_called()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from langchain_core.tools import StructuredTool
+from agent.tools.compaction import (
+    ELIDED_OUTPUTS, clean_output, clear_elided_outputs, compact_output, compact_tools, estimate_tokens
+)
+
+def make_tool(name, output):
+    def run(command: str) -> str:
+        """Returns canned output."""
+        return output
+    return StructuredTool.from_function(func=run, name=name, description="test tool")
+
+class TestCompaction(unittest.TestCase):
+
+    def tearDown(self):
+        clear_elided_outputs("compact-test")
+
+    def test_clean_strips_ansi_progress_and_repeats(self):
+        raw = "\x1b[31mERROR\x1b[0m\n" + "npm WARN deprecated glob@7\n" * 50 + "[##########----------] 50%\n10%\r60%\rdone"
+        cleaned = clean_output(raw)
+        self.assertNotIn("\x1b", cleaned)
+        self.assertNotIn("50%", cleaned)
+        self.assertIn("npm WARN deprecated glob@7\n... [line repeated 49 more times] ...", cleaned)
+        self.assertTrue(cleaned.endswith("done"))
+
+    def test_lines_differing_only_in_numbers_are_kept(self):
+        for raw in ("src/app.py:12: foo()\nsrc/app.py:48: foo()\nsrc/app.py:90: foo()",
+                    "FAILED test_case_1\nFAILED test_case_2\nFAILED test_case_3\nFAILED test_case_4"):
+            self.assertEqual(clean_output(raw), raw)
+
+    def test_uncleaned_output_can_be_fetched(self):
+        raw = "start\n" + "retrying...\n" * 5 + "end"
+        compacted, ref = compact_output(raw, 100, "compact-test")
+        self.assertIsNone(ref)
+        self.assertTrue(compacted.startswith("start\nretrying...\n... [line repeated 4 more times] ...\nend"))
+        raw_ref = list(ELIDED_OUTPUTS["compact-test"])[-1]
+        self.assertIn(f'ref="{raw_ref}"', compacted)
+        self.assertEqual(ELIDED_OUTPUTS["compact-test"][raw_ref], raw)
+        # Nothing dropped, nothing stored
+        self.assertEqual(compact_output("a\nb", 100, "compact-test"), ("a\nb", None))
+        self.assertEqual(len(ELIDED_OUTPUTS["compact-test"]), 1)
+
+    def test_small_output_untouched(self):
+        self.assertEqual(compact_output("all good", 100, "compact-test"), ("all good", None))
+
+    def test_large_output_keeps_head_tail_and_stores_rest(self):
+        text = "\n".join(f"test_{i} passed in {i}ms with details" for i in range(2000)) + "\nFAILED test_final"
+        compacted, ref = compact_output(text, 200, "compact-test", clean=False)
+        self.assertLessEqual(estimate_tokens(compacted), 260)
+        self.assertTrue(compacted.startswith("test_0 passed"))
+        self.assertTrue(compacted.endswith("FAILED test_final"))
+        self.assertIn(f'ref="{ref}"', compacted)
+        self.assertEqual(ELIDED_OUTPUTS["compact-test"][ref], text)
+
+    def test_compact_tools_wraps_and_adds_fetch(self):
+        big = "\n".join(f"line {i} " + chr(97 + i % 26) * 40 for i in range(3000))
+        tools = compact_tools([make_tool("run_command", big), make_tool("read_file", "a\na\na\na")], "compact-test", budgets={"run_command": 100})
+        self.assertEqual([t.name for t in tools], ["run_command", "read_file", "fetch_elided_output"])
+
+        # File contents are never cleaned, so repeated lines survive for exact edits
+        self.assertEqual(tools[1].run({"command": "x"}), "a\na\na\na")
+
+        compacted = tools[0].run({"command": "x"})
+        self.assertIn("elided", compacted)
+        ref = list(ELIDED_OUTPUTS["compact-test"])[-1]
+        page = tools[2].run({"ref": ref, "offset": 0, "limit_chars": 50})
+        self.assertTrue(page.startswith("line 0 "))
+        self.assertIn("continue with offset=50", page)
+        self.assertIn("Error", tools[2].run({"ref": "out-missing"}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import threading
+import time
+import unittest
+from typing import Any, List, Optional, Sequence
+from langchain.agents import create_tool_calling_agent
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.tools import StructuredTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from agent.workflow_pkg.agents import ConcurrentAgentExecutor
+
+class BatchChatModel(BaseChatModel):
+    """Returns all `calls` in its first turn, then finishes."""
+    calls: List[dict] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "batch"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _generate(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if any(isinstance(m, ToolMessage) for m in messages):
+            message = AIMessage(content="done")
+        else:
+            message = AIMessage(content="", tool_calls=[{**call, "id": f"call_{i}"} for i, call in enumerate(self.calls)])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+class TestConcurrentAgentExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.events = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+        def read_file(filepath: str) -> str:
+            """Reads a file."""
+            with self.lock:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            time.sleep(0.2)
+            with self.lock:
+                self.active -= 1
+                self.events.append(f"read {filepath}")
+            return f"contents of {filepath}"
+
+        def write_file(filepath: str, content: str) -> str:
+            """Writes a file."""
+            self.events.append(f"write {filepath}")
+            return f"wrote {filepath}"
+
+        self.tools = [
+            StructuredTool.from_function(func=read_file, name="read_file", description="Read a file"),
+            StructuredTool.from_function(func=write_file, name="write_file", description="Write a file"),
+        ]
+        self.prompt = ChatPromptTemplate.from_messages([("system", "Engineer"), ("human", "Go"), ("placeholder", "{agent_scratchpad}")])
+
+    def run_agent(self, calls, **kwargs):
+        agent = create_tool_calling_agent(BatchChatModel(calls=calls), self.tools, self.prompt)
+        executor = ConcurrentAgentExecutor(agent=agent, tools=self.tools, return_intermediate_steps=True, **kwargs)
+        return executor.invoke({})
+
+    def test_reads_run_concurrently_and_results_keep_call_order(self):
+        calls = [{"name": "read_file", "args": {"filepath": f"f{i}.py"}} for i in range(4)]
+        start = time.perf_counter()
+        result = self.run_agent(calls, max_concurrency=4)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(result["output"], "done")
+        self.assertEqual(self.peak, 4)
+        self.assertLess(elapsed, 0.6)
+        self.assertEqual([obs for _, obs in result["intermediate_steps"]], [f"contents of f{i}.py" for i in range(4)])
+
+    def test_writes_are_barriers(self):
+        calls = [
+            {"name": "write_file", "args": {"filepath": "a.py", "content": "x"}},
+            {"name": "read_file", "args": {"filepath": "b.py"}},
+            {"name": "write_file", "args": {"filepath": "c.py", "content": "y"}},
+            {"name": "read_file", "args": {"filepath": "d.py"}},
+        ]
+        result = self.run_agent(calls, max_concurrency=2)
+        self.assertEqual(self.events, ["write a.py", "read b.py", "write c.py", "read d.py"])
+        self.assertEqual([obs for _, obs in result["intermediate_steps"]], ["wrote a.py", "contents of b.py", "wrote c.py", "contents of d.py"])
+
+    def test_read_after_a_write_sees_the_write(self):
+        calls = [
+            {"name": "read_file", "args": {"filepath": "a.py"}},
+            {"name": "read_file", "args": {"filepath": "b.py"}},
+            {"name": "write_file", "args": {"filepath": "a.py", "content": "x"}},
+            {"name": "read_file", "args": {"filepath": "a.py"}},
+            {"name": "read_file", "args": {"filepath": "c.py"}},
+        ]
+        self.run_agent(calls, max_concurrency=4)
+        # Reads on either side of the write still run concurrently with each other
+        self.assertEqual(self.peak, 2)
+        self.assertEqual(sorted(self.events[:2]), ["read a.py", "read b.py"])
+        self.assertEqual(self.events[2], "write a.py")
+        self.assertEqual(sorted(self.events[3:]), ["read a.py", "read c.py"])
+
+    def test_concurrency_of_one_runs_serially(self):
+        calls = [{"name": "read_file", "args": {"filepath": f"f{i}.py"}} for i in range(3)]
+        self.run_agent(calls, max_concurrency=1)
+        self.assertEqual(self.peak, 1)
+        self.assertEqual(self.events, ["read f0.py", "read f1.py", "read f2.py"])
+
+if __name__ == '__main__':
+    unittest.main()
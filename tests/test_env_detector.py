@@ -0,0 +1,135 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from agent.tools.env_detector import InstallPlan, InstallStep, build_install_plan, detect_install_plan, has_setup_instructions, run_install_plan
+from agent.workflow_pkg.nodes.env_setup import env_setup_node
+from tests.test_symbol_index import RepoSandbox, git
+
+ALL_TOOLS = {"pnpm", "yarn", "npm", "pip", "poetry", "go", "corepack"}
+
+def commands(plan):
+    return [(" ".join(step.command), step.workdir) for step in plan.steps]
+
+class TestBuildInstallPlan(unittest.TestCase):
+
+    def test_pnpm_workspace_installs_once_at_root(self):
+        paths = ["package.json", "pnpm-lock.yaml", "apps/web/package.json", "packages/ui/package.json"]
+        plan = build_install_plan(paths, {"name": "root"}, True, ALL_TOOLS)
+        self.assertTrue(plan.confident)
+        self.assertEqual(commands(plan), [("pnpm install", ".")])
+
+    def test_npm_workspaces_field(self):
+        paths = ["package.json", "package-lock.json", "packages/a/package.json"]
+        plan = build_install_plan(paths, {"workspaces": ["packages/*"]}, False, ALL_TOOLS)
+        self.assertEqual(commands(plan), [("npm ci", ".")])
+
+    def test_monorepo_without_workspaces_installs_per_package(self):
+        paths = ["apps/api/package.json", "apps/api/yarn.lock", "apps/web/package.json", "apps/web/package-lock.json"]
+        plan = build_install_plan(paths, None, False, ALL_TOOLS)
+        self.assertEqual(commands(plan), [("yarn install", "apps/api"), ("npm ci", "apps/web")])
+
+    def test_npm_ci_only_next_to_a_lockfile(self):
+        plan = build_install_plan(["package.json", "package-lock.json", "docs/package.json"], None, False, ALL_TOOLS)
+        self.assertEqual(commands(plan), [("npm ci", "."), ("npm install", "docs")])
+
+    def test_mixed_ecosystems_and_skipped_dirs(self):
+        paths = ["pyproject.toml", "poetry.lock", "go.mod", "web/package.json", "web/node_modules/x/package.json",
+                 "examples/demo/requirements.txt"]
+        plan = build_install_plan(paths, None, False, ALL_TOOLS)
+        self.assertEqual(commands(plan), [("npm install", "web"), ("poetry install --no-interaction", "."), ("go mod download", ".")])
+
+    def test_package_manager_field_and_bootstrap(self):
+        plan = build_install_plan(["package.json"], {"packageManager": "pnpm@9.1.0"}, False, {"npm", "corepack"})
+        self.assertEqual(commands(plan), [("corepack enable", "."), ("pnpm install", ".")])
+
+    def test_unsure_cases(self):
+        self.assertFalse(build_install_plan(["pom.xml"], None, False, ALL_TOOLS).confident)
+        self.assertFalse(build_install_plan(["Cargo.toml"], None, False, ALL_TOOLS).confident)
+        plan = build_install_plan(["package.json"], {}, False, ALL_TOOLS, agents_md="Run `make bootstrap` first")
+        self.assertFalse(plan.confident)
+        many = [f"services/s{i}/go.mod" for i in range(12)]
+        self.assertFalse(build_install_plan(many, None, False, ALL_TOOLS).confident)
+
+    def test_agents_md_setup_instructions(self):
+        for agents_md in ("# Repo\n\n## Local Setup\nAsk in #dev.", "Before coding:\n```sh\npnpm install --frozen-lockfile\n```", "Run `./scripts/bootstrap.sh` once."):
+            self.assertTrue(has_setup_instructions(agents_md), agents_md)
+        # Passing mentions of installing or setting things up are not setup instructions
+        agents_md = "## Style\nDo not install new dependencies without asking.\nThe setup of the CI lives in `.github/`.\nRun `npm test` before committing."
+        self.assertFalse(has_setup_instructions(agents_md))
+        self.assertTrue(build_install_plan(["package.json"], {}, False, ALL_TOOLS, agents_md=agents_md).confident)
+
+    def test_nothing_to_install(self):
+        plan = build_install_plan(["README.md"], None, False, ALL_TOOLS)
+        self.assertTrue(plan.confident)
+        self.assertEqual(plan.steps, [])
+
+class TestDetectInstallPlan(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        git(self.root, "init", "-q")
+        files = {
+            "package.json": json.dumps({"name": "mono", "private": True}),
+            "pnpm-lock.yaml": "lockfileVersion: 9",
+            "pnpm-workspace.yaml": "packages: ['packages/*']",
+            "packages/ui/package.json": "{}",
+        }
+        for path, content in files.items():
+            os.makedirs(os.path.dirname(os.path.join(self.root, path)), exist_ok=True)
+            with open(os.path.join(self.root, path), "w") as f:
+                f.write(content)
+        git(self.root, "add", ".")
+        self.sandbox = RepoSandbox(self.root)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_scans_in_one_exec(self):
+        with patch.object(RepoSandbox, "execute", wraps=self.sandbox.execute) as spy:
+            plan = detect_install_plan(self.sandbox)
+        self.assertEqual(spy.call_count, 1)
+        if plan.confident:
+            self.assertEqual(plan.steps[-1].command, ["pnpm", "install"])
+        else:
+            self.assertEqual(plan.reason, "'pnpm' is not installed in the sandbox")
+
+    def test_run_install_plan_stops_at_first_failure(self):
+        plan = InstallPlan(steps=[InstallStep(["true"]), InstallStep(["false"]), InstallStep(["echo", "never"])])
+        ok, report = run_install_plan(self.sandbox, plan)
+        self.assertFalse(ok)
+        self.assertIn("$ true: ok", report)
+        self.assertNotIn("never", report)
+
+    @patch("agent.workflow_pkg.state.storage")
+    @patch("agent.workflow_pkg.nodes.env_setup.ConcurrentAgentExecutor")
+    @patch("agent.workflow_pkg.nodes.env_setup.get_llm")
+    def test_env_setup_fast_path_skips_llm(self, mock_llm, mock_executor, _storage):
+        plan = InstallPlan(steps=[InstallStep(["true"])])
+        state = {"session_id": "detect-session", "logs": [], "status": "ENV_SETUP"}
+        with patch("agent.workflow_pkg.nodes.env_setup.get_active_sandbox", return_value=self.sandbox), \
+             patch("agent.workflow_pkg.nodes.env_setup.detect_install_plan", return_value=plan):
+            state = env_setup_node(state)
+        mock_llm.assert_not_called()
+        mock_executor.assert_not_called()
+        self.assertEqual(state["status"], "PLANNING")
+
+    @patch("agent.workflow_pkg.state.storage")
+    @patch("agent.workflow_pkg.nodes.env_setup.create_tool_calling_agent")
+    @patch("agent.workflow_pkg.nodes.env_setup.ConcurrentAgentExecutor")
+    @patch("agent.workflow_pkg.nodes.env_setup.get_llm")
+    def test_env_setup_falls_back_to_agent_on_failure(self, mock_llm, mock_executor, _agent, _storage):
+        mock_executor.return_value.invoke.return_value = {"output": "SETUP_COMPLETE"}
+        plan = InstallPlan(steps=[InstallStep(["false"])])
+        state = {"session_id": "detect-session", "logs": [], "status": "ENV_SETUP"}
+        with patch("agent.workflow_pkg.nodes.env_setup.get_active_sandbox", return_value=self.sandbox), \
+             patch("agent.workflow_pkg.nodes.env_setup.detect_install_plan", return_value=plan):
+            state = env_setup_node(state)
+        inputs = mock_executor.return_value.invoke.call_args.args[0]
+        self.assertIn("automatic install was attempted and failed", inputs["failure_report"])
+        self.assertEqual(state["status"], "PLANNING")
+
+if __name__ == '__main__':
+    unittest.main()
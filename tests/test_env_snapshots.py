@@ -0,0 +1,147 @@
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from agent.common.repo_cache import FileRepoCache
+from agent.sandbox.daytona import DaytonaSandbox
+from agent.sandbox.snapshots import find_env_snapshot, lockfile_hash, snapshot_environment
+from agent.tools.git_tools import init_workspace
+from agent.workflow_pkg.nodes.env_setup import env_setup_node
+from tests.test_sandbox_batch import LocalShellSandbox
+from tests.test_symbol_index import RepoSandbox, git
+
+REPO = "https://github.com/acme/app.git"
+
+class TestEnvSnapshots(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = FileRepoCache(os.path.join(self.tmp.name, "cache"))
+        self.root = os.path.join(self.tmp.name, "repo")
+        os.makedirs(os.path.join(self.root, "web"))
+        git(self.root, "init", "-q")
+        for path, content in [("web/package-lock.json", "{}"), ("poetry.lock", "a"), ("README.md", "x")]:
+            with open(os.path.join(self.root, path), "w") as f:
+                f.write(content)
+        git(self.root, "add", ".")
+        self.sandbox = RepoSandbox(self.root)
+        patcher = patch("agent.sandbox.snapshots.repo_cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_lockfile_hash_tracks_lockfiles_only(self):
+        first = lockfile_hash(self.sandbox)
+        self.assertEqual(len(first), 64)
+        with open(os.path.join(self.root, "README.md"), "w") as f:
+            f.write("changed")
+        self.assertEqual(lockfile_hash(self.sandbox), first)
+        with open(os.path.join(self.root, "web/package-lock.json"), "w") as f:
+            f.write('{"v": 2}')
+        self.assertNotEqual(lockfile_hash(self.sandbox), first)
+
+    def test_no_lockfiles(self):
+        git(self.root, "rm", "-q", "--cached", "web/package-lock.json", "poetry.lock")
+        self.assertIsNone(lockfile_hash(self.sandbox))
+
+    def test_snapshot_registers_and_scrubs_credentials(self):
+        sandbox = MagicMock()
+        sandbox.create_snapshot.return_value = True
+        name = snapshot_environment(sandbox, REPO, "f" * 64)
+        commands = [c.args[0] for c in sandbox.execute.call_args_list]
+        self.assertIn("mv ~/.git-credentials ~/.git-credentials.swe-bak", commands[0])
+        self.assertIn("mv ~/.git-credentials.swe-bak ~/.git-credentials", commands[1])
+        self.assertEqual(find_env_snapshot(REPO)["name"], name)
+        self.assertEqual(find_env_snapshot("git@github.com:acme/app.git", "f" * 64)["lock_hash"], "f" * 64)
+
+        sandbox.create_snapshot.return_value = False
+        self.assertIsNone(snapshot_environment(sandbox, REPO, "e" * 64))
+        self.assertIsNone(find_env_snapshot(REPO, "e" * 64))
+
+    def test_daytona_create_snapshot(self):
+        sandbox = DaytonaSandbox("snap-session")
+        self.assertFalse(sandbox.create_snapshot("x"))
+        sandbox.sandbox = MagicMock()
+        self.assertTrue(sandbox.create_snapshot("swe-env-x"))
+        sandbox.sandbox.create_snapshot.assert_called_once()
+        sandbox.sandbox.create_snapshot.side_effect = RuntimeError("quota")
+        self.assertFalse(sandbox.create_snapshot("swe-env-y"))
+
+    @patch("agent.workflow_pkg.state.storage")
+    @patch("agent.workflow_pkg.nodes.env_setup.ConcurrentAgentExecutor")
+    @patch("agent.workflow_pkg.nodes.env_setup.get_llm")
+    def test_env_setup_skips_install_when_hash_matches(self, mock_llm, mock_executor, _storage):
+        state = {"session_id": "snap-session", "repo_url": REPO, "logs": [], "status": "ENV_SETUP",
+                 "env_snapshot_hash": lockfile_hash(self.sandbox)}
+        with patch("agent.workflow_pkg.nodes.env_setup.get_active_sandbox", return_value=self.sandbox):
+            state = env_setup_node(state)
+        mock_executor.assert_not_called()
+        self.assertEqual(state["status"], "PLANNING")
+        self.assertIn("Skipping dependency install", state["logs"][-1])
+
+class WorkspaceSandbox(LocalShellSandbox):
+    def __init__(self, root):
+        super().__init__()
+        self.root = root
+    def get_root_path(self):
+        return self.root
+
+class TestSnapshotClone(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.remote = os.path.join(self.tmp.name, "remote", "app.git")
+        os.makedirs(self.remote)
+        git(self.remote, "init", "-q", "-b", "main")
+        git(self.remote, "config", "user.email", "dev@example.com")
+        git(self.remote, "config", "user.name", "Dev")
+        self.commit("poetry.lock", "v1", "init")
+        git(self.remote, "branch", "develop")
+
+        # The clone as it was baked into the environment snapshot
+        self.workspace = os.path.join(self.tmp.name, "workspace")
+        os.makedirs(self.workspace)
+        git(self.workspace, "clone", "-q", self.remote, "app")
+        git(os.path.join(self.workspace, "app"), "checkout", "-q", "develop")
+        self.snapshot_hash = lockfile_hash(RepoSandbox(os.path.join(self.workspace, "app")))
+
+        # The remote moved on after the snapshot
+        self.commit("poetry.lock", "v2", "bump deps")
+        git(self.remote, "checkout", "-q", "develop")
+        self.commit("poetry.lock", "v3", "bump deps on develop")
+        git(self.remote, "checkout", "-q", "main")
+
+    def commit(self, path, content, message):
+        with open(os.path.join(self.remote, path), "w") as f:
+            f.write(content)
+        git(self.remote, "add", path)
+        git(self.remote, "commit", "-q", "-m", message)
+
+    def head(self, ref="HEAD"):
+        return subprocess.run(["git", "rev-parse", ref], cwd=os.path.join(self.workspace, "app"), capture_output=True, text=True).stdout.strip()
+
+    def remote_head(self, branch):
+        return subprocess.run(["git", "rev-parse", branch], cwd=self.remote, capture_output=True, text=True).stdout.strip()
+
+    def test_stale_clone_is_moved_to_the_remote_tip(self):
+        for base_branch in ("develop", None):
+            sandbox = WorkspaceSandbox(self.workspace)
+            output = init_workspace(sandbox, self.remote, base_branch, sync=True)
+            self.assertIn("Updated existing clone to the remote tip", output)
+            self.assertEqual(self.head(), self.remote_head(base_branch or "main"))
+            with open(os.path.join(self.workspace, "app", "poetry.lock")) as f:
+                self.assertEqual(f.read(), "v3" if base_branch else "v2")
+            # The lockfiles changed upstream, so the snapshot's install must not be reused
+            self.assertNotEqual(lockfile_hash(sandbox), self.snapshot_hash)
+
+    def test_missing_base_branch_falls_back_to_the_default(self):
+        output = init_workspace(WorkspaceSandbox(self.workspace), self.remote, "gone", sync=True)
+        self.assertIn("Warning: Base branch 'gone' not found", output)
+        self.assertEqual(self.head(), self.remote_head("main"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch
+from agent.agent import AgentManager
+from agent.sandbox.memory import InMemorySandbox
+from agent.workflow_pkg.manager import WorkflowManager
+from agent.workflow_pkg.nodes.fast_path import PYTHON_PARSE_CHECK, changed_line_count, classify_pipeline, fast_branch_name, fast_verify_node
+from tests.helpers import use_temp_storage
+
+SESSION = "fast-path-session"
+
+def make_state(goal, **extra):
+    state = {"session_id": SESSION, "goal": goal, "repo_url": "", "base_branch": None, "workspace_path": "/workspace",
+             "plan": None, "current_step": 0, "review_feedback": None, "plan_critic_feedback": None,
+             "status": "PLANNING", "logs": [], "mode": "auto", "review_count": 0}
+    state.update(extra)
+    return state
+
+class TestClassifier(unittest.TestCase):
+
+    def setUp(self):
+        use_temp_storage(self)
+
+    def test_small_goals_take_the_fast_path(self):
+        for goal in ("Fix the typo in README.md", "Update the copyright year in the LICENSE", "Reword the docstring of parse()"):
+            self.assertEqual(classify_pipeline(make_state(goal)), "fast", goal)
+
+    def test_everything_else_takes_the_full_pipeline(self):
+        for goal in ("Add retry support to the HTTP client", "Fix the typo in README.md and add tests for it", "Document the API endpoints", "x" * 300):
+            self.assertEqual(classify_pipeline(make_state(goal)), "full", goal)
+        self.assertEqual(classify_pipeline(make_state("Fix the typo in README.md", mode="review")), "full")
+        self.assertEqual(classify_pipeline(make_state("Fix the typo in README.md", plan="1. Fix it")), "full")
+        with patch("agent.workflow_pkg.nodes.fast_path.settings.FAST_PATH_CLASSIFIER", "off"):
+            self.assertEqual(classify_pipeline(make_state("Fix the typo in README.md")), "full")
+
+    def test_branch_name_follows_the_convention(self):
+        self.assertEqual(fast_branch_name("Fix the typo in README.md!", "42"), "docs/fix-the-typo-in-readme-md-42")
+        self.assertEqual(fast_branch_name("Correct spelling of 'receive'", "42"), "chore/correct-spelling-of-receive-42")
+
+class TestFastVerify(unittest.TestCase):
+
+    def setUp(self):
+        use_temp_storage(self)
+        self.sandbox = InMemorySandbox({"README.md": "# Hello\n"})
+        AgentManager().register_sandbox(SESSION, self.sandbox)
+        self.addCleanup(AgentManager().unregister_sandbox, SESSION)
+
+    def verify(self, numstat, names):
+        self.sandbox.respond(r"--numstat", numstat)
+        self.sandbox.respond(r"--name-only", names)
+        return fast_verify_node(make_state("Fix the typo in README.md", status="TESTING", pipeline="fast", plan="Fixed it"))
+
+    def test_small_change_proceeds_to_submission(self):
+        state = self.verify("1\t1\tREADME.md\n2\t0\tsrc/app.py\n", "README.md\nsrc/app.py\n")
+        self.assertEqual(state["status"], "SUBMITTING")
+        self.assertIn(f"{PYTHON_PARSE_CHECK} src/app.py", self.sandbox.commands)
+
+    def test_missing_or_large_changes_escalate(self):
+        for numstat, names in (("", ""), ("90\t10\tREADME.md\n", "README.md\n"), ("-\t-\tlogo.png\n", "logo.png\n")):
+            state = self.verify(numstat, names)
+            self.assertEqual((state["status"], state["pipeline"], state["plan"]), ("ENV_SETUP", "full", None))
+            self.sandbox._responses.clear()
+
+    def test_changed_file_that_does_not_parse_escalates(self):
+        self.sandbox.respond(r"ast\.parse", "SyntaxError: invalid syntax", exit_code=1)
+        state = self.verify("1\t0\tsrc/app.py\n", "src/app.py\n")
+        self.assertEqual(state["status"], "ENV_SETUP")
+        self.assertIn("SyntaxError", state["logs"][-1])
+
+    def test_parse_check_writes_no_bytecode(self):
+        with tempfile.TemporaryDirectory() as root:
+            with open(os.path.join(root, "good.py"), "w") as f:
+                f.write("x = 1\n")
+            with open(os.path.join(root, "bad.py"), "w") as f:
+                f.write("def broken(:\n")
+            check = lambda name: subprocess.run(f"{PYTHON_PARSE_CHECK} {name}", shell=True, cwd=root, capture_output=True, text=True)
+            self.assertEqual(check("good.py").returncode, 0)
+            failed = check("bad.py")
+            self.assertNotEqual(failed.returncode, 0)
+            self.assertIn("SyntaxError", failed.stderr)
+            self.assertEqual(sorted(os.listdir(root)), ["bad.py", "good.py"])
+
+    def test_changed_line_count(self):
+        self.assertEqual(changed_line_count("3\t1\ta.py\n0\t2\tb.md\n"), 6)
+        self.assertIsNone(changed_line_count("-\t-\timg.png\n"))
+
+class TestFastGraph(unittest.TestCase):
+
+    def setUp(self):
+        use_temp_storage(self)
+
+    @patch("agent.workflow_pkg.manager.planner_node")
+    @patch("agent.workflow_pkg.manager.env_setup_node")
+    @patch("agent.workflow_pkg.manager.submit_node")
+    @patch("agent.workflow_pkg.manager.fast_verify_node")
+    @patch("agent.workflow_pkg.manager.fast_programmer_node")
+    @patch("agent.workflow_pkg.manager.initializer_node")
+    def test_small_goal_skips_the_full_pipeline(self, mock_init, mock_fast_programmer, mock_fast_verify, mock_submit, mock_env_setup, mock_planner):
+        transitions = {mock_init: "PLANNING", mock_fast_programmer: "TESTING", mock_fast_verify: "SUBMITTING", mock_submit: "COMPLETED"}
+        for node, status in transitions.items():
+            node.side_effect = lambda state, status=status: {**state, "status": status, "codebase_tree": "tree"}
+
+        final_state = WorkflowManager().run_workflow_sync(make_state("Fix the typo in README.md"))
+        self.assertEqual((final_state["status"], final_state["pipeline"]), ("COMPLETED", "fast"))
+        for node in transitions:
+            node.assert_called_once()
+        mock_env_setup.assert_not_called()
+        mock_planner.assert_not_called()
+
+    @patch("agent.workflow_pkg.manager.branch_naming_node")
+    @patch("agent.workflow_pkg.manager.plan_critic_node")
+    @patch("agent.workflow_pkg.manager.planner_node")
+    @patch("agent.workflow_pkg.manager.env_setup_node")
+    @patch("agent.workflow_pkg.manager.fast_programmer_node")
+    @patch("agent.workflow_pkg.manager.initializer_node")
+    def test_escalation_continues_in_the_full_graph(self, mock_init, mock_fast_programmer, mock_env_setup, mock_planner, mock_critic, mock_branch_naming):
+        mock_init.side_effect = lambda state: {**state, "status": "PLANNING", "codebase_tree": "tree"}
+        mock_fast_programmer.side_effect = lambda state: {**state, "status": "ENV_SETUP", "pipeline": "full"}
+        mock_env_setup.side_effect = lambda state: {**state, "status": "PLANNING"}
+        mock_planner.side_effect = lambda state: {**state, "status": "PLAN_CRITIC", "plan": "1. Fix it"}
+        mock_critic.side_effect = lambda state: {**state, "status": "FAILED"}
+        mock_branch_naming.side_effect = lambda state: {**state, "status": "CODING", "branch_name": "docs/fix"}
+
+        final_state = WorkflowManager().run_workflow_sync(make_state("Fix the typo in README.md"))
+        self.assertEqual(final_state["status"], "FAILED")
+        mock_env_setup.assert_called_once()
+        mock_planner.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
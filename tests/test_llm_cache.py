@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import HumanMessage
+from langchain_core.outputs import Generation
+from agent.agent import AgentManager
+from agent.common.llm import get_llm
+from agent.common.llm_cache import SQLiteLLMCache, cache_enabled_for
+
+class TestSQLiteLLMCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = SQLiteLLMCache(os.path.join(self.tmp.name, "llm.sqlite"), max_entries=2)
+
+    def test_repeated_prompt_is_served_from_cache(self):
+        llm = FakeListChatModel(responses=["feat/add-parser", "fix/something-else"], cache=self.cache)
+        messages = [HumanMessage(content="Name a branch for: add a parser")]
+        self.assertEqual(llm.invoke(messages).content, "feat/add-parser")
+        self.assertEqual(llm.invoke(messages).content, "feat/add-parser")
+        self.assertEqual(llm.invoke([HumanMessage(content="Name a branch for: fix a bug")]).content, "fix/something-else")
+        # A new cache object on the same file sees the entries (resumes, replays)
+        reopened = FakeListChatModel(responses=["feat/add-parser", "fix/something-else"], cache=SQLiteLLMCache(self.cache.path))
+        reopened.i = 1
+        self.assertEqual(reopened.invoke(messages).content, "feat/add-parser")
+
+    def test_least_recently_used_entry_is_evicted(self):
+        for prompt in ("a", "b"):
+            self.cache.update(prompt, "model", [Generation(text=prompt.upper())])
+        self.cache.lookup("a", "model")
+        self.cache.update("c", "model", [Generation(text="C")])
+        self.assertEqual(self.cache.size(), 2)
+        self.assertIsNone(self.cache.lookup("b", "model"))
+        self.assertEqual(self.cache.lookup("a", "model")[0].text, "A")
+        self.assertIsNone(self.cache.lookup("a", "other-model"))
+        self.cache.clear()
+        self.assertEqual(self.cache.size(), 0)
+
+class TestNodeFlags(unittest.TestCase):
+
+    def test_cache_is_opt_in_per_node(self):
+        with patch("agent.common.llm_cache.settings") as settings:
+            settings.LLM_CACHE_ENABLED = False
+            settings.LLM_CACHE_NODES = "*"
+            self.assertFalse(cache_enabled_for("planner"))
+            settings.LLM_CACHE_ENABLED = True
+            self.assertTrue(cache_enabled_for("programmer"))
+            settings.LLM_CACHE_NODES = "branch_naming, submit"
+            self.assertTrue(cache_enabled_for("submit"))
+            self.assertFalse(cache_enabled_for("programmer"))
+            self.assertFalse(cache_enabled_for(None))
+
+    def test_get_llm_attaches_cache(self):
+        manager = AgentManager()
+        manager.register_ai_config("s-cache", SimpleNamespace(provider="openai", model="gpt-4o", api_key="sk-test", base_url=None))
+        self.addCleanup(manager.unregister_ai_config, "s-cache")
+        cache = SQLiteLLMCache(":memory:")
+        with patch("agent.common.llm.cache_enabled_for", side_effect=lambda node: node == "branch_naming"), \
+             patch("agent.common.llm.get_llm_cache", return_value=cache):
+            cached = get_llm("s-cache", "branch_naming")
+            uncached = get_llm("s-cache", "programmer")
+        self.assertIs(cached.cache, cache)
+        self.assertIsNone(uncached.cache)
+        # The session-scoped cache key would make cached entries session-specific
+        self.assertNotIn("prompt_cache_key", cached.model_kwargs)
+        self.assertEqual(uncached.model_kwargs, {"prompt_cache_key": "s-cache"})
+
+if __name__ == '__main__':
+    unittest.main()
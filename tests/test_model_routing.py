@@ -0,0 +1,72 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+from langchain_core.messages import HumanMessage, SystemMessage
+from agent.agent import AgentManager
+from agent.callbacks import UsageCallbackHandler
+from agent.common.llm import get_llm, resolve_model
+from agent.common.usage import clear_usage, format_usage, get_usage, record_usage
+
+SESSION = "routing-session"
+
+def config(**extra):
+    return SimpleNamespace(provider="scripted", model="large-model", api_key=None, base_url=None, **extra)
+
+class TestResolveModel(unittest.TestCase):
+
+    def test_nodes_use_their_role_model(self):
+        ai_config = config(models={"small": "small-model"})
+        self.assertEqual(resolve_model(ai_config, "branch_naming"), ("small-model", "small"))
+        self.assertEqual(resolve_model(ai_config, "submit"), ("small-model", "small"))
+        # No "large" model configured, so the programmer keeps the config's model
+        self.assertEqual(resolve_model(ai_config, "programmer"), ("large-model", "default"))
+        self.assertEqual(resolve_model(ai_config, None), ("large-model", "default"))
+
+    def test_node_overrides_win(self):
+        ai_config = config(models={"small": "small-model"}, node_models={"planner": "small", "reviewer": "reasoning-model"})
+        self.assertEqual(resolve_model(ai_config, "planner"), ("small-model", "small"))
+        self.assertEqual(resolve_model(ai_config, "reviewer"), ("reasoning-model", "reasoning-model"))
+
+    def test_role_models_from_the_environment(self):
+        with patch("agent.common.llm.settings.LLM_ROLE_MODELS", "small=env-small"):
+            self.assertEqual(resolve_model(config(), "plan_critic"), ("env-small", "small"))
+            self.assertEqual(resolve_model(config(models={"small": "own-small"}), "plan_critic"), ("own-small", "small"))
+        self.assertEqual(resolve_model(config(), "plan_critic"), ("large-model", "default"))
+
+class TestPerRoleUsage(unittest.TestCase):
+
+    def setUp(self):
+        AgentManager().register_ai_config(SESSION, config(models={"small": "small-model"}))
+        self.addCleanup(AgentManager().unregister_ai_config, SESSION)
+        self.addCleanup(clear_usage, SESSION)
+
+    @patch("agent.common.usage.settings.LLM_PRICES", "small-model=0.5/1.5,large-model=5/15")
+    def test_calls_are_totalled_per_role(self):
+        handler = UsageCallbackHandler(SESSION)
+        for node, marker in (("branch_naming", "Branch Name"), ("submit", "Commit Message"), ("programmer", "Software Engineer")):
+            llm = get_llm(SESSION, node)
+            self.assertEqual(llm.metadata["model_role"], "small" if node != "programmer" else "default")
+            llm.invoke([SystemMessage(content=marker), HumanMessage(content="Go")], config={"callbacks": [handler]})
+
+        usage = get_usage(SESSION)
+        self.assertEqual(usage["calls"], 3)
+        self.assertEqual({role: stats["calls"] for role, stats in usage["roles"].items()}, {"small": 2, "default": 1})
+        self.assertEqual(usage["roles"]["small"]["model"], "small-model")
+        self.assertGreaterEqual(usage["roles"]["small"]["latency_ms"], 0)
+        self.assertIn("cost_usd", usage["roles"]["default"])
+
+        report = format_usage(usage)
+        self.assertIn("small (small-model): 2 calls", report)
+        self.assertIn("default (large-model): 1 calls", report)
+
+    def test_cost_from_prices(self):
+        with patch("agent.common.usage.settings.LLM_PRICES", "small-model=0.5/1.5"):
+            record_usage(SESSION, {"prompt_tokens": 2_000_000, "completion_tokens": 1_000_000}, role="small", model="small-model", latency_ms=120.0)
+            record_usage(SESSION, {"prompt_tokens": 1000, "completion_tokens": 10}, role="default", model="unpriced-model", latency_ms=900.0)
+        usage = get_usage(SESSION)
+        self.assertAlmostEqual(usage["roles"]["small"]["cost_usd"], 2.5)
+        self.assertNotIn("cost_usd", usage["roles"]["default"])
+        self.assertIn("120 ms per call, $2.5000", format_usage(usage))
+
+if __name__ == '__main__':
+    unittest.main()
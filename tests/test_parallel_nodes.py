@@ -0,0 +1,138 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from agent.workflow_pkg.manager import WorkflowManager
+from agent.workflow_pkg.parallel import Branch, parallel_node
+from agent.workflow_pkg.state import log_update
+from tests.helpers import use_temp_storage
+
+def make_state(**extra):
+    state = {"session_id": "parallel-session", "goal": "Add retry support", "repo_url": "", "base_branch": None,
+             "workspace_path": "/workspace", "plan": None, "current_step": 0, "review_feedback": None,
+             "plan_critic_feedback": None, "status": "ENV_SETUP", "logs": ["started"], "mode": "auto",
+             "codebase_tree": "tree"}
+    state.update(extra)
+    return state
+
+class TestParallelNode(unittest.TestCase):
+
+    def setUp(self):
+        self.storage = use_temp_storage(self)
+
+    def test_branches_run_concurrently_and_merge_their_fields(self):
+        threads = set()
+
+        def slow(field, value, delay):
+            def node(state):
+                threads.add(threading.get_ident())
+                time.sleep(delay)
+                state[field] = value
+                state["logs"].append(f"{field} done")
+                state["status"] = field.upper()
+                return state
+            return node
+
+        node = parallel_node((
+            Branch("first", slow("plan", "1. Do it", 0.3), writes=("plan",)),
+            Branch("second", slow("env_snapshot_hash", "abc", 0.1), writes=("env_snapshot_hash",)),
+        ), status=lambda results: results["first"]["status"])
+
+        start = time.perf_counter()
+        state = node(make_state())
+        self.assertLess(time.perf_counter() - start, 0.38)
+        self.assertEqual(len(threads), 2)
+        self.assertEqual((state["plan"], state["env_snapshot_hash"], state["status"]), ("1. Do it", "abc", "PLAN"))
+        # Branch order, not completion order
+        self.assertEqual(state["logs"], ["started", "plan done", "env_snapshot_hash done"])
+
+    def test_undeclared_and_overlapping_writes_are_rejected(self):
+        def writes_goal(state):
+            state["goal"] = "something else"
+            return state
+
+        node = parallel_node((Branch("rogue", writes_goal, writes=("plan",)),), status=lambda results: "PLANNING")
+        with self.assertRaises(ValueError):
+            node(make_state())
+        with self.assertRaises(ValueError):
+            parallel_node((Branch("a", writes_goal, writes=("plan",)), Branch("b", writes_goal, writes=("plan",))), status=lambda results: "PLANNING")
+
+    def test_skipped_branches(self):
+        node = parallel_node((
+            Branch("always", lambda state: {**state, "status": "A"}, writes=()),
+            Branch("auto_only", lambda state: {**state, "branch_name": "feature/x"}, writes=("branch_name",), when=lambda state: state["mode"] == "auto"),
+        ), status=lambda results: ",".join(sorted(results)))
+        state = node(make_state(mode="review"))
+        self.assertEqual(state["status"], "always")
+        self.assertNotIn("branch_name", state)
+
+    def test_only_the_merged_state_is_saved(self):
+        saved = []
+        self.storage.save_state = lambda session_id, state: saved.append(dict(state))
+
+        def writer(field, value):
+            def node(state):
+                state[field] = value
+                log_update(state, f"{field} done")
+                return state
+            return node
+
+        node = parallel_node((
+            Branch("first", writer("plan", "1. Do it"), writes=("plan",)),
+            Branch("second", writer("env_snapshot_hash", "abc"), writes=("env_snapshot_hash",)),
+        ), status=lambda results: "PLAN_CRITIC")
+        node(make_state())
+        self.assertEqual([(state["plan"], state["env_snapshot_hash"]) for state in saved], [("1. Do it", "abc")])
+        self.assertEqual(sorted(self.storage.get_logs("parallel-session")), ["env_snapshot_hash done", "plan done"])
+
+    def test_writes_of_branches_not_kept_are_dropped(self):
+        node = parallel_node((
+            Branch("critic", lambda state: {**state, "status": "PLANNING"}, writes=()),
+            Branch("naming", lambda state: {**state, "branch_name": "feature/x"}, writes=("branch_name",),
+                   keep=lambda results: results["critic"]["status"] == "BRANCH_NAMING"),
+        ), status=lambda results: results["critic"]["status"])
+        state = node(make_state())
+        self.assertEqual(state["status"], "PLANNING")
+        self.assertNotIn("branch_name", state)
+
+class TestParallelGraph(unittest.TestCase):
+
+    def setUp(self):
+        use_temp_storage(self)
+
+    @patch("agent.workflow_pkg.manager.programmer_node")
+    @patch("agent.workflow_pkg.manager.branch_naming_node")
+    @patch("agent.workflow_pkg.manager.plan_critic_node")
+    @patch("agent.workflow_pkg.manager.planner_node")
+    @patch("agent.workflow_pkg.manager.env_setup_node")
+    @patch("agent.workflow_pkg.manager.initializer_node")
+    def test_independent_nodes_join_before_the_programmer(self, mock_init, mock_env_setup, mock_planner, mock_critic, mock_branch_naming, mock_programmer):
+        verdicts = iter(["Step 2 is missing", "APPROVED"])
+
+        def critic(state):
+            verdict = next(verdicts)
+            approved = verdict == "APPROVED"
+            return {**state, "status": "BRANCH_NAMING" if approved else "PLANNING", "plan_critic_feedback": None if approved else verdict}
+
+        mock_init.side_effect = lambda state: {**state, "status": "PLANNING", "codebase_tree": "tree"}
+        mock_env_setup.side_effect = lambda state: {**state, "status": "PLANNING", "env_snapshot_hash": "abc"}
+        mock_planner.side_effect = lambda state: {**state, "status": "PLAN_CRITIC", "plan": f"plan {mock_planner.call_count}"}
+        mock_critic.side_effect = critic
+        # Like branch_naming_node, an existing name is kept
+        mock_branch_naming.side_effect = lambda state: {**state, "status": "CODING", "branch_name": state.get("branch_name") or f"feature/{state['plan'].replace(' ', '-')}"}
+
+        def programmer(state):
+            self.seen = dict(state)
+            return {**state, "status": "FAILED"}
+        mock_programmer.side_effect = programmer
+
+        WorkflowManager().run_workflow_sync(make_state(status="PLANNING", codebase_tree=None))
+        mock_env_setup.assert_called_once()
+        self.assertEqual(mock_planner.call_count, 2)
+        # Named alongside each critic pass, for the plan that pass approved; the programmer sees every branch's writes
+        self.assertEqual(mock_branch_naming.call_count, 2)
+        self.assertEqual((self.seen["plan"], self.seen["env_snapshot_hash"], self.seen["branch_name"]), ("plan 2", "abc", "feature/plan-2"))
+        self.assertIsNone(self.seen["plan_critic_feedback"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from unittest.mock import patch
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from agent.callbacks import UsageCallbackHandler
+from agent.common.prompt_layout import PromptLayout
+from agent.common.usage import clear_usage, extract_usage, format_usage, get_usage
+from agent.workflow_pkg.nodes.planner import planner_node
+from agent.workflow_pkg.nodes.tester import interpret_failures
+
+STATE = {
+    "session_id": "s1",
+    "goal": "Fix the {parser}",
+    "repo_url": "https://github.com/acme/app",
+    "base_branch": "main",
+    "plan": "1. Edit parse()",
+    "agents_md_content": "Run make lint.",
+    "codebase_tree": "src/\n  parse.py",
+    "plan_critic_feedback": None,
+    "pending_inputs": [],
+}
+
+class RecordingChatModel(FakeListChatModel):
+    prompts: list = []
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs):
+        self.prompts.append(messages)
+        return super()._call(messages, stop, run_manager, **kwargs)
+
+class TestPromptLayout(unittest.TestCase):
+
+    def test_stable_blocks_come_first(self):
+        layout = PromptLayout().volatile("Fix {this} now").task(STATE).instructions("You are a reviewer.").repo(STATE)
+        messages = layout.to_prompt().invoke({}).to_messages()
+        system, human = messages[0].content, messages[1].content
+        positions = [system.index(text) for text in ("Run make lint.", "src/", "You are a reviewer.", "Goal: Fix the {parser}", "1. Edit parse()")]
+        self.assertEqual(positions, sorted(positions))
+        self.assertEqual(human, "Fix {this} now")
+        self.assertIn("agent_scratchpad", layout.to_prompt(scratchpad=True).partial_variables)
+
+    def test_nodes_share_the_repo_prefix(self):
+        first, _ = PromptLayout().repo(STATE).instructions("Role A").sections()
+        second, _ = PromptLayout().repo(STATE).instructions("Role B").sections()
+        self.assertEqual(first[:first.index("Role A")], second[:second.index("Role B")])
+
+    @patch("agent.workflow_pkg.state.storage")
+    def test_planner_and_tester_prompts(self, _storage):
+        llm = RecordingChatModel(responses=["1. Do it", "TESTS_FAILED: parse() breaks"], prompts=[])
+        state = dict(STATE, plan=None, plan_critic_feedback="Too vague", logs=[])
+        with patch("agent.workflow_pkg.nodes.planner.get_llm", return_value=llm), \
+             patch("agent.workflow_pkg.nodes.planner.get_active_sandbox"), \
+             patch("agent.workflow_pkg.nodes.planner.get_session_callbacks", return_value=[]):
+            planner_node(state)
+        self.assertEqual(state["plan"], "1. Do it")
+        with patch("agent.workflow_pkg.nodes.tester.get_llm", return_value=llm), \
+             patch("agent.workflow_pkg.nodes.tester.get_session_callbacks", return_value=[]):
+            self.assertEqual(interpret_failures(state, ["$ pytest (exit code 1)"]), "TESTS_FAILED: parse() breaks")
+
+        planner, tester = llm.prompts
+        self.assertIn("Too vague", planner[1].content)
+        self.assertNotIn("Too vague", planner[0].content)
+        self.assertIn("1. Do it", tester[0].content)
+        self.assertIn("$ pytest (exit code 1)", tester[1].content)
+        prefix = planner[0].content[:planner[0].content.index("You are a Senior")]
+        self.assertTrue(tester[0].content.startswith(prefix))
+
+class TestUsage(unittest.TestCase):
+
+    def test_openai_token_usage(self):
+        response = LLMResult(generations=[[]], llm_output={"token_usage": {"prompt_tokens": 1200, "completion_tokens": 50, "prompt_tokens_details": {"cached_tokens": 1024}}})
+        self.assertEqual(extract_usage(response), {"prompt_tokens": 1200, "completion_tokens": 50, "cached_tokens": 1024})
+
+    def test_response_metadata_usage(self):
+        message = AIMessage(content="ok", response_metadata={"usage_metadata": {"prompt_token_count": 900, "candidates_token_count": 20, "cached_content_token_count": 512}})
+        response = LLMResult(generations=[[ChatGeneration(message=message)]])
+        self.assertEqual(extract_usage(response), {"prompt_tokens": 900, "completion_tokens": 20, "cached_tokens": 512})
+        self.assertEqual(extract_usage(LLMResult(generations=[[]])), {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0})
+
+    def test_session_totals(self):
+        self.addCleanup(clear_usage, "s-usage")
+        handler = UsageCallbackHandler("s-usage")
+        for cached in (0, 1024):
+            handler.on_llm_end(LLMResult(generations=[[]], llm_output={"token_usage": {"prompt_tokens": 2048, "completion_tokens": 10, "prompt_tokens_details": {"cached_tokens": cached}}}))
+        usage = get_usage("s-usage")
+        self.assertEqual(usage, {"calls": 2, "prompt_tokens": 4096, "completion_tokens": 20, "cached_tokens": 1024})
+        self.assertIn("1024 cached (25% from prompt cache)", format_usage(usage))
+        clear_usage("s-usage")
+        self.assertEqual(get_usage("s-usage"), {})
+
+if __name__ == '__main__':
+    unittest.main()
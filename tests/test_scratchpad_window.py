@@ -0,0 +1,94 @@
+import unittest
+from typing import Any, List, Optional, Sequence
+from langchain.agents import AgentExecutor
+from langchain.agents.output_parsers.tools import ToolAgentAction
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.tools import StructuredTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from agent.tools.compaction import ELIDED_OUTPUTS, clear_elided_outputs, estimate_tokens
+from agent.workflow_pkg.agents import ScratchpadWindow, create_bounded_tool_calling_agent
+
+SESSION = "scratchpad-test"
+
+def step(i, output, tool="read_file", args=None):
+    args = args or {"filepath": f"src/file_{i}.py"}
+    call_id = f"call_{i}"
+    message = AIMessage(content="", tool_calls=[{"name": tool, "args": args, "id": call_id}])
+    return ToolAgentAction(tool=tool, tool_input=args, log="", message_log=[message], tool_call_id=call_id), output
+
+class ReadingChatModel(BaseChatModel):
+    """Reads `reads` files one per turn, then finishes. Records the size of every prompt."""
+    reads: int = 8
+    prompt_tokens: List[int] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "reading"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _generate(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.prompt_tokens.append(sum(estimate_tokens(str(m.content)) for m in messages))
+        done = sum(1 for m in messages if isinstance(m, ToolMessage))
+        if done < self.reads:
+            message = AIMessage(content="", tool_calls=[{"name": "read_file", "args": {"filepath": f"src/file_{done}.py"}, "id": f"call_{done}"}])
+        else:
+            message = AIMessage(content="CHANGES_COMPLETE")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+class TestScratchpadWindow(unittest.TestCase):
+
+    def tearDown(self):
+        clear_elided_outputs(SESSION)
+
+    def test_recent_steps_verbatim_older_ones_referenced(self):
+        steps = [step(i, f"line one of file {i}\n" + "x = 1\n" * 200) for i in range(6)]
+        window = ScratchpadWindow(SESSION, keep_steps=2, token_ceiling=0)
+        messages = window.format(steps)
+        results = [m for m in messages if isinstance(m, ToolMessage)]
+        self.assertEqual([r.content for r in results[-2:]], [steps[4][1], steps[5][1]])
+        self.assertIn("[Result of step 1 compacted: read_file(", results[0].content)
+        self.assertIn("First line: line one of file 0", results[0].content)
+        ref = results[0].content.split('ref="')[1].split('"')[0]
+        self.assertEqual(ELIDED_OUTPUTS[SESSION][ref], steps[0][1])
+        # Compacted once, then sent identically on later iterations
+        later = window.format(steps + [step(6, "short")])
+        self.assertEqual(later[1].content, results[0].content)
+        self.assertEqual(len(ELIDED_OUTPUTS[SESSION]), 5)
+
+    def test_small_results_and_call_arguments(self):
+        steps = [step(0, "ok"), step(1, "y" * 1000, tool="write_file", args={"filepath": "a.py", "content": "z" * 5000}), step(2, "done")]
+        messages = ScratchpadWindow(SESSION, keep_steps=1, token_ceiling=0).format(steps)
+        self.assertEqual(messages[1].content, "ok")
+        write_call = messages[2].tool_calls[0]["args"]
+        self.assertEqual(write_call["filepath"], "a.py")
+        self.assertIn("[4800 more characters]", write_call["content"])
+
+    def test_token_ceiling_compacts_oldest_first(self):
+        steps = [step(i, "word " * 2000) for i in range(4)]
+        messages = ScratchpadWindow(SESSION, keep_steps=4, token_ceiling=6000).format(steps)
+        results = [m.content for m in messages if isinstance(m, ToolMessage)]
+        self.assertTrue(results[0].startswith("[Result of step 1"))
+        self.assertEqual(results[2:], [steps[2][1], steps[3][1]])
+        self.assertLessEqual(sum(estimate_tokens(r) for r in results), 6000)
+
+    def test_prompt_size_stays_flat(self):
+        def read_file(filepath: str) -> str:
+            """Reads a file."""
+            return f"# {filepath}\n" + "def handler(request):\n    return process(request)\n" * 150
+        tool = StructuredTool.from_function(func=read_file, name="read_file", description="Read a file")
+        prompt = ChatPromptTemplate.from_messages([("system", "You are a Skilled Software Engineer."), ("human", "Go"), ("placeholder", "{agent_scratchpad}")])
+        llm = ReadingChatModel(reads=10, prompt_tokens=[])
+        agent = create_bounded_tool_calling_agent(llm, [tool], prompt, SESSION, keep_steps=3, token_ceiling=0)
+        result = AgentExecutor(agent=agent, tools=[tool], max_iterations=15).invoke({})
+        self.assertEqual(result["output"], "CHANGES_COMPLETE")
+        sizes = llm.prompt_tokens
+        # Growth per step after the window fills is the size of a reference, not of a file
+        self.assertLess(sizes[-1] - sizes[4], (sizes[4] - sizes[0]) / 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import os
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from agent.agent import AgentManager
+from agent.callbacks import LLMRecordingCallbackHandler, get_session_callbacks
+from agent.common.llm import get_llm
+from agent.common.replay_llm import ReplayChatModel
+from agent.common.session_trace import TraceReader, TraceWriter
+from agent.replay import replay_session
+from agent.sandbox.recording import RecordingSandbox, ReplaySandbox
+from agent.workflow_pkg.nodes.tester import tester_node as run_tester
+from tests.helpers import use_temp_storage
+from tests.test_sandbox_batch import LocalShellSandbox
+from tests.test_symbol_index import RepoSandbox, git
+
+class TestSessionReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "session.jsonl")
+
+    def test_sandbox_calls_replay_without_a_sandbox(self):
+        inner = LocalShellSandbox()
+        writer = TraceWriter(self.path)
+        recording = RecordingSandbox(inner, writer)
+        first = recording.execute("echo one; exit 3")
+        batch = recording.run_commands(["echo a", "echo b"])
+        recording.write_file("notes.txt", "hi")
+        writer.close()
+
+        trace = TraceReader.load(self.path)
+        replay = ReplaySandbox(trace)
+        # Recorded order is not required
+        self.assertEqual([r.output for r in replay.run_commands(["echo a", "echo b"])], [r.output for r in batch])
+        replayed = replay.execute("echo one; exit 3")
+        self.assertEqual((replayed.output, replayed.exit_code), (first.output, 3))
+        streamed = []
+        self.assertEqual(replay.write_file("notes.txt", "hi"), "")
+        self.assertEqual(trace.misses, 0)
+        self.assertEqual(replay.execute_stream("echo never", on_output=streamed.append).exit_code, 127)
+        self.assertEqual(trace.misses, 1)
+        self.assertFalse(hasattr(replay, "generate_codebase_tree"))
+
+    def test_llm_responses_replay_with_usage(self):
+        writer = TraceWriter(self.path)
+        handler = LLMRecordingCallbackHandler(writer)
+        llm = FakeListChatModel(responses=["APPROVED"])
+        messages = [SystemMessage(content="Review"), HumanMessage(content="Goal: x")]
+        self.assertEqual(llm.invoke(messages, config={"callbacks": [handler]}).content, "APPROVED")
+        # A provider response with usage, recorded through the same hooks
+        handler.on_chat_model_start({}, [[HumanMessage(content="Name a branch")]], run_id="r1")
+        handler.on_llm_end(LLMResult(generations=[[ChatGeneration(message=AIMessage(content="feat/x"))]], llm_output={"token_usage": {"prompt_tokens": 10}}), run_id="r1")
+        writer.close()
+
+        replay = ReplayChatModel(trace=TraceReader.load(self.path))
+        self.assertEqual(replay.invoke([HumanMessage(content="Name a branch")]).response_metadata["token_usage"], {"prompt_tokens": 10})
+        self.assertEqual(replay.invoke(messages).content, "APPROVED")
+        with self.assertRaises(ValueError):
+            replay.invoke(messages)
+
+    def test_recording_callback_is_attached_while_recording(self):
+        manager = AgentManager()
+        writer = TraceWriter(self.path)
+        manager.register_session_trace("s-rec", writer)
+        self.addCleanup(manager.unregister_session_trace, "s-rec")
+        self.assertTrue(any(isinstance(c, LLMRecordingCallbackHandler) for c in get_session_callbacks("s-rec")))
+        manager.register_session_trace("s-rec", TraceReader([]))
+        self.assertFalse(any(isinstance(c, LLMRecordingCallbackHandler) for c in get_session_callbacks("s-rec")))
+        writer.close()
+
+    def test_recorded_node_replays_offline(self):
+        use_temp_storage(self)
+        root = os.path.join(self.tmp.name, "repo")
+        os.makedirs(os.path.join(root, "tests"))
+        with open(os.path.join(root, "tests", "test_a.py"), "w") as f:
+            f.write("def test_ok():\n    assert True\n\ndef test_bad():\n    assert 1 == 2\n")
+        git(root, "init", "-q")
+        state = {"session_id": "s-replay", "goal": "Fix test_bad", "repo_url": "", "plan": "1. Fix it", "status": "TESTING", "logs": [],
+                 "review_feedback": None, "test_commands": [{"command": f"{sys.executable} -m pytest -q -p no:cacheprovider", "cwd": ".", "env": {}}]}
+        manager = AgentManager()
+        self.addCleanup(manager.unregister_sandbox, "s-replay")
+        self.addCleanup(manager.unregister_ai_config, "s-replay")
+        self.addCleanup(manager.unregister_session_trace, "s-replay")
+
+        # Record: real sandbox, scripted model
+        writer = TraceWriter(self.path)
+        writer.write({"kind": "session", "state": dict(state)})
+        manager.register_session_trace("s-replay", writer)
+        manager.register_sandbox("s-replay", RecordingSandbox(RepoSandbox(root), writer))
+        with patch("agent.workflow_pkg.nodes.tester.get_llm", return_value=FakeListChatModel(responses=["TESTS_FAILED: test_bad asserts 1 == 2"])):
+            recorded = run_tester(dict(state))
+        writer.close()
+        manager.unregister_session_trace("s-replay")
+        self.assertEqual(recorded["status"], "CODING")
+
+        # Replay: no sandbox commands, no provider
+        manager.register_ai_config("s-replay", SimpleNamespace(provider="replay", model=None, api_key=None, base_url=None))
+        trace = TraceReader.load(self.path)
+        manager.register_session_trace("s-replay", trace)
+        manager.register_sandbox("s-replay", ReplaySandbox(trace, "s-replay"))
+        self.assertIsInstance(get_llm("s-replay"), ReplayChatModel)
+        replayed = run_tester(trace.session_state())
+        self.assertEqual(replayed["review_feedback"], recorded["review_feedback"])
+        self.assertIn("test_bad", replayed["review_feedback"])
+        self.assertEqual((trace.misses, trace.remaining()), (0, 0))
+
+    def test_replay_entrypoint(self):
+        writer = TraceWriter(self.path)
+        writer.write({"kind": "session", "state": {"session_id": "s-entry", "goal": "Add a README", "status": "COMPLETED", "logs": []}})
+        writer.close()
+        report = replay_session(self.path)
+        self.assertEqual((report["session_id"], report["status"], report["unused"]), ("s-entry", "COMPLETED", 0))
+        self.assertIsNone(AgentManager().get_sandbox("s-entry"))
+
+    def test_replay_leaves_the_recorded_session_alone(self):
+        storage = use_temp_storage(self)
+        stored = {"session_id": "s-kept", "goal": "Add a README", "status": "WAITING_FOR_USER", "logs": ["original"], "pending_inputs": ["Use tabs"]}
+        storage.save_state("s-kept", stored)
+        storage.append_log("s-kept", "original")
+        writer = TraceWriter(self.path)
+        writer.write({"kind": "session", "state": {"session_id": "s-kept", "goal": "Add a README", "status": "PLANNING", "logs": []}})
+        writer.close()
+
+        report = replay_session(self.path)
+        self.assertEqual(report["status"], "FAILED")
+        self.assertEqual(storage.get_state("s-kept"), stored)
+        self.assertEqual(storage.get_logs("s-kept"), ["original"])
+
+if __name__ == '__main__':
+    unittest.main()
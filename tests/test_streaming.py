@@ -0,0 +1,123 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+from agent.callbacks import SessionOutputStream
+from agent.sandbox.base import CommandResult
+from agent.sandbox.daytona import DaytonaSandbox
+from agent.sandbox.streaming import OutputBuffer
+from agent.tools.base import is_long_running, run_streamed
+from tests.test_sandbox_batch import LocalShellSandbox
+
+class TestStreaming(unittest.TestCase):
+
+    def test_buffer_keeps_head_and_tail(self):
+        buffer = OutputBuffer(max_chars=20)
+        for i in range(100):
+            buffer.feed(f"line {i}\n")
+        text, truncated = buffer.getvalue()
+        self.assertTrue(truncated)
+        self.assertTrue(text.startswith("line 0"))
+        self.assertTrue(text.endswith("line 99"))
+        self.assertIn("characters truncated", text)
+        self.assertEqual(buffer.total_chars, sum(len(f"line {i}\n") for i in range(100)))
+
+    def test_buffer_filters_lines_across_chunks(self):
+        buffer = OutputBuffer(line_filter=lambda line: "FAIL" in line)
+        accepted = buffer.feed("ok a\nFA") + buffer.feed("IL b\nok c\nFAIL d") + buffer.close()
+        self.assertEqual(accepted, "FAIL b\nFAIL d")
+        text, truncated = buffer.getvalue()
+        self.assertFalse(truncated)
+        self.assertEqual(text, "FAIL b\nFAIL d\n[2 lines not matching the filter omitted]")
+
+    def test_base_fallback_uses_buffer(self):
+        chunks = []
+        result = LocalShellSandbox().execute_stream("seq 1 1000", on_output=chunks.append, max_output_chars=40)
+        self.assertTrue(result.ok)
+        self.assertTrue(result.truncated)
+        self.assertTrue(result.output.endswith("1000"))
+        self.assertEqual(len(chunks), 1)
+
+    def test_daytona_streams_session_logs(self):
+        sandbox = DaytonaSandbox("test-stream")
+        sandbox.sandbox = MagicMock()
+        process = sandbox.sandbox.process
+        process.execute_session_command.return_value = MagicMock(cmd_id="cmd-1")
+        process.get_session_command.return_value = MagicMock(exit_code=1)
+
+        async def follow(session_id, cmd_id, on_stdout, on_stderr):
+            on_stdout("PASS a\n")
+            on_stderr("FAIL b\n")
+        process.get_session_command_logs_async.side_effect = follow
+
+        chunks = []
+        result = sandbox.execute_stream("npm test", cwd="/repo", on_output=chunks.append, line_filter=lambda l: "FAIL" in l, timeout=60)
+        self.assertEqual(result.exit_code, 1)
+        self.assertEqual(chunks, ["FAIL b\n"])
+        self.assertIn("FAIL b", result.output)
+        self.assertNotIn("PASS a", result.output)
+        request = process.execute_session_command.call_args.args[1]
+        self.assertTrue(request.run_async)
+        self.assertIn("timeout -k", request.command)
+        process.delete_session.assert_called_once()
+
+    def test_daytona_streams_inside_a_running_loop(self):
+        sandbox = DaytonaSandbox("test-stream-loop")
+        sandbox.sandbox = MagicMock()
+        process = sandbox.sandbox.process
+        process.execute_session_command.return_value = MagicMock(cmd_id="cmd-1")
+        process.get_session_command.return_value = MagicMock(exit_code=0)
+
+        async def follow(session_id, cmd_id, on_stdout, on_stderr):
+            await asyncio.sleep(0)
+            on_stdout("done\n")
+        process.get_session_command_logs_async.side_effect = follow
+
+        async def caller():
+            return sandbox.execute_stream("npm run build", cwd="/repo")
+
+        result = asyncio.run(caller())
+        self.assertEqual((result.exit_code, result.output, result.stderr), (0, "done", ""))
+
+    def test_only_long_running_commands_are_streamed(self):
+        sandbox = MagicMock(session_id=None)
+        sandbox.execute.return_value = CommandResult(command="git status", stdout="ok a\nFAIL b\n", exit_code=0)
+        sandbox.execute_stream.return_value = CommandResult(command="npm test", stdout="streamed", exit_code=0)
+
+        result = run_streamed(sandbox, "git status", line_filter=lambda line: "FAIL" in line)
+        self.assertEqual(result.output, "FAIL b\n[1 lines not matching the filter omitted]")
+        sandbox.execute_stream.assert_not_called()
+
+        self.assertEqual(run_streamed(sandbox, "npm test").output, "streamed")
+        self.assertEqual(run_streamed(sandbox, "ls", stream=True).output, "streamed")
+        self.assertEqual(sandbox.execute.call_count, 1)
+
+    @patch("agent.callbacks.storage")
+    def test_short_commands_are_not_logged(self, mock_storage):
+        sandbox = MagicMock(session_id="s1")
+        sandbox.execute.return_value = CommandResult(command="git status", stdout="ok\n", exit_code=0)
+        self.assertEqual(run_streamed(sandbox, "git status").output, "ok")
+        mock_storage.append_log.assert_not_called()
+
+    def test_long_running_is_decided_by_the_command_word(self):
+        for command in ("pytest -q", "cd web && npm test", "FOO=1 python3 -m pytest", "env CI=1 npm ci", "npx jest", "./gradlew build", "pip install -r requirements.txt", "yarn"):
+            self.assertTrue(is_long_running(command), command)
+        for command in ("cat test.py", "ls build/", "grep -rn install .", "git status", "npm view left-pad", "echo make"):
+            self.assertFalse(is_long_running(command), command)
+
+    @patch("agent.callbacks.storage")
+    def test_session_output_stream_batches_and_caps(self, mock_storage):
+        stream = SessionOutputStream("s1", flush_interval=3600, max_chars=10)
+        stream("abc\n")
+        stream("def\n")
+        mock_storage.append_log.assert_not_called()
+        stream.flush()
+        mock_storage.append_log.assert_called_once_with("s1", "Output: abc\ndef")
+        stream("x" * 50)
+        stream.flush()
+        self.assertIn("capped", mock_storage.append_log.call_args.args[1])
+        stream("more")
+        stream.flush()
+        self.assertEqual(mock_storage.append_log.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch
+from agent.tools.symbol_index import SymbolIndex, create_symbol_tools, parse_grep_output
+from tests.test_sandbox_batch import LocalShellSandbox
+
+class RepoSandbox(LocalShellSandbox):
+    """Local shell sandbox rooted in a temporary git repository."""
+    def __init__(self, root):
+        super().__init__()
+        self.root = root
+    def run_command(self, command, cwd=None):
+        return super().run_command(command, cwd=cwd or self.root)
+
+def git(root, *args):
+    subprocess.run(["git", *args], cwd=root, check=True, capture_output=True)
+
+class TestSymbolIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        git(self.root, "init", "-q")
+        git(self.root, "config", "user.email", "dev@example.com")
+        git(self.root, "config", "user.name", "Dev")
+        self.write("app/models.py", "import os\n\nclass User:\n    def save(self):\n        pass\n\ndef _helper():\n    pass\n")
+        self.write("app/views.py", "from app.models import User\n\ndef show(user_id):\n    return User()\n")
+        self.write("web/api.ts", "import { x } from './x'\nexport async function fetchUser(id: string) {}\nconst local = () => 1\nexport interface Props {}\n")
+        self.write("srv/main.go", "package main\n\nfunc (s *Server) Start() {}\nfunc helper() {}\ntype Server struct {}\n")
+        git(self.root, "add", ".")
+        git(self.root, "commit", "-q", "-m", "init")
+        self.sandbox = RepoSandbox(self.root)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, content):
+        full = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "w") as f:
+            f.write(content)
+
+    def test_parse_classifies_languages(self):
+        parsed = parse_grep_output("a.py:3:    def run(self):\nb.ts:1:export class Widget {\nc.go:2:func (r *R) Do() {\nd.rs:4:pub struct Config {\ne.py:1:from x import y")
+        self.assertEqual(parsed["files"]["a.py"], [["run", "method", 3, False]])
+        self.assertEqual(parsed["files"]["b.ts"], [["Widget", "class", 1, True]])
+        self.assertEqual(parsed["files"]["c.go"], [["Do", "method", 2, True]])
+        self.assertEqual(parsed["files"]["d.rs"], [["Config", "type", 4, True]])
+        self.assertEqual(parsed["imports"]["e.py"], ["from x import y"])
+
+    def test_build_and_find(self):
+        index = SymbolIndex.build(self.sandbox)
+        self.assertEqual(self.sandbox.exec_count, 1)
+        self.assertEqual(len(index.revision), 40)
+        user = index.find("User")
+        self.assertEqual((user[0]["path"], user[0]["line"], user[0]["kind"]), ("app/models.py", 3, "class"))
+        self.assertEqual(index.find("fetchUser")[0]["exported"], True)
+        self.assertEqual(index.find("local")[0]["exported"], False)
+        self.assertEqual(index.find("Start")[0]["kind"], "method")
+        self.assertEqual(index.find("Server", kind="type")[0]["path"], "srv/main.go")
+        self.assertEqual(index.importers("User"), ["app/views.py"])
+
+    def test_refresh_is_incremental(self):
+        index = SymbolIndex.build(self.sandbox)
+        self.sandbox.exec_count = 0
+        self.assertFalse(index.refresh(self.sandbox))
+        self.assertEqual(self.sandbox.exec_count, 1)
+
+        self.write("app/views.py", "def show_all():\n    pass\n")
+        self.write("app/new.py", "class Fresh:\n    pass\n")
+        os.remove(os.path.join(self.root, "srv/main.go"))
+        self.assertTrue(index.refresh(self.sandbox))
+        self.assertEqual(index.find("show_all")[0]["path"], "app/views.py")
+        self.assertEqual(index.find("Fresh")[0]["path"], "app/new.py")
+        self.assertEqual(index.find("show", kind="function")[0]["name"], "show_all")
+        self.assertEqual(index.find("Start"), [])
+
+        # Unchanged working tree: nothing re-read
+        self.assertFalse(index.refresh(self.sandbox))
+
+        # Reverting an edit restores the committed definitions
+        git(self.root, "checkout", "--", "app/views.py")
+        self.assertTrue(index.refresh(self.sandbox))
+        self.assertEqual(index.find("show")[0]["name"], "show")
+
+    @patch("agent.tools.symbol_index.storage")
+    def test_tools(self, mock_storage):
+        mock_storage.get_artifact.return_value = SymbolIndex.build(self.sandbox).to_dict()
+        find_symbol, find_references = create_symbol_tools(self.sandbox, "sym-session")
+        self.assertIn("app/models.py:3  class User", find_symbol.run({"name": "User"}))
+        self.assertIn("app/models.py:7  function _helper (private)", find_symbol.run({"name": "_helper"}))
+        self.assertIn("No definition", find_symbol.run({"name": "Nope"}))
+
+        refs = find_references.run({"name": "User"})
+        self.assertIn("Definitions:\napp/models.py:3  class", refs)
+        self.assertIn("Imported by:\napp/views.py", refs)
+        self.assertIn("app/views.py:4: return User()", refs)
+
+if __name__ == '__main__':
+    unittest.main()
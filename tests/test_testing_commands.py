@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from agent.common.repo_cache import FileRepoCache
+from agent.tools.testing.commands import create_record_test_command_tool, format_test_command, load_test_commands
+from agent.workflow_pkg.nodes.tester import tester_node as run_tester
+from tests.test_symbol_index import RepoSandbox
+
+REPO = "https://github.com/acme/app.git"
+
+class TestTestCommands(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.tmp.name, "repo", "web"))
+        self.sandbox = RepoSandbox(os.path.join(self.tmp.name, "repo"))
+        self.cache = FileRepoCache(os.path.join(self.tmp.name, "cache"))
+        patcher = patch("agent.tools.testing.commands.repo_cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def state(self, **extra):
+        state = {"session_id": "test-cmd-session", "repo_url": REPO, "goal": "g", "plan": "p", "logs": [], "status": "TESTING"}
+        state.update(extra)
+        return state
+
+    def test_record_tool_dedupes(self):
+        state = self.state()
+        tool = create_record_test_command_tool(state)
+        tool.invoke({"command": "npm test", "cwd": "web", "env": {"CI": "1"}})
+        tool.invoke({"command": "npm test", "cwd": "web", "env": {"CI": "1"}})
+        self.assertEqual(state["test_commands"], [{"command": "npm test", "cwd": "web", "env": {"CI": "1"}}])
+
+    def test_format_test_command(self):
+        line = format_test_command({"command": "pytest -q", "cwd": "my dir", "env": {"A": "x y"}})
+        self.assertEqual(line, "cd 'my dir' 2>/dev/null || exit 127; export A='x y'; pytest -q")
+
+    @patch("agent.workflow_pkg.state.storage")
+    @patch("agent.workflow_pkg.nodes.tester.ConcurrentAgentExecutor")
+    @patch("agent.workflow_pkg.nodes.tester.get_llm")
+    def test_cached_commands_pass_without_llm(self, mock_llm, mock_executor, _storage):
+        self.cache.set(REPO, "latest", {"commands": [{"command": "test \"$MODE\" = ci", "cwd": "web", "env": {"MODE": "ci"}}]}, name="test_commands")
+        state = self.state()
+        with patch("agent.workflow_pkg.nodes.tester.get_active_sandbox", return_value=self.sandbox):
+            state = run_tester(state)
+        mock_llm.assert_not_called()
+        mock_executor.assert_not_called()
+        self.assertEqual(state["status"], "REVIEWING")
+        self.assertEqual(state["test_commands"][0]["cwd"], "web")
+
+    @patch("agent.workflow_pkg.state.storage")
+    @patch("agent.workflow_pkg.nodes.tester.ConcurrentAgentExecutor")
+    @patch("agent.workflow_pkg.nodes.tester.get_llm")
+    def test_failures_are_interpreted_by_llm(self, mock_llm, mock_executor, _storage):
+        mock_llm.return_value = lambda _: MagicMock(content="TESTS_FAILED: test_login asserts 200, got 500")
+        state = self.state(test_commands=[{"command": "echo 'FAILED test_login'; exit 1", "cwd": ".", "env": {}}])
+        with patch("agent.workflow_pkg.nodes.tester.get_active_sandbox", return_value=self.sandbox):
+            state = run_tester(state)
+        mock_executor.assert_not_called()
+        self.assertEqual(state["status"], "CODING")
+        self.assertIn("test_login asserts 200", state["review_feedback"])
+
+    @patch("agent.workflow_pkg.state.storage")
+    @patch("agent.workflow_pkg.nodes.tester.create_tool_calling_agent")
+    @patch("agent.workflow_pkg.nodes.tester.ConcurrentAgentExecutor")
+    @patch("agent.workflow_pkg.nodes.tester.get_llm")
+    def test_stale_commands_are_rediscovered_and_cached(self, mock_llm, mock_executor, _agent, _storage):
+        state = self.state(test_commands=[{"command": "no-such-test-runner", "cwd": ".", "env": {}}])
+
+        def discover(inputs, config=None):
+            tools = mock_executor.call_args.kwargs["tools"]
+            record = next(t for t in tools if t.name == "record_test_command")
+            record.invoke({"command": "true"})
+            return {"output": "TESTS_PASSED"}
+        mock_executor.return_value.invoke.side_effect = discover
+
+        with patch("agent.workflow_pkg.nodes.tester.get_active_sandbox", return_value=self.sandbox):
+            state = run_tester(state)
+        self.assertEqual(state["status"], "REVIEWING")
+        self.assertEqual(state["test_commands"], [{"command": "true", "cwd": ".", "env": {}}])
+        self.assertEqual(load_test_commands(self.state()), [{"command": "true", "cwd": ".", "env": {}}])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from agent.tools.symbol_index import SymbolIndex
+from agent.tools.testing.impact import changed_and_test_files, narrow_command, select_test_commands, select_tests
+from agent.workflow_pkg.nodes.reviewer import require_full_test_run
+from agent.workflow_pkg.nodes.tester import tester_node as run_tester
+from tests.test_symbol_index import RepoSandbox, git
+
+TESTS = [
+    "tests/test_models.py", "tests/test_views.py", "tests/test_utils.py",
+    "web/src/Button.test.tsx", "web/src/__tests__/api.ts", "srv/auth/auth_test.go", "srv/db/db_test.go",
+]
+
+class TestSelectTests(unittest.TestCase):
+
+    def test_naming_conventions(self):
+        selected = select_tests(["app/models.py", "web/src/Button.tsx", "srv/auth/token.go"], TESTS)
+        self.assertEqual(selected, {"tests/test_models.py", "web/src/Button.test.tsx", "srv/auth/auth_test.go"})
+
+    def test_changed_tests_are_selected(self):
+        self.assertEqual(select_tests(["tests/test_utils.py", "README.md"], TESTS), {"tests/test_utils.py"})
+
+    def test_import_graph_is_followed_transitively(self):
+        index = SymbolIndex(imports={
+            "app/services.py": ["from app.models import User"],
+            "tests/test_views.py": ["from app.services import signup"],
+            "web/src/__tests__/api.ts": ["import { get } from '../client'"],
+        })
+        selected = select_tests(["app/models.py", "web/src/client/index.ts"], TESTS, index)
+        self.assertEqual(selected, {"tests/test_models.py", "tests/test_views.py", "web/src/__tests__/api.ts"})
+
+class TestNarrowCommand(unittest.TestCase):
+
+    def test_pytest_drops_path_args(self):
+        spec = narrow_command({"command": "python -m pytest -q tests/ -k 'not slow'", "cwd": ".", "env": {}}, {"tests/test_models.py", "web/a.test.ts"})
+        self.assertEqual(spec["command"], "python -m pytest -q -k 'not slow' tests/test_models.py")
+
+    def test_option_values_are_kept(self):
+        tests = {"tests/test_models.py"}
+        spec = narrow_command({"command": "pytest --cov src/ -q tests/ --rootdir=. -k test", "cwd": "."}, tests)
+        self.assertEqual(spec["command"], "pytest --cov src/ -q --rootdir=. -k test tests/test_models.py")
+        spec = narrow_command({"command": "npx jest --config jest/unit.config.js", "cwd": "."}, {"src/a.test.ts"})
+        self.assertEqual(spec["command"], "npx jest --config jest/unit.config.js src/a.test.ts")
+
+    def test_cwd_relative_and_runner_specific(self):
+        tests = {"web/src/Button.test.tsx", "srv/auth/auth_test.go", "tests/test_models.py"}
+        self.assertEqual(narrow_command({"command": "npm test", "cwd": "web"}, tests)["command"], "npm test -- src/Button.test.tsx")
+        self.assertEqual(narrow_command({"command": "go test ./...", "cwd": "srv"}, tests)["command"], "go test ./auth")
+        self.assertEqual(narrow_command({"command": "npx vitest run", "cwd": "web"}, tests)["command"], "npx vitest run src/Button.test.tsx")
+
+    def test_unaffected_unknown_and_compound_commands(self):
+        tests = {"tests/test_models.py"}
+        self.assertIsNone(narrow_command({"command": "go test ./...", "cwd": "."}, tests))
+        make = {"command": "make test", "cwd": "."}
+        self.assertIs(narrow_command(make, tests), make)
+        compound = {"command": "pytest && npm test", "cwd": "."}
+        self.assertIs(narrow_command(compound, tests), compound)
+
+    def test_large_selection_falls_back_to_full_suite(self):
+        tests = {f"tests/test_{i}.py" for i in range(300)}
+        self.assertIsNone(select_test_commands([{"command": "pytest", "cwd": "."}], tests))
+
+class TestImpactInTester(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        git(self.root, "init", "-q")
+        git(self.root, "config", "user.email", "dev@example.com")
+        git(self.root, "config", "user.name", "Dev")
+        for path in ["app/models.py", "app/views.py", "tests/test_models.py", "tests/test_views.py"]:
+            self.write(path, "x = 1\n")
+        git(self.root, "add", ".")
+        git(self.root, "commit", "-q", "-m", "init")
+        self.sandbox = RepoSandbox(self.root)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, content):
+        os.makedirs(os.path.dirname(os.path.join(self.root, path)), exist_ok=True)
+        with open(os.path.join(self.root, path), "w") as f:
+            f.write(content)
+
+    def test_changed_and_test_files(self):
+        self.write("app/models.py", "x = 2\n")
+        self.write("app/new.py", "y = 1\n")
+        files = changed_and_test_files(self.sandbox)
+        self.assertEqual(files["changed"], ["app/models.py", "app/new.py"])
+        self.assertEqual(sorted(files["tests"]), ["tests/test_models.py", "tests/test_views.py"])
+        self.assertIsNone(changed_and_test_files(self.sandbox, "no-such-revision"))
+
+    @patch("agent.workflow_pkg.nodes.tester.load_symbol_index", return_value=None)
+    @patch("agent.workflow_pkg.state.storage")
+    def test_subset_then_full_suite_before_submit(self, _storage, _index):
+        self.write("app/models.py", "x = 2\n")
+        # Echo the args so the log shows which tests would have run
+        state = {"session_id": "impact-session", "goal": "g", "plan": "p", "logs": [], "status": "TESTING",
+                 "test_commands": [{"command": "echo pytest", "cwd": ".", "env": {}}]}
+        with patch("agent.workflow_pkg.nodes.tester.get_active_sandbox", return_value=self.sandbox):
+            state = run_tester(state)
+            self.assertEqual(state["status"], "REVIEWING")
+            self.assertIs(state["full_suite_passed"], False)
+            self.assertIn("echo pytest tests/test_models.py", state["logs"][-2])
+
+            state["status"] = "SUBMITTING"
+            require_full_test_run(state)
+            self.assertEqual(state["status"], "TESTING")
+
+            state = run_tester(state)
+        self.assertIn("Running test commands: echo pytest", state["logs"][-2])
+        self.assertNotIn("tests/test_models.py", state["logs"][-2])
+        self.assertEqual(state["status"], "SUBMITTING")
+        self.assertTrue(state["full_suite_passed"])
+
+if __name__ == '__main__':
+    unittest.main()
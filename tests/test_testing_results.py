@@ -0,0 +1,93 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from agent.tools.testing.commands import run_test_commands
+from agent.tools.testing.results import parse_go_test_json, parse_jest_json, parse_junit_xml, trim_trace, with_reporter
+from tests.test_symbol_index import RepoSandbox
+
+JUNIT = """<?xml version="1.0"?>
+<testsuites><testsuite name="pytest" tests="4">
+  <testcase classname="tests.test_api" name="test_ok" time="0.01"/>
+  <testcase classname="tests.test_api" name="test_login" time="0.2">
+    <failure message="AssertionError: assert 500 == 200">def test_login():
+&gt;       assert status == 200
+E       AssertionError: assert 500 == 200</failure>
+  </testcase>
+  <testcase classname="tests.test_api" name="test_db"><error message="fixture 'db' not found"/></testcase>
+  <testcase classname="tests.test_api" name="test_slow"><skipped message="slow"/></testcase>
+</testsuite></testsuites>"""
+
+GO = "\n".join(json.dumps(e) for e in [
+    {"Action": "run", "Package": "example.com/auth", "Test": "TestToken"},
+    {"Action": "output", "Package": "example.com/auth", "Test": "TestToken", "Output": "    token_test.go:12: expected abc, got xyz\n"},
+    {"Action": "fail", "Package": "example.com/auth", "Test": "TestToken"},
+    {"Action": "pass", "Package": "example.com/auth", "Test": "TestParse"},
+    {"Action": "fail", "Package": "example.com/auth"},
+    {"Action": "output", "Package": "example.com/db", "Output": "db.go:3: undefined: sql\n"},
+    {"Action": "fail", "Package": "example.com/db"},
+]) + "\nnot json\n"
+
+JEST = json.dumps({
+    "numTotalTests": 3, "numPassedTests": 1, "numFailedTests": 1, "numPendingTests": 1, "numTodoTests": 0,
+    "testResults": [
+        {"name": "/app/src/Button.test.tsx", "status": "failed", "assertionResults": [
+            {"status": "passed", "fullName": "Button renders"},
+            {"status": "failed", "fullName": "Button clicks", "failureMessages": ["Error: expect(received).toBe(expected)\n\nExpected: 1\nReceived: 0\n    at Object.<anonymous> (src/Button.test.tsx:9:5)"]},
+        ]},
+        {"name": "/app/src/api.test.ts", "status": "failed", "message": "Cannot find module './client'", "assertionResults": []},
+    ],
+})
+
+class TestParsers(unittest.TestCase):
+
+    def test_junit(self):
+        summary = parse_junit_xml(JUNIT)
+        self.assertEqual((summary.total, summary.passed, summary.failed, summary.errors, summary.skipped), (4, 1, 1, 1, 1))
+        self.assertEqual(summary.failures[0].test_id, "tests.test_api::test_login")
+        self.assertEqual(summary.failures[0].message, "AssertionError: assert 500 == 200")
+        self.assertIn("assert status == 200", summary.failures[0].trace)
+        self.assertFalse(summary.ok)
+
+    def test_go_json(self):
+        summary = parse_go_test_json(GO)
+        self.assertEqual((summary.total, summary.passed, summary.failed, summary.errors), (2, 1, 1, 1))
+        self.assertEqual([f.test_id for f in summary.failures], ["example.com/auth.TestToken", "example.com/db"])
+        self.assertIn("expected abc, got xyz", summary.failures[0].message)
+
+    def test_jest_json(self):
+        summary = parse_jest_json(JEST)
+        self.assertEqual((summary.total, summary.failed, summary.errors, summary.skipped), (3, 1, 1, 1))
+        self.assertEqual(summary.failures[0].test_id, "/app/src/Button.test.tsx::Button clicks")
+        self.assertIn("Cannot find module", summary.failures[1].message)
+        self.assertIn("FAILED /app/src/Button.test.tsx::Button clicks", summary.format())
+
+    def test_trim_trace_keeps_the_end(self):
+        trace = trim_trace("\n".join(f"frame {i}" for i in range(40)), max_lines=5)
+        self.assertTrue(trace.startswith("... (35 lines omitted)"))
+        self.assertTrue(trace.endswith("frame 39"))
+
+    def test_with_reporter(self):
+        spec, report = with_reporter({"command": "go test ./...", "cwd": "."}, 0)
+        self.assertEqual(spec["command"], "go test -json ./... > /tmp/swe-test-reports/0.jsonl")
+        self.assertEqual(report["format"], "go")
+        self.assertEqual(with_reporter({"command": "npx jest src", "cwd": "."}, 1)[0]["command"], "npx jest src --json --outputFile=/tmp/swe-test-reports/1.json")
+        unknown = {"command": "make test", "cwd": "."}
+        self.assertEqual(with_reporter(unknown, 2), (unknown, None))
+
+class TestPytestReport(unittest.TestCase):
+
+    def test_real_pytest_run(self):
+        with tempfile.TemporaryDirectory() as root:
+            with open(os.path.join(root, "test_sample.py"), "w") as f:
+                f.write("def test_ok():\n    assert True\n\ndef test_bad():\n    assert 1 + 1 == 3\n")
+            sandbox = RepoSandbox(root)
+            [(spec, result, summary)] = run_test_commands(sandbox, [{"command": f"{sys.executable} -m pytest -q -p no:cacheprovider", "cwd": ".", "env": {}}])
+        self.assertFalse(result.ok)
+        self.assertEqual((summary.total, summary.passed, summary.failed), (2, 1, 1))
+        self.assertTrue(summary.failures[0].test_id.endswith("test_bad"))
+        self.assertIn("assert", summary.failures[0].message)
+
+if __name__ == '__main__':
+    unittest.main()
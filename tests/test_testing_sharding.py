@@ -0,0 +1,108 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+from agent.common.repo_cache import FileRepoCache
+from agent.sandbox.base import CommandResult
+from agent.tools.testing.commands import merge_shard_results, run_test_commands
+from agent.tools.testing import results as test_results
+from agent.tools.testing.sharding import balance, file_durations, load_durations, record_durations, shard_command
+from tests.test_symbol_index import RepoSandbox
+
+FILES = ["tests/test_a.py", "tests/test_b.py", "tests/test_c.py", "tests/test_d.py", "tests/unit/test_e.py", "web/x.test.ts"]
+
+class TestSharding(unittest.TestCase):
+
+    def test_balance_by_duration(self):
+        buckets = balance(["a", "b", "c", "d"], {"a": 10, "b": 6, "c": 4}, 2)
+        # d is unmeasured and assumed typical (the median, 6s)
+        self.assertEqual(sorted(buckets), [["a", "c"], ["b", "d"]])
+        self.assertEqual(balance(["a"], {}, 4), [["a"]])
+
+    def test_pytest_file_shards(self):
+        shards = shard_command({"command": "pytest -q", "cwd": "."}, FILES, {"tests/test_a.py": 30, "tests/test_b.py": 1, "tests/test_c.py": 1}, shards=2)
+        self.assertEqual([s["command"] for s in shards], [
+            "pytest -q tests/test_a.py",
+            "pytest -q tests/test_b.py tests/test_c.py tests/test_d.py tests/unit/test_e.py",
+        ])
+
+    def test_pytest_keeps_its_scope(self):
+        shards = shard_command({"command": "pytest tests/unit/ tests/test_a.py tests/test_b.py tests/test_c.py", "cwd": "."}, FILES, {}, shards=2)
+        targets = sorted(t for s in shards for t in s["command"].split()[1:])
+        self.assertEqual(targets, ["tests/test_a.py", "tests/test_b.py", "tests/test_c.py", "tests/unit/test_e.py"])
+
+    def test_custom_pytest_collection_is_not_sharded(self):
+        spec = {"command": "pytest -q", "cwd": "."}
+        for config in ("[pytest]\npython_files = check_*.py\n", "[tool.pytest.ini_options]\naddopts = \"--doctest-modules\"\n", None):
+            self.assertEqual(shard_command(spec, FILES, {}, 2, config), [spec])
+        doctests = {"command": "pytest --doctest-modules", "cwd": "."}
+        self.assertEqual(shard_command(doctests, FILES, {}, 2), [doctests])
+        self.assertEqual(len(shard_command(spec, FILES, {}, 2, "[tool.black]\nline-length = 100\n")), 2)
+
+    def test_native_parallelism_and_opt_outs(self):
+        self.assertEqual(shard_command({"command": "go test ./...", "cwd": "."}, FILES, {}, 4)[0]["command"], "go test -p 4 ./...")
+        self.assertEqual(shard_command({"command": "npx jest", "cwd": "web"}, FILES, {}, 4)[0]["command"], "npx jest --maxWorkers=4")
+        for command in ["npx jest --runInBand", "pytest -n 4", "make test", "pytest; true"]:
+            self.assertEqual(shard_command({"command": command, "cwd": "."}, FILES, {}, 4), [{"command": command, "cwd": "."}])
+        self.assertEqual(len(shard_command({"command": "pytest", "cwd": "."}, FILES, {}, 1)), 1)
+
+    def test_file_durations(self):
+        summary = test_results.TestSummary(durations={"tests.test_a": 2.0, "tests.unit.test_e.TestThing": 1.5, "/sandbox/app/web/x.test.ts": 0.5, "unknown": 9})
+        self.assertEqual(file_durations(summary, FILES), {"tests/test_a.py": 2.0, "tests/unit/test_e.py": 1.5, "web/x.test.ts": 0.5})
+
+    def test_duration_history(self):
+        with tempfile.TemporaryDirectory() as tmp, patch("agent.tools.testing.sharding.repo_cache", FileRepoCache(tmp)):
+            record_durations("https://github.com/acme/app", {"tests/test_a.py": 1.23456})
+            record_durations("https://github.com/acme/app", {"tests/test_b.py": 2})
+            self.assertEqual(load_durations("https://github.com/acme/app"), {"tests/test_a.py": 1.235, "tests/test_b.py": 2})
+
+    def test_sharded_pytest_run_merges_results(self):
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, "tests"))
+            files = []
+            for i in range(4):
+                files.append(f"tests/test_m{i}.py")
+                with open(os.path.join(root, files[-1]), "w") as f:
+                    f.write(f"def test_ok{i}():\n    assert True\n\ndef test_bad{i}():\n    assert {i} == -1\n")
+            sandbox = RepoSandbox(root)
+            spec = {"command": f"{sys.executable} -m pytest -q -p no:cacheprovider", "cwd": ".", "env": {}}
+            with patch.object(RepoSandbox, "run_parallel", wraps=sandbox.run_parallel) as parallel:
+                [(_, result, summary)] = run_test_commands(sandbox, [spec], files, {}, shards=2)
+        self.assertEqual(len(parallel.call_args.args[0]), 2)
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("[shard 2/2]", result.output)
+        self.assertEqual((summary.total, summary.passed, summary.failed), (8, 4, 4))
+        self.assertEqual(set(file_durations(summary, files)), set(files))
+
+    def test_pytest_config_is_read_from_the_repo(self):
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, "tests"))
+            with open(os.path.join(root, "pytest.ini"), "w") as f:
+                f.write("[pytest]\npython_files = check_*.py test_*.py\n")
+            files = []
+            for i in range(4):
+                files.append(f"tests/test_m{i}.py")
+                with open(os.path.join(root, files[-1]), "w") as f:
+                    f.write(f"def test_ok{i}():\n    assert True\n")
+            with open(os.path.join(root, "tests", "check_extra.py"), "w") as f:
+                f.write("def test_extra():\n    assert True\n")
+            sandbox = RepoSandbox(root)
+            spec = {"command": f"{sys.executable} -m pytest -q -p no:cacheprovider", "cwd": ".", "env": {}}
+            with patch.object(RepoSandbox, "run_parallel", wraps=sandbox.run_parallel) as parallel:
+                [(_, result, summary)] = run_test_commands(sandbox, [spec], files, {}, shards=2)
+        parallel.assert_not_called()
+        self.assertEqual((result.exit_code, summary.passed), (0, 5))
+
+    def test_missing_or_timed_out_shards_fail_the_command(self):
+        passed = CommandResult(command="pytest a", stdout="1 passed", exit_code=0)
+        timed_out = CommandResult(command="pytest b", stdout="started", exit_code=124, timed_out=True)
+        self.assertEqual(merge_shard_results("pytest", [passed, passed], 2).exit_code, 0)
+        merged = merge_shard_results("pytest", [passed, timed_out], 2)
+        self.assertEqual((merged.exit_code, merged.timed_out), (124, True))
+        missing = merge_shard_results("pytest", [passed], 2)
+        self.assertFalse(missing.ok)
+        self.assertIn("2 test shards ran but 1 reported", missing.output)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+from unittest.mock import patch
+from langchain_core.tools import StructuredTool
+from agent.tools.tool_cache import ToolResultCache, memoize_tools
+
+class FakeWorkspace:
+    def __init__(self):
+        self.files = {"a.py": "x = 1\n"}
+        self.reads = 0
+
+    def tools(self):
+        def read_file(filepath: str) -> str:
+            """Reads a file."""
+            self.reads += 1
+            return self.files.get(filepath, f"Error reading file: {filepath}")
+
+        def write_file(filepath: str, content: str) -> str:
+            """Writes a file."""
+            self.files[filepath] = content
+            return f"Successfully wrote to {filepath}"
+
+        def scratchpad(note: str) -> str:
+            """Keeps a note."""
+            return "noted"
+
+        return [StructuredTool.from_function(func=f, name=f.__name__, description=f.__doc__) for f in (read_file, write_file, scratchpad)]
+
+class TestToolResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.workspace = FakeWorkspace()
+
+    def run_tools(self, cache):
+        return {t.name: t for t in memoize_tools(self.workspace.tools(), cache)}
+
+    def test_repeat_read_is_a_marker_until_a_write(self):
+        tools = self.run_tools(ToolResultCache())
+        self.assertEqual(tools["read_file"].invoke({"filepath": "a.py"}), "x = 1\n")
+        tools["scratchpad"].invoke({"note": "neutral tools keep the cache"})
+        self.assertEqual(tools["read_file"].invoke({"filepath": "a.py"}), "[Unchanged since step 1: read_file returns the same result as it did then. Nothing in the workspace was modified in between.]")
+        self.assertEqual(self.workspace.reads, 1)
+
+        tools["write_file"].invoke({"filepath": "a.py", "content": "x = 2\n"})
+        self.assertEqual(tools["read_file"].invoke({"filepath": "a.py"}), "x = 2\n")
+        self.assertEqual(self.workspace.reads, 2)
+
+    def test_reads_outside_the_window_return_the_output(self):
+        cache = ToolResultCache(marker_window=2)
+        tools = self.run_tools(cache)
+        tools["read_file"].invoke({"filepath": "a.py"})
+        tools["scratchpad"].invoke({"note": "one"})
+        tools["scratchpad"].invoke({"note": "two"})
+        self.assertEqual(tools["read_file"].invoke({"filepath": "a.py"}), "x = 1\n")
+        self.assertEqual((self.workspace.reads, cache.hits), (1, 1))
+
+    def test_errors_are_not_cached(self):
+        tools = self.run_tools(ToolResultCache())
+        tools["read_file"].invoke({"filepath": "new.py"})
+        tools["read_file"].invoke({"filepath": "new.py"})
+        self.assertEqual(self.workspace.reads, 2)
+
+    def test_disabled(self):
+        with patch("agent.tools.tool_cache.settings.TOOL_RESULT_CACHE_ENABLED", False):
+            tools = self.workspace.tools()
+            self.assertIs(memoize_tools(tools, ToolResultCache()), tools)
+
+if __name__ == '__main__':
+    unittest.main()
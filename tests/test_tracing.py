@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+import unittest
+from uuid import uuid4
+from agent.common.tracing import Tracer, JsonlSpanExporter, NOOP_SPAN
+from agent.callbacks import TracingCallbackHandler
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.trace_file = os.path.join(self.tmp_dir, "spans.jsonl")
+        self.tracer = Tracer(JsonlSpanExporter(self.trace_file))
+
+    def read_spans(self):
+        with open(self.trace_file) as f:
+            return {span["name"]: span for span in map(json.loads, f)}
+
+    def test_disabled_tracer_returns_noop(self):
+        tracer = Tracer()
+        self.assertFalse(tracer.enabled)
+        with tracer.span("session", session_id="s") as span:
+            span.set_attribute("key", "value")
+        self.assertIs(span, NOOP_SPAN)
+
+    def test_nested_spans_are_exported(self):
+        with self.tracer.span("session", session_id="s1"):
+            with self.tracer.span("node.planner") as node:
+                with self.tracer.span("sandbox.run_command", command="ls") as cmd:
+                    cmd.set_attribute("exit_code", 0)
+
+        spans = self.read_spans()
+        self.assertEqual(set(spans), {"session", "node.planner", "sandbox.run_command"})
+        self.assertIsNone(spans["session"]["parent_id"])
+        self.assertEqual(spans["node.planner"]["parent_id"], spans["session"]["span_id"])
+        self.assertEqual(spans["sandbox.run_command"]["parent_id"], node.span_id)
+        self.assertEqual(spans["sandbox.run_command"]["trace_id"], spans["session"]["trace_id"])
+        self.assertEqual(spans["sandbox.run_command"]["attributes"]["exit_code"], 0)
+        self.assertIsNone(self.tracer.current_span())
+
+    def test_error_is_recorded(self):
+        with self.assertRaises(ValueError):
+            with self.tracer.span("node.tester"):
+                raise ValueError("boom")
+        span = self.read_spans()["node.tester"]
+        self.assertEqual(span["status"], "ERROR")
+        self.assertIn("boom", span["error"])
+
+    def test_callback_handler_tool_span_is_current_during_tool(self):
+        import agent.callbacks as callbacks_module
+        original = callbacks_module.tracer
+        callbacks_module.tracer = self.tracer
+        try:
+            handler = TracingCallbackHandler("s2")
+            run_id = uuid4()
+            with self.tracer.span("node.programmer"):
+                handler.on_tool_start({"name": "read_file"}, "a.py", run_id=run_id)
+                with self.tracer.span("sandbox.read_file"):
+                    pass
+                handler.on_tool_end("content", run_id=run_id)
+        finally:
+            callbacks_module.tracer = original
+
+        spans = self.read_spans()
+        self.assertEqual(spans["sandbox.read_file"]["parent_id"], spans["tool.call"]["span_id"])
+        self.assertEqual(spans["tool.call"]["parent_id"], spans["node.programmer"]["span_id"])
+        self.assertEqual(spans["tool.call"]["attributes"]["tool"], "read_file")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,9 +3,13 @@ import unittest
 from unittest.mock import MagicMock, patch
 from agent.workflow_pkg.manager import WorkflowManager
 from agent.workflow_pkg.state import AgentState
+from tests.helpers import use_temp_storage
 
 class TestWorkflow(unittest.TestCase):
 
+    def setUp(self):
+        use_temp_storage(self)
+
     @patch("agent.workflow_pkg.manager.initializer_node")
     @patch("agent.workflow_pkg.manager.env_setup_node")
     @patch("agent.workflow_pkg.manager.planner_node")